@@ -3,8 +3,11 @@
 Check help output for main command:
 
   $ icon --help
-  usage: icon [-h] [--log {debug,info,warning,error,critical}]
-              {config,dataloss,list,measure,rename,stu} ...
+  usage: icon [-h] [--log {debug,info,warning,error,critical}] [--stats]
+              [--stats-file FILE] [--stats-format {json,prometheus}]
+              [--stats-interval SECONDS]
+              {analyze,benchmark,catalog,config,dataloss,export,list,measure,rename,stu}
+              ...
   
   ICOtronic CLI tool
   
@@ -13,15 +16,119 @@ Check help output for main command:
     --log {debug,info,warning,error,critical}
                           minimum log level
   
+  Statistics:
+    --stats               print network statistics (request latency, retries, …)
+                          at exit
+    --stats-file FILE     periodically store network statistics in FILE
+    --stats-format {json,prometheus}
+                          format of statistics file
+    --stats-interval SECONDS
+                          time between updates of statistics file
+  
   Subcommands:
-    {config,dataloss,list,measure,rename,stu}
+    {analyze,benchmark,catalog,config,dataloss,export,list,measure,rename,stu}
+      analyze             Compute metrics for multiple measurement files
+      benchmark           Compare compression settings for measurement data
+      catalog             Search measurement files
       config              Open config file in default application
       dataloss            Check data loss at different sample rates
+      export              Convert measurement file into another format
       list                List sensor devices
       measure             Store measurement data
       rename              Rename a sensor device
       stu                 Execute commands related to stationary receiver unit
 
+Check help output of analyze command:
+
+  $ icon analyze -h
+  usage: icon analyze [-h] [-o FILE] [-m METRIC] [-b LOW-HIGH] [-w WORKERS]
+                      PATH [PATH ...]
+  
+  positional arguments:
+    PATH                  measurement file or directory containing measurement
+                          files
+  
+  option.* (re)
+    -h, --help            show this help message and exit
+    -o FILE, --output FILE
+                          summary file (CSV or HDF5)
+    -m METRIC, --metric METRIC
+                          metric that should be computed: dataloss, sample_rate,
+                          rms, peak, noise, bands (default: all metrics)
+    -b LOW-HIGH, --band LOW-HIGH
+                          frequency band in Hz for metric “bands”
+    -w WORKERS, --workers WORKERS
+                          number of processes used to analyze files (default:
+                          CPU cores)
+
+Check help output of benchmark command:
+
+  $ icon benchmark -h
+  usage: icon benchmark [-h] [--compression LIBRARY] [--compression-level 0–9]
+                        [--shuffle {none,byte,bit}]
+                        FILE
+  
+  positional arguments:
+    FILE                  measurement file (HDF5) containing sample data
+  
+  option.* (re)
+    -h, --help            show this help message and exit
+  
+  Compression:
+    --compression LIBRARY
+                          compression library for measurement data (e.g. zlib,
+                          blosc:lz4, blosc:zstd)
+    --compression-level 0–9
+                          compression level (0 for no compression)
+    --shuffle {none,byte,bit}
+                          shuffle filter applied before compression
+
+Check help output of catalog command:
+
+  $ icon catalog -h
+  usage: icon catalog [-h] {index,search} ...
+  
+  option.* (re)
+    -h, --help      show this help message and exit
+  
+  Subcommands:
+    {index,search}
+      index         Add measurement files of directories to catalog
+      search        Search for measurement files
+
+Check help output of catalog index command:
+
+  $ icon catalog index -h
+  usage: icon catalog index [-h] [-w WORKERS] [DIRECTORY ...]
+  
+  positional arguments:
+    DIRECTORY             directory containing measurement files (default:
+                          output directory of configuration)
+  
+  option.* (re)
+    -h, --help            show this help message and exit
+    -w WORKERS, --workers WORKERS
+                          number of processes used to read files (default: CPU
+                          cores)
+
+Check help output of catalog search command:
+
+  $ icon catalog search -h
+  usage: icon catalog search [-h] [-n NAME] [--since DATE] [--until DATE]
+                             [--min-rate HZ] [--max-rate HZ]
+                             [--max-loss PERCENT] [-a NAME=VALUE]
+  
+  option.* (re)
+    -h, --help            show this help message and exit
+    -n NAME, --name NAME  pattern for the filename (e.g. “Measurement_2024*”)
+    --since DATE          earliest start time (e.g. “2024-05-17 13:45”)
+    --until DATE          latest start time
+    --min-rate HZ         minimum sample rate in Hz
+    --max-rate HZ         maximum sample rate in Hz
+    --max-loss PERCENT    maximum data loss in percent
+    -a NAME=VALUE, --attribute NAME=VALUE
+                          required value of measurement attribute
+
 Check help output of config command:
 
   $ icon config -h
@@ -30,6 +137,22 @@ Check help output of config command:
   option.* (re)
     -h, --help  show this help message and exit
 
+Check help output of export command:
+
+  $ icon export -h
+  usage: icon export [-h] [--row-group-size ROWS] INPUT OUTPUT
+  
+  positional arguments:
+    INPUT                 measurement file (HDF5)
+    OUTPUT                exported file (.npy, .arrow, .feather, .ipc or
+                          .parquet)
+  
+  option.* (re)
+    -h, --help            show this help message and exit
+    --row-group-size ROWS
+                          number of rows per row group (Parquet) or record batch
+                          (Arrow)
+
 Check help output of list command:
 
   $ icon list -h
@@ -41,18 +164,31 @@ Check help output of list command:
 Check help output of measure command:
 
   $ icon measure --help
-  usage: icon measure [-h] [-t TIME] [-1 [FIRST_CHANNEL]] [-2 [SECOND_CHANNEL]]
-                      [-3 [THIRD_CHANNEL]]* (glob)
+  usage: icon measure [-h] [-t TIME] [-r] [-f {hdf5,npy,arrow,parquet}] [--live]
+                      [--voltage] [-1 [FIRST_CHANNEL]] [-2 [SECOND_CHANNEL]]
+                      [-3 [THIRD_CHANNEL]] [--trigger-level G] [--trigger-rms G]
+                      [--rms-window SECONDS] [--trigger-band LOW-HIGH]
+                      [--trigger-energy G²] [--pre-trigger SECONDS]
+                      [--post-trigger SECONDS]
                       *-d DEVICE_NUMBER) [-s * (glob)
                       [-a {1,2,3,4,8,16,32,64,128,256}]
                       [-o {1,2,4,8,16,32,64,128,256,512,1024,2048,4096}]
                       [-v {1.25,1.65,1.8,2.1,2.2,2.5,2.7,3.3,5,6.6}]
+                      [--compression LIBRARY] [--compression-level 0–9]
+                      [--shuffle {none,byte,bit}]
   
   option.* (re)
     -h, --help            show this help message and exit
   
   Measurement:
     -t* measurement time in seconds (0 for infinite runtime) (glob)
+    -r, --raw             store raw ADC values instead of acceleration in g
+    -f {hdf5,npy,arrow,parquet}, --format {hdf5,npy,arrow,parquet}
+                          file format of measurement data
+    --live                show rolling statistics of every channel during
+                          measurement
+    --voltage             also store the supply voltage (table “voltage” of HDF5
+                          file)
     -1* [FIRST_CHANNEL] (glob)
                           sensor channel number for first measurement channel (1
                           - 255; 0 to disable)
@@ -63,6 +199,20 @@ Check help output of measure command:
                           sensor channel number for third measurement channel (1
                           - 255; 0 to disable)
   
+  Trigger:
+    --trigger-level G     store data around absolute acceleration values of at
+                          least G
+    --trigger-rms G       store data around RMS values (see --rms-window) of at
+                          least G
+    --rms-window SECONDS  length of the window for RMS values (default: 0.1)
+    --trigger-band LOW-HIGH
+                          frequency band in Hz for --trigger-energy
+    --trigger-energy G²   store data around band energies of at least G²
+    --pre-trigger SECONDS
+                          stored time before trigger events (default: 1)
+    --post-trigger SECONDS
+                          stored time after trigger events (default: 2)
+  
   Sensor Device Identifier:
     -n* Name of sensor device (glob)
     -m* (glob)
@@ -79,6 +229,15 @@ Check help output of measure command:
                           Oversampling rate value
     -v* {1.25,1.65,1.8,2.1,2.2,2.5,2.7,3.3,5,6.6} (glob)
                           Reference voltage in V
+  
+  Compression:
+    --compression LIBRARY
+                          compression library for measurement data (e.g. zlib,
+                          blosc:lz4, blosc:zstd)
+    --compression-level 0–9
+                          compression level (0 for no compression)
+    --shuffle {none,byte,bit}
+                          shuffle filter applied before compression
 
 Check help output of rename command:
 
@@ -0,0 +1,361 @@
+"""Estimate the bandwidth required for streaming data
+
+The sensor node sends streaming data over Bluetooth to the STU, which
+forwards every message on the CAN bus. Both connections only provide a
+limited bandwidth: if a configuration requires more bits per second than a
+connection can transfer, then streaming data gets lost.
+
+The bandwidth model below is based on the model of the old network code
+(`bandwith`, `canBandwith` and `bluetoothBandwidth` in
+`mytoolit.old.network`): every streaming message consists of a header, a
+sub header (streaming format and message counter) and the 16 bit values of
+the enabled channels. The ADC of the sensor node distributes its
+conversions evenly across all enabled (acceleration and voltage) channels.
+"""
+
+# -- Imports ------------------------------------------------------------------
+
+from __future__ import annotations
+
+from typing import NamedTuple, Optional
+
+from mytoolit.can.adc import ADCConfiguration
+from mytoolit.can.streaming import StreamingConfiguration, StreamingFormat
+
+# -- Constants ----------------------------------------------------------------
+
+# Number of bits of an extended CAN frame without data bytes (identifier,
+# control field, CRC, acknowledgment, end of frame and interframe space)
+CAN_HEADER_BITS = 67
+
+# Number of header bits of a Bluetooth streaming packet
+BLUETOOTH_HEADER_BITS = 32
+
+# Streaming format and message counter
+SUB_HEADER_BITS = 16
+
+# Number of bits of a single streaming value
+VALUE_BITS = 16
+
+# Maximum number of (16 bit) values in a single streaming message
+MAX_VALUES_PER_MESSAGE = 3
+
+# Default bitrate of the CAN bus (see configuration)
+CAN_BITRATE = 1_000_000
+
+# Estimated payload rate of the Bluetooth connection between sensor node and
+# STU (the results of `icon dataloss` show the actual limit of a setup)
+BLUETOOTH_BITRATE = 400_000
+
+# Load above which small disturbances (e.g. a weak Bluetooth connection or
+# other traffic on the CAN bus) usually cause data loss
+ELEVATED_LOAD = 0.8
+
+# -- Functions ----------------------------------------------------------------
+
+
+def data_sets(channels: StreamingConfiguration) -> int:
+    """Get the number of data sets with the highest throughput
+
+    Every streaming message has the same overhead (header and sub header),
+    which means the throughput is maximal, if every message contains as
+    many values as possible.
+
+    Parameters
+    ----------
+
+    channels:
+        The enabled channels
+
+    Returns
+    -------
+
+    The largest number of data sets (values per channel), whose values fit
+    into a single streaming message
+
+    Examples
+    --------
+
+    >>> data_sets(StreamingConfiguration(first=True))
+    3
+    >>> data_sets(StreamingConfiguration(first=True, third=True))
+    1
+    >>> data_sets(StreamingConfiguration(first=True, second=True,
+    ...                                  third=True))
+    1
+
+    """
+
+    enabled = channels.enabled_channels()
+    if enabled <= 0:
+        raise ValueError("At least one channel has to be enabled")
+
+    return max(
+        sets
+        for sets in StreamingFormat.data_set
+        if 0 < sets * enabled <= MAX_VALUES_PER_MESSAGE
+    )
+
+
+def channel_sample_rate(
+    adc_configuration: ADCConfiguration,
+    channels: StreamingConfiguration,
+    voltage: Optional[StreamingConfiguration] = None,
+) -> float:
+    """Get the sample rate of a single enabled channel
+
+    Parameters
+    ----------
+
+    adc_configuration:
+        The ADC configuration of the sensor node
+
+    channels:
+        The enabled acceleration channels
+
+    voltage:
+        The enabled voltage channels or `None`, if the sensor node only
+        streams acceleration data
+
+    Returns
+    -------
+
+    The number of values per second of every enabled (acceleration or
+    voltage) channel
+
+    Examples
+    --------
+
+    >>> adc_configuration = ADCConfiguration(
+    ...     prescaler=2, acquisition_time=8, oversampling_rate=64)
+    >>> round(channel_sample_rate(
+    ...     adc_configuration, StreamingConfiguration(first=True)), 2)
+    9523.81
+
+    The ADC distributes its conversions across the acceleration and voltage
+    channels
+
+    >>> round(channel_sample_rate(
+    ...     adc_configuration,
+    ...     StreamingConfiguration(first=True, second=True, third=True),
+    ...     voltage=StreamingConfiguration(first=True)), 2)
+    2380.95
+
+    """
+
+    streams = [channels] + ([] if voltage is None else [voltage])
+    return adc_configuration.sample_rate() / sum(
+        stream.enabled_channels() for stream in streams
+    )
+
+
+def plan_bandwidth(  # pylint: disable=too-many-arguments
+    adc_configuration: ADCConfiguration,
+    channels: StreamingConfiguration,
+    voltage: Optional[StreamingConfiguration] = None,
+    *,
+    can_bitrate: float = CAN_BITRATE,
+    bluetooth_bitrate: float = BLUETOOTH_BITRATE,
+) -> BandwidthPlan:
+    """Estimate the bandwidth required for a streaming configuration
+
+    Parameters
+    ----------
+
+    adc_configuration:
+        The ADC configuration of the sensor node
+
+    channels:
+        The enabled acceleration channels
+
+    voltage:
+        The enabled voltage channels or `None`, if the sensor node only
+        streams acceleration data
+
+    can_bitrate:
+        The bitrate of the CAN bus in bit/s
+
+    bluetooth_bitrate:
+        The maximum payload rate of the Bluetooth connection in bit/s
+
+    Returns
+    -------
+
+    The predicted load of the CAN bus and the Bluetooth connection
+
+    Examples
+    --------
+
+    >>> adc_configuration = ADCConfiguration(
+    ...     prescaler=2, acquisition_time=8, oversampling_rate=64)
+    >>> plan_bandwidth(adc_configuration, StreamingConfiguration(first=True))
+    3174.60 Messages/s (3 Data Sets), CAN: 415.87 kbit/s (41.6 %), \
+Bluetooth: 304.76 kbit/s (76.2 %), Risk: low
+
+    >>> plan = plan_bandwidth(
+    ...     ADCConfiguration(prescaler=2, acquisition_time=8,
+    ...                      oversampling_rate=32),
+    ...     StreamingConfiguration(first=True, second=True))
+    >>> plan.risk(), plan.sustainable()
+    ('unsustainable', False)
+
+    Voltage channels reduce the sample rate of the acceleration channels
+
+    >>> plan = plan_bandwidth(adc_configuration,
+    ...                       StreamingConfiguration(first=True),
+    ...                       voltage=StreamingConfiguration(first=True))
+    >>> round(plan.messages, 2), round(plan.voltage_messages, 2)
+    (1587.3, 1587.3)
+
+    """
+
+    sample_rate = adc_configuration.sample_rate()
+    channel_rate = channel_sample_rate(adc_configuration, channels, voltage)
+    streams = [channels] + ([] if voltage is None else [voltage])
+
+    can = 0.0
+    bluetooth = 0.0
+    messages = []
+    for stream in streams:
+        sets = data_sets(stream)
+        values = sets * stream.enabled_channels()
+        rate = channel_rate / sets
+        messages.append(rate)
+        can += (CAN_HEADER_BITS + SUB_HEADER_BITS + VALUE_BITS * values) * rate
+        bluetooth += (
+            BLUETOOTH_HEADER_BITS + SUB_HEADER_BITS + VALUE_BITS * values
+        ) * rate
+
+    return BandwidthPlan(
+        sample_rate=sample_rate,
+        data_sets=data_sets(channels),
+        messages=messages[0],
+        voltage_messages=messages[1] if voltage is not None else 0,
+        can_bitrate=can,
+        can_load=can / can_bitrate,
+        bluetooth_bitrate=bluetooth,
+        bluetooth_load=bluetooth / bluetooth_bitrate,
+    )
+
+
+# -- Classes ------------------------------------------------------------------
+
+
+class BandwidthPlan(NamedTuple):
+    """Predicted bandwidth usage of a streaming configuration"""
+
+    sample_rate: float
+    data_sets: int
+    messages: float
+    voltage_messages: float
+    can_bitrate: float
+    can_load: float
+    bluetooth_bitrate: float
+    bluetooth_load: float
+
+    def __repr__(self) -> str:
+        """Get the textual representation of the bandwidth plan
+
+        Returns
+        -------
+
+        A string that contains the message rate, the required bitrate and
+        load of the CAN bus and Bluetooth connection and the risk of data
+        loss
+
+        """
+
+        return (
+            f"{self.messages + self.voltage_messages:.2f} Messages/s "
+            f"({self.data_sets} Data Set{'' if self.data_sets == 1 else 's'}"
+            f"), CAN: {self.can_bitrate / 1000:.2f} kbit/s "
+            f"({self.can_load * 100:.1f} %), Bluetooth: "
+            f"{self.bluetooth_bitrate / 1000:.2f} kbit/s "
+            f"({self.bluetooth_load * 100:.1f} %), Risk: {self.risk()}"
+        )
+
+    def load(self) -> float:
+        """Get the load of the connection with the highest load
+
+        Returns
+        -------
+
+        The required bitrate divided by the available bitrate of the more
+        heavily loaded connection (CAN or Bluetooth)
+
+        """
+
+        return max(self.can_load, self.bluetooth_load)
+
+    def risk(self) -> str:
+        """Get the risk of data loss
+
+        Returns
+        -------
+
+        - `low`, if both connections have enough spare capacity
+        - `elevated`, if one of the connections is close to its limit
+        - `unsustainable`, if one of the connections is not able to transfer
+          the data
+
+        """
+
+        load = self.load()
+        if load > 1:
+            return "unsustainable"
+        if load > ELEVATED_LOAD:
+            return "elevated"
+        return "low"
+
+    def sustainable(self) -> bool:
+        """Check if the connections are able to transfer the data
+
+        Returns
+        -------
+
+        `True`, if the required bitrate of both connections is below their
+        available bitrate, `False` otherwise
+
+        """
+
+        return self.load() <= 1
+
+    def streaming_format(
+        self, channels: StreamingConfiguration
+    ) -> StreamingFormat:
+        """Get the streaming format for the planned data set packing
+
+        Parameters
+        ----------
+
+        channels:
+            The enabled acceleration channels
+
+        Returns
+        -------
+
+        The streaming format that requests a stream of data with the
+        planned number of data sets
+
+        Examples
+        --------
+
+        >>> channels = StreamingConfiguration(first=True)
+        >>> plan_bandwidth(ADCConfiguration(prescaler=2, acquisition_time=8,
+        ...                                 oversampling_rate=64),
+        ...                channels).streaming_format(channels)
+        Streaming, 2 Bytes, 3 Data Sets, Read Value 1
+
+        """
+
+        return StreamingFormat(
+            channels=channels, streaming=True, sets=self.data_sets
+        )
+
+
+# -- Main ---------------------------------------------------------------------
+
+if __name__ == "__main__":
+    from doctest import testmod
+
+    testmod()
@@ -0,0 +1,440 @@
+"""Distribute streaming data to multiple consumers
+
+A stream buffer (`AsyncStreamBuffer`) can only be read by a single consumer.
+The class `StreamBroker` reads blocks of streaming data from a stream buffer
+and publishes them to any number of subscribers. Since streaming blocks are
+read-only, all subscribers share the same block objects. Every subscriber
+uses its own bounded queue: If a subscriber is not able to keep up with the
+stream, then the broker drops the oldest block of this subscriber instead of
+waiting for it. This way a slow consumer (e.g. a plot) never slows down other
+consumers (e.g. the storage of measurement data).
+"""
+
+# -- Imports ------------------------------------------------------------------
+
+from __future__ import annotations
+
+from asyncio import CancelledError, Future, get_running_loop, Task
+from collections import deque
+from types import TracebackType
+from typing import AsyncIterator, Deque, Dict, List, Optional, Type
+
+from mytoolit.can.streaming import AsyncStreamBuffer, StreamingBlock
+
+# -- Classes ------------------------------------------------------------------
+
+
+# pylint: disable=too-many-instance-attributes
+
+
+class StreamSubscription:
+    """Receive streaming blocks published by a stream broker"""
+
+    def __init__(self, name: str = "", max_blocks: int = 100) -> None:
+        """Create a new subscription
+
+        Parameters
+        ----------
+
+        name:
+            A name that describes the subscriber
+
+        max_blocks:
+            The maximum number of queued blocks; if the subscriber falls
+            further behind, then the oldest blocks will be dropped. The value
+            `0` means that the queue size is not limited.
+
+        Examples
+        --------
+
+        >>> StreamSubscription("Plot", max_blocks=10)
+        ... # doctest:+NORMALIZE_WHITESPACE
+        Plot: Received: 0 blocks, Dropped: 0 blocks (0 messages), Lag: 0
+        messages (Max: 0)
+
+        """
+
+        self.name = name
+        self.max_blocks = max_blocks
+        self.queue: Deque[StreamingBlock] = deque()
+        self.received = 0
+        self.dropped = 0
+        self.dropped_messages = 0
+        self.lag = 0
+        self.lag_max = 0
+        self.closed = False
+        self.exception: Optional[BaseException] = None
+        self._waiter: Optional[Future[None]] = None
+
+    def __repr__(self) -> str:
+        """Get the textual representation of the subscription
+
+        Returns
+        -------
+
+        A string that describes the state of the subscription
+
+        """
+
+        return (
+            f"{self.name}: Received: {self.received} blocks, "
+            f"Dropped: {self.dropped} blocks "
+            f"({self.dropped_messages} messages), "
+            f"Lag: {self.lag} messages (Max: {self.lag_max})"
+        )
+
+    def __aiter__(self) -> AsyncIterator[StreamingBlock]:
+        """Retrieve iterator for the published blocks
+
+        Returns
+        -------
+
+        An iterator over the streaming blocks of the subscription
+
+        """
+
+        return self
+
+    async def __anext__(self) -> StreamingBlock:
+        """Retrieve the next streaming block
+
+        Returns
+        -------
+
+        The oldest queued streaming block
+
+        Raises
+        ------
+
+        `StopAsyncIteration`, if the broker stopped and all blocks were
+        read, or the exception that stopped the broker
+
+        """
+
+        while not self.queue:
+            if self.closed:
+                if self.exception is not None:
+                    raise self.exception
+                raise StopAsyncIteration
+
+            self._waiter = get_running_loop().create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+
+        block = self.queue.popleft()
+        self.lag -= len(block)
+
+        return block
+
+    def _wake_up(self) -> None:
+        """Notify a waiting consumer about a state change"""
+
+        waiter = self._waiter
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    def put(self, block: StreamingBlock) -> None:
+        """Add a block to the queue of the subscription
+
+        Parameters
+        ----------
+
+        block:
+            The streaming block that should be added
+
+        Examples
+        --------
+
+        >>> from numpy import array, uint8, uint16, uint32
+        >>> from mytoolit.can.streaming import StreamingConfiguration
+        >>> def create_block(counter):
+        ...     return StreamingBlock(
+        ...         counters=array([counter], dtype=uint8),
+        ...         timestamps=array([counter / 1000]),
+        ...         values=array([[1, 2, 3]], dtype=uint16),
+        ...         lost=array([0], dtype=uint32),
+        ...         configuration=StreamingConfiguration())
+
+        >>> subscription = StreamSubscription("Plot", max_blocks=2)
+        >>> for counter in range(5):
+        ...     subscription.put(create_block(counter))
+        >>> subscription # doctest:+NORMALIZE_WHITESPACE
+        Plot: Received: 5 blocks, Dropped: 3 blocks (3 messages), Lag: 2
+        messages (Max: 2)
+        >>> [int(block.counters[0]) for block in subscription.queue]
+        [3, 4]
+
+        """
+
+        queue = self.queue
+        self.received += 1
+        if 0 < self.max_blocks <= len(queue):
+            dropped = queue.popleft()
+            self.dropped += 1
+            self.dropped_messages += len(dropped)
+            self.lag -= len(dropped)
+
+        queue.append(block)
+        self.lag += len(block)
+        self.lag_max = max(self.lag_max, self.lag)
+        self._wake_up()
+
+    def close(self, exception: Optional[BaseException] = None) -> None:
+        """Stop the subscription
+
+        The consumer can still read all queued blocks. Afterwards the
+        iteration stops or raises the given exception.
+
+        Parameters
+        ----------
+
+        exception:
+            The exception that caused the broker to stop
+
+        """
+
+        self.closed = True
+        self.exception = exception
+        self._wake_up()
+
+    def as_dict(self) -> Dict[str, int]:
+        """Get the statistics of the subscription
+
+        Returns
+        -------
+
+        A dictionary containing the number of received and dropped blocks
+        and the current and maximum lag in messages
+
+        """
+
+        return {
+            "received": self.received,
+            "dropped": self.dropped,
+            "dropped_messages": self.dropped_messages,
+            "lag": self.lag,
+            "lag_max": self.lag_max,
+        }
+
+
+# pylint: enable=too-many-instance-attributes
+
+
+class StreamBroker:
+    """Publish the data of a stream buffer to multiple subscribers"""
+
+    def __init__(
+        self, stream: AsyncStreamBuffer, max_messages: int = 1000
+    ) -> None:
+        """Create a new broker for the given stream buffer
+
+        Parameters
+        ----------
+
+        stream:
+            The stream buffer that provides the streaming data
+
+        max_messages:
+            The maximum number of messages per published block
+
+        Examples
+        --------
+
+        Publish the same data to two subscribers
+
+        >>> from asyncio import create_task, run, sleep
+        >>> from can import Message
+        >>> from mytoolit.can.identifier import Identifier
+        >>> from mytoolit.can.streaming import StreamingConfiguration
+
+        >>> identifier = Identifier(block="Streaming", block_command="Data",
+        ...                         sender="STH 1", receiver="SPU 1")
+        >>> async def produce(stream):
+        ...     for counter in range(20):
+        ...         stream.on_message_received(
+        ...             Message(arbitration_id=identifier.value,
+        ...                     data=[0, counter, 0, 0, 0, 0, 0, 0]))
+        ...         await sleep(0)
+
+        >>> async def consume(subscription, delay):
+        ...     messages = 0
+        ...     async for block in subscription:
+        ...         messages += len(block)
+        ...         await sleep(delay)
+        ...     return messages
+
+        >>> async def main():
+        ...     stream = AsyncStreamBuffer(StreamingConfiguration(),
+        ...                                timeout=1)
+        ...     broker = StreamBroker(stream)
+        ...     storage = broker.subscribe("Storage", max_blocks=0)
+        ...     plot = broker.subscribe("Plot", max_blocks=1)
+        ...     async with broker:
+        ...         consumers = [create_task(consume(storage, 0)),
+        ...                      create_task(consume(plot, 0.01))]
+        ...         await produce(stream)
+        ...         await sleep(0.05)
+        ...     stream.stop()
+        ...     print(f"Stored messages: {await consumers[0]}")
+        ...     await consumers[1]
+        ...     print(f"Plot dropped blocks: {plot.dropped > 0}")
+        >>> run(main())
+        Stored messages: 20
+        Plot dropped blocks: True
+
+        """
+
+        self.stream = stream
+        self.max_messages = max_messages
+        self.subscriptions: List[StreamSubscription] = []
+        self.task: Optional[Task[None]] = None
+
+    async def __aenter__(self) -> StreamBroker:
+        """Start publishing streaming data
+
+        Returns
+        -------
+
+        The stream broker
+
+        """
+
+        self.start()
+        return self
+
+    async def __aexit__(
+        self,
+        exception_type: Optional[Type[BaseException]],
+        exception_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        """Stop publishing streaming data
+
+        Parameters
+        ----------
+
+        exception_type:
+            The type of the exception in case of an exception
+
+        exception_value:
+            The value of the exception in case of an exception
+
+        traceback:
+            The traceback in case of an exception
+
+        """
+
+        await self.stop()
+
+    def subscribe(
+        self, name: str = "", max_blocks: int = 100
+    ) -> StreamSubscription:
+        """Add a new subscriber
+
+        Parameters
+        ----------
+
+        name:
+            A name that describes the subscriber
+
+        max_blocks:
+            The maximum number of queued blocks of the subscriber (`0` for
+            no limit)
+
+        Returns
+        -------
+
+        The subscription, which provides an asynchronous iterator over the
+        published streaming blocks
+
+        """
+
+        subscription = StreamSubscription(name, max_blocks)
+        self.subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: StreamSubscription) -> None:
+        """Remove a subscriber
+
+        Parameters
+        ----------
+
+        subscription:
+            The subscription that should be removed
+
+        """
+
+        self.subscriptions.remove(subscription)
+        subscription.close()
+
+    def publish(self, block: StreamingBlock) -> None:
+        """Send a block of streaming data to all subscribers
+
+        Parameters
+        ----------
+
+        block:
+            The streaming block that should be published
+
+        """
+
+        for subscription in self.subscriptions:
+            subscription.put(block)
+
+    async def run(self) -> None:
+        """Publish streaming data until the stream stops"""
+
+        exception: Optional[BaseException] = None
+        try:
+            async for block in self.stream.blocks(self.max_messages):
+                self.publish(block)
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            exception = error
+        finally:
+            for subscription in self.subscriptions:
+                subscription.close(exception)
+
+    def start(self) -> None:
+        """Start publishing streaming data in a background task"""
+
+        if self.task is None:
+            self.task = get_running_loop().create_task(self.run())
+
+    async def stop(self) -> None:
+        """Stop publishing streaming data"""
+
+        task = self.task
+        if task is None:
+            return
+
+        self.task = None
+        task.cancel()
+        try:
+            await task
+        except CancelledError:
+            pass
+
+    def as_dict(self) -> Dict[str, Dict[str, int]]:
+        """Get the statistics of all subscribers
+
+        Returns
+        -------
+
+        A dictionary that maps the name of each subscriber to its statistics
+
+        """
+
+        return {
+            subscription.name: subscription.as_dict()
+            for subscription in self.subscriptions
+        }
+
+
+# -- Main ---------------------------------------------------------------------
+
+if __name__ == "__main__":
+    from doctest import testmod
+
+    testmod()
@@ -0,0 +1,840 @@
+"""Support for collecting performance metrics of the CAN network
+
+The class `NetworkMetrics` collects information about
+
+- the latency of requests,
+- the number of retries, timeouts and error responses,
+- the rate of received streaming messages,
+- the size of the streaming buffer, and
+- the time spent in the streaming callback of the CAN notifier.
+
+You can access the collected data via the Python API
+(`NetworkMetrics.as_dict`, `NetworkMetrics.summary`) or store it as JSON or
+Prometheus text file (`NetworkMetrics.write`, `NetworkMetrics.dump`).
+"""
+
+# -- Imports ------------------------------------------------------------------
+
+from __future__ import annotations
+
+from asyncio import sleep
+from bisect import bisect_left
+from json import dumps
+from math import inf
+from os import replace
+from pathlib import Path
+from time import monotonic
+from typing import Dict, List, Optional, Union
+
+# -- Classes ------------------------------------------------------------------
+
+
+class LatencyHistogram:
+    """Store a histogram of latency values"""
+
+    # Upper bounds of the histogram buckets in seconds
+    BUCKETS = (
+        0.0001,
+        0.0005,
+        0.001,
+        0.0025,
+        0.005,
+        0.01,
+        0.025,
+        0.05,
+        0.1,
+        0.25,
+        0.5,
+        1,
+        2.5,
+        5,
+    )
+
+    def __init__(self) -> None:
+        """Initialize an empty histogram
+
+        Examples
+        --------
+
+        >>> histogram = LatencyHistogram()
+        >>> histogram.count
+        0
+        >>> histogram.mean()
+        0
+
+        """
+
+        cls = type(self)
+        # The last bucket stores all values larger than the largest bound
+        self.counts = [0] * (len(cls.BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.minimum = inf
+        self.maximum = 0.0
+
+    def add(self, seconds: float) -> None:
+        """Add a latency value to the histogram
+
+        Parameters
+        ----------
+
+        seconds:
+            The latency in seconds
+
+        Examples
+        --------
+
+        >>> histogram = LatencyHistogram()
+        >>> histogram.add(0.002)
+        >>> histogram.add(0.004)
+        >>> histogram.add(10)
+        >>> histogram.count
+        3
+        >>> histogram.minimum
+        0.002
+        >>> histogram.maximum
+        10
+
+        """
+
+        cls = type(self)
+        self.counts[bisect_left(cls.BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.minimum = min(self.minimum, seconds)
+        self.maximum = max(self.maximum, seconds)
+
+    def mean(self) -> float:
+        """Get the mean latency
+
+        Returns
+        -------
+
+        The average of all stored latency values in seconds
+
+        Examples
+        --------
+
+        >>> histogram = LatencyHistogram()
+        >>> histogram.add(1)
+        >>> histogram.add(2)
+        >>> histogram.mean()
+        1.5
+
+        """
+
+        return self.sum / self.count if self.count > 0 else 0
+
+    def quantile(self, quantile: float) -> float:
+        """Estimate a quantile of the stored latency values
+
+        The returned value is the upper bound of the bucket that contains the
+        requested quantile (or the maximum value, if this value is smaller).
+
+        Parameters
+        ----------
+
+        quantile:
+            A number between 0 and 1 (e.g. 0.99 for the 99th percentile)
+
+        Returns
+        -------
+
+        An upper bound for the requested quantile in seconds
+
+        Examples
+        --------
+
+        >>> histogram = LatencyHistogram()
+        >>> for _ in range(99):
+        ...     histogram.add(0.003)
+        >>> histogram.add(0.2)
+        >>> histogram.quantile(0.5)
+        0.005
+        >>> histogram.quantile(0.99)
+        0.005
+        >>> histogram.quantile(1)
+        0.2
+
+        """
+
+        if self.count <= 0:
+            return 0
+
+        cls = type(self)
+        rank = quantile * self.count
+        cumulative = 0
+        for bound, count in zip((*cls.BUCKETS, inf), self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return min(bound, self.maximum)
+
+        return self.maximum
+
+    def as_dict(self) -> Dict[str, Union[int, float, Dict[str, int]]]:
+        """Get a (JSON serializable) representation of the histogram
+
+        Returns
+        -------
+
+        A dictionary containing the histogram data
+
+        Examples
+        --------
+
+        >>> histogram = LatencyHistogram()
+        >>> histogram.add(0.003)
+        >>> data = histogram.as_dict()
+        >>> data["count"]
+        1
+        >>> data["buckets"]["0.005"]
+        1
+
+        """
+
+        cls = type(self)
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.mean(),
+            "min": self.minimum if self.count > 0 else 0,
+            "max": self.maximum,
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+            "buckets": {
+                str(bound): count
+                for bound, count in zip((*cls.BUCKETS, "+Inf"), self.counts)
+            },
+        }
+
+
+# pylint: disable=too-few-public-methods
+
+
+class RequestMetrics:
+    """Store metrics for a single request type"""
+
+    def __init__(self) -> None:
+        """Initialize the metrics for a request type"""
+
+        self.latency = LatencyHistogram()
+        self.retries = 0
+        self.timeouts = 0
+        self.errors = 0
+
+    def as_dict(self) -> Dict[str, object]:
+        """Get a (JSON serializable) representation of the request metrics
+
+        Returns
+        -------
+
+        A dictionary containing the request metrics
+
+        Examples
+        --------
+
+        >>> RequestMetrics().as_dict()["retries"]
+        0
+
+        """
+
+        return {
+            "latency": self.latency.as_dict(),
+            "retries": self.retries,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+        }
+
+
+# pylint: enable=too-few-public-methods
+
+
+# pylint: disable=too-many-instance-attributes
+
+
+class NetworkMetrics:
+    """Collect performance metrics of a CAN network"""
+
+    FORMATS = ("json", "prometheus")
+
+    def __init__(self) -> None:
+        """Initialize the metrics collector
+
+        Examples
+        --------
+
+        >>> metrics = NetworkMetrics()
+        >>> metrics.requests
+        {}
+
+        """
+
+        self.requests: Dict[str, RequestMetrics] = {}
+        self.frames = 0
+        self.frames_lost = 0
+        self.first_frame_time: Optional[float] = None
+        self.last_frame_time: Optional[float] = None
+        self.queue_depth = 0
+        self.queue_depth_max = 0
+        self.frames_dropped = 0
+        self.frames_spilled = 0
+        self.callback_time = LatencyHistogram()
+
+    def _request(self, name: str) -> RequestMetrics:
+        """Get the metrics for a request type
+
+        Parameters
+        ----------
+
+        name:
+            The name of the request type
+
+        Returns
+        -------
+
+        The (possibly newly created) metrics of the request type
+
+        """
+
+        metrics = self.requests.get(name)
+        if metrics is None:
+            metrics = self.requests[name] = RequestMetrics()
+
+        return metrics
+
+    def record_request(self, name: str, seconds: float) -> None:
+        """Record the latency of a successful request
+
+        Parameters
+        ----------
+
+        name:
+            The name of the request type
+
+        seconds:
+            The time between sending the (first) request and receiving the
+            response
+
+        Examples
+        --------
+
+        >>> metrics = NetworkMetrics()
+        >>> metrics.record_request("System/Reset", 0.002)
+        >>> metrics.requests["System/Reset"].latency.count
+        1
+
+        """
+
+        self._request(name).latency.add(seconds)
+
+    def record_retry(self, name: str) -> None:
+        """Record that a request had to be sent again
+
+        Parameters
+        ----------
+
+        name:
+            The name of the request type
+
+        Examples
+        --------
+
+        >>> metrics = NetworkMetrics()
+        >>> metrics.record_retry("System/Reset")
+        >>> metrics.requests["System/Reset"].retries
+        1
+
+        """
+
+        self._request(name).retries += 1
+
+    def record_timeout(self, name: str) -> None:
+        """Record that a request did not receive any response
+
+        Parameters
+        ----------
+
+        name:
+            The name of the request type
+
+        Examples
+        --------
+
+        >>> metrics = NetworkMetrics()
+        >>> metrics.record_timeout("System/Reset")
+        >>> metrics.requests["System/Reset"].timeouts
+        1
+
+        """
+
+        self._request(name).timeouts += 1
+
+    def record_error(self, name: str) -> None:
+        """Record that a request received an error response
+
+        Parameters
+        ----------
+
+        name:
+            The name of the request type
+
+        Examples
+        --------
+
+        >>> metrics = NetworkMetrics()
+        >>> metrics.record_error("System/Reset")
+        >>> metrics.requests["System/Reset"].errors
+        1
+
+        """
+
+        self._request(name).errors += 1
+
+    def record_frame(self, lost: int = 0) -> None:
+        """Record a received streaming message
+
+        Parameters
+        ----------
+
+        lost:
+            The number of lost streaming messages before this message
+
+        Examples
+        --------
+
+        >>> metrics = NetworkMetrics()
+        >>> metrics.record_frame()
+        >>> metrics.record_frame(lost=2)
+        >>> metrics.frames, metrics.frames_lost
+        (2, 2)
+
+        """
+
+        timestamp = monotonic()
+        if self.first_frame_time is None:
+            self.first_frame_time = timestamp
+        self.last_frame_time = timestamp
+        self.frames += 1
+        self.frames_lost += lost
+
+    def record_queue_depth(self, depth: int) -> None:
+        """Record the current size of the streaming buffer
+
+        Parameters
+        ----------
+
+        depth:
+            The number of buffered streaming messages
+
+        Examples
+        --------
+
+        >>> metrics = NetworkMetrics()
+        >>> metrics.record_queue_depth(10)
+        >>> metrics.record_queue_depth(3)
+        >>> metrics.queue_depth, metrics.queue_depth_max
+        (3, 10)
+
+        """
+
+        self.queue_depth = depth
+        self.queue_depth_max = max(self.queue_depth_max, depth)
+
+    def record_overflow(self, dropped: int = 0, spilled: int = 0) -> None:
+        """Record messages handled by the overflow policy of a stream buffer
+
+        Parameters
+        ----------
+
+        dropped:
+            The number of buffered streaming messages that were removed
+
+        spilled:
+            The number of streaming messages that were stored on disk
+
+        Examples
+        --------
+
+        >>> metrics = NetworkMetrics()
+        >>> metrics.record_overflow(dropped=1)
+        >>> metrics.record_overflow(spilled=2)
+        >>> metrics.frames_dropped, metrics.frames_spilled
+        (1, 2)
+
+        """
+
+        self.frames_dropped += dropped
+        self.frames_spilled += spilled
+
+    def record_callback(self, seconds: float) -> None:
+        """Record the time spent in a notifier callback
+
+        Parameters
+        ----------
+
+        seconds:
+            The runtime of the callback in seconds
+
+        Examples
+        --------
+
+        >>> metrics = NetworkMetrics()
+        >>> metrics.record_callback(0.00002)
+        >>> metrics.callback_time.count
+        1
+
+        """
+
+        self.callback_time.add(seconds)
+
+    def frame_rate(self) -> float:
+        """Calculate the rate of received streaming messages
+
+        Returns
+        -------
+
+        The number of received streaming messages per second
+
+        Examples
+        --------
+
+        >>> metrics = NetworkMetrics()
+        >>> metrics.frame_rate()
+        0
+
+        """
+
+        if (
+            self.first_frame_time is None
+            or self.last_frame_time is None
+            or self.last_frame_time <= self.first_frame_time
+        ):
+            return 0
+
+        duration = self.last_frame_time - self.first_frame_time
+        return (self.frames - 1) / duration
+
+    def as_dict(self) -> Dict[str, object]:
+        """Get a (JSON serializable) representation of all metrics
+
+        Returns
+        -------
+
+        A dictionary containing all collected metrics
+
+        Examples
+        --------
+
+        >>> metrics = NetworkMetrics()
+        >>> metrics.record_request("Streaming/Voltage", 0.01)
+        >>> sorted(metrics.as_dict())
+        ['callback', 'requests', 'streaming']
+
+        """
+
+        return {
+            "requests": {
+                name: metrics.as_dict()
+                for name, metrics in sorted(self.requests.items())
+            },
+            "streaming": {
+                "frames": self.frames,
+                "frames_lost": self.frames_lost,
+                "frame_rate": self.frame_rate(),
+                "queue_depth": self.queue_depth,
+                "queue_depth_max": self.queue_depth_max,
+                "frames_dropped": self.frames_dropped,
+                "frames_spilled": self.frames_spilled,
+            },
+            "callback": self.callback_time.as_dict(),
+        }
+
+    def summary(self) -> str:
+        """Get a human readable summary of the collected metrics
+
+        Returns
+        -------
+
+        A textual description of the metrics
+
+        Examples
+        --------
+
+        >>> metrics = NetworkMetrics()
+        >>> metrics.record_request("System/Reset", 0.002)
+        >>> metrics.record_retry("System/Reset")
+        >>> print(metrics.summary()) # doctest:+NORMALIZE_WHITESPACE
+        Requests:
+          System/Reset: 1 requests, Mean: 2.00 ms, P99: 2.00 ms,
+                        Max: 2.00 ms, Retries: 1, Timeouts: 0, Errors: 0
+        Streaming:
+          Messages: 0 (Lost: 0), Rate: 0.0 messages/s, Buffer: 0 (Max: 0)
+          Overflow: Dropped: 0, Spilled: 0
+          Callback: Mean: 0.0 µs, Max: 0.0 µs
+
+        """
+
+        lines = ["Requests:"]
+        for name, metrics in sorted(self.requests.items()):
+            latency = metrics.latency
+            lines.append(
+                f"  {name}: {latency.count} requests, "
+                f"Mean: {latency.mean() * 1000:.2f} ms, "
+                f"P99: {latency.quantile(0.99) * 1000:.2f} ms, "
+                f"Max: {latency.maximum * 1000:.2f} ms, "
+                f"Retries: {metrics.retries}, "
+                f"Timeouts: {metrics.timeouts}, "
+                f"Errors: {metrics.errors}"
+            )
+
+        callback = self.callback_time
+        lines.extend([
+            "Streaming:",
+            (
+                f"  Messages: {self.frames} (Lost: {self.frames_lost}), "
+                f"Rate: {self.frame_rate():.1f} messages/s, "
+                f"Buffer: {self.queue_depth} (Max: {self.queue_depth_max})"
+            ),
+            (
+                f"  Overflow: Dropped: {self.frames_dropped}, "
+                f"Spilled: {self.frames_spilled}"
+            ),
+            (
+                f"  Callback: Mean: {callback.mean() * 10**6:.1f} µs, "
+                f"Max: {callback.maximum * 10**6:.1f} µs"
+            ),
+        ])
+
+        return "\n".join(lines)
+
+    def to_prometheus(self) -> str:
+        """Get the metrics in the Prometheus text exposition format
+
+        Returns
+        -------
+
+        A string that can be used as input for the text file collector of the
+        Prometheus node exporter
+
+        Examples
+        --------
+
+        >>> metrics = NetworkMetrics()
+        >>> metrics.record_request("System/Reset", 0.002)
+        >>> lines = metrics.to_prometheus().splitlines()
+        >>> print(lines[1])
+        # TYPE icoc_request_latency_seconds histogram
+        >>> print(lines[5]) # doctest:+NORMALIZE_WHITESPACE
+        icoc_request_latency_seconds_bucket{request="System/Reset",le="0.0025"}
+        1
+
+        """
+
+        def histogram(
+            name: str, values: LatencyHistogram, labels: str = ""
+        ) -> List[str]:
+            """Convert a histogram into Prometheus format"""
+
+            separator = "," if labels else ""
+            lines = []
+            cumulative = 0
+            for bound, count in zip(
+                (*LatencyHistogram.BUCKETS, "+Inf"), values.counts
+            ):
+                cumulative += count
+                lines.append(
+                    f'{name}_bucket{{{labels}{separator}le="{bound}"}} '
+                    f"{cumulative}"
+                )
+            labels_text = f"{{{labels}}}" if labels else ""
+            lines.append(f"{name}_sum{labels_text} {values.sum}")
+            lines.append(f"{name}_count{labels_text} {values.count}")
+            return lines
+
+        lines = [
+            "# HELP icoc_request_latency_seconds Latency of CAN requests",
+            "# TYPE icoc_request_latency_seconds histogram",
+        ]
+        for name, metrics in sorted(self.requests.items()):
+            lines.extend(
+                histogram(
+                    "icoc_request_latency_seconds",
+                    metrics.latency,
+                    f'request="{name}"',
+                )
+            )
+
+        for counter, description in (
+            ("retries", "Number of resent requests"),
+            ("timeouts", "Number of requests without response"),
+            ("errors", "Number of error responses"),
+        ):
+            metric = f"icoc_request_{counter}_total"
+            lines.append(f"# HELP {metric} {description}")
+            lines.append(f"# TYPE {metric} counter")
+            for name, metrics in sorted(self.requests.items()):
+                lines.append(
+                    f'{metric}{{request="{name}"}} {getattr(metrics, counter)}'
+                )
+
+        for metric, metric_type, description, value in (
+            (
+                "icoc_streaming_messages_total",
+                "counter",
+                "Number of received streaming messages",
+                self.frames,
+            ),
+            (
+                "icoc_streaming_messages_lost_total",
+                "counter",
+                "Number of lost streaming messages",
+                self.frames_lost,
+            ),
+            (
+                "icoc_streaming_messages_per_second",
+                "gauge",
+                "Rate of received streaming messages",
+                self.frame_rate(),
+            ),
+            (
+                "icoc_stream_buffer_messages",
+                "gauge",
+                "Number of buffered streaming messages",
+                self.queue_depth,
+            ),
+            (
+                "icoc_stream_buffer_messages_max",
+                "gauge",
+                "Maximum number of buffered streaming messages",
+                self.queue_depth_max,
+            ),
+            (
+                "icoc_stream_buffer_dropped_total",
+                "counter",
+                "Number of streaming messages removed from a full buffer",
+                self.frames_dropped,
+            ),
+            (
+                "icoc_stream_buffer_spilled_total",
+                "counter",
+                "Number of streaming messages stored on disk",
+                self.frames_spilled,
+            ),
+        ):
+            lines.extend([
+                f"# HELP {metric} {description}",
+                f"# TYPE {metric} {metric_type}",
+                f"{metric} {value}",
+            ])
+
+        lines.extend([
+            "# HELP icoc_notifier_callback_seconds Runtime of stream callback",
+            "# TYPE icoc_notifier_callback_seconds histogram",
+            *histogram("icoc_notifier_callback_seconds", self.callback_time),
+        ])
+
+        return "\n".join(lines) + "\n"
+
+    def write(
+        self, filepath: Union[Path, str], file_format: str = "json"
+    ) -> None:
+        """Store the metrics in a file
+
+        The data is first written to a temporary file, which then replaces
+        the target file. This way readers (such as the Prometheus node
+        exporter) never see a partially written file.
+
+        Parameters
+        ----------
+
+        filepath:
+            The location of the output file
+
+        file_format:
+            The output format (`json` or `prometheus`)
+
+        Examples
+        --------
+
+        >>> from json import loads
+        >>> filepath = Path("metrics.json")
+        >>> metrics = NetworkMetrics()
+        >>> metrics.record_frame()
+        >>> metrics.write(filepath)
+        >>> loads(filepath.read_text())["streaming"]["frames"]
+        1
+        >>> filepath.unlink()
+
+        >>> metrics.write(filepath, file_format="xml")
+        Traceback (most recent call last):
+           ...
+        ValueError: Unsupported metrics format: “xml”
+
+        """
+
+        if file_format not in type(self).FORMATS:
+            raise ValueError(f"Unsupported metrics format: “{file_format}”")
+
+        filepath = Path(filepath)
+        text = (
+            dumps(self.as_dict(), indent=2)
+            if file_format == "json"
+            else self.to_prometheus()
+        )
+        temporary_filepath = filepath.with_name(f".{filepath.name}.tmp")
+        temporary_filepath.write_text(text, encoding="utf-8")
+        replace(temporary_filepath, filepath)
+
+    async def dump(
+        self,
+        filepath: Union[Path, str],
+        interval: float = 10,
+        file_format: str = "json",
+    ) -> None:
+        """Store the metrics in a file periodically
+
+        This coroutine runs until it is cancelled. You usually want to execute
+        it in its own task.
+
+        Parameters
+        ----------
+
+        filepath:
+            The location of the output file
+
+        interval:
+            The time between two updates of the output file in seconds
+
+        file_format:
+            The output format (`json` or `prometheus`)
+
+        Examples
+        --------
+
+        >>> from asyncio import create_task, run, sleep
+        >>> async def dump_metrics(filepath):
+        ...     metrics = NetworkMetrics()
+        ...     task = create_task(metrics.dump(filepath, interval=0.01))
+        ...     await sleep(0.05)
+        ...     task.cancel()
+        >>> filepath = Path("metrics.json")
+        >>> run(dump_metrics(filepath))
+        >>> filepath.exists()
+        True
+        >>> filepath.unlink()
+
+        """
+
+        while True:
+            await sleep(interval)
+            self.write(filepath, file_format)
+
+
+# pylint: enable=too-many-instance-attributes
+
+# -- Main ---------------------------------------------------------------------
+
+if __name__ == "__main__":
+    from doctest import testmod
+
+    testmod()
@@ -16,14 +16,15 @@ from __future__ import annotations
 from asyncio import get_running_loop, CancelledError, Queue, sleep, wait_for
 from datetime import date
 from logging import getLogger
+from math import ceil
 from struct import pack, unpack
-from sys import platform
-from time import time
+from time import perf_counter, time
 from types import TracebackType
 from typing import List, NamedTuple, Optional, Sequence, Type, Union
 
 from can import Bus, Listener, Message as CANMessage, Notifier
 from can.interfaces.pcan.pcan import PcanError
+from numpy import empty, float64, ndarray, uint8, uint16, uint32
 from semantic_version import Version
 from netaddr import EUI
 
@@ -31,20 +32,29 @@ from mytoolit.eeprom import EEPROMStatus
 from mytoolit.config import settings
 from mytoolit.measurement import ADC_MAX_VALUE
 from mytoolit.can.adc import ADCConfiguration
+from mytoolit.can.bandwidth import data_sets
 from mytoolit.can.calibration import CalibrationMeasurementFormat
 from mytoolit.can.error import UnsupportedFeatureException
 from mytoolit.can.message import Message
+from mytoolit.can.metrics import NetworkMetrics
 from mytoolit.can.node import Node
+from mytoolit.can.rules import Rule, RuleEngine
 from mytoolit.can.streaming import (
     AsyncStreamBuffer,
     StreamingConfiguration,
     StreamingData,
     StreamingFormat,
     StreamingFormatVoltage,
+    StreamingSamples,
+    StreamingSession,
 )
 from mytoolit.can.status import State
 from mytoolit.measurement import convert_raw_to_supply_voltage
-from mytoolit.measurement.sensor import SensorConfiguration
+from mytoolit.measurement.sensor import (
+    classify_sensors,
+    Sensor,
+    SensorConfiguration,
+)
 from mytoolit.utility import convert_bytes_to_text
 from mytoolit.utility.log import get_log_file_handler
 
@@ -281,6 +291,8 @@ class DataStreamContextManager:
         network: Network,
         channels: StreamingConfiguration,
         timeout: float,
+        overflow: str = "error",
+        rules: Sequence[Rule] = (),
     ) -> None:
         """Create a new stream context manager for the given Network
 
@@ -299,10 +311,23 @@ class DataStreamContextManager:
             The amount of seconds between two consecutive messages, before
             a TimeoutError will be raised
 
+        overflow:
+            The policy of the stream buffer for messages that exceed the
+            maximum buffer size (`error`, `grow`, `drop` or `spill`)
+
+        rules:
+            Rules that check the raw values of every received message
+
         """
 
         self.network = network
-        self.reader = AsyncStreamBuffer(channels, timeout)
+        self.reader = AsyncStreamBuffer(
+            channels,
+            timeout,
+            metrics=network.metrics,
+            overflow=overflow,
+            rules=RuleEngine(channels.axes(), rules) if rules else None,
+        )
         self.channels = channels
 
     async def __aenter__(self) -> AsyncStreamBuffer:
@@ -316,9 +341,9 @@ class DataStreamContextManager:
         """
 
         reader = self.reader
-        # Raise exception if there if there is more than one second worth
-        # of buffered data
-        adc_config = await self.network.read_adc_configuration()
+        # Handle overflow if there is more than one second worth of buffered
+        # data
+        adc_config = await self.network.read_adc_configuration(use_cache=True)
         max_buffer_size = round(adc_config.sample_rate())
         self.reader.max_buffer_size = max_buffer_size
         await self.network.start_streaming_data(self.channels)
@@ -372,6 +397,130 @@ class DataStreamContextManager:
             )
 
 
+class StreamingSessionContextManager(DataStreamContextManager):
+    """Open and close an acceleration and an optional voltage stream"""
+
+    # pylint: disable=too-many-arguments, too-many-positional-arguments
+
+    def __init__(
+        self,
+        network: Network,
+        channels: StreamingConfiguration,
+        voltage: Optional[StreamingConfiguration],
+        timeout: float,
+        overflow: str = "error",
+        rules: Sequence[Rule] = (),
+    ) -> None:
+        """Create a new streaming session context manager
+
+        Parameters
+        ----------
+
+        network:
+            The CAN network class for which this context manager handles
+            sensor device stream data
+
+        channels:
+            A streaming configuration that specifies which of the three
+            measurement channels should be enabled or not
+
+        voltage:
+            A streaming configuration that specifies which of the three
+            voltage channels should be enabled or `None` to only stream
+            acceleration data
+
+        timeout
+            The amount of seconds between two consecutive acceleration
+            messages, before a TimeoutError will be raised
+
+        overflow:
+            The policy of the stream buffers for messages that exceed the
+            maximum buffer size (`error`, `grow`, `drop` or `spill`)
+
+        rules:
+            Rules that check the raw values of every received acceleration
+            message
+
+        """
+
+        super().__init__(network, channels, timeout, overflow, rules)
+        self.voltage = voltage
+        self.voltage_reader = (
+            None
+            if voltage is None
+            else AsyncStreamBuffer(
+                voltage, timeout, overflow=overflow, block_command="Voltage"
+            )
+        )
+
+    # pylint: enable=too-many-arguments, too-many-positional-arguments
+
+    async def __aenter__(self) -> StreamingSession:  # type: ignore[override]
+        """Open the acceleration and voltage stream
+
+        Returns
+        -------
+
+        The streaming session that contains the buffers of both streams
+
+        """
+
+        reader = await super().__aenter__()
+        if self.voltage is None or self.voltage_reader is None:
+            return StreamingSession(reader)
+
+        try:
+            await self.network.start_streaming_voltage(self.voltage)
+        except BaseException as error:
+            await super().__aexit__(type(error), error, error.__traceback__)
+            raise
+        self.network.notifier.add_listener(self.voltage_reader)
+
+        return StreamingSession(reader, self.voltage_reader)
+
+    async def __aexit__(
+        self,
+        exception_type: Optional[Type[BaseException]],
+        exception_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        """Clean up the resources used by the streams
+
+        Parameters
+        ----------
+
+        exception_type:
+            The type of the exception in case of an exception
+
+        exception_value:
+            The value of the exception in case of an exception
+
+        traceback:
+            The traceback in case of an exception
+
+        """
+
+        if self.voltage_reader is None:
+            await super().__aexit__(exception_type, exception_value, traceback)
+            return
+
+        self.voltage_reader.stop()
+        self.network.notifier.remove_listener(self.voltage_reader)
+
+        try:
+            if exception_type is None or isinstance(
+                exception_type, type(CancelledError)
+            ):
+                await self.network.stop_streaming_voltage()
+            else:
+                # Do not hide the original error (see base class)
+                await self.network.stop_streaming_voltage(
+                    retries=1, ignore_errors=True
+                )
+        finally:
+            await super().__aexit__(exception_type, exception_value, traceback)
+
+
 # pylint: disable=too-many-public-methods
 
 
@@ -382,7 +531,7 @@ class Network:
     # - https://mytoolit.github.io/Documentation/#page-system-configuration
     ADVERTISEMENT_TIME_EEPROM_TO_MS = 0.625
 
-    def __init__(self) -> None:
+    def __init__(self, metrics: Optional[NetworkMetrics] = None) -> None:
         """Create a new network from the given arguments
 
         Please note, that you have to clean up used resources after you use
@@ -390,6 +539,16 @@ class Network:
         the context manager interface we recommend you use a with statement to
         handle the cleanup phase automatically.
 
+        Parameters
+        ----------
+
+        metrics:
+            An optional metrics collector that stores performance data
+            (request latency, retries, streaming rate, …) of the network. If
+            you do not specify this parameter, then the network will create
+            its own collector, which you can access via the attribute
+            `metrics`.
+
         Examples
         --------
 
@@ -409,17 +568,19 @@ class Network:
         ...         pass
         >>> run(create_and_shutdown_network())
 
+        Collect performance data of the network
+
+        >>> async def reset_stu():
+        ...     async with Network() as network:
+        ...         await network.reset_node("STU 1")
+        ...         return network.metrics
+        >>> metrics = run(reset_stu())
+        >>> metrics.requests["System/Reset"].latency.count
+        1
+
         """
 
-        configuration = (
-            settings.can.linux
-            if platform == "linux"
-            else (
-                settings.can.mac
-                if platform == "darwin"
-                else settings.can.windows
-            )
-        )
+        configuration = settings.can_configuration()
         try:
             self.bus = Bus(  # pylint: disable=abstract-class-instantiated
                 channel=configuration.get("channel"),
@@ -438,6 +599,11 @@ class Network:
         self._notifier: Optional[Notifier] = None
         self.sender = Node("SPU 1")
         self.streaming = False
+        self.metrics = NetworkMetrics() if metrics is None else metrics
+        # Configuration of the connected sensor node. We store these values
+        # to avoid additional requests, e.g. each time we open a data stream.
+        self._adc_configuration: Optional[ADCConfiguration] = None
+        self._sensor_configuration: Optional[SensorConfiguration] = None
 
     async def __aenter__(self) -> Network:
         """Initialize the network
@@ -488,6 +654,8 @@ class Network:
         except NoResponseError:
             pass
 
+        self.clear_configuration_cache()
+
         if self._notifier is not None:
             self._notifier.stop()
 
@@ -517,6 +685,21 @@ class Network:
 
         return self._notifier
 
+    def clear_configuration_cache(self) -> None:
+        """Forget the stored configuration of the connected sensor node
+
+        The network stores the ADC and sensor configuration of the connected
+        sensor node after it read or wrote these values. The coroutines of
+        this class clear this data automatically, if the configuration
+        might have changed (e.g. after a reset or after connecting to another
+        sensor node). You only need to call this method, if you changed the
+        configuration of the sensor node without using this class.
+
+        """
+
+        self._adc_configuration = None
+        self._sensor_configuration = None
+
     # pylint: disable=too-many-arguments, too-many-positional-arguments
 
     async def _request(
@@ -566,7 +749,16 @@ class Network:
 
         """
 
+        identifier = message.identifier()
+        request_name = (
+            f"{identifier.block_name()}/{identifier.block_command_name()}"
+        )
+        metrics = self.metrics
+        start_time = perf_counter()
+
         for attempt in range(retries):
+            if attempt > 0:
+                metrics.record_retry(request_name)
             listener = ResponseListener(message, response_data)
             self.notifier.add_listener(listener)
             getLogger("network.can").debug("%s", message)
@@ -596,14 +788,17 @@ class Network:
                 self.notifier.remove_listener(listener)
 
             if response.is_error:
+                metrics.record_error(request_name)
                 raise ErrorResponseError(
                     "Received unexpected response for request to "
                     f"{description}:\n\n{response.error_message}\n"
                     f"Response Message: {Message(response.message)}"
                 )
 
+            metrics.record_request(request_name, perf_counter() - start_time)
             return response.message
 
+        metrics.record_timeout(request_name)
         raise NoResponseError(f"Unable to {description}")
 
     async def _request_bluetooth(
@@ -779,6 +974,8 @@ class Network:
             receiver=node,
             request=True,
         )
+        # Resetting the STU also disconnects the sensor node
+        self.clear_configuration_cache()
         await self._request(
             message,
             description=f"reset node “{node}”",
@@ -889,6 +1086,7 @@ class Network:
 
         """
 
+        self.clear_configuration_cache()
         await self._request_bluetooth(
             node=node,
             subcommand=9,
@@ -1141,6 +1339,7 @@ class Network:
 
         """
 
+        self.clear_configuration_cache()
         response = await self._request_bluetooth(
             node=node,
             subcommand=7,
@@ -1636,6 +1835,7 @@ class Network:
 
         mac_address_bytes_reversed = list(reversed(mac_address.packed))
 
+        self.clear_configuration_cache()
         await self._request_bluetooth(
             node=node,
             subcommand=18,
@@ -1936,15 +2136,55 @@ class Network:
 
         """
 
-        streaming_format = StreamingFormat(
-            channels=channels,
-            streaming=True,
-            sets=3 if channels.enabled_channels() <= 1 else 1,
+        await self._start_streaming(channels, "Data")
+        self.streaming = True
+
+    async def start_streaming_voltage(
+        self, channels: StreamingConfiguration
+    ) -> None:
+        """Start streaming voltage data
+
+        Parameters
+        ----------
+
+        channels:
+            Specifies which of the three voltage channels should be enabled
+            or disabled (the first channel contains the supply voltage)
+
+        """
+
+        await self._start_streaming(channels, "Voltage")
+
+    async def _start_streaming(
+        self, channels: StreamingConfiguration, block_command: str
+    ) -> None:
+        """Start streaming acceleration or voltage data
+
+        Parameters
+        ----------
+
+        channels:
+            Specifies which of the three channels should be enabled or
+            disabled
+
+        block_command:
+            The streaming command (`Data` or `Voltage`)
+
+        """
+
+        format_class = (
+            StreamingFormatVoltage
+            if block_command == "Voltage"
+            else StreamingFormat
+        )
+        # Use the packing with the highest throughput
+        streaming_format = format_class(
+            channels=channels, streaming=True, sets=data_sets(channels)
         )
         node = "STH 1"
         message = Message(
             block="Streaming",
-            block_command="Data",
+            block_command=block_command,
             sender=self.sender,
             receiver=node,
             request=True,
@@ -1963,15 +2203,15 @@ class Network:
         channels_text = "".join(
             (f"{channel}, " for channel in measurement_channels[:-2])
         ) + " and ".join(measurement_channels[-2:])
+        kind = "measurement" if block_command == "Data" else "voltage"
 
         await self._request(
             message,
             description=(
-                f"enable streaming of {channels_text} measurement "
+                f"enable streaming of {channels_text} {kind} "
                 f"channel of “{node}”"
             ),
         )
-        self.streaming = True
 
     async def stop_streaming_data(
         self, retries: int = 10, ignore_errors=False
@@ -1991,33 +2231,83 @@ class Network:
 
         """
 
-        streaming_format = StreamingFormat(streaming=True, sets=0)
+        await self._stop_streaming("Data", retries, ignore_errors)
+        self.streaming = False
+
+    async def stop_streaming_voltage(
+        self, retries: int = 10, ignore_errors=False
+    ) -> None:
+        """Stop streaming voltage data
+
+        Parameters
+        ----------
+
+        retries:
+            The number of times the message is sent again, if no response was
+            sent back in a certain amount of time
+
+        ignore_errors:
+            Specifies, if this coroutine should ignore, if there were any
+            problems while stopping the stream.
+
+        """
+
+        await self._stop_streaming("Voltage", retries, ignore_errors)
+
+    async def _stop_streaming(
+        self, block_command: str, retries: int, ignore_errors: bool
+    ) -> None:
+        """Stop streaming acceleration or voltage data
+
+        Parameters
+        ----------
+
+        block_command:
+            The streaming command (`Data` or `Voltage`)
+
+        retries:
+            The number of times the message is sent again, if no response was
+            sent back in a certain amount of time
+
+        ignore_errors:
+            Specifies, if this coroutine should ignore, if there were any
+            problems while stopping the stream.
+
+        """
+
+        format_class = (
+            StreamingFormatVoltage
+            if block_command == "Voltage"
+            else StreamingFormat
+        )
+        streaming_format = format_class(streaming=True, sets=0)
         node = "STH 1"
         message = Message(
             block="Streaming",
-            block_command="Data",
+            block_command=block_command,
             sender=self.sender,
             receiver=node,
             request=True,
             data=[streaming_format.value],
         )
+        kind = "data" if block_command == "Data" else "voltage"
 
         try:
             await self._request(
                 message,
-                description=f"disable data streaming of “{node}”",
+                description=f"disable {kind} streaming of “{node}”",
                 retries=retries,
             )
         except (NoResponseError, ErrorResponseError) as error:
             if not ignore_errors:
                 raise error
 
-        self.streaming = False
-
     def open_data_stream(
         self,
         channels: StreamingConfiguration,
         timeout: float = 5,
+        overflow: str = "error",
+        rules: Sequence[Rule] = (),
     ) -> DataStreamContextManager:
         """Open measurement data stream
 
@@ -2031,6 +2321,22 @@ class Network:
             The amount of seconds between two consecutive messages, before
             a TimeoutError will be raised
 
+        overflow:
+            Specifies what happens, if the application does not read the
+            streaming data fast enough and the stream buffer contains more
+            than one second of data:
+
+            - `error`: raise a `StreamingBufferError`
+            - `grow`: keep all data in main memory
+            - `drop`: remove the oldest buffered data
+            - `spill`: store the data in a temporary file
+
+        rules:
+            Rules that check the raw values of every received message
+            directly in the receive path. The rules call their callback
+            synchronously, before the message is stored in the stream
+            buffer (see `mytoolit.can.rules`).
+
         Returns
         -------
 
@@ -2066,7 +2372,189 @@ class Network:
 
         """
 
-        return DataStreamContextManager(self, channels, timeout)
+        return DataStreamContextManager(
+            self, channels, timeout, overflow, rules
+        )
+
+    def open_streaming_session(  # pylint: disable=too-many-arguments
+        self,
+        channels: StreamingConfiguration,
+        voltage: Optional[StreamingConfiguration] = None,
+        timeout: float = 5,
+        overflow: str = "error",
+        rules: Sequence[Rule] = (),
+    ) -> StreamingSessionContextManager:
+        """Open an acceleration and a voltage data stream at the same time
+
+        The sensor device sends acceleration data with the streaming
+        command `Data` and voltage data with the command `Voltage`. Both
+        streams use separate stream buffers and the session only waits for
+        acceleration data, which means the voltage stream does not delay the
+        processing of acceleration data. Without voltage channels the
+        session works like a single data stream (see `open_data_stream`).
+
+        Parameters
+        ----------
+
+        channels:
+            Specifies which measurement channels should be enabled
+
+        voltage:
+            Specifies which voltage channels should be enabled (the first
+            channel contains the supply voltage) or `None` to only stream
+            acceleration data
+
+        timeout:
+            The amount of seconds between two consecutive acceleration
+            messages, before a TimeoutError will be raised
+
+        overflow:
+            Specifies what happens, if the application does not read the
+            streaming data fast enough (see `open_data_stream`)
+
+        rules:
+            Rules that check the raw values of every received acceleration
+            message (see `open_data_stream`)
+
+        Returns
+        -------
+
+        A context manager object for the streaming session
+
+        Examples
+        --------
+
+        >>> from asyncio import run
+
+        Read acceleration data of the first channel and the supply voltage
+
+        >>> async def read_streaming_data():
+        ...     async with Network() as network:
+        ...         await network.connect_sensor_device(0)
+        ...         channels = StreamingConfiguration(first=True)
+        ...         async with network.open_streaming_session(
+        ...                 channels, voltage=channels) as session:
+        ...             kinds = set()
+        ...             async for kind, block in session.blocks():
+        ...                 kinds.add(kind)
+        ...                 if len(kinds) >= 2:
+        ...                     break
+        ...             return sorted(kinds)
+        >>> run(read_streaming_data())
+        ['acceleration', 'voltage']
+
+        """
+
+        return StreamingSessionContextManager(
+            self, channels, voltage, timeout, overflow, rules
+        )
+
+    async def collect(
+        self,
+        channels: StreamingConfiguration,
+        *,
+        samples: Optional[int] = None,
+        duration: Optional[float] = None,
+        timeout: float = 5,
+    ) -> StreamingSamples:
+        """Collect a certain amount of streaming data
+
+        The coroutine allocates the arrays for the whole measurement in
+        advance and copies the data of every streaming block directly into
+        them.
+
+        Parameters
+        ----------
+
+        channels:
+            Specifies which measurement channels should be enabled
+
+        samples:
+            The number of values that should be collected per channel
+
+        duration:
+            The measurement time in seconds; the number of values per
+            channel is calculated from the current ADC configuration (all
+            enabled channels share the sample rate of the ADC)
+
+        timeout:
+            The amount of seconds between two consecutive messages, before
+            a TimeoutError will be raised
+
+        Raises
+        ------
+
+        A `ValueError`, if you specify both or none of the arguments
+        `samples` and `duration`, or if the measurement would not contain
+        any values
+
+        Returns
+        -------
+
+        The collected values together with the counter, timestamp and
+        number of lost messages of every streaming message
+
+        Examples
+        --------
+
+        >>> from asyncio import run
+
+        Read 1000 values of the first channel
+
+        >>> async def collect_streaming_data():
+        ...     async with Network() as network:
+        ...         await network.connect_sensor_device(0)
+        ...         return await network.collect(
+        ...             StreamingConfiguration(first=True), samples=1000)
+        >>> data = run(collect_streaming_data())
+        >>> len(data.channel("x"))
+        1000
+
+        """
+
+        if (samples is None) == (duration is None):
+            raise ValueError(
+                "Please specify either the number of samples or the duration"
+            )
+        if samples is None:
+            assert duration is not None
+            adc_configuration = await self.read_adc_configuration(
+                use_cache=True
+            )
+            samples = ceil(
+                duration
+                * adc_configuration.sample_rate()
+                / channels.enabled_channels()
+            )
+        if samples <= 0:
+            raise ValueError(f"Incorrect number of samples: “{samples}”")
+
+        # A message contains three values of a single channel or one value
+        # of each enabled channel
+        messages = ceil(
+            samples / (3 if channels.enabled_channels() <= 1 else 1)
+        )
+        counters: ndarray = empty(messages, dtype=uint8)
+        timestamps: ndarray = empty(messages, dtype=float64)
+        lost: ndarray = empty(messages, dtype=uint32)
+        values: ndarray = empty(
+            (messages, channels.data_length()), dtype=uint16
+        )
+
+        collected = 0
+        async with self.open_data_stream(channels, timeout) as stream:
+            while collected < messages:
+                block = await stream.read_block(messages - collected)
+                end = collected + len(block)
+                counters[collected:end] = block.counters
+                timestamps[collected:end] = block.timestamps
+                lost[collected:end] = block.lost
+                values[collected:end] = block.values
+                collected = end
+
+        return StreamingSamples(
+            counters, timestamps, values, lost, channels, samples
+        )
 
     # -----------
     # - Voltage -
@@ -2123,7 +2611,7 @@ class Network:
         voltage_bytes = response.data[2:4]
         voltage_raw = int.from_bytes(voltage_bytes, "little")
 
-        adc_configuration = await self.read_adc_configuration()
+        adc_configuration = await self.read_adc_configuration(use_cache=True)
 
         return convert_raw_to_supply_voltage(
             voltage_raw,
@@ -2138,9 +2626,19 @@ class Network:
     # - Get/Set ADC Configuration -
     # -----------------------------
 
-    async def read_adc_configuration(self) -> ADCConfiguration:
+    async def read_adc_configuration(
+        self, use_cache: bool = False
+    ) -> ADCConfiguration:
         """Read the current ADC configuration of a connected sensor node
 
+        Parameters
+        ----------
+
+        use_cache:
+            Return the last ADC configuration read from or written to the
+            connected sensor node (`True`), if available, instead of
+            requesting the configuration from the sensor node (`False`)
+
         Returns
         -------
 
@@ -2161,8 +2659,31 @@ class Network:
         Get, Prescaler: 2, Acquisition Time: 8, Oversampling Rate: 64,
         Reference Voltage: 3.3 V
 
+        Use the stored configuration after writing the ADC configuration
+
+        >>> async def write_read_adc_config():
+        ...     async with Network() as network:
+        ...         await network.connect_sensor_device(0)
+        ...         await network.write_adc_configuration(3.3, 2, 8, 64)
+        ...         requests = network.metrics.requests
+        ...         name = "Configuration/Get/Set ADC Configuration"
+        ...         before = requests[name].latency.count
+        ...         config = await network.read_adc_configuration(
+        ...             use_cache=True)
+        ...         after = requests[name].latency.count
+        ...         return config, after - before
+        >>> config, requests = run(write_read_adc_config())
+        >>> config # doctest:+NORMALIZE_WHITESPACE
+        Get, Prescaler: 2, Acquisition Time: 8, Oversampling Rate: 64,
+        Reference Voltage: 3.3 V
+        >>> requests
+        0
+
         """
 
+        if use_cache and self._adc_configuration is not None:
+            return self._adc_configuration
+
         node = "STH 1"
 
         message = Message(
@@ -2178,7 +2699,9 @@ class Network:
             message, description=f"Read ADC configuration of “{node}”"
         )
 
-        return ADCConfiguration(response.data[0:5])
+        self._adc_configuration = ADCConfiguration(response.data[0:5])
+
+        return self._adc_configuration
 
     async def write_adc_configuration(
         self,
@@ -2258,17 +2781,37 @@ class Network:
             data=adc_configuration.data,
         )
 
+        # If writing the configuration fails, we do not know the current
+        # configuration of the sensor node
+        self._adc_configuration = None
         await self._request(
             message, description=f"write ADC configuration of “{node}”"
         )
+        self._adc_configuration = ADCConfiguration(
+            set=False,
+            prescaler=prescaler,
+            acquisition_time=acquisition_time,
+            oversampling_rate=oversampling_rate,
+            reference_voltage=reference_voltage,
+        )
 
     # --------------------------------
     # - Get/Set Sensor Configuration -
     # --------------------------------
 
-    async def read_sensor_configuration(self) -> SensorConfiguration:
+    async def read_sensor_configuration(
+        self, use_cache: bool = False
+    ) -> SensorConfiguration:
         """Read the current sensor configuration
 
+        Parameters
+        ----------
+
+        use_cache:
+            Return the last sensor configuration read from or written to the
+            connected sensor node (`True`), if available, instead of
+            requesting the configuration from the sensor node (`False`)
+
         Raises
         ------
 
@@ -2300,6 +2843,9 @@ class Network:
 
         """
 
+        if use_cache and self._sensor_configuration is not None:
+            return self._sensor_configuration
+
         message = Message(
             block="Configuration",
             block_command=0x01,
@@ -2322,7 +2868,9 @@ class Network:
 
         channels = response.data[1:4]
 
-        return SensorConfiguration(*channels)
+        self._sensor_configuration = SensorConfiguration(*channels)
+
+        return self._sensor_configuration
 
     async def write_sensor_configuration(
         self, sensors: SensorConfiguration
@@ -2358,6 +2906,8 @@ class Network:
             data=data,
         )
 
+        cached = self._sensor_configuration
+        self._sensor_configuration = None
         try:
             await self._request(
                 message, description=f"set sensor configuration of “{node}”"
@@ -2367,6 +2917,95 @@ class Network:
                 "Writing sensor configuration not supported"
             ) from error
 
+        # The sensor number `0` does not change the sensor of a channel. We
+        # can only update the stored configuration, if we know the old value
+        # of all unchanged channels.
+        if cached is not None or all(sensors.values()):
+            self._sensor_configuration = SensorConfiguration(**{
+                channel: sensor or (0 if cached is None else cached[channel])
+                for channel, sensor in sensors.items()
+            })
+
+    async def _configure_sensors(self, sensors: SensorConfiguration) -> None:
+        """Change the sensor configuration and check the result
+
+        Parameters
+        ----------
+
+        sensors:
+            The sensor numbers of the different measurement channels
+
+        Raises
+        ------
+
+        A `NetworkError`, if the sensor node did not apply the configuration
+
+        """
+
+        await self.write_sensor_configuration(sensors)
+        configuration = await self.read_sensor_configuration()
+        for channel, sensor in sensors.items():
+            if sensor not in (0, configuration[channel]):
+                raise NetworkError(
+                    f"Read sensor configuration “{configuration}” does not "
+                    f"match expected sensor configuration “{sensors}”"
+                )
+
+    async def scan_sensors(
+        self, channels: Sequence[int], samples: int = 1000
+    ) -> List[Sensor]:
+        """Guess the type of the sensors connected to multiple channels
+
+        The coroutine measures up to three sensor channels with a single
+        data stream (one channel per measurement channel). While it
+        analyzes the data of one group of channels, it already configures
+        the sensor node for the next group.
+
+        Parameters
+        ----------
+
+        channels:
+            The numbers of the sensor channels that should be checked
+
+        samples:
+            The number of values used to classify a single channel
+
+        Raises
+        ------
+
+        A `NetworkError`, if the sensor node did not apply the sensor
+        configuration for a group of channels
+
+        Returns
+        -------
+
+        The guessed sensor of every channel (in the order of `channels`)
+
+        """
+
+        groups = [
+            SensorConfiguration(*channels[start : start + 3])
+            for start in range(0, len(channels), 3)
+        ]
+        sensors: List[Sensor] = []
+        if not groups:
+            return sensors
+
+        loop = get_running_loop()
+        await self._configure_sensors(groups[0])
+        for index, group in enumerate(groups):
+            data = await self.collect(
+                group.streaming_configuration(), samples=samples
+            )
+            analysis = loop.run_in_executor(
+                None, classify_sensors, data.array()
+            )
+            if index + 1 < len(groups):
+                await self._configure_sensors(groups[index + 1])
+            sensors.extend(await analysis)
+
+        return sensors
+
     # ---------------------------
     # - Calibration Measurement -
     # ---------------------------
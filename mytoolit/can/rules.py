@@ -0,0 +1,695 @@
+"""Check streaming data for anomalies while it is received
+
+The rules in this module check the raw 16 bit ADC values of every streaming
+message directly in the receive path of the stream buffer: before the
+message is buffered, decoded into NumPy arrays or converted into multiples
+of g₀. All thresholds are converted into raw ADC units when you create a
+rule, so checking a value only requires integer arithmetic.
+
+A rule calls its callback synchronously as soon as its condition becomes
+true. It calls the callback again only after the condition was false for
+at least one value. The class `RuleEngine` stores the time between the
+reception of a CAN message and the call of the callback.
+"""
+
+# -- Imports ------------------------------------------------------------------
+
+from __future__ import annotations
+
+from collections import deque
+from logging import getLogger
+from math import ceil, floor, sqrt
+from struct import Struct
+from time import time
+from typing import Callable, Deque, List, NamedTuple, Optional, Sequence, Tuple
+
+from mytoolit.can.metrics import LatencyHistogram
+from mytoolit.measurement.constants import ADC_MAX_VALUE
+
+# -- Functions ----------------------------------------------------------------
+
+
+def convert_g_to_raw(acceleration: float, sensor_range: float) -> float:
+    """Convert an acceleration into a raw 16 bit ADC value
+
+    This function is the inverse of `convert_raw_to_g`.
+
+    Parameters
+    ----------
+
+    acceleration:
+        The acceleration in multiples of the standard gravity g₀
+
+    sensor_range:
+        The maximum acceleration value as factor of g₀
+        (e.g. 200 for a ±100 g sensor)
+
+    Returns
+    -------
+
+    The (fractional) raw ADC value that corresponds to the acceleration
+
+    Examples
+    --------
+
+    >>> convert_g_to_raw(0, sensor_range=200)
+    32767.5
+    >>> convert_g_to_raw(100, sensor_range=200)
+    65535.0
+
+    """
+
+    return (acceleration / sensor_range + 1 / 2) * ADC_MAX_VALUE
+
+
+# -- Classes ------------------------------------------------------------------
+
+
+class RuleEvent(NamedTuple):
+    """Information about a rule that matched"""
+
+    rule: Rule
+    value: float
+    counter: int
+    timestamp: float
+    latency: float
+
+    def __repr__(self) -> str:
+        """Get the textual representation of the event
+
+        Returns
+        -------
+
+        A string that contains the rule, the raw value that matched the
+        rule, the message counter and the latency
+
+        Examples
+        --------
+
+        >>> RuleEvent(LimitRule("x", low=100, high=65000), value=65001,
+        ...           counter=12, timestamp=0, latency=0.0004)
+        x ∉ (100, 65000): 65001 (Message #12, Latency: 0.40 ms)
+
+        """
+
+        return (
+            f"{self.rule}: {self.value:g} (Message #{self.counter}, "
+            f"Latency: {self.latency * 1000:.2f} ms)"
+        )
+
+
+class Rule:
+    """Base class for rules that check raw streaming values"""
+
+    def __init__(
+        self,
+        axis: str,
+        callback: Optional[Callable[[RuleEvent], None]] = None,
+    ) -> None:
+        """Initialize the rule using the given arguments
+
+        Parameters
+        ----------
+
+        axis:
+            The axis (`x`, `y` or `z`) checked by the rule
+
+        callback:
+            The function that should be called, after the rule matched
+
+        """
+
+        self.axis = axis
+        self.callback = callback
+        self.active = False
+
+    def evaluate(self, value: int) -> Optional[float]:
+        """Add a raw value and check the condition of the rule
+
+        Parameters
+        ----------
+
+        value:
+            A raw 16 bit ADC value
+
+        Returns
+        -------
+
+        The (raw) value that fulfills the condition of the rule or `None`,
+        if the condition is not fulfilled
+
+        """
+
+        raise NotImplementedError()
+
+    def check(self, value: int) -> Optional[float]:
+        """Check if a raw value activates the rule
+
+        Parameters
+        ----------
+
+        value:
+            A raw 16 bit ADC value
+
+        Returns
+        -------
+
+        The (raw) value that fulfills the condition of the rule, if the
+        rule was not active before, or `None` otherwise
+
+        Examples
+        --------
+
+        >>> rule = LimitRule("x", low=0, high=100)
+        >>> [rule.check(value) for value in (100, 200, 50, 150)]
+        [100.0, None, None, 150.0]
+
+        """
+
+        result = self.evaluate(value)
+        if result is None:
+            self.active = False
+            return None
+
+        if self.active:
+            return None
+
+        self.active = True
+        return result
+
+
+class LimitRule(Rule):
+    """Check that raw values stay within certain limits"""
+
+    def __init__(
+        self,
+        axis: str,
+        low: float,
+        high: float,
+        callback: Optional[Callable[[RuleEvent], None]] = None,
+    ) -> None:
+        """Initialize the rule using the given arguments
+
+        Parameters
+        ----------
+
+        axis:
+            The axis (`x`, `y` or `z`) checked by the rule
+
+        low:
+            The rule matches values smaller than or equal to this value
+
+        high:
+            The rule matches values larger than or equal to this value
+
+        callback:
+            The function that should be called, after the rule matched
+
+        """
+
+        super().__init__(axis, callback)
+        self.low = low
+        self.high = high
+
+    @classmethod
+    def from_acceleration(
+        cls,
+        axis: str,
+        limit: float,
+        sensor_range: float,
+        callback: Optional[Callable[[RuleEvent], None]] = None,
+    ) -> LimitRule:
+        """Create a rule for absolute acceleration values
+
+        Parameters
+        ----------
+
+        axis:
+            The axis (`x`, `y` or `z`) checked by the rule
+
+        limit:
+            The rule matches accelerations with an absolute value of at
+            least this value in multiples of g₀
+
+        sensor_range:
+            The maximum acceleration value as factor of g₀
+            (e.g. 200 for a ±100 g sensor)
+
+        callback:
+            The function that should be called, after the rule matched
+
+        Returns
+        -------
+
+        A rule that checks the raw ADC values
+
+        Examples
+        --------
+
+        >>> LimitRule.from_acceleration("y", limit=10, sensor_range=200)
+        y ∉ (29490, 36045)
+
+        """
+
+        return cls(
+            axis,
+            low=floor(convert_g_to_raw(-limit, sensor_range)),
+            high=ceil(convert_g_to_raw(limit, sensor_range)),
+            callback=callback,
+        )
+
+    def __repr__(self) -> str:
+        """Get the textual representation of the rule
+
+        Returns
+        -------
+
+        A string that contains the axis and the limits
+
+        """
+
+        return f"{self.axis} ∉ ({self.low:g}, {self.high:g})"
+
+    def evaluate(self, value: int) -> Optional[float]:
+        """Check if a raw value exceeds the limits
+
+        Parameters
+        ----------
+
+        value:
+            A raw 16 bit ADC value
+
+        Returns
+        -------
+
+        The value, if it exceeds one of the limits, or `None` otherwise
+
+        """
+
+        if self.low < value < self.high:
+            return None
+
+        return float(value)
+
+
+class RMSRule(Rule):
+    """Check the RMS value of a sliding window of raw values"""
+
+    def __init__(
+        self,
+        axis: str,
+        level: float,
+        window: int,
+        callback: Optional[Callable[[RuleEvent], None]] = None,
+    ) -> None:
+        """Initialize the rule using the given arguments
+
+        Parameters
+        ----------
+
+        axis:
+            The axis (`x`, `y` or `z`) checked by the rule
+
+        level:
+            The rule matches, if the RMS value of the deviation of the
+            window values from the center of the ADC range (0 g₀) is at
+            least this level (in raw ADC units)
+
+        window:
+            The number of values in the sliding window
+
+        callback:
+            The function that should be called, after the rule matched
+
+        Examples
+        --------
+
+        >>> rule = RMSRule("x", level=100, window=4)
+        >>> rule
+        RMS(x, 4) ≥ 100
+        >>> center = ADC_MAX_VALUE // 2
+        >>> [rule.check(value) for value in (center + 200, center - 200,
+        ...                                   center, center, center - 200)
+        ... ] # doctest:+ELLIPSIS
+        [None, None, None, 141.42..., None]
+
+        """
+
+        if window <= 0:
+            raise ValueError(f"Incorrect window size “{window}”")
+
+        super().__init__(axis, callback)
+        self.level = level
+        self.window = window
+        # The code uses twice the deviation from the (fractional) center of
+        # the ADC range to work with integer values only
+        self.squares: Deque[int] = deque(maxlen=window)
+        self.sum = 0
+        self.threshold = window * (2 * level) ** 2
+
+    @classmethod
+    def from_acceleration(
+        cls,
+        axis: str,
+        level: float,
+        window: int,
+        sensor_range: float,
+        callback: Optional[Callable[[RuleEvent], None]] = None,
+    ) -> RMSRule:
+        """Create a rule for the RMS value of the acceleration
+
+        Parameters
+        ----------
+
+        axis:
+            The axis (`x`, `y` or `z`) checked by the rule
+
+        level:
+            The rule matches RMS values of at least this value in multiples
+            of g₀
+
+        window:
+            The number of values in the sliding window
+
+        sensor_range:
+            The maximum acceleration value as factor of g₀
+            (e.g. 200 for a ±100 g sensor)
+
+        callback:
+            The function that should be called, after the rule matched
+
+        Returns
+        -------
+
+        A rule that checks the raw ADC values
+
+        Examples
+        --------
+
+        >>> RMSRule.from_acceleration("z", level=1, window=100,
+        ...                           sensor_range=200)
+        RMS(z, 100) ≥ 327.675
+
+        """
+
+        return cls(
+            axis,
+            level=level * ADC_MAX_VALUE / sensor_range,
+            window=window,
+            callback=callback,
+        )
+
+    def __repr__(self) -> str:
+        """Get the textual representation of the rule
+
+        Returns
+        -------
+
+        A string that contains the axis, the window size and the level
+
+        """
+
+        return f"RMS({self.axis}, {self.window}) ≥ {self.level:g}"
+
+    def evaluate(self, value: int) -> Optional[float]:
+        """Add a raw value and check the RMS value of the window
+
+        Parameters
+        ----------
+
+        value:
+            A raw 16 bit ADC value
+
+        Returns
+        -------
+
+        The RMS value of the window (in raw ADC units), if it reaches the
+        level, or `None` otherwise
+
+        """
+
+        deviation = 2 * value - ADC_MAX_VALUE
+        square = deviation * deviation
+        squares = self.squares
+        if len(squares) >= self.window:
+            self.sum -= squares[0]
+        squares.append(square)
+        self.sum += square
+
+        if len(squares) < self.window or self.sum < self.threshold:
+            return None
+
+        return sqrt(self.sum / self.window) / 2
+
+
+class RateRule(Rule):
+    """Check the difference between consecutive raw values"""
+
+    def __init__(
+        self,
+        axis: str,
+        limit: float,
+        callback: Optional[Callable[[RuleEvent], None]] = None,
+    ) -> None:
+        """Initialize the rule using the given arguments
+
+        Parameters
+        ----------
+
+        axis:
+            The axis (`x`, `y` or `z`) checked by the rule
+
+        limit:
+            The rule matches, if the absolute difference between two
+            consecutive values is at least this value (in raw ADC units)
+
+        callback:
+            The function that should be called, after the rule matched
+
+        Examples
+        --------
+
+        >>> rule = RateRule("x", limit=1000)
+        >>> [rule.check(value) for value in (0, 500, 2000, 1000, 1200)]
+        [None, None, 1500.0, None, None]
+
+        """
+
+        super().__init__(axis, callback)
+        self.limit = limit
+        self.previous: Optional[int] = None
+
+    @classmethod
+    def from_acceleration(  # pylint: disable=too-many-arguments
+        cls,
+        axis: str,
+        rate: float,
+        sample_rate: float,
+        sensor_range: float,
+        callback: Optional[Callable[[RuleEvent], None]] = None,
+    ) -> RateRule:
+        """Create a rule for the rate of change of the acceleration
+
+        Parameters
+        ----------
+
+        axis:
+            The axis (`x`, `y` or `z`) checked by the rule
+
+        rate:
+            The rule matches, if the acceleration changes by at least this
+            value in g₀ per second
+
+        sample_rate:
+            The sample rate of the checked channel in Hz
+
+        sensor_range:
+            The maximum acceleration value as factor of g₀
+            (e.g. 200 for a ±100 g sensor)
+
+        callback:
+            The function that should be called, after the rule matched
+
+        Returns
+        -------
+
+        A rule that checks the raw ADC values
+
+        Examples
+        --------
+
+        >>> RateRule.from_acceleration("x", rate=10_000, sample_rate=10_000,
+        ...                            sensor_range=200)
+        Δx ≥ 327.675
+
+        """
+
+        return cls(
+            axis,
+            limit=rate / sample_rate * ADC_MAX_VALUE / sensor_range,
+            callback=callback,
+        )
+
+    def __repr__(self) -> str:
+        """Get the textual representation of the rule
+
+        Returns
+        -------
+
+        A string that contains the axis and the limit
+
+        """
+
+        return f"Δ{self.axis} ≥ {self.limit:g}"
+
+    def evaluate(self, value: int) -> Optional[float]:
+        """Check the difference to the previous raw value
+
+        Parameters
+        ----------
+
+        value:
+            A raw 16 bit ADC value
+
+        Returns
+        -------
+
+        The absolute difference to the previous value, if it reaches the
+        limit, or `None` otherwise
+
+        """
+
+        previous = self.previous
+        self.previous = value
+        if previous is None:
+            return None
+
+        difference = abs(value - previous)
+
+        return float(difference) if difference >= self.limit else None
+
+
+# pylint: disable=too-few-public-methods
+
+
+class RuleEngine:
+    """Check the rules for the values of streaming messages"""
+
+    def __init__(self, axes: Sequence[str], rules: Sequence[Rule]) -> None:
+        """Initialize the engine using the given arguments
+
+        Parameters
+        ----------
+
+        axes:
+            The axes contained in the streaming data (e.g. the return value
+            of `StreamingConfiguration.axes`)
+
+        rules:
+            The rules that should be checked
+
+        Examples
+        --------
+
+        >>> events = []
+        >>> engine = RuleEngine(
+        ...     ["x", "z"],
+        ...     [LimitRule("z", low=10, high=1000, callback=events.append)])
+        >>> engine.process(counter=1, timestamp=time(),
+        ...                data=bytes([0, 1, 20, 0, 232, 3, 0, 0]))
+        >>> events # doctest:+ELLIPSIS
+        [z ∉ (10, 1000): 1000 (Message #1, Latency: ... ms)]
+        >>> engine.latency.count
+        1
+
+        >>> RuleEngine(["x"], [RateRule("y", limit=10)])
+        Traceback (most recent call last):
+        ...
+        ValueError: Axis “y” is not part of the streaming data
+
+        """
+
+        # A message contains three values of a single channel, two values of
+        # two channels or three values of three channels
+        self.format = Struct(f"<{2 if len(axes) == 2 else 3}H")
+        self.rules: List[Tuple[Rule, Tuple[int, ...]]] = []
+        for rule in rules:
+            if rule.axis not in axes:
+                raise ValueError(
+                    f"Axis “{rule.axis}” is not part of the streaming data"
+                )
+            positions = (
+                (0, 1, 2) if len(axes) == 1 else (axes.index(rule.axis),)
+            )
+            self.rules.append((rule, positions))
+        self.latency = LatencyHistogram()
+
+    def process(self, counter: int, timestamp: float, data: bytes) -> None:
+        """Check the values of a single streaming message
+
+        Parameters
+        ----------
+
+        counter:
+            The message counter of the streaming message
+
+        timestamp:
+            The time the CAN message was received in seconds since the epoch
+
+        data:
+            The data bytes of the streaming message
+
+        Examples
+        --------
+
+        An exception in a callback does not affect other rules
+
+        >>> def fail(event):
+        ...     raise ValueError("Faulty callback")
+        >>> events = []
+        >>> engine = RuleEngine(
+        ...     ["x"],
+        ...     [LimitRule("x", low=0, high=1000, callback=fail),
+        ...      LimitRule("x", low=0, high=2000, callback=events.append)])
+        >>> engine.process(counter=1, timestamp=time(),
+        ...                data=bytes([0, 1, 208, 7, 0, 0, 0, 0]))
+        >>> events # doctest:+ELLIPSIS
+        [x ∉ (0, 2000): 2000 (Message #1, Latency: ... ms)]
+
+        """
+
+        if len(data) < 2 + self.format.size:
+            return
+
+        values = self.format.unpack_from(data, 2)
+        for rule, positions in self.rules:
+            for position in positions:
+                value = rule.check(values[position])
+                if value is None:
+                    continue
+
+                latency = time() - timestamp
+                self.latency.add(latency)
+                if rule.callback is None:
+                    continue
+                # A failing callback must not stop the processing of the
+                # streaming data in the receive path
+                try:
+                    rule.callback(
+                        RuleEvent(rule, value, counter, timestamp, latency)
+                    )
+                except Exception:  # pylint: disable=broad-exception-caught
+                    getLogger(__name__).exception(
+                        "Callback of rule for axis “%s” failed", rule.axis
+                    )
+
+
+# pylint: enable=too-few-public-methods
+
+
+# -- Main ---------------------------------------------------------------------
+
+if __name__ == "__main__":
+    from doctest import testmod
+
+    testmod()
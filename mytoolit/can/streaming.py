@@ -1,16 +1,47 @@
 """Support for streaming (measurement) data in the ICOtronic system"""
 
+# pylint: disable=too-many-lines
+
 # -- Imports ------------------------------------------------------------------
 
 from __future__ import annotations
 
-from asyncio import Queue, wait_for
+from asyncio import Future, get_running_loop, TimerHandle
+from collections import deque
 from ctypes import c_uint8, LittleEndianStructure
-from typing import AsyncIterator, Callable, List, Optional, Sequence, Tuple
+from pathlib import Path
+from tempfile import TemporaryFile
+from time import monotonic, perf_counter
+from typing import (
+    AsyncIterator,
+    Callable,
+    Deque,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TYPE_CHECKING,
+    Union,
+)
 
 from can import Listener, Message
+from numpy import (
+    dtype,
+    float64,
+    frombuffer,
+    fromiter,
+    memmap,
+    ndarray,
+    uint8,
+    uint16,
+    uint32,
+)
 
 from mytoolit.can.identifier import Identifier
+from mytoolit.can.metrics import NetworkMetrics
+
+if TYPE_CHECKING:
+    from mytoolit.can.rules import RuleEngine
 
 # -- Classes ------------------------------------------------------------------
 
@@ -351,17 +382,516 @@ class MessageStats:
         self.lost = 0
 
 
+class BufferStats:
+    """Store statistics about the size of a stream buffer"""
+
+    def __init__(self) -> None:
+        """Initialize the buffer statistics
+
+        Examples
+        --------
+
+        >>> BufferStats()
+        High-Water Mark: 0, Overflows: 0, Dropped: 0, Spilled: 0
+
+        """
+
+        self.high_water_mark = 0
+        self.overflows = 0
+        self.dropped = 0
+        self.spilled = 0
+
+    def __repr__(self) -> str:
+        """Get the textual representation of the buffer statistics
+
+        Returns
+        -------
+
+        A string that describes the buffer statistics
+
+        """
+
+        return ", ".join([
+            f"High-Water Mark: {self.high_water_mark}",
+            f"Overflows: {self.overflows}",
+            f"Dropped: {self.dropped}",
+            f"Spilled: {self.spilled}",
+        ])
+
+
 # pylint: enable=too-few-public-methods
 
 
+class SpillBuffer:
+    """Store streaming messages in a memory mapped temporary file
+
+    The stream buffer uses this class to store messages, if the consumer of
+    the stream is not able to keep up with the rate of incoming messages.
+    This way the amount of used main memory stays constant even if the
+    consumer stalls for a longer amount of time.
+
+    """
+
+    DTYPE = dtype([
+        ("timestamp", float64),
+        ("data", uint8, (8,)),
+        ("length", uint8),
+        ("lost", uint32),
+    ])
+
+    def __init__(
+        self,
+        directory: Optional[Union[Path, str]] = None,
+        capacity: int = 10_000,
+    ) -> None:
+        """Create a new spill buffer
+
+        Parameters
+        ----------
+
+        directory:
+            The directory that should store the temporary file; if you do not
+            specify a directory, then the default directory for temporary
+            files will be used
+
+        capacity:
+            The initial number of messages the buffer is able to store; the
+            buffer grows automatically, if this number is exceeded
+
+        Examples
+        --------
+
+        >>> spill = SpillBuffer(capacity=2)
+        >>> for counter in range(5):
+        ...     spill.append(counter / 10, bytes([0, counter, 1, 2]), 0)
+        >>> len(spill)
+        5
+        >>> spill.popleft()
+        (0.0, b'\\x00\\x00\\x01\\x02', 0)
+        >>> spill.capacity
+        8
+        >>> spill.close()
+
+        """
+
+        self.file = TemporaryFile(dir=directory)
+        self.capacity = 0
+        self.start = 0
+        self.end = 0
+        self.array: Optional[memmap] = None
+        self._resize(capacity)
+
+    def __len__(self) -> int:
+        """Get the number of stored messages
+
+        Returns
+        -------
+
+        The amount of messages stored in the buffer
+
+        """
+
+        return self.end - self.start
+
+    def _resize(self, capacity: int) -> None:
+        """Change the number of messages the buffer is able to store
+
+        Parameters
+        ----------
+
+        capacity:
+            The new capacity of the buffer
+
+        """
+
+        # Release the old mapping before we change the size of the file
+        self.array = None
+        self.file.truncate(capacity * self.DTYPE.itemsize)
+        self.array = memmap(
+            self.file, dtype=self.DTYPE, mode="r+", shape=(capacity,)
+        )
+        self.capacity = capacity
+
+    def append(self, timestamp: float, data: bytes, lost: int) -> None:
+        """Add a message at the end of the buffer
+
+        Parameters
+        ----------
+
+        timestamp:
+            The timestamp of the message
+
+        data:
+            The data bytes of the message
+
+        lost:
+            The number of lost messages right before the message
+
+        """
+
+        if self.end >= self.capacity:
+            size = len(self)
+            if size <= self.capacity // 2:
+                # Reuse the space of already read messages
+                assert self.array is not None
+                self.array[:size] = self.array[self.start : self.end]
+                self.start, self.end = 0, size
+            else:
+                self._resize(2 * self.capacity)
+
+        assert self.array is not None
+        length = min(len(data), 8)
+        self.array[self.end] = (
+            timestamp,
+            frombuffer(data[:8].ljust(8, b"\0"), dtype=uint8),
+            length,
+            lost,
+        )
+        self.end += 1
+
+    def popleft(self) -> Tuple[float, bytes, int]:
+        """Remove the oldest message from the buffer
+
+        Returns
+        -------
+
+        The timestamp, data bytes and number of lost messages of the oldest
+        message in the buffer
+
+        """
+
+        if len(self) <= 0:
+            raise IndexError("pop from an empty spill buffer")
+
+        assert self.array is not None
+        record = self.array[self.start]
+        message = (
+            float(record["timestamp"]),
+            record["data"][: record["length"]].tobytes(),
+            int(record["lost"]),
+        )
+        self.start += 1
+        if self.start >= self.end:
+            self.start = self.end = 0
+
+        return message
+
+    def close(self) -> None:
+        """Remove the temporary file used by the buffer"""
+
+        self.array = None
+        self.file.close()
+
+
+# pylint: disable=too-many-arguments
+
+
+class StreamingBlock:
+    """Support for storing the data of multiple streaming messages
+
+    In comparison to `StreamingData`, which stores the data of a single
+    message, this class stores the (raw) data of many messages in NumPy
+    arrays. To make it possible to share a block between different consumers
+    all arrays are read-only.
+
+    """
+
+    def __init__(
+        self,
+        counters: ndarray,
+        timestamps: ndarray,
+        values: ndarray,
+        lost: ndarray,
+        configuration: StreamingConfiguration,
+    ) -> None:
+        """Initialize the streaming block with the given arguments
+
+        Parameters
+        ----------
+
+        counters:
+            The message counter values
+
+        timestamps:
+            The message timestamps
+
+        values:
+            A two dimensional array containing the raw streaming values of
+            each message (one row per message)
+
+        lost:
+            The number of lost messages right before each message
+
+        configuration:
+            The streaming configuration used to collect the data
+
+        Examples
+        --------
+
+        >>> from numpy import array
+        >>> block = StreamingBlock(
+        ...     counters=array([1, 2], dtype=uint8),
+        ...     timestamps=array([0.1, 0.2]),
+        ...     values=array([[1, 2], [3, 4]], dtype=uint16),
+        ...     lost=array([0, 0], dtype=uint32),
+        ...     configuration=StreamingConfiguration(first=True, second=True))
+        >>> block
+        2 messages (x, y) #1 – #2
+
+        >>> block.values[0, 0] = 10
+        Traceback (most recent call last):
+        ...
+        ValueError: assignment destination is read-only
+
+        """
+
+        for array in (counters, timestamps, values, lost):
+            array.flags.writeable = False
+
+        self.counters = counters
+        self.timestamps = timestamps
+        self.values = values
+        self.lost = lost
+        self.configuration = configuration
+
+    def __len__(self) -> int:
+        """Get the number of messages stored in the block
+
+        Returns
+        -------
+
+        The amount of streaming messages stored in the block
+
+        """
+
+        return len(self.counters)
+
+    def __repr__(self) -> str:
+        """Get the string representation of the streaming block"""
+
+        axes = ", ".join(self.configuration.axes())
+        if len(self) <= 0:
+            return f"0 messages ({axes})"
+
+        return (
+            f"{len(self)} messages ({axes}) "
+            f"#{self.counters[0]} – #{self.counters[-1]}"
+        )
+
+    def channel(self, axis: str) -> ndarray:
+        """Get all raw values of a single channel
+
+        Parameters
+        ----------
+
+        axis:
+            The axis (`x`, `y` or `z`) for which the values should be returned
+
+        Returns
+        -------
+
+        The values of the channel in chronological order
+
+        Examples
+        --------
+
+        >>> from numpy import array
+        >>> block = StreamingBlock(
+        ...     counters=array([1, 2], dtype=uint8),
+        ...     timestamps=array([0.1, 0.2]),
+        ...     values=array([[1, 2, 3], [4, 5, 6]], dtype=uint16),
+        ...     lost=array([0, 0], dtype=uint32),
+        ...     configuration=StreamingConfiguration(first=True))
+        >>> block.channel("x")
+        array([1, 2, 3, 4, 5, 6], dtype=uint16)
+
+        >>> block = StreamingBlock(
+        ...     counters=array([1, 2], dtype=uint8),
+        ...     timestamps=array([0.1, 0.2]),
+        ...     values=array([[1, 2], [3, 4]], dtype=uint16),
+        ...     lost=array([0, 0], dtype=uint32),
+        ...     configuration=StreamingConfiguration(first=False, second=True,
+        ...                                          third=True))
+        >>> block.channel("z")
+        array([2, 4], dtype=uint16)
+        >>> block.channel("x")
+        Traceback (most recent call last):
+        ...
+        ValueError: Axis “x” is not part of the streaming data
+
+        """
+
+        axes = self.configuration.axes()
+        if axis not in axes:
+            raise ValueError(
+                f"Axis “{axis}” is not part of the streaming data"
+            )
+
+        if len(axes) == 1:
+            return self.values.ravel()
+
+        return self.values[:, axes.index(axis)]
+
+    def dataloss(self) -> int:
+        """Get the number of lost messages
+
+        Returns
+        -------
+
+        The overall amount of lost messages for the data in this block
+
+        """
+
+        return int(self.lost.sum())
+
+
+class StreamingSamples(StreamingBlock):
+    """Store a fixed number of values per channel of a data stream
+
+    Streaming messages of a single channel contain three values each. The
+    messages of a collection might therefore contain up to two values per
+    channel more than requested. This class only returns the requested
+    values.
+
+    """
+
+    def __init__(  # pylint: disable=too-many-positional-arguments
+        self,
+        counters: ndarray,
+        timestamps: ndarray,
+        values: ndarray,
+        lost: ndarray,
+        configuration: StreamingConfiguration,
+        samples: int,
+    ) -> None:
+        """Initialize the collected data with the given arguments
+
+        Parameters
+        ----------
+
+        counters:
+            The message counter values
+
+        timestamps:
+            The message timestamps
+
+        values:
+            A two dimensional array containing the raw streaming values of
+            each message (one row per message)
+
+        lost:
+            The number of lost messages right before each message
+
+        configuration:
+            The streaming configuration used to collect the data
+
+        samples:
+            The number of values per channel
+
+        Examples
+        --------
+
+        >>> from numpy import arange, array, zeros
+        >>> data = StreamingSamples(
+        ...     counters=array([1, 2], dtype=uint8),
+        ...     timestamps=array([0.1, 0.2]),
+        ...     values=arange(6, dtype=uint16).reshape(2, 3),
+        ...     lost=array([0, 2], dtype=uint32),
+        ...     configuration=StreamingConfiguration(first=True),
+        ...     samples=5)
+        >>> data.channel("x")
+        array([0, 1, 2, 3, 4], dtype=uint16)
+        >>> data.stats().dataloss()
+        0.5
+
+        """
+
+        super().__init__(counters, timestamps, values, lost, configuration)
+        self.samples = samples
+
+    def channel(self, axis: str) -> ndarray:
+        """Get the collected raw values of a single channel
+
+        Parameters
+        ----------
+
+        axis:
+            The axis (`x`, `y` or `z`) for which the values should be returned
+
+        Returns
+        -------
+
+        The requested number of values of the channel in chronological order
+
+        """
+
+        return super().channel(axis)[: self.samples]
+
+    def array(self) -> ndarray:
+        """Get the collected raw values of all channels
+
+        Returns
+        -------
+
+        A two dimensional array that contains the values of every channel
+        (one row per channel)
+
+        Examples
+        --------
+
+        >>> from numpy import arange, array
+        >>> StreamingSamples(
+        ...     counters=array([1, 2], dtype=uint8),
+        ...     timestamps=array([0.1, 0.2]),
+        ...     values=arange(4, dtype=uint16).reshape(2, 2),
+        ...     lost=array([0, 0], dtype=uint32),
+        ...     configuration=StreamingConfiguration(first=True, third=True),
+        ...     samples=2).array()
+        array([[0, 2],
+               [1, 3]], dtype=uint16)
+
+        """
+
+        if self.configuration.enabled_channels() <= 1:
+            return self.values.reshape(1, -1)[:, : self.samples]
+
+        return self.values[: self.samples].T
+
+    def stats(self) -> MessageStats:
+        """Get the message statistics of the collected data
+
+        Returns
+        -------
+
+        The number of retrieved and lost messages
+
+        """
+
+        return MessageStats(retrieved=len(self), lost=self.dataloss())
+
+
+# pylint: enable=too-many-arguments
+
+
+# pylint: disable=too-many-instance-attributes
+
+
 class AsyncStreamBuffer(Listener):
     """Buffer for streaming data"""
 
-    def __init__(
+    OVERFLOW_POLICIES = ("error", "grow", "drop", "spill")
+
+    def __init__(  # pylint: disable=too-many-arguments
         self,
         configuration: StreamingConfiguration,
         timeout: float,
         max_buffer_size: int = 10_000,
+        metrics: Optional[NetworkMetrics] = None,
+        *,
+        overflow: str = "error",
+        spill_directory: Optional[Union[Path, str]] = None,
+        rules: Optional[RuleEngine] = None,
+        block_command: str = "Data",
     ) -> None:
         """Initialize object using the given arguments
 
@@ -378,28 +908,105 @@ class AsyncStreamBuffer(Listener):
 
         max_buffer_size:
             Maximum amount of buffered messages kept by the stream buffer.
-            If this amount is exceeded, then this listener will raise a
-            `StreamingBufferError`. A large buffer indicates that the
-            application is not able to keep up with the current rate of
-            retrieved messages and therefore the probability of losing
-            messages is quite high.
+            What happens if this amount is exceeded depends on the value of
+            `overflow`. A large buffer indicates that the application is not
+            able to keep up with the current rate of retrieved messages.
+
+        metrics:
+            An optional metrics collector that stores the rate of received
+            messages, the buffer size and the runtime of the message callback
+
+        overflow:
+            Specifies how the buffer handles messages, after the maximum
+            buffer size is exceeded:
+
+            - `error`: raise a `StreamingBufferError`
+            - `grow`: keep all messages in main memory
+            - `drop`: remove the oldest buffered message
+            - `spill`: store messages in a memory mapped temporary file
+
+        spill_directory:
+            The directory for the temporary file used by the overflow policy
+            `spill`
+
+        rules:
+            An optional rule engine that checks the raw values of every
+            received message, before the buffer stores the message (see
+            `mytoolit.can.rules`)
+
+        block_command:
+            The streaming command of the buffered messages: `Data` for
+            acceleration data or `Voltage` for voltage data
+
+        Examples
+        --------
+
+        >>> AsyncStreamBuffer(StreamingConfiguration(), timeout=1,
+        ...                   overflow="ignore")
+        Traceback (most recent call last):
+        ...
+        ValueError: Unknown overflow policy “ignore”
+
+        Drop the oldest messages, if the buffer is full
+
+        >>> from asyncio import run
+        >>> identifier = Identifier(block="Streaming", block_command="Data",
+        ...                         sender="STH 1", receiver="SPU 1")
+        >>> async def fill_buffer(overflow):
+        ...     stream = AsyncStreamBuffer(StreamingConfiguration(),
+        ...                                timeout=1, max_buffer_size=2,
+        ...                                overflow=overflow)
+        ...     for counter in range(5):
+        ...         stream.on_message_received(
+        ...             Message(arbitration_id=identifier.value,
+        ...                     data=[0, counter, 0, 0, 0, 0, 0, 0]))
+        ...     block = await stream.read_block()
+        ...     stream.stop()
+        ...     print(block.counters.tolist(), block.lost.tolist())
+        ...     print(stream.buffer_stats)
+        >>> run(fill_buffer("drop"))
+        [3, 4] [3, 0]
+        High-Water Mark: 2, Overflows: 1, Dropped: 3, Spilled: 0
+
+        Store messages in a temporary file, if the buffer is full
+
+        >>> run(fill_buffer("spill"))
+        [0, 1, 2, 3, 4] [0, 0, 0, 0, 0]
+        High-Water Mark: 5, Overflows: 1, Dropped: 0, Spilled: 3
 
         """
 
+        if overflow not in self.OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy “{overflow}”")
+
         # Expected identifier of received streaming messages
         self.identifier = Identifier(
             block="Streaming",
-            block_command="Data",
+            block_command=block_command,
             sender="STH 1",
             receiver="SPU 1",
             request=False,
         )
-        self.queue: Queue[Tuple[StreamingData, int]] = Queue()
+        # Raw data of received messages: timestamp, message data and number
+        # of lost messages before the message
+        self.buffer: Deque[Tuple[float, bytes, int]] = deque()
         self.timeout = timeout
         self.configuration = configuration
         self.last_counter = -1
         self.max_buffer_size = max_buffer_size
         self.stats = MessageStats()
+        self.metrics = metrics
+        self.overflow = overflow
+        self.spill_directory = spill_directory
+        self.spill: Optional[SpillBuffer] = None
+        self.buffer_stats = BufferStats()
+        self._overflowing = False
+        # Instead of using a timeout for every single message we use a single
+        # timer (“watchdog”) that checks the arrival time of the last message
+        self.last_arrival: Optional[float] = None
+        self._watchdog: Optional[TimerHandle] = None
+        self._waiter: Optional[Future[None]] = None
+        self.rules = rules
 
     def __aiter__(self) -> AsyncIterator[Tuple[StreamingData, int]]:
         """Retrieve iterator for collected data
@@ -426,20 +1033,324 @@ class AsyncStreamBuffer(Listener):
         - the number of lost streaming messages right before the returned
           streaming message
 
+        Examples
+        --------
+
+        >>> from asyncio import run
+
+        >>> def create_message(counter):
+        ...     return Message(
+        ...         arbitration_id=Identifier(block="Streaming",
+        ...                                   block_command="Data",
+        ...                                   sender="STH 1",
+        ...                                   receiver="SPU 1").value,
+        ...         data=[0, counter, 1, 0, 2, 0, 3, 0],
+        ...         timestamp=counter / 1000)
+
+        >>> async def read_messages():
+        ...     stream = AsyncStreamBuffer(StreamingConfiguration(),
+        ...                                timeout=0.1)
+        ...     for counter in (1, 2, 5):
+        ...         stream.on_message_received(create_message(counter))
+        ...     try:
+        ...         async for data, lost in stream:
+        ...             print(f"{data} (Lost: {lost})")
+        ...     except StreamingTimeoutError as error:
+        ...         print(error)
+        ...     finally:
+        ...         stream.stop()
+        >>> run(read_messages())
+        [1, 2, 3]@0.001 #1 (Lost: 0)
+        [1, 2, 3]@0.002 #2 (Lost: 0)
+        [1, 2, 3]@0.005 #5 (Lost: 2)
+        No data received for at least 0.1 seconds
+
         """
 
-        if self.queue.qsize() > self.max_buffer_size:
+        self._check_buffer()
+
+        if not self.buffer and not self.spill:
+            await self._wait()
+
+        timestamp, data, lost_messages = self._pop()
+
+        data_bytes = (
+            (data[2:4], data[4:6], data[6:8])
+            if self.configuration.data_length() == 3
+            else (data[2:4], data[4:6])
+        )
+        values = [
+            int.from_bytes(word, byteorder="little") for word in data_bytes
+        ]
+
+        return (
+            StreamingData(timestamp=timestamp, counter=data[1], values=values),
+            lost_messages,
+        )
+
+    async def read_block(self, max_messages: int = 1000) -> StreamingBlock:
+        """Retrieve all buffered messages (up to a maximum amount) at once
+
+        Compared to the iteration over single messages, this coroutine
+        decodes all data at once (using NumPy), which reduces the processing
+        time per message considerably.
+
+        Parameters
+        ----------
+
+        max_messages:
+            The maximum number of messages that should be returned
+
+        Returns
+        -------
+
+        The data of at least one and at most `max_messages` messages
+
+        Examples
+        --------
+
+        >>> from asyncio import run
+
+        >>> identifier = Identifier(block="Streaming", block_command="Data",
+        ...                         sender="STH 1", receiver="SPU 1")
+        >>> async def read_block():
+        ...     stream = AsyncStreamBuffer(StreamingConfiguration(),
+        ...                                timeout=1)
+        ...     for counter in range(10):
+        ...         stream.on_message_received(
+        ...             Message(arbitration_id=identifier.value,
+        ...                     data=[0, counter, counter, 0, 2, 0, 3, 0],
+        ...                     timestamp=counter / 1000))
+        ...     first = await stream.read_block(max_messages=8)
+        ...     second = await stream.read_block(max_messages=8)
+        ...     stream.stop()
+        ...     return first, second
+        >>> first, second = run(read_block())
+        >>> len(first), len(second)
+        (8, 2)
+        >>> second.counters
+        array([8, 9], dtype=uint8)
+        >>> second.values
+        array([[8, 2, 3],
+               [9, 2, 3]], dtype=uint16)
+
+        """
+
+        self._check_buffer()
+
+        if not self.buffer and not self.spill:
+            await self._wait()
+
+        messages = min(self._size(), max_messages)
+        pop = self._pop
+        items = [pop() for _ in range(messages)]
+
+        timestamps = fromiter(
+            (item[0] for item in items), dtype=float64, count=messages
+        )
+        lost = fromiter(
+            (item[2] for item in items), dtype=uint32, count=messages
+        )
+        raw = b"".join(item[1] for item in items)
+        if len(raw) != 8 * messages:
+            # Handle (unusual) messages with less than 8 data bytes
+            raw = b"".join(item[1][:8].ljust(8, b"\0") for item in items)
+        data = frombuffer(raw, dtype=uint8).reshape(messages, 8)
+
+        data_length = self.configuration.data_length()
+        values = (
+            data[:, 2 : 2 + 2 * data_length]
+            .copy()
+            .view("<u2")
+            .astype(uint16, copy=False)
+        )
+
+        return StreamingBlock(
+            counters=data[:, 1].copy(),
+            timestamps=timestamps,
+            values=values,
+            lost=lost,
+            configuration=self.configuration,
+        )
+
+    async def blocks(
+        self, max_messages: int = 1000
+    ) -> AsyncIterator[StreamingBlock]:
+        """Iterate over blocks of streaming data
+
+        Parameters
+        ----------
+
+        max_messages:
+            The maximum number of messages stored in a single block
+
+        Returns
+        -------
+
+        An iterator over blocks of streaming data
+
+        """
+
+        while True:
+            yield await self.read_block(max_messages)
+
+    def buffered_messages(self) -> int:
+        """Get the number of messages that can be read without waiting
+
+        Returns
+        -------
+
+        The amount of buffered messages
+
+        """
+
+        return self._size()
+
+    def _size(self) -> int:
+        """Get the number of buffered messages
+
+        Returns
+        -------
+
+        The amount of messages stored in main memory and the spill file
+
+        """
+
+        return len(self.buffer) + (
+            0 if self.spill is None else len(self.spill)
+        )
+
+    def _pop(self) -> Tuple[float, bytes, int]:
+        """Remove the oldest buffered message
+
+        Returns
+        -------
+
+        The timestamp, data bytes and number of lost messages of the oldest
+        buffered message
+
+        """
+
+        if self.buffer:
+            return self.buffer.popleft()
+
+        assert self.spill is not None
+        return self.spill.popleft()
+
+    def _store(self, item: Tuple[float, bytes, int]) -> None:
+        """Add a message to the buffer according to the overflow policy
+
+        Parameters
+        ----------
+
+        item:
+            The timestamp, data bytes and number of lost messages of the
+            received message
+
+        """
+
+        buffer = self.buffer
+        spill = self.spill
+        stats = self.buffer_stats
+        metrics = self.metrics
+
+        full = len(buffer) >= self.max_buffer_size or bool(spill)
+        if full and not self._overflowing:
+            stats.overflows += 1
+        self._overflowing = full
+
+        if not full:
+            buffer.append(item)
+        elif self.overflow == "spill":
+            if spill is None:
+                spill = self.spill = SpillBuffer(self.spill_directory)
+            spill.append(*item)
+            stats.spilled += 1
+            if metrics is not None:
+                metrics.record_overflow(spilled=1)
+        elif self.overflow == "drop" and buffer:
+            _, _, lost = buffer.popleft()
+            buffer.append(item)
+            # Account for the dropped message in the next buffered message,
+            # so that the consumer still sees the correct amount of lost data
+            timestamp, data, lost_next = buffer[0]
+            buffer[0] = (timestamp, data, lost_next + lost + 1)
+            stats.dropped += 1
+            if metrics is not None:
+                metrics.record_overflow(dropped=1)
+        else:
+            buffer.append(item)
+
+        size = len(buffer) + (0 if spill is None else len(spill))
+        stats.high_water_mark = max(stats.high_water_mark, size)
+
+    def _check_buffer(self) -> None:
+        """Check the amount of buffered messages
+
+        Raises
+        ------
+
+        A `StreamingBufferError`, if there are more buffered messages than
+        allowed and the overflow policy is `error`
+
+        """
+
+        size = self._size()
+
+        if self.metrics is not None:
+            self.metrics.record_queue_depth(size)
+
+        if size > self.max_buffer_size and self.overflow == "error":
             raise StreamingBufferError(
                 f"Maximum buffer size of {self.max_buffer_size} messages "
                 "exceeded"
             )
 
+    async def _wait(self) -> None:
+        """Wait until new streaming data arrives
+
+        Raises
+        ------
+
+        A `StreamingTimeoutError`, if there was no new data for the amount of
+        time specified in the attribute `timeout`
+
+        """
+
+        loop = get_running_loop()
+
+        if self.last_arrival is None:
+            self.last_arrival = monotonic()
+
+        if self._watchdog is None:
+            self._watchdog = loop.call_later(self.timeout, self._check_timeout)
+
+        self._waiter = loop.create_future()
         try:
-            return await wait_for(self.queue.get(), self.timeout)
-        except TimeoutError as error:
-            raise StreamingTimeoutError(
-                f"No data received for at least {self.timeout} seconds"
-            ) from error
+            await self._waiter
+        finally:
+            self._waiter = None
+
+    def _check_timeout(self) -> None:
+        """Check if the arrival of the last message is too long ago"""
+
+        assert self.last_arrival is not None
+
+        remaining = self.last_arrival + self.timeout - monotonic()
+        if remaining > 0:
+            self._watchdog = get_running_loop().call_later(
+                remaining, self._check_timeout
+            )
+            return
+
+        self._watchdog = None
+        waiter = self._waiter
+        if waiter is not None and not waiter.done():
+            waiter.set_exception(
+                StreamingTimeoutError(
+                    f"No data received for at least {self.timeout} seconds"
+                )
+            )
 
     def on_message_received(self, msg: Message) -> None:
         """Handle received messages
@@ -450,31 +1361,45 @@ class AsyncStreamBuffer(Listener):
         msg:
             The received CAN message
 
+        Examples
+        --------
+
+        >>> from asyncio import run
+        >>> from mytoolit.can.rules import LimitRule, RuleEngine
+
+        A failing rule callback does not lose the message
+
+        >>> def fail(event):
+        ...     raise ValueError("Faulty callback")
+        >>> async def receive():
+        ...     channels = StreamingConfiguration(first=True)
+        ...     stream = AsyncStreamBuffer(
+        ...         channels, timeout=1,
+        ...         rules=RuleEngine(channels.axes(),
+        ...                          [LimitRule("x", low=0, high=10,
+        ...                                      callback=fail)]))
+        ...     identifier = Identifier(block="Streaming",
+        ...                             block_command="Data",
+        ...                             sender="STH 1", receiver="SPU 1")
+        ...     stream.on_message_received(
+        ...         Message(arbitration_id=identifier.value,
+        ...                 data=[0, 1, 20, 0, 20, 0, 20, 0]))
+        ...     block = await stream.read_block()
+        ...     stream.stop()
+        ...     print(block.values.tolist())
+        >>> run(receive())
+        [[20, 20, 20]]
+
         """
 
         # Ignore messages with wrong id and “Stop Stream” messages
         if msg.arbitration_id != self.identifier.value or len(msg.data) <= 1:
             return
 
+        start_time = perf_counter()
+
         data = msg.data
         counter = data[1]
-        timestamp = msg.timestamp
-        data_bytes = (
-            (data[2:4], data[4:6], data[6:8])
-            if self.configuration.data_length() == 3
-            else (data[2:4], data[4:6])
-        )
-
-        values = [
-            int.from_bytes(word, byteorder="little") for word in data_bytes
-        ]
-        assert len(values) == 2 or len(values) == 3
-
-        streaming_data = StreamingData(
-            timestamp=timestamp,
-            counter=counter,
-            values=values,
-        )
 
         # Calculate amount of lost messages
         if self.last_counter < 0:
@@ -485,7 +1410,21 @@ class AsyncStreamBuffer(Listener):
         self.stats.lost += lost_messages
         self.stats.retrieved += 1
 
-        self.queue.put_nowait((streaming_data, lost_messages))
+        self._store((msg.timestamp, bytes(data), lost_messages))
+        self.last_arrival = monotonic()
+
+        waiter = self._waiter
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+        # Check the rules after storing the message, so that a failing rule
+        # never loses data
+        if self.rules is not None:
+            self.rules.process(counter, msg.timestamp, data)
+
+        if self.metrics is not None:
+            self.metrics.record_frame(lost_messages)
+            self.metrics.record_callback(perf_counter() - start_time)
 
     def on_error(self, exc: Exception) -> None:
         """This method is called to handle any exception in the receive thread.
@@ -503,6 +1442,14 @@ class AsyncStreamBuffer(Listener):
     def stop(self) -> None:
         """Stop handling new messages"""
 
+        if self._watchdog is not None:
+            self._watchdog.cancel()
+            self._watchdog = None
+
+        if self.spill is not None:
+            self.spill.close()
+            self.spill = None
+
     def reset_stats(self) -> None:
         """Reset the message statistics
 
@@ -529,6 +1476,117 @@ class AsyncStreamBuffer(Listener):
         return self.stats.dataloss()
 
 
+# pylint: enable=too-many-instance-attributes
+
+
+class StreamingSession:
+    """Read acceleration and voltage data of a single streaming session
+
+    The acceleration and (optional) voltage data use separate stream
+    buffers, which means every stream has its own message counter, data
+    loss and timeline. The session only waits for acceleration data.
+    Voltage data is read after the acceleration data, if it is already
+    available.
+
+    """
+
+    def __init__(
+        self,
+        acceleration: AsyncStreamBuffer,
+        voltage: Optional[AsyncStreamBuffer] = None,
+    ) -> None:
+        """Initialize the session using the given stream buffers
+
+        Parameters
+        ----------
+
+        acceleration:
+            The stream buffer for acceleration (`Data`) messages
+
+        voltage:
+            The stream buffer for `Voltage` messages or `None`, if the
+            session only contains acceleration data
+
+        """
+
+        self.acceleration = acceleration
+        self.voltage = voltage
+
+    async def blocks(
+        self, max_messages: int = 1000
+    ) -> AsyncIterator[Tuple[str, StreamingBlock]]:
+        """Iterate over blocks of acceleration and voltage data
+
+        Parameters
+        ----------
+
+        max_messages:
+            The maximum number of messages stored in a single block
+
+        Returns
+        -------
+
+        An iterator over tuples containing the kind of data (`acceleration`
+        or `voltage`) and a block of streaming data
+
+        Examples
+        --------
+
+        >>> from asyncio import run
+
+        >>> def create_message(block_command, counter):
+        ...     identifier = Identifier(block="Streaming",
+        ...                             block_command=block_command,
+        ...                             sender="STH 1", receiver="SPU 1")
+        ...     return Message(arbitration_id=identifier.value,
+        ...                    data=[0, counter, 1, 0, 2, 0, 3, 0])
+        >>> async def read_blocks():
+        ...     channels = StreamingConfiguration(first=True)
+        ...     session = StreamingSession(
+        ...         AsyncStreamBuffer(channels, timeout=1),
+        ...         AsyncStreamBuffer(channels, timeout=1,
+        ...                           block_command="Voltage"))
+        ...     assert session.voltage is not None
+        ...     # The voltage data arrives before the acceleration data
+        ...     session.voltage.on_message_received(
+        ...         create_message("Voltage", 7))
+        ...     for counter in range(3):
+        ...         for stream in (session.acceleration, session.voltage):
+        ...             stream.on_message_received(
+        ...                 create_message("Data", counter))
+        ...     blocks = session.blocks()
+        ...     for _ in range(2):
+        ...         print(await anext(blocks))
+        >>> run(read_blocks())
+        ('acceleration', 3 messages (x) #0 – #2)
+        ('voltage', 1 messages (x) #7 – #7)
+
+        """
+
+        while True:
+            # Acceleration data comes first, since it determines the start
+            # time of the measurement
+            yield "acceleration", await self.acceleration.read_block(
+                max_messages
+            )
+            voltage = self.voltage
+            if voltage is not None and voltage.buffered_messages() > 0:
+                yield "voltage", await voltage.read_block(max_messages)
+
+    def dataloss(self) -> float:
+        """Calculate the overall amount of acceleration data loss
+
+        Returns
+        -------
+
+        The overall amount of data loss of the acceleration stream as number
+        between 0 (no data loss) and 1 (all data lost)
+
+        """
+
+        return self.acceleration.dataloss()
+
+
 class StreamingFormat:
     """Support for specifying the data streaming format
 
@@ -1,14 +1,19 @@
 """Command Line Parsing support"""
 
+# pylint: disable=too-many-lines
+
 # -- Imports ------------------------------------------------------------------
 
 from argparse import ArgumentParser, ArgumentTypeError
+from datetime import datetime
 from math import inf
 from re import compile as re_compile
 
 from netaddr import AddrFormatError, EUI
 
 from mytoolit.can.adc import ADCConfiguration
+from mytoolit.measurement.analysis import Analysis
+from mytoolit.measurement.compression import Compression
 
 # -- Functions ----------------------------------------------------------------
 
@@ -231,6 +236,238 @@ def measurement_time(value: str) -> float:
         ) from error
 
 
+def non_negative_number(value: str) -> float:
+    """Check if the given text represents a number larger or equal to zero
+
+    Raises
+    ------
+
+    An argument type error in case the given text does not represent a
+    number larger or equal to 0
+
+    Returns
+    -------
+
+    A float value representing the given number on success
+
+    Examples
+    --------
+
+    >>> non_negative_number("0")
+    0.0
+
+    >>> non_negative_number("-0.5")
+    Traceback (most recent call last):
+       ...
+    argparse.ArgumentTypeError: “-0.5” is not a non-negative number
+
+    """
+
+    try:
+        number = float(value)
+        if number < 0:
+            raise ValueError()
+        return number
+    except ValueError as error:
+        raise ArgumentTypeError(
+            f"“{value}” is not a non-negative number"
+        ) from error
+
+
+def positive_number(value: str) -> float:
+    """Check if the given text represents a positive number
+
+    Raises
+    ------
+
+    An argument type error in case the given text does not represent a
+    number larger than 0
+
+    Returns
+    -------
+
+    A float value representing the given number on success
+
+    Examples
+    --------
+
+    >>> positive_number("2.5")
+    2.5
+
+    >>> positive_number("0")
+    Traceback (most recent call last):
+       ...
+    argparse.ArgumentTypeError: “0” is not a positive number
+
+    >>> positive_number("ten")
+    Traceback (most recent call last):
+       ...
+    argparse.ArgumentTypeError: “ten” is not a positive number
+
+    """
+
+    try:
+        number = float(value)
+        if number <= 0:
+            raise ValueError()
+        return number
+    except ValueError as error:
+        raise ArgumentTypeError(
+            f"“{value}” is not a positive number"
+        ) from error
+
+
+def positive_integer(value: str) -> int:
+    """Check if the given text represents a positive integer
+
+    Raises
+    ------
+
+    An argument type error in case the given text does not represent an
+    integer larger than 0
+
+    Returns
+    -------
+
+    The integer represented by the given text
+
+    Examples
+    --------
+
+    >>> positive_integer("4")
+    4
+
+    >>> positive_integer("1.5")
+    Traceback (most recent call last):
+       ...
+    argparse.ArgumentTypeError: “1.5” is not a positive integer
+
+    """
+
+    try:
+        number = int(value)
+        if number <= 0:
+            raise ValueError()
+        return number
+    except ValueError as error:
+        raise ArgumentTypeError(
+            f"“{value}” is not a positive integer"
+        ) from error
+
+
+def date_time(value: str) -> datetime:
+    """Check if the given text represents a date (and time)
+
+    Raises
+    ------
+
+    An argument type error in case the given text does not represent a date
+    in ISO format
+
+    Returns
+    -------
+
+    The date and time represented by the given text
+
+    Examples
+    --------
+
+    >>> date_time("2024-05-17")
+    datetime.datetime(2024, 5, 17, 0, 0)
+
+    >>> date_time("2024-05-17 13:45")
+    datetime.datetime(2024, 5, 17, 13, 45)
+
+    >>> date_time("yesterday")
+    Traceback (most recent call last):
+       ...
+    argparse.ArgumentTypeError: “yesterday” is not a valid date
+
+    """
+
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError as error:
+        raise ArgumentTypeError(f"“{value}” is not a valid date") from error
+
+
+def frequency_band(value: str) -> tuple[float, float]:
+    """Check if the given text represents a frequency band (`low-high`)
+
+    Raises
+    ------
+
+    An argument type error in case the given text does not represent a
+    frequency band
+
+    Returns
+    -------
+
+    A tuple containing the lower and upper frequency of the band
+
+    Examples
+    --------
+
+    >>> frequency_band("100-2000")
+    (100.0, 2000.0)
+
+    >>> frequency_band("2000-100")
+    Traceback (most recent call last):
+       ...
+    argparse.ArgumentTypeError: “2000-100” is not a valid frequency band
+
+    >>> frequency_band("high")
+    Traceback (most recent call last):
+       ...
+    argparse.ArgumentTypeError: “high” is not a valid frequency band
+
+    """
+
+    try:
+        low, high = (float(frequency) for frequency in value.split("-"))
+        if low < 0 or high <= low:
+            raise ValueError()
+        return (low, high)
+    except ValueError as error:
+        raise ArgumentTypeError(
+            f"“{value}” is not a valid frequency band"
+        ) from error
+
+
+def name_value(value: str) -> tuple[str, str]:
+    """Check if the given text represents an assignment (`name=value`)
+
+    Raises
+    ------
+
+    An argument type error in case the given text does not contain a name
+    followed by an equals sign
+
+    Returns
+    -------
+
+    A tuple containing the name and the value
+
+    Examples
+    --------
+
+    >>> name_value("Tool=Drill")
+    ('Tool', 'Drill')
+
+    >>> name_value("Tool")
+    Traceback (most recent call last):
+       ...
+    argparse.ArgumentTypeError: “Tool” is not of the form NAME=VALUE
+
+    """
+
+    name, separator, text = value.partition("=")
+    if not name or not separator:
+        raise ArgumentTypeError(f"“{value}” is not of the form NAME=VALUE")
+
+    return (name, text)
+
+
 def device_number(value: str) -> int:
     """Check if the given number is valid Bluetooth device number
 
@@ -406,6 +643,44 @@ def add_adc_arguments(parser: ArgumentParser) -> None:
     )
 
 
+def add_compression_arguments(parser: ArgumentParser) -> None:
+    """Add compression arguments to given argument parser
+
+    parser:
+        The parser which should include the compression arguments
+
+    """
+
+    compression_group = parser.add_argument_group(title="Compression")
+    compression_group.add_argument(
+        "--compression",
+        choices=Compression.LIBRARIES,
+        metavar="LIBRARY",
+        default=None,
+        required=False,
+        help=(
+            "compression library for measurement data (e.g. zlib, "
+            "blosc:lz4, blosc:zstd)"
+        ),
+    )
+    compression_group.add_argument(
+        "--compression-level",
+        type=int,
+        choices=range(10),
+        metavar="0–9",
+        default=None,
+        required=False,
+        help="compression level (0 for no compression)",
+    )
+    compression_group.add_argument(
+        "--shuffle",
+        choices=Compression.SHUFFLE,
+        default=None,
+        required=False,
+        help="shuffle filter applied before compression",
+    )
+
+
 def add_channel_arguments(group) -> None:
     """Add channel arguments to given argument parser group
 
@@ -455,6 +730,9 @@ def add_channel_arguments(group) -> None:
     )
 
 
+# pylint: disable=too-many-locals,too-many-statements
+
+
 def create_icon_parser() -> ArgumentParser:
     """Create command line parser for icon
 
@@ -475,10 +753,187 @@ def create_icon_parser() -> ArgumentParser:
         help="minimum log level",
     )
 
+    stats_group = parser.add_argument_group(title="Statistics")
+    stats_group.add_argument(
+        "--stats",
+        action="store_true",
+        help="print network statistics (request latency, retries, …) at exit",
+    )
+    stats_group.add_argument(
+        "--stats-file",
+        metavar="FILE",
+        default=None,
+        required=False,
+        help="periodically store network statistics in FILE",
+    )
+    stats_group.add_argument(
+        "--stats-format",
+        choices=("json", "prometheus"),
+        default="json",
+        required=False,
+        help="format of statistics file",
+    )
+    stats_group.add_argument(
+        "--stats-interval",
+        type=positive_number,
+        metavar="SECONDS",
+        default=10,
+        required=False,
+        help="time between updates of statistics file",
+    )
+
     subparsers = parser.add_subparsers(
         required=True, title="Subcommands", dest="subcommand"
     )
 
+    # ===========
+    # = Analyze =
+    # ===========
+
+    analyze_parser = subparsers.add_parser(
+        "analyze", help="Compute metrics for multiple measurement files"
+    )
+    analyze_parser.add_argument(
+        "paths",
+        metavar="PATH",
+        nargs="+",
+        help="measurement file or directory containing measurement files",
+    )
+    analyze_parser.add_argument(
+        "-o",
+        "--output",
+        metavar="FILE",
+        default="Analysis.csv",
+        help="summary file (CSV or HDF5)",
+    )
+    analyze_parser.add_argument(
+        "-m",
+        "--metric",
+        choices=Analysis.METRICS,
+        metavar="METRIC",
+        action="append",
+        default=None,
+        help=(
+            "metric that should be computed: "
+            f"{', '.join(Analysis.METRICS)} (default: all metrics)"
+        ),
+    )
+    analyze_parser.add_argument(
+        "-b",
+        "--band",
+        type=frequency_band,
+        metavar="LOW-HIGH",
+        action="append",
+        default=[],
+        help="frequency band in Hz for metric “bands”",
+    )
+    analyze_parser.add_argument(
+        "-w",
+        "--workers",
+        type=positive_integer,
+        default=None,
+        help="number of processes used to analyze files (default: CPU cores)",
+    )
+
+    # =============
+    # = Benchmark =
+    # =============
+
+    benchmark_parser = subparsers.add_parser(
+        "benchmark", help="Compare compression settings for measurement data"
+    )
+    benchmark_parser.add_argument(
+        "filepath",
+        metavar="FILE",
+        help="measurement file (HDF5) containing sample data",
+    )
+    add_compression_arguments(benchmark_parser)
+
+    # ===========
+    # = Catalog =
+    # ===========
+
+    catalog_parser = subparsers.add_parser(
+        "catalog", help="Search measurement files"
+    )
+    catalog_subparsers = catalog_parser.add_subparsers(
+        required=True, title="Subcommands", dest="catalog_subcommand"
+    )
+
+    index_parser = catalog_subparsers.add_parser(
+        "index", help="Add measurement files of directories to catalog"
+    )
+    index_parser.add_argument(
+        "directories",
+        metavar="DIRECTORY",
+        nargs="*",
+        help=(
+            "directory containing measurement files (default: output "
+            "directory of configuration)"
+        ),
+    )
+    index_parser.add_argument(
+        "-w",
+        "--workers",
+        type=positive_integer,
+        default=None,
+        help="number of processes used to read files (default: CPU cores)",
+    )
+
+    search_parser = catalog_subparsers.add_parser(
+        "search", help="Search for measurement files"
+    )
+    search_parser.add_argument(
+        "-n",
+        "--name",
+        default=None,
+        help="pattern for the filename (e.g. “Measurement_2024*”)",
+    )
+    search_parser.add_argument(
+        "--since",
+        type=date_time,
+        metavar="DATE",
+        default=None,
+        help="earliest start time (e.g. “2024-05-17 13:45”)",
+    )
+    search_parser.add_argument(
+        "--until",
+        type=date_time,
+        metavar="DATE",
+        default=None,
+        help="latest start time",
+    )
+    search_parser.add_argument(
+        "--min-rate",
+        type=positive_number,
+        metavar="HZ",
+        default=None,
+        help="minimum sample rate in Hz",
+    )
+    search_parser.add_argument(
+        "--max-rate",
+        type=positive_number,
+        metavar="HZ",
+        default=None,
+        help="maximum sample rate in Hz",
+    )
+    search_parser.add_argument(
+        "--max-loss",
+        type=float,
+        metavar="PERCENT",
+        default=None,
+        help="maximum data loss in percent",
+    )
+    search_parser.add_argument(
+        "-a",
+        "--attribute",
+        type=name_value,
+        metavar="NAME=VALUE",
+        action="append",
+        default=[],
+        help="required value of measurement attribute",
+    )
+
     # ==========
     # = Config =
     # ==========
@@ -496,6 +951,29 @@ def create_icon_parser() -> ArgumentParser:
     )
     add_identifier_arguments(dataloss_parser)
 
+    # ==========
+    # = Export =
+    # ==========
+
+    export_parser = subparsers.add_parser(
+        "export", help="Convert measurement file into another format"
+    )
+    export_parser.add_argument(
+        "source", metavar="INPUT", help="measurement file (HDF5)"
+    )
+    export_parser.add_argument(
+        "destination",
+        metavar="OUTPUT",
+        help="exported file (.npy, .arrow, .feather, .ipc or .parquet)",
+    )
+    export_parser.add_argument(
+        "--row-group-size",
+        type=positive_integer,
+        metavar="ROWS",
+        default=100_000,
+        help="number of rows per row group (Parquet) or record batch (Arrow)",
+    )
+
     # ========
     # = List =
     # ========
@@ -521,10 +999,86 @@ def create_icon_parser() -> ArgumentParser:
         help="measurement time in seconds (0 for infinite runtime)",
         default=10,
     )
+    measurement_group.add_argument(
+        "-r",
+        "--raw",
+        action="store_true",
+        help="store raw ADC values instead of acceleration in g",
+    )
+    measurement_group.add_argument(
+        "-f",
+        "--format",
+        choices=("hdf5", "npy", "arrow", "parquet"),
+        default="hdf5",
+        help="file format of measurement data",
+    )
+    measurement_group.add_argument(
+        "--live",
+        action="store_true",
+        help="show rolling statistics of every channel during measurement",
+    )
+    measurement_group.add_argument(
+        "--voltage",
+        action="store_true",
+        help="also store the supply voltage (table “voltage” of HDF5 file)",
+    )
 
     add_channel_arguments(measurement_group)
+
+    trigger_group = measurement_parser.add_argument_group(title="Trigger")
+    trigger_group.add_argument(
+        "--trigger-level",
+        type=positive_number,
+        metavar="G",
+        default=None,
+        help="store data around absolute acceleration values of at least G",
+    )
+    trigger_group.add_argument(
+        "--trigger-rms",
+        type=positive_number,
+        metavar="G",
+        default=None,
+        help="store data around RMS values (see --rms-window) of at least G",
+    )
+    trigger_group.add_argument(
+        "--rms-window",
+        type=positive_number,
+        metavar="SECONDS",
+        default=0.1,
+        help="length of the window for RMS values (default: 0.1)",
+    )
+    trigger_group.add_argument(
+        "--trigger-band",
+        type=frequency_band,
+        metavar="LOW-HIGH",
+        default=None,
+        help="frequency band in Hz for --trigger-energy",
+    )
+    trigger_group.add_argument(
+        "--trigger-energy",
+        type=positive_number,
+        metavar="G²",
+        default=None,
+        help="store data around band energies of at least G²",
+    )
+    trigger_group.add_argument(
+        "--pre-trigger",
+        type=non_negative_number,
+        metavar="SECONDS",
+        default=1,
+        help="stored time before trigger events (default: 1)",
+    )
+    trigger_group.add_argument(
+        "--post-trigger",
+        type=positive_number,
+        metavar="SECONDS",
+        default=2,
+        help="stored time after trigger events (default: 2)",
+    )
+
     add_identifier_arguments(measurement_parser)
     add_adc_arguments(measurement_parser)
+    add_compression_arguments(measurement_parser)
 
     # ==========
     # = Rename =
@@ -558,6 +1112,8 @@ def create_icon_parser() -> ArgumentParser:
     return parser
 
 
+# pylint: enable=too-many-locals,too-many-statements
+
 # -- Main ---------------------------------------------------------------------
 
 if __name__ == "__main__":
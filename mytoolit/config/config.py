@@ -12,13 +12,14 @@ from numbers import Real
 from os import makedirs
 from pathlib import Path
 from platform import system
-from sys import exit as sys_exit, stderr
+from sys import exit as sys_exit, platform, stderr
 from typing import List, Optional
 
 from dynaconf import Dynaconf, ValidationError, Validator
 from dynaconf.vendor.ruamel.yaml.parser import ParserError
 from dynaconf.vendor.ruamel.yaml.scanner import ScannerError
-from platformdirs import site_config_dir, user_config_dir
+from platformdirs import site_config_dir, user_config_dir, user_data_dir
+from tables.filters import all_complibs
 
 from mytoolit.utility.open import open_file, UnableToOpenError
 
@@ -303,6 +304,37 @@ class Settings(Dynaconf):
                 "measurement.output.filename",
                 is_type_of=str,
             ),
+            must_exist(
+                "measurement.output.flush_interval",
+                "measurement.output.segment.size",
+                "measurement.output.segment.duration",
+                is_type_of=(int, float),
+                gte=0,
+            ),
+            must_exist("measurement.catalog.enabled", is_type_of=bool),
+            must_exist("measurement.catalog.filepath", is_type_of=str),
+            must_exist(
+                "measurement.buffer.overflow",
+                is_in=("error", "grow", "drop", "spill"),
+            ),
+            # Same values as `Compression.LIBRARIES`; importing the
+            # measurement package here would create an import cycle
+            must_exist(
+                "measurement.compression.library", is_in=tuple(all_complibs)
+            ),
+            must_exist(
+                "measurement.compression.level",
+                is_type_of=int,
+                gte=0,
+                lte=9,
+            ),
+            must_exist(
+                "measurement.compression.shuffle",
+                is_in=("none", "byte", "bit"),
+            ),
+            must_exist(
+                "measurement.compression.threads", is_type_of=int, gte=0
+            ),
         ]
         operator_validators = [must_exist("operator.name", is_type_of=str)]
         sensory_device_validators = [
@@ -390,6 +422,23 @@ class Settings(Dynaconf):
         sensor_settings = self.sth.acceleration_sensor
         return sensor_settings[sensor_settings.sensor]
 
+    def can_configuration(self):
+        """Get the CAN configuration of the current platform
+
+        Returns
+        -------
+
+        A configuration object that contains the bitrate, channel and
+        interface of the CAN adapter for the current operating system
+
+        """
+
+        return (
+            self.can.linux
+            if platform == "linux"
+            else (self.can.mac if platform == "darwin" else self.can.windows)
+        )
+
     def sth_name(self) -> str:
         """Return the current name of the STH as string
 
@@ -442,6 +491,31 @@ class Settings(Dynaconf):
 
         return filepath
 
+    def catalog_filepath(self) -> Path:
+        """Get the filepath of the measurement catalog
+
+        Returns
+        -------
+
+        The filepath of the SQLite database that stores the metadata of
+        measurement files
+
+        """
+
+        filepath = settings.measurement.catalog.filepath
+        if filepath:
+            return Path(filepath).expanduser()
+
+        return (
+            Path(
+                user_data_dir(
+                    ConfigurationUtility.app_name,
+                    appauthor=ConfigurationUtility.app_author,
+                )
+            )
+            / "Catalog.sqlite"
+        )
+
     def check_output_directory(self) -> None:
         """Check the output directory
 
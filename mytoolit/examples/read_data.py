@@ -14,16 +14,13 @@ async def read_streaming_data(identifier):
     async with Network() as network:
         await network.connect_sensor_device(identifier)
 
-        # Read data of first channel
-        async with network.open_data_stream(
-            StreamingConfiguration(first=True)
-        ) as stream:
-            messages = 5
-            async for data, _ in stream:
-                print(f"Read data values: {data}")
-                messages -= 1
-                if messages <= 0:
-                    break
+        # Read 15 values of first channel
+        data = await network.collect(
+            StreamingConfiguration(first=True), samples=15
+        )
+        print(f"Read data values: {data.channel('x')}")
+        print(f"Message counters: {data.counters}")
+        print(f"Data loss: {data.stats().dataloss() * 100:.2f} %")
 
 
 # -- Main ---------------------------------------------------------------------
@@ -3,6 +3,15 @@
 # -- Exports ------------------------------------------------------------------
 
 from .acceleration import convert_raw_to_g, ratio_noise_max
+from .compression import Compression
 from .voltage import convert_raw_to_supply_voltage
 from .constants import ADC_MAX_VALUE
+from .moments import StreamingStatistics
 from .storage import Storage
+from .reader import StorageReader, StorageTail
+from .segments import SegmentedReader, SegmentedStorage
+from .catalog import Catalog, MeasurementInfo
+from .timing import TimingModel
+from .export import export_measurement, ExportStorage
+from .spectrum import SpectralAnalyzer, Spectrum
+from .resample import Resampler, resample_measurement
@@ -2,11 +2,13 @@
 
 # -- Imports ------------------------------------------------------------------
 
-from math import log, sqrt
-from statistics import pvariance
-from typing import Iterable
+from math import log
+from typing import Iterable, Union
+
+from numpy import fromiter, float64, ndarray
 
 from mytoolit.measurement.constants import ADC_MAX_VALUE
+from mytoolit.measurement.moments import StreamingStatistics
 
 # -- Functions ----------------------------------------------------------------
 
@@ -52,7 +54,9 @@ def convert_raw_to_g(acceleration_raw: int, max_value: float) -> float:
     return acceleration_in_g
 
 
-def ratio_noise_max(values: Iterable[int]) -> float:
+def ratio_noise_max(
+    values: Union[Iterable[int], StreamingStatistics],
+) -> float:
     """Calculate the ratio noise to max ADC amplitude in dB
 
     Parameters
@@ -60,18 +64,41 @@ def ratio_noise_max(values: Iterable[int]) -> float:
 
     values:
         An iterable object that stores a series of measured 16 bit raw ADC
-        (acceleration) values
+        (acceleration) values, or the statistics of these values
 
     Returns
     -------
 
     The ratio of the average noise to the highest possible measured value
 
+    Examples
+    --------
+
+    >>> from numpy import array
+    >>> values = [32768, 32770, 32766, 32768]
+    >>> round(ratio_noise_max(values), 2)
+    -87.3
+
+    >>> statistics = StreamingStatistics()
+    >>> statistics.add(array(values[:3]))
+    >>> statistics.add(array(values[3:]))
+    >>> round(ratio_noise_max(statistics), 2)
+    -87.3
+
     """
 
+    if isinstance(values, StreamingStatistics):
+        statistics = values
+    else:
+        statistics = StreamingStatistics()
+        statistics.add(
+            values
+            if isinstance(values, ndarray)
+            else fromiter(values, dtype=float64)
+        )
+
     max_value = ADC_MAX_VALUE / 2
-    standard_deviation = sqrt(pvariance(values))
-    return 20 * log(standard_deviation / max_value, 10)
+    return 20 * log(statistics.standard_deviation() / max_value, 10)
 
 
 # -- Main ---------------------------------------------------------------------
@@ -0,0 +1,626 @@
+"""Compute summary metrics for many measurement files
+
+The class `Analysis` reads a measurement file in chunks of limited size and
+computes metrics like the data loss, the RMS value or the energy of certain
+frequency bands. The function `analyze_files` distributes many files over
+multiple processes and `write_summary` stores the results of all files in a
+single table (CSV or HDF5).
+"""
+
+# -- Imports ------------------------------------------------------------------
+
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from csv import DictWriter
+from math import inf, log10, nan, sqrt
+from pathlib import Path
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from numpy import concatenate, empty, hanning, ndarray, zeros
+from numpy.fft import rfft, rfftfreq
+from tables import Float64Col, open_file, StringCol
+from tables.exceptions import HDF5ExtError
+
+from mytoolit.measurement.catalog import attribute_number
+from mytoolit.measurement.moments import StreamingStatistics
+from mytoolit.measurement.spectrum import power_spectral_density
+from mytoolit.measurement.storage import StorageData, StorageException
+
+# -- Functions ----------------------------------------------------------------
+
+
+def analyze_files(
+    filepaths: Iterable[Union[Path, str]],
+    analysis: Optional[Analysis] = None,
+    workers: Optional[int] = None,
+) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """Analyze multiple measurement files in parallel
+
+    Every worker process analyzes a single file at a time and only reads a
+    chunk of limited size into memory.
+
+    Parameters
+    ----------
+
+    filepaths:
+        The measurement files that should be analyzed
+
+    analysis:
+        The analysis that should be applied to every file or `None` to
+        compute the default metrics
+
+    workers:
+        The number of worker processes or `None` to use one process per CPU
+        core
+
+    Returns
+    -------
+
+    A tuple containing the results (in the order of the given files) and a
+    list of errors for files that could not be analyzed
+
+    Examples
+    --------
+
+    >>> from tempfile import TemporaryDirectory
+    >>> from mytoolit.can.streaming import StreamingConfiguration
+    >>> from mytoolit.measurement.storage import Storage
+
+    >>> with TemporaryDirectory() as directory:
+    ...     filepaths = [Path(directory) / f"{name}.hdf5"
+    ...                  for name in ("A", "B", "Missing")]
+    ...     for value, filepath in enumerate(filepaths[:2], start=1):
+    ...         with Storage(filepath, StreamingConfiguration(first=True)
+    ...                     ) as data:
+    ...             data.acceleration.append([(0, 0, value)] * 10)
+    ...     results, errors = analyze_files(
+    ...         filepaths, Analysis(metrics=["peak"]), workers=2)
+    >>> [(Path(result["file"]).name, result["x_peak"]) for result in results]
+    [('A.hdf5', 1.0), ('B.hdf5', 2.0)]
+    >>> len(errors)
+    1
+
+    """
+
+    analysis = Analysis() if analysis is None else analysis
+
+    results = []
+    errors = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for result in executor.map(analysis.try_analyze, filepaths):
+            if isinstance(result, str):
+                errors.append(result)
+            else:
+                results.append(result)
+
+    return (results, errors)
+
+
+def write_summary(
+    results: Sequence[Dict[str, Any]], filepath: Union[Path, str]
+) -> None:
+    """Store analysis results in a single table
+
+    Parameters
+    ----------
+
+    results:
+        The analysis results of multiple files
+
+    filepath:
+        The filepath of the summary table. The function stores the table in
+        HDF5 format, if the file extension is `.hdf5` or `.h5`, and as CSV
+        file otherwise. Metrics that are missing for some files are stored
+        as empty (CSV) or NaN (HDF5) values.
+
+    Examples
+    --------
+
+    >>> results = [{"file": "A.hdf5", "x_rms": 1.5},
+    ...            {"file": "B.hdf5", "y_rms": 2.5}]
+    >>> filepath = Path("test.csv")
+    >>> write_summary(results, filepath)
+    >>> print(filepath.read_text(encoding="utf-8").strip())
+    file,x_rms,y_rms
+    A.hdf5,1.5,
+    B.hdf5,,2.5
+    >>> filepath.unlink()
+
+    >>> filepath = Path("test.hdf5")
+    >>> write_summary(results, filepath)
+    >>> with open_file(filepath) as hdf:
+    ...     print(hdf.root.summary.col("y_rms"))
+    [nan 2.5]
+    >>> filepath.unlink()
+
+    """
+
+    path = Path(filepath).expanduser()
+    columns: Dict[str, None] = {}
+    for result in results:
+        columns.update(dict.fromkeys(result))
+
+    if path.suffix in {".hdf5", ".h5"}:
+        names = [column for column in columns if column != "file"]
+        length = max(
+            (len(str(result["file"])) for result in results), default=1
+        )
+        description: Dict[str, Any] = {"file": StringCol(length * 4, pos=0)}
+        for position, name in enumerate(names, start=1):
+            description[name] = Float64Col(pos=position, dflt=nan)
+        with open_file(path, mode="w", title="Analysis Results") as hdf:
+            table = hdf.create_table(
+                hdf.root,
+                name="summary",
+                description=description,
+                title="Summary of Measurement Files",
+            )
+            table.append([
+                (
+                    str(result["file"]).encode(),
+                    *(result.get(name, nan) for name in names),
+                )
+                for result in results
+            ])
+        return
+
+    with path.open("w", encoding="utf-8", newline="") as summary:
+        writer = DictWriter(summary, fieldnames=list(columns))
+        writer.writeheader()
+        writer.writerows(results)
+
+
+# -- Classes ------------------------------------------------------------------
+
+
+class Analysis:
+    """Compute summary metrics of a measurement file"""
+
+    METRICS = ("dataloss", "sample_rate", "rms", "peak", "noise", "bands")
+
+    def __init__(
+        self,
+        metrics: Sequence[str] = METRICS,
+        bands: Sequence[Tuple[float, float]] = (),
+        chunk_size: int = 100_000,
+        segment_length: int = 4096,
+    ) -> None:
+        """Initialize the analysis using the given arguments
+
+        Parameters
+        ----------
+
+        metrics:
+            The metrics that should be computed:
+
+            - `dataloss`: ratio of lost messages
+            - `sample_rate`: effective sample rate (per channel) in Hz
+            - `rms`: RMS value of each axis in multiples of g₀
+            - `peak`: maximum absolute value of each axis in multiples of g₀
+            - `noise`: ratio of the standard deviation to the maximum
+              amplitude of the sensor in dB (like `ratio_noise_max`)
+            - `bands`: energy (mean square value in g₀²) of each axis in the
+              given frequency bands
+
+        bands:
+            The frequency bands (lower and upper frequency in Hz) used by the
+            metric `bands`
+
+        chunk_size:
+            The maximum number of rows read into memory at once
+
+        segment_length:
+            The number of values per FFT segment used to estimate the power
+            spectrum for the metric `bands`
+
+        Examples
+        --------
+
+        >>> Analysis(metrics=["rms", "loudness"])
+        Traceback (most recent call last):
+           ...
+        ValueError: Unknown metric “loudness” (available metrics: dataloss, \
+sample_rate, rms, peak, noise, bands)
+
+        """
+
+        for metric in metrics:
+            if metric not in Analysis.METRICS:
+                raise ValueError(
+                    f"Unknown metric “{metric}” (available metrics: "
+                    f"{', '.join(Analysis.METRICS)})"
+                )
+        if chunk_size <= 0:
+            raise ValueError(f"Incorrect chunk size “{chunk_size}”")
+
+        self.metrics = list(metrics)
+        self.bands = list(bands)
+        self.chunk_size = chunk_size
+        self.segment_length = segment_length
+
+    def try_analyze(
+        self, filepath: Union[Path, str]
+    ) -> Union[Dict[str, Any], str]:
+        """Analyze a measurement file without raising an exception
+
+        Parameters
+        ----------
+
+        filepath:
+            The filepath of the measurement file
+
+        Returns
+        -------
+
+        The analysis results or a description of the error, if the file
+        could not be analyzed
+
+        """
+
+        try:
+            return self.analyze(filepath)
+        except StorageException as error:
+            return str(error)
+
+    # pylint: disable=too-many-locals
+
+    def analyze(self, filepath: Union[Path, str]) -> Dict[str, Any]:
+        """Analyze a measurement file
+
+        Parameters
+        ----------
+
+        filepath:
+            The filepath of the measurement file
+
+        Returns
+        -------
+
+        A dictionary containing the filepath and the value of each metric.
+        Metrics for a single axis use the name of the axis as prefix (e.g.
+        `x_rms` or `x_band_0_1000`).
+
+        Raises
+        ------
+
+        A `StorageException`, if the file could not be read
+
+        Examples
+        --------
+
+        >>> from math import isclose, pi
+        >>> from numpy import arange, sin
+        >>> from mytoolit.can.streaming import StreamingConfiguration
+        >>> from mytoolit.measurement.storage import Storage
+
+        Store a 1 kHz sine wave (amplitude: 2 g₀, sample rate: 10 kHz)
+
+        >>> filepath = Path("test.hdf5")
+        >>> times = arange(100_000)
+        >>> values = 2 * sin(2 * pi * 1000 * times / 10_000)
+        >>> with Storage(filepath, StreamingConfiguration(first=True)) as data:
+        ...     data.write_sensor_range(200)
+        ...     data.acceleration.append([
+        ...         (number // 3 % 256, number // 3 * 300, value)
+        ...         for number, value in enumerate(values)])
+
+        >>> result = Analysis(bands=[(900, 1100), (2000, 3000)],
+        ...                   chunk_size=30_000).analyze(filepath)
+        >>> result["dataloss"], round(result["sample_rate"])
+        (0.0, 10000)
+        >>> round(result["x_rms"], 3), round(result["x_peak"], 3)
+        (1.414, 1.902)
+        >>> round(result["x_noise"], 2)
+        -36.99
+        >>> isclose(result["x_band_900_1100"], 2, rel_tol=0.01)
+        True
+        >>> result["x_band_2000_3000"] < 0.001
+        True
+        >>> filepath.unlink()
+
+        """
+
+        path = Path(filepath).expanduser().resolve()
+        result: Dict[str, Any] = {"file": str(path)}
+
+        try:
+            with open_file(path, mode="r") as hdf:
+                data = StorageData(hdf)
+                if "dataloss" in self.metrics:
+                    result["dataloss"] = data.dataloss()
+                sample_rate = data.sampling_frequency()
+                if "sample_rate" in self.metrics:
+                    result["sample_rate"] = sample_rate
+                sensor_range = (
+                    attribute_number(
+                        str(data.acceleration.attrs["Sensor_Range"])
+                    )
+                    if "Sensor_Range" in data.acceleration.attrs
+                    else None
+                )
+
+                values = set(self.metrics) - {"dataloss", "sample_rate"}
+                if values:
+                    statistics = {
+                        axis: AxisStatistics(
+                            self.segment_length if "bands" in values else 0
+                        )
+                        for axis in data.axes
+                    }
+                    rows = data.acceleration.nrows
+                    for start in range(0, rows, self.chunk_size):
+                        chunk = data.read(start, start + self.chunk_size)
+                        for axis, axis_statistics in statistics.items():
+                            axis_statistics.add(chunk[axis])
+
+                    for axis, axis_statistics in statistics.items():
+                        result.update(
+                            self._axis_metrics(
+                                axis,
+                                axis_statistics,
+                                sample_rate,
+                                sensor_range,
+                            )
+                        )
+        except (HDF5ExtError, OSError) as error:
+            reason = str(error).strip().splitlines()[-1]
+            raise StorageException(
+                f"Unable to analyze file “{path}”: {reason}"
+            ) from error
+
+        return result
+
+    # pylint: enable=too-many-locals
+
+    def _axis_metrics(
+        self,
+        axis: str,
+        statistics: AxisStatistics,
+        sample_rate: float,
+        sensor_range: Optional[float],
+    ) -> Dict[str, float]:
+        """Get the metrics of a single axis
+
+        Parameters
+        ----------
+
+        axis:
+            The name of the axis
+
+        statistics:
+            The accumulated statistics of the axis
+
+        sample_rate:
+            The sample rate of the axis in Hz
+
+        sensor_range:
+            The (positive) measurement range of the sensor in multiples of
+            g₀ or `None`, if the range is unknown
+
+        Returns
+        -------
+
+        A dictionary containing the metrics of the axis
+
+        """
+
+        metrics: Dict[str, float] = {}
+
+        if "rms" in self.metrics:
+            metrics[f"{axis}_rms"] = statistics.rms()
+        if "peak" in self.metrics:
+            metrics[f"{axis}_peak"] = statistics.peak()
+        if "noise" in self.metrics:
+            deviation = statistics.standard_deviation()
+            metrics[f"{axis}_noise"] = (
+                nan
+                if sensor_range is None or statistics.moments.count <= 0
+                else (
+                    20 * log10(deviation / sensor_range)
+                    if deviation > 0
+                    else -inf
+                )
+            )
+        if "bands" in self.metrics:
+            for low, high in self.bands:
+                metrics[f"{axis}_band_{low:g}_{high:g}"] = (
+                    statistics.band_energy(low, high, sample_rate)
+                )
+
+        return metrics
+
+
+# pylint: disable=too-many-instance-attributes
+
+
+class AxisStatistics:
+    """Accumulate statistics of the values of a single axis
+
+    The class stores the moments of the values (`StreamingStatistics`) and
+    the power spectrum of the values.
+    """
+
+    def __init__(self, segment_length: int = 0) -> None:
+        """Initialize the statistics
+
+        Parameters
+        ----------
+
+        segment_length:
+            The number of values per FFT segment used to estimate the power
+            spectrum or `0` to not compute the power spectrum
+
+        Examples
+        --------
+
+        >>> from numpy import array
+
+        >>> statistics = AxisStatistics()
+        >>> statistics.add(array([1.0, -3.0]))
+        >>> statistics.add(array([1.0, 1.0]))
+        >>> statistics.moments.count, statistics.mean(), statistics.peak()
+        (4, 0.0, 3.0)
+        >>> statistics.rms(), statistics.standard_deviation()
+        (1.7320508075688772, 1.7320508075688772)
+
+        The moments stay precise for values with a large offset
+
+        >>> statistics = AxisStatistics()
+        >>> statistics.add(array([1e9 + 1, 1e9 - 1]))
+        >>> statistics.standard_deviation()
+        1.0
+
+        """
+
+        self.moments = StreamingStatistics()
+
+        self.segment_length = segment_length
+        self.remainder = empty(0)
+        self.power = zeros(segment_length // 2 + 1)
+        self.segments = 0
+        self.window = hanning(segment_length) if segment_length > 0 else None
+
+    def add(self, values: ndarray) -> None:
+        """Add values to the statistics
+
+        Parameters
+        ----------
+
+        values:
+            The values that should be added
+
+        """
+
+        if len(values) <= 0:
+            return
+
+        self.moments.add(values)
+
+        if self.window is None:
+            return
+
+        values = concatenate((self.remainder, values.astype(float)))
+        segments = len(values) // self.segment_length
+        self.remainder = values[segments * self.segment_length :]
+        if segments <= 0:
+            return
+
+        spectrum = rfft(
+            values[: segments * self.segment_length].reshape(
+                segments, self.segment_length
+            )
+            * self.window,
+            axis=1,
+        )
+        self.power += (spectrum.real**2 + spectrum.imag**2).sum(axis=0)
+        self.segments += segments
+
+    def mean(self) -> float:
+        """Get the mean value
+
+        Returns
+        -------
+
+        The arithmetic mean of all values
+
+        """
+
+        return self.moments.mean if self.moments.count > 0 else nan
+
+    def rms(self) -> float:
+        """Get the RMS value
+
+        Returns
+        -------
+
+        The root mean square of all values
+
+        """
+
+        mean = self.mean()
+        return sqrt(self.moments.variance() + mean * mean)
+
+    def peak(self) -> float:
+        """Get the peak value
+
+        Returns
+        -------
+
+        The largest absolute value of all values
+
+        """
+
+        if self.moments.count <= 0:
+            return 0.0
+
+        return max(abs(self.moments.minimum), abs(self.moments.maximum))
+
+    def standard_deviation(self) -> float:
+        """Get the (population) standard deviation
+
+        Returns
+        -------
+
+        The standard deviation of all values
+
+        """
+
+        return self.moments.standard_deviation()
+
+    def band_energy(
+        self, low: float, high: float, sample_rate: float
+    ) -> float:
+        """Get the energy of a frequency band
+
+        Parameters
+        ----------
+
+        low:
+            The lower frequency of the band in Hz
+
+        high:
+            The upper frequency of the band in Hz
+
+        sample_rate:
+            The sample rate of the values in Hz
+
+        Returns
+        -------
+
+        The mean square value of the signal components in the frequency band
+        (estimated using Welch’s method without overlap) or NaN, if there
+        are not enough values to compute the power spectrum
+
+        """
+
+        if self.window is None or self.segments <= 0 or sample_rate <= 0:
+            return nan
+
+        density = power_spectral_density(
+            self.power, self.segments, self.window, sample_rate
+        )
+
+        frequencies = rfftfreq(self.segment_length, 1 / sample_rate)
+        band = (frequencies >= low) & (frequencies <= high)
+
+        return float(density[band].sum() * sample_rate / self.segment_length)
+
+
+# pylint: enable=too-many-instance-attributes
+
+# -- Main ---------------------------------------------------------------------
+
+if __name__ == "__main__":
+    from doctest import testmod
+
+    testmod()
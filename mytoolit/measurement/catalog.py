@@ -0,0 +1,760 @@
+"""Search measurement files using a catalog (SQLite database)
+
+The class `Catalog` stores metadata about measurement files in an SQLite
+database. This way you can find certain measurements (e.g. all measurements
+of last week with a sample rate of about 9.5 kHz) without opening every
+single HDF5 file.
+
+`Storage` adds a measurement file to a catalog, when it closes the file (if
+you specify a catalog). To add existing files use the method `index`, which
+reads the metadata of all files in the given directories using multiple
+processes.
+"""
+
+# -- Imports ------------------------------------------------------------------
+
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from json import dumps, loads
+from pathlib import Path
+from re import search
+from sqlite3 import connect, Row
+from types import TracebackType
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+)
+
+from tables import open_file
+from tables.exceptions import HDF5ExtError
+
+from mytoolit.measurement.storage import StorageData, StorageException
+
+# -- Functions ----------------------------------------------------------------
+
+
+def attribute_number(text: str) -> Optional[float]:
+    """Get the first (positive) number contained in an attribute value
+
+    Parameters
+    ----------
+
+    text:
+        The text of an attribute (e.g. `± 100 g₀`)
+
+    Returns
+    -------
+
+    The first number contained in the text or `None`, if the text does not
+    contain a number
+
+    Examples
+    --------
+
+    >>> attribute_number("± 100 g₀")
+    100.0
+    >>> attribute_number("9523.81 Hz (Prescaler: 2)")
+    9523.81
+    >>> attribute_number("Unknown") is None
+    True
+
+    """
+
+    match = search(r"\d+(\.\d+)?", text)
+
+    return None if match is None else float(match.group())
+
+
+# pylint: disable=too-many-locals
+
+
+def read_measurement_info(filepath: Union[Path, str]) -> MeasurementInfo:
+    """Read the metadata of a measurement file
+
+    Parameters
+    ----------
+
+    filepath:
+        The filepath of the HDF5 measurement file
+
+    Returns
+    -------
+
+    The metadata of the measurement file
+
+    Raises
+    ------
+
+    A `StorageException`, if the file could not be read
+
+    Examples
+    --------
+
+    >>> from mytoolit.can.streaming import (StreamingConfiguration,
+    ...                                     StreamingData)
+    >>> from mytoolit.measurement.storage import Storage
+
+    >>> filepath = Path("test.hdf5")
+    >>> with Storage(filepath, StreamingConfiguration(first=True)) as data:
+    ...     data.write_sensor_range(200)
+    ...     for counter in (1, 2, 4):
+    ...         data.add_streaming_data(StreamingData(
+    ...             values=[1, 2, 3], counter=counter, timestamp=counter))
+    >>> info = read_measurement_info(filepath)
+    >>> info.rows, info.messages, info.lost, info.duration
+    (9, 3, 1, 3.0)
+    >>> info.sensor_range
+    100.0
+    >>> filepath.unlink()
+
+    """
+
+    path = Path(filepath).expanduser().resolve()
+
+    try:
+        with open_file(path, mode="r") as hdf:
+            data = StorageData(hdf)
+            table = data.acceleration
+            names = table.attrs._v_attrnamesuser  # pylint: disable=W0212
+            attributes = {name: str(table.attrs[name]) for name in names}
+            rows = int(table.nrows)
+            messages, lost = data.dataloss_stats()
+            duration = (
+                float(table[-1]["timestamp"] - table[0]["timestamp"])
+                / 1_000_000
+                if rows > 0
+                else 0
+            )
+            axes = "".join(data.axes)
+            raw = data.raw
+    except (HDF5ExtError, OSError) as error:
+        # Only use the last line of (long) HDF5 error messages
+        reason = str(error).strip().splitlines()[-1]
+        raise StorageException(
+            f"Unable to read file “{path}”: {reason}"
+        ) from error
+
+    stat = path.stat()
+
+    return MeasurementInfo(
+        filepath=path,
+        start_time=attributes.get("Start_Time"),
+        sensor_range=attribute_number(attributes.get("Sensor_Range", "")),
+        sample_rate=attribute_number(attributes.get("Sample_Rate", "")),
+        axes=axes,
+        raw=raw,
+        rows=rows,
+        messages=messages,
+        lost=lost,
+        duration=duration,
+        size=stat.st_size,
+        modified=stat.st_mtime,
+        attributes=attributes,
+    )
+
+
+# pylint: enable=too-many-locals
+
+
+def _read_measurement_info(
+    filepath: Path,
+) -> Union[MeasurementInfo, str]:
+    """Read the metadata of a measurement file in a worker process
+
+    Parameters
+    ----------
+
+    filepath:
+        The filepath of the HDF5 measurement file
+
+    Returns
+    -------
+
+    The metadata of the measurement file or a description of the error, if
+    the file could not be read
+
+    """
+
+    try:
+        return read_measurement_info(filepath)
+    except StorageException as error:
+        return str(error)
+
+
+# -- Classes ------------------------------------------------------------------
+
+# pylint: disable=too-many-instance-attributes
+
+
+class MeasurementInfo:
+    """Metadata of a measurement file"""
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        filepath: Path,
+        *,
+        start_time: Optional[str],
+        sensor_range: Optional[float],
+        sample_rate: Optional[float],
+        axes: str,
+        raw: bool,
+        rows: int,
+        messages: int,
+        lost: int,
+        duration: float,
+        size: int,
+        modified: float,
+        attributes: Dict[str, str],
+    ) -> None:
+        """Initialize the metadata using the given arguments
+
+        Parameters
+        ----------
+
+        filepath:
+            The filepath of the measurement file
+
+        start_time:
+            The start time of the measurement (ISO format)
+
+        sensor_range:
+            The (positive) measurement range of the sensor in multiples of
+            g₀ (e.g. `100` for a sensor that measures values between -100 g₀
+            and +100 g₀)
+
+        sample_rate:
+            The sample rate in Hz
+
+        axes:
+            The measured axes (e.g. `xyz`)
+
+        raw:
+            Specifies if the file stores raw ADC values
+
+        rows:
+            The number of rows of the acceleration table
+
+        messages:
+            The number of received messages
+
+        lost:
+            The number of lost messages
+
+        duration:
+            The time between the first and last value in seconds
+
+        size:
+            The file size in bytes
+
+        modified:
+            The time of the last modification (seconds since the epoch)
+
+        attributes:
+            All attributes of the acceleration table
+
+        """
+
+        self.filepath = filepath
+        self.start_time = start_time
+        self.sensor_range = sensor_range
+        self.sample_rate = sample_rate
+        self.axes = axes
+        self.raw = raw
+        self.rows = rows
+        self.messages = messages
+        self.lost = lost
+        self.duration = duration
+        self.size = size
+        self.modified = modified
+        self.attributes = attributes
+
+    def __repr__(self) -> str:
+        """Get the textual representation of the metadata
+
+        Returns
+        -------
+
+        A string that contains the most important metadata
+
+        """
+
+        sample_rate = (
+            "Unknown Sample Rate"
+            if self.sample_rate is None
+            else f"{self.sample_rate:.2f} Hz"
+        )
+
+        return (
+            f"{self.filepath}: {self.start_time or 'Unknown Start'}, "
+            f"{sample_rate}, {self.duration:.2f} s, "
+            f"Data Loss: {self.dataloss() * 100:.2f} %"
+        )
+
+    def dataloss(self) -> float:
+        """Get the data loss of the measurement
+
+        Returns
+        -------
+
+        The amount of lost messages divided by the number of all messages
+
+        """
+
+        messages = self.messages + self.lost
+
+        return self.lost / messages if messages > 0 else 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Get the metadata as dictionary
+
+        Returns
+        -------
+
+        A dictionary containing the values of all catalog columns
+
+        """
+
+        return {
+            "filepath": str(self.filepath),
+            "name": self.filepath.name,
+            "start_time": self.start_time,
+            "sensor_range": self.sensor_range,
+            "sample_rate": self.sample_rate,
+            "axes": self.axes,
+            "raw": int(self.raw),
+            "rows": self.rows,
+            "messages": self.messages,
+            "lost": self.lost,
+            "dataloss": self.dataloss(),
+            "duration": self.duration,
+            "size": self.size,
+            "modified": self.modified,
+            "attributes": dumps(self.attributes),
+        }
+
+
+# pylint: enable=too-many-instance-attributes
+
+
+class Catalog:
+    """Store metadata of measurement files in an SQLite database"""
+
+    COLUMNS = (
+        "filepath TEXT PRIMARY KEY",
+        "name TEXT",
+        "start_time TEXT",
+        "sensor_range REAL",
+        "sample_rate REAL",
+        "axes TEXT",
+        "raw INTEGER",
+        "rows INTEGER",
+        "messages INTEGER",
+        "lost INTEGER",
+        "dataloss REAL",
+        "duration REAL",
+        "size INTEGER",
+        "modified REAL",
+        "attributes TEXT",
+    )
+
+    def __init__(self, filepath: Union[Path, str]) -> None:
+        """Open (or create) the catalog database
+
+        Parameters
+        ----------
+
+        filepath:
+            The filepath of the SQLite database or `:memory:` to use a
+            temporary database stored in memory
+
+        Examples
+        --------
+
+        >>> from mytoolit.can.streaming import (StreamingConfiguration,
+        ...                                     StreamingData)
+        >>> from mytoolit.measurement.storage import Storage
+
+        >>> catalog_filepath = Path("test.sqlite")
+        >>> filepath = Path("test.hdf5")
+        >>> with Catalog(catalog_filepath) as catalog:
+        ...     with Storage(filepath, StreamingConfiguration(first=True),
+        ...                  catalog=catalog) as data:
+        ...         data.add_streaming_data(StreamingData(
+        ...             values=[1, 2, 3], counter=1, timestamp=0))
+        ...     [info.filepath.name for info in catalog.search()]
+        ['test.hdf5']
+        >>> filepath.unlink()
+        >>> catalog_filepath.unlink()
+
+        """
+
+        if str(filepath) == ":memory:":
+            self.connection = connect(":memory:")
+        else:
+            path = Path(filepath).expanduser().resolve()
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self.connection = connect(path)
+        self.connection.row_factory = Row
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS measurements "
+                f"({', '.join(Catalog.COLUMNS)})"
+            )
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS measurements_start_time "
+                "ON measurements (start_time)"
+            )
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS measurements_sample_rate "
+                "ON measurements (sample_rate)"
+            )
+
+    def __enter__(self) -> Catalog:
+        """Use the catalog in a with statement
+
+        Returns
+        -------
+
+        The catalog object
+
+        """
+
+        return self
+
+    def __exit__(
+        self,
+        exception_type: Optional[Type[BaseException]],
+        exception_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        """Close the database connection
+
+        Parameters
+        ----------
+
+        exception_type:
+            The type of the exception in case of an exception
+
+        exception_value:
+            The value of the exception in case of an exception
+
+        traceback:
+            The traceback in case of an exception
+
+        """
+
+        self.close()
+
+    def close(self) -> None:
+        """Close the database connection"""
+
+        self.connection.close()
+
+    def add(self, filepath: Union[Path, str]) -> MeasurementInfo:
+        """Add (or update) a measurement file
+
+        Parameters
+        ----------
+
+        filepath:
+            The filepath of the HDF5 measurement file
+
+        Returns
+        -------
+
+        The metadata stored in the catalog
+
+        """
+
+        info = read_measurement_info(filepath)
+        self.store([info])
+
+        return info
+
+    def store(self, infos: Iterable[MeasurementInfo]) -> None:
+        """Store the metadata of measurement files
+
+        Parameters
+        ----------
+
+        infos:
+            The metadata that should be stored
+
+        """
+
+        columns = [column.split()[0] for column in Catalog.COLUMNS]
+        with self.connection:
+            self.connection.executemany(
+                f"INSERT OR REPLACE INTO measurements ({', '.join(columns)}) "
+                f"VALUES ({', '.join(':' + column for column in columns)})",
+                (info.as_dict() for info in infos),
+            )
+
+    def remove(self, filepath: Union[Path, str]) -> None:
+        """Remove a measurement file from the catalog
+
+        Parameters
+        ----------
+
+        filepath:
+            The filepath of the measurement file
+
+        """
+
+        with self.connection:
+            self.connection.execute(
+                "DELETE FROM measurements WHERE filepath = ?",
+                (str(Path(filepath).expanduser().resolve()),),
+            )
+
+    # pylint: disable=too-many-locals
+
+    def index(
+        self,
+        directories: Iterable[Union[Path, str]],
+        pattern: str = "*.hdf5",
+        workers: Optional[int] = None,
+    ) -> Tuple[int, List[str]]:
+        """Add all measurement files of the given directories
+
+        The method skips files that did not change since they were added to
+        the catalog. It also removes files that do not exist anymore.
+
+        Parameters
+        ----------
+
+        directories:
+            The directories that should be searched (recursively)
+
+        pattern:
+            The pattern of the measurement filenames
+
+        workers:
+            The number of processes used to read the measurement files or
+            `None` to use one process per CPU core
+
+        Returns
+        -------
+
+        A tuple containing the number of added (or updated) files and a list
+        of errors for files that could not be read
+
+        Examples
+        --------
+
+        >>> from mytoolit.can.streaming import StreamingConfiguration
+        >>> from mytoolit.measurement.storage import Storage
+        >>> from tempfile import TemporaryDirectory
+
+        >>> with TemporaryDirectory() as directory:
+        ...     for number in range(3):
+        ...         filepath = Path(directory) / f"Measurement {number}.hdf5"
+        ...         with Storage(filepath, StreamingConfiguration(first=True)
+        ...                     ) as data:
+        ...             data.acceleration.append([(0, 0, number)])
+        ...     _ = (Path(directory) / "Broken.hdf5").write_text("Broken")
+        ...     with Catalog(Path(directory) / "catalog.sqlite") as catalog:
+        ...         added, errors = catalog.index([directory], workers=2)
+        ...         print(added, len(errors))
+        ...         added, errors = catalog.index([directory], workers=2)
+        ...         print(added, len(errors))
+        ...         print(len(catalog.search(name="Measurement*")))
+        3 1
+        0 1
+        3
+
+        """
+
+        candidates: Dict[str, Path] = {}
+        for directory in directories:
+            for filepath in Path(directory).expanduser().rglob(pattern):
+                filepath = filepath.resolve()
+                candidates[str(filepath)] = filepath
+
+        known = {
+            row["filepath"]: (row["size"], row["modified"])
+            for row in self.connection.execute(
+                "SELECT filepath, size, modified FROM measurements"
+            )
+        }
+        searched = [
+            Path(directory).expanduser().resolve() for directory in directories
+        ]
+        with self.connection:
+            self.connection.executemany(
+                "DELETE FROM measurements WHERE filepath = ?",
+                (
+                    (filepath,)
+                    for filepath in known
+                    if filepath not in candidates
+                    and any(
+                        Path(filepath).is_relative_to(directory)
+                        for directory in searched
+                    )
+                ),
+            )
+
+        changed = []
+        for name, filepath in candidates.items():
+            stat = filepath.stat()
+            if known.get(name) != (stat.st_size, stat.st_mtime):
+                changed.append(filepath)
+
+        if not changed:
+            return (0, [])
+
+        infos = []
+        errors = []
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for result in executor.map(
+                _read_measurement_info, changed, chunksize=16
+            ):
+                if isinstance(result, str):
+                    errors.append(result)
+                else:
+                    infos.append(result)
+
+        self.store(infos)
+
+        return (len(infos), errors)
+
+    # pylint: enable=too-many-locals
+
+    # pylint: disable=too-many-arguments
+
+    def search(
+        self,
+        *,
+        name: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        min_sample_rate: Optional[float] = None,
+        max_sample_rate: Optional[float] = None,
+        max_dataloss: Optional[float] = None,
+        attributes: Optional[Dict[str, str]] = None,
+    ) -> List[MeasurementInfo]:
+        """Search for measurement files
+
+        Parameters
+        ----------
+
+        name:
+            A pattern (e.g. `Tool-X*`) for the name of the measurement files
+
+        since:
+            The earliest start time of the measurements
+
+        until:
+            The latest start time of the measurements
+
+        min_sample_rate:
+            The minimum sample rate in Hz
+
+        max_sample_rate:
+            The maximum sample rate in Hz
+
+        max_dataloss:
+            The maximum data loss (between 0 and 1)
+
+        attributes:
+            Attributes of the acceleration table and their required values
+
+        Returns
+        -------
+
+        The metadata of all matching measurement files ordered by their
+        start time
+
+        Examples
+        --------
+
+        >>> catalog = Catalog(":memory:")
+        >>> def create_info(name, start_time, sample_rate, tool):
+        ...     return MeasurementInfo(
+        ...         Path(name), start_time=start_time, sensor_range=200,
+        ...         sample_rate=sample_rate, axes="x", raw=False, rows=3,
+        ...         messages=1, lost=0, duration=0, size=1000, modified=0,
+        ...         attributes={"Tool": tool})
+        >>> catalog.store([
+        ...     create_info("A.hdf5", "2024-01-01T10:00:00", 9523.81, "X"),
+        ...     create_info("B.hdf5", "2024-01-08T10:00:00", 9523.81, "X"),
+        ...     create_info("C.hdf5", "2024-01-09T10:00:00", 3175.97, "X"),
+        ...     create_info("D.hdf5", "2024-01-10T10:00:00", 9523.81, "Y")])
+
+        >>> [info.filepath.name for info in catalog.search(
+        ...     since=datetime(2024, 1, 7), min_sample_rate=9000,
+        ...     attributes={"Tool": "X"})]
+        ['B.hdf5']
+        >>> [info.filepath.name for info in catalog.search(name="[CD]*")]
+        ['C.hdf5', 'D.hdf5']
+
+        """
+
+        conditions = []
+        parameters: List[Any] = []
+
+        if name is not None:
+            conditions.append("name GLOB ?")
+            parameters.append(name)
+        if since is not None:
+            conditions.append("start_time >= ?")
+            parameters.append(since.isoformat())
+        if until is not None:
+            conditions.append("start_time <= ?")
+            parameters.append(until.isoformat())
+        if min_sample_rate is not None:
+            conditions.append("sample_rate >= ?")
+            parameters.append(min_sample_rate)
+        if max_sample_rate is not None:
+            conditions.append("sample_rate <= ?")
+            parameters.append(max_sample_rate)
+        if max_dataloss is not None:
+            conditions.append("dataloss <= ?")
+            parameters.append(max_dataloss)
+        for attribute, value in (attributes or {}).items():
+            conditions.append("json_extract(attributes, ?) = ?")
+            parameters.extend((f'$."{attribute}"', value))
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = self.connection.execute(
+            f"SELECT * FROM measurements {where} "
+            "ORDER BY start_time, filepath",
+            parameters,
+        )
+
+        return [
+            MeasurementInfo(
+                Path(row["filepath"]),
+                start_time=row["start_time"],
+                sensor_range=row["sensor_range"],
+                sample_rate=row["sample_rate"],
+                axes=row["axes"],
+                raw=bool(row["raw"]),
+                rows=row["rows"],
+                messages=row["messages"],
+                lost=row["lost"],
+                duration=row["duration"],
+                size=row["size"],
+                modified=row["modified"],
+                attributes=loads(row["attributes"]),
+            )
+            for row in rows
+        ]
+
+    # pylint: enable=too-many-arguments
+
+
+# -- Main ---------------------------------------------------------------------
+
+if __name__ == "__main__":
+    from doctest import testmod
+
+    testmod()
@@ -0,0 +1,349 @@
+"""Support for compressing measurement data (in HDF5)
+
+The class `Compression` specifies the filter that PyTables uses to compress
+measurement data. Besides the zlib filter used by previous versions of ICOc,
+you can also use the fast (multithreaded) compressors of the Blosc family
+(e.g. `blosc:lz4` or `blosc:zstd`).
+
+To choose the best compression for a certain kind of measurement data, use
+the function `benchmark_compression`, which stores the data of an existing
+measurement file with different compression settings.
+"""
+
+# -- Imports ------------------------------------------------------------------
+
+from __future__ import annotations
+
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Dict, Iterable, List, Optional, Union
+
+from tables import Filters, open_file
+from tables.filters import all_complibs
+
+# -- Classes ------------------------------------------------------------------
+
+
+class Compression:
+    """Compression settings for HDF5 measurement files"""
+
+    LIBRARIES = tuple(all_complibs)
+    SHUFFLE = ("none", "byte", "bit")
+
+    def __init__(
+        self,
+        library: str = "zlib",
+        level: int = 4,
+        shuffle: str = "byte",
+        threads: Optional[int] = None,
+    ) -> None:
+        """Initialize the compression settings
+
+        Parameters
+        ----------
+
+        library:
+            The compression library (e.g. `zlib`, `blosc:lz4` or
+            `blosc:zstd`)
+
+        level:
+            The compression level between 0 (no compression) and 9 (maximum
+            compression)
+
+        shuffle:
+            The shuffle filter applied before the compression:
+
+            - `none`: no shuffle filter
+            - `byte`: byte shuffle
+            - `bit`: bit shuffle
+
+        threads:
+            The maximum number of threads used by the Blosc compressors or
+            `None` to use one thread per CPU core
+
+        Examples
+        --------
+
+        >>> Compression()
+        zlib (Level: 4, Shuffle: byte, Threads: auto)
+
+        >>> Compression("blosc:zstd", level=5, shuffle="bit", threads=4)
+        blosc:zstd (Level: 5, Shuffle: bit, Threads: 4)
+
+        >>> Compression("gzip")
+        Traceback (most recent call last):
+        ...
+        ValueError: Unsupported compression library “gzip”
+
+        >>> Compression(level=10)
+        Traceback (most recent call last):
+        ...
+        ValueError: Compression level “10” out of range (0 – 9)
+
+        """
+
+        cls = type(self)
+
+        if library not in cls.LIBRARIES:
+            raise ValueError(f"Unsupported compression library “{library}”")
+        if not 0 <= level <= 9:
+            raise ValueError(
+                f"Compression level “{level}” out of range (0 – 9)"
+            )
+        if shuffle not in cls.SHUFFLE:
+            raise ValueError(f"Unknown shuffle filter “{shuffle}”")
+        if threads is not None and threads < 1:
+            raise ValueError(f"Incorrect number of threads “{threads}”")
+
+        self.library = library
+        self.level = level
+        self.shuffle = shuffle
+        self.threads = threads
+
+    def __repr__(self) -> str:
+        """Get the textual representation of the compression settings
+
+        Returns
+        -------
+
+        A string that describes the compression settings
+
+        """
+
+        threads = "auto" if self.threads is None else self.threads
+
+        return (
+            f"{self.library} (Level: {self.level}, Shuffle: {self.shuffle}, "
+            f"Threads: {threads})"
+        )
+
+    def filters(self) -> Filters:
+        """Get the PyTables filters for the compression settings
+
+        Returns
+        -------
+
+        A filter object that can be used to create HDF5 tables
+
+        Examples
+        --------
+
+        >>> Compression("blosc:lz4", level=5, shuffle="bit").filters()
+        ... # doctest:+NORMALIZE_WHITESPACE
+        Filters(complevel=5, complib='blosc:lz4', shuffle=False,
+                bitshuffle=True, fletcher32=False,
+                least_significant_digit=None)
+
+        """
+
+        return Filters(
+            complevel=self.level,
+            complib=self.library,
+            shuffle=self.shuffle == "byte",
+            bitshuffle=self.shuffle == "bit",
+        )
+
+    def parameters(self) -> Dict[str, int]:
+        """Get the PyTables parameters for the compression settings
+
+        Returns
+        -------
+
+        A dictionary containing keyword arguments for `tables.open_file`
+
+        Examples
+        --------
+
+        >>> Compression().parameters()
+        {}
+        >>> Compression("blosc:zstd", threads=2).parameters()
+        {'max_blosc_threads': 2}
+
+        """
+
+        return (
+            {} if self.threads is None else {"max_blosc_threads": self.threads}
+        )
+
+
+# pylint: disable=too-few-public-methods
+
+
+class CompressionBenchmark:
+    """Store the result of a compression benchmark"""
+
+    def __init__(
+        self,
+        compression: Compression,
+        write_speed: float,
+        read_speed: float,
+        ratio: float,
+    ) -> None:
+        """Initialize the benchmark result
+
+        Parameters
+        ----------
+
+        compression:
+            The compression settings used in the benchmark
+
+        write_speed:
+            The write speed in MB/s
+
+        read_speed:
+            The read speed in MB/s
+
+        ratio:
+            The uncompressed size divided by the compressed size
+
+        Examples
+        --------
+
+        >>> CompressionBenchmark(Compression(), 100.123, 200.456, 2.345)
+        ... # doctest:+NORMALIZE_WHITESPACE
+        zlib (Level: 4, Shuffle: byte, Threads: auto): Write: 100.1 MB/s,
+        Read: 200.5 MB/s, Ratio: 2.35
+
+        """
+
+        self.compression = compression
+        self.write_speed = write_speed
+        self.read_speed = read_speed
+        self.ratio = ratio
+
+    def __repr__(self) -> str:
+        """Get the textual representation of the benchmark result
+
+        Returns
+        -------
+
+        A string that describes the benchmark result
+
+        """
+
+        return (
+            f"{self.compression}: Write: {self.write_speed:.1f} MB/s, "
+            f"Read: {self.read_speed:.1f} MB/s, Ratio: {self.ratio:.2f}"
+        )
+
+
+# pylint: enable=too-few-public-methods
+
+# -- Functions ----------------------------------------------------------------
+
+# pylint: disable=too-many-locals
+
+
+def benchmark_compression(
+    filepath: Union[Path, str],
+    compressions: Iterable[Compression],
+    table: str = "/acceleration",
+    rows: int = 1_000_000,
+) -> List[CompressionBenchmark]:
+    """Measure the performance of different compression settings
+
+    The function reads the first rows of the given table into memory and
+    stores them in a temporary file for each of the compression settings.
+
+    Parameters
+    ----------
+
+    filepath:
+        The HDF5 file that contains the sample data
+
+    compressions:
+        The compression settings that should be tested
+
+    table:
+        The HDF5 path of the table that contains the sample data
+
+    rows:
+        The maximum number of rows used as sample data. This value limits
+        the memory usage for large measurement files.
+
+    Returns
+    -------
+
+    A list containing the write speed, read speed and compression ratio for
+    each of the given compression settings
+
+    Examples
+    --------
+
+    >>> from mytoolit.can.streaming import StreamingConfiguration
+    >>> from mytoolit.measurement.storage import Storage
+
+    >>> filepath = Path("test.hdf5")
+    >>> with Storage(filepath, StreamingConfiguration(first=True)) as storage:
+    ...     storage.acceleration.append([(counter % 256, counter, counter % 7)
+    ...                                  for counter in range(10_000)])
+    >>> results = benchmark_compression(
+    ...     filepath, [Compression(), Compression("blosc:lz4", level=5)])
+    >>> [result.compression.library for result in results]
+    ['zlib', 'blosc:lz4']
+    >>> all(result.ratio > 1 for result in results)
+    True
+
+    Only use the first 1000 rows
+
+    >>> benchmark_compression(filepath, [Compression()],
+    ...                       rows=1000) # doctest:+ELLIPSIS
+    [zlib (Level: 4, Shuffle: byte, Threads: auto): Write: ... MB/s, \
+Read: ... MB/s, Ratio: ...]
+    >>> filepath.unlink()
+
+    """
+
+    megabyte = 1000**2
+
+    with open_file(filepath, mode="r") as source:
+        data = source.get_node(table).read(stop=rows)
+
+    size = data.nbytes
+    results = []
+    with TemporaryDirectory() as directory:
+        for number, compression in enumerate(compressions):
+            output = Path(directory) / f"benchmark-{number}.hdf5"
+
+            start = perf_counter()
+            with open_file(
+                output, mode="w", **compression.parameters()
+            ) as hdf:
+                stored = hdf.create_table(
+                    hdf.root,
+                    name="data",
+                    obj=data,
+                    filters=compression.filters(),
+                )
+                stored.flush()
+                size_on_disk = stored.size_on_disk
+            write_time = perf_counter() - start
+
+            start = perf_counter()
+            with open_file(
+                output, mode="r", **compression.parameters()
+            ) as hdf:
+                hdf.get_node("/data").read()
+            read_time = perf_counter() - start
+
+            results.append(
+                CompressionBenchmark(
+                    compression,
+                    write_speed=size / megabyte / write_time,
+                    read_speed=size / megabyte / read_time,
+                    ratio=size / size_on_disk if size_on_disk > 0 else 0,
+                )
+            )
+
+    return results
+
+
+# pylint: enable=too-many-locals
+
+# -- Main ---------------------------------------------------------------------
+
+if __name__ == "__main__":
+    from doctest import testmod
+
+    testmod()
@@ -0,0 +1,916 @@
+"""Export measurement data to other (columnar) file formats
+
+The exporters in this module write measurement data chunk by chunk, which
+means the memory usage only depends on the size of a row group and not on
+the size of the measurement. Supported formats are:
+
+- NumPy (`.npy`): a single structured array that can be memory mapped
+  (`numpy.load(filepath, mmap_mode="r")`); the metadata is stored in a JSON
+  file with the same name
+- Apache Arrow IPC (`.arrow`, `.feather`, `.ipc`) and
+- Apache Parquet (`.parquet`).
+
+The Arrow based formats require the optional package `pyarrow`.
+
+The function `export_measurement` converts an existing HDF5 measurement
+file. The class `ExportStorage` writes the data of a running measurement
+directly into one of the supported formats.
+"""
+
+# -- Imports ------------------------------------------------------------------
+
+from __future__ import annotations
+
+from datetime import datetime
+from importlib import import_module
+from json import dump
+from pathlib import Path
+from types import ModuleType, TracebackType
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Type,
+    Union,
+)
+
+from numpy import (
+    concatenate,
+    dtype,
+    float32,
+    ndarray,
+    uint8,
+    uint16,
+    uint64,
+)
+from numpy.lib.format import dtype_to_descr
+
+from mytoolit.can.adc import ADCConfiguration
+from mytoolit.can.streaming import StreamingBlock, StreamingConfiguration
+from mytoolit.measurement.constants import ADC_MAX_VALUE
+from mytoolit.measurement.reader import StorageReader
+from mytoolit.measurement.segments import MessageCounter
+from mytoolit.measurement.storage import (
+    convert_streaming_block,
+    describe_sample_rate,
+    StorageException,
+)
+
+# -- Functions ----------------------------------------------------------------
+
+
+def import_pyarrow(module: str = "pyarrow") -> ModuleType:
+    """Import (a module of) the optional package `pyarrow`
+
+    Parameters
+    ----------
+
+    module:
+        The name of the module that should be imported
+
+    Returns
+    -------
+
+    The imported module
+
+    Raises
+    ------
+
+    A `StorageException`, if `pyarrow` is not installed
+
+    """
+
+    try:
+        return import_module(module)
+    except ImportError as error:
+        raise StorageException(
+            "Exporting data to Arrow or Parquet format requires the package "
+            "“pyarrow” (pip install icoc[arrow])"
+        ) from error
+
+
+def create_exporter(
+    filepath: Union[Path, str],
+    row_type: dtype,
+    metadata: Optional[Dict[str, str]] = None,
+    row_group_size: int = 100_000,
+) -> Exporter:
+    """Create an exporter for a certain file format
+
+    Parameters
+    ----------
+
+    filepath:
+        The filepath of the exported data; the file extension specifies the
+        format
+
+    row_type:
+        The data type of a single row of measurement data
+
+    metadata:
+        Metadata (e.g. the attributes of the acceleration table) that should
+        be stored together with the data
+
+    row_group_size:
+        The number of rows written at once (size of a row group for Parquet
+        or of a record batch for Arrow IPC files)
+
+    Returns
+    -------
+
+    An exporter for the format specified by the file extension
+
+    Examples
+    --------
+
+    >>> create_exporter("Measurement.csv", dtype([("x", float32)]))
+    Traceback (most recent call last):
+       ...
+    ValueError: Unsupported export format “.csv” (supported formats: .npy, \
+.arrow, .feather, .ipc, .parquet)
+
+    """
+
+    suffix = Path(filepath).suffix.lower()
+    exporter = Exporter.FORMATS.get(suffix)
+    if exporter is None:
+        raise ValueError(
+            f"Unsupported export format “{suffix}” (supported formats: "
+            f"{', '.join(Exporter.FORMATS)})"
+        )
+
+    return exporter(filepath, row_type, metadata, row_group_size)
+
+
+def export_measurement(
+    source: Union[Path, str],
+    destination: Union[Path, str],
+    axes: Optional[Sequence[str]] = None,
+    chunk_size: int = 100_000,
+    row_group_size: int = 100_000,
+) -> int:
+    """Export an HDF5 measurement file to another format
+
+    Parameters
+    ----------
+
+    source:
+        The filepath of the HDF5 measurement file
+
+    destination:
+        The filepath of the exported data; the file extension specifies the
+        format
+
+    axes:
+        The axes that should be exported or `None` to export all axes
+
+    chunk_size:
+        The maximum number of rows read at once
+
+    row_group_size:
+        The number of rows per row group (Parquet) or record batch (Arrow
+        IPC)
+
+    Returns
+    -------
+
+    The number of exported rows
+
+    Examples
+    --------
+
+    >>> from json import loads
+    >>> from numpy import load
+    >>> from mytoolit.measurement.storage import Storage
+
+    >>> source = Path("test.hdf5")
+    >>> with Storage(source, StreamingConfiguration(first=True),
+    ...              raw=True) as data:
+    ...     data.write_sensor_range(200)
+    ...     data.acceleration.append(
+    ...         [(0, timestamp, 0) for timestamp in range(10)])
+
+    >>> destination = Path("test.npy")
+    >>> export_measurement(source, destination, chunk_size=3)
+    10
+    >>> exported = load(destination, mmap_mode="r")
+    >>> exported.dtype.names, len(exported), float(exported["x"][0])
+    (('counter', 'timestamp', 'x'), 10, -100.0)
+    >>> metadata = destination.with_suffix(".json")
+    >>> attributes = loads(metadata.read_text(encoding="utf-8"))
+    >>> attributes["Sensor_Range"]
+    '± 100 g₀'
+
+    The exported values are already converted, which means the metadata
+    does not contain the conversion of the raw values
+
+    >>> sorted(name for name in attributes if name.startswith("Conversion"))
+    []
+
+    >>> del exported
+    >>> for filepath in (source, destination, metadata):
+    ...     filepath.unlink()
+
+    """
+
+    with StorageReader(source) as reader:
+        assert reader.data is not None
+        table = reader.data.acceleration
+        # The exported data is already converted into multiples of g₀: The
+        # conversion of raw values does not apply to it
+        metadata = {
+            name: str(table.attrs[name])
+            for name in table.attrs._v_attrnamesuser  # pylint: disable=W0212
+            if not name.startswith("Conversion_")
+        }
+        row_type = reader.data.read(0, 0, axes).dtype
+        rows = 0
+        with create_exporter(
+            destination, row_type, metadata, row_group_size
+        ) as exporter:
+            for chunk in reader.chunks(size=chunk_size, axes=axes):
+                exporter.write(chunk)
+                rows += len(chunk)
+
+    return rows
+
+
+# -- Classes ------------------------------------------------------------------
+
+
+# pylint: disable=too-many-instance-attributes
+
+
+class Exporter:
+    """Write measurement data in groups of rows"""
+
+    FORMATS: Dict[str, Type[Exporter]] = {}
+
+    def __init__(
+        self,
+        filepath: Union[Path, str],
+        row_type: dtype,
+        metadata: Optional[Dict[str, str]] = None,
+        row_group_size: int = 100_000,
+    ) -> None:
+        """Initialize the exporter using the given arguments
+
+        Parameters
+        ----------
+
+        filepath:
+            The filepath of the exported data
+
+        row_type:
+            The data type of a single row of measurement data
+
+        metadata:
+            Metadata that should be stored together with the data
+
+        row_group_size:
+            The number of rows written at once
+
+        """
+
+        if row_group_size <= 0:
+            raise ValueError(f"Incorrect row group size “{row_group_size}”")
+
+        self.filepath = Path(filepath).expanduser().resolve()
+        self.row_type = row_type
+        self.metadata = {} if metadata is None else dict(metadata)
+        self.row_group_size = row_group_size
+        self.pending: List[ndarray] = []
+        self.pending_rows = 0
+        self.rows = 0
+        self.closed = False
+
+    def __enter__(self) -> Exporter:
+        """Use the exporter in a with statement
+
+        Returns
+        -------
+
+        The exporter object
+
+        """
+
+        return self
+
+    def __exit__(
+        self,
+        exception_type: Optional[Type[BaseException]],
+        exception_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        """Write the remaining data and close the exported file
+
+        Parameters
+        ----------
+
+        exception_type:
+            The type of the exception in case of an exception
+
+        exception_value:
+            The value of the exception in case of an exception
+
+        traceback:
+            The traceback in case of an exception
+
+        """
+
+        self.close()
+
+    def write(self, data: ndarray) -> None:
+        """Add measurement data
+
+        Parameters
+        ----------
+
+        data:
+            A structured array containing rows of measurement data
+
+        """
+
+        if len(data) <= 0:
+            return
+
+        self.pending.append(data)
+        self.pending_rows += len(data)
+        if self.pending_rows >= self.row_group_size:
+            self._write_pending(complete=False)
+
+    def _write_pending(self, complete: bool) -> None:
+        """Write the buffered data
+
+        Parameters
+        ----------
+
+        complete:
+            Specifies if the method should also write an incomplete row group
+
+        """
+
+        if self.pending_rows <= 0:
+            return
+
+        data = concatenate(self.pending)
+        size = self.row_group_size
+        end = len(data) if complete else len(data) // size * size
+        for start in range(0, end, size):
+            group = data[start : min(start + size, end)]
+            self._write_group(group)
+            self.rows += len(group)
+
+        self.pending = [data[end:]]
+        self.pending_rows = len(data) - end
+
+    def close(self) -> None:
+        """Write the remaining data and close the exported file"""
+
+        if self.closed:
+            return
+
+        self._write_pending(complete=True)
+        self._finish()
+        self.closed = True
+
+    def _write_group(self, data: ndarray) -> None:
+        """Write a group of rows
+
+        Parameters
+        ----------
+
+        data:
+            The rows that should be written
+
+        """
+
+        raise NotImplementedError()
+
+    def _finish(self) -> None:
+        """Finish writing the exported file"""
+
+        raise NotImplementedError()
+
+
+class NumPyExporter(Exporter):
+    """Write measurement data into a NumPy (`.npy`) file"""
+
+    def __init__(
+        self,
+        filepath: Union[Path, str],
+        row_type: dtype,
+        metadata: Optional[Dict[str, str]] = None,
+        row_group_size: int = 100_000,
+    ) -> None:
+        """Create the NumPy file
+
+        Parameters
+        ----------
+
+        filepath:
+            The filepath of the NumPy file
+
+        row_type:
+            The data type of a single row of measurement data
+
+        metadata:
+            Metadata that should be stored in a JSON file with the same name
+
+        row_group_size:
+            The number of rows written at once
+
+        Examples
+        --------
+
+        >>> from numpy import array, load
+
+        >>> row_type = dtype([("timestamp", uint64), ("x", float32)])
+        >>> data = array([(value, value / 2) for value in range(5)],
+        ...              dtype=row_type)
+        >>> filepath = Path("test.npy")
+        >>> with NumPyExporter(filepath, row_type,
+        ...                    row_group_size=2) as exporter:
+        ...     exporter.write(data[:3])
+        ...     exporter.write(data[3:])
+        >>> load(filepath)["x"]
+        array([0. , 0.5, 1. , 1.5, 2. ], dtype=float32)
+        >>> filepath.unlink()
+        >>> filepath.with_suffix(".json").unlink()
+
+        """
+
+        super().__init__(filepath, row_type, metadata, row_group_size)
+        # The file stays open until the exporter is closed
+        # pylint: disable=consider-using-with
+        self.file: BinaryIO = self.filepath.open("wb")
+        # pylint: enable=consider-using-with
+        # Reserve space for the largest possible number of rows, since we
+        # only know the final shape of the array after the last write
+        self.header_size = len(self._header(10**19))
+        self.file.write(self._header(0))
+
+    def _header(self, rows: int) -> bytes:
+        """Create the header of the NumPy file
+
+        Parameters
+        ----------
+
+        rows:
+            The number of rows stored in the file
+
+        Returns
+        -------
+
+        The header (format version 1.0)
+
+        """
+
+        text = (
+            f"{{'descr': {dtype_to_descr(self.row_type)!r}, "
+            f"'fortran_order': False, 'shape': ({rows},), }}"
+        )
+        size = getattr(self, "header_size", None)
+        prefix = 10  # Magic string, version and header length
+        if size is None:
+            # Align the data to 64 bytes
+            size = (prefix + len(text) + 1 + 63) // 64 * 64
+        text = text.ljust(size - prefix - 1) + "\n"
+
+        return (
+            b"\x93NUMPY\x01\x00"
+            + len(text).to_bytes(2, "little")
+            + text.encode("latin1")
+        )
+
+    def _write_group(self, data: ndarray) -> None:
+        """Write a group of rows
+
+        Parameters
+        ----------
+
+        data:
+            The rows that should be written
+
+        """
+
+        self.file.write(data.astype(self.row_type, copy=False).tobytes())
+
+    def _finish(self) -> None:
+        """Store the number of rows and the metadata"""
+
+        self.file.seek(0)
+        self.file.write(self._header(self.rows))
+        self.file.close()
+
+        with self.filepath.with_suffix(".json").open(
+            "w", encoding="utf-8"
+        ) as metadata_file:
+            dump(self.metadata, metadata_file, ensure_ascii=False, indent=2)
+
+
+class ArrowExporter(Exporter):
+    """Write measurement data into an Apache Arrow IPC file"""
+
+    def __init__(
+        self,
+        filepath: Union[Path, str],
+        row_type: dtype,
+        metadata: Optional[Dict[str, str]] = None,
+        row_group_size: int = 100_000,
+    ) -> None:
+        """Create the Arrow IPC file
+
+        Parameters
+        ----------
+
+        filepath:
+            The filepath of the Arrow IPC file
+
+        row_type:
+            The data type of a single row of measurement data
+
+        metadata:
+            Metadata that should be stored in the schema of the file
+
+        row_group_size:
+            The number of rows per record batch
+
+        """
+
+        super().__init__(filepath, row_type, metadata, row_group_size)
+        self.pyarrow = import_pyarrow()
+        assert row_type.names is not None
+        self.schema = self.pyarrow.schema(
+            [
+                (name, self.pyarrow.from_numpy_dtype(row_type[name]))
+                for name in row_type.names
+            ],
+            metadata=self.metadata,
+        )
+        self.writer = self._open_writer()
+
+    def _open_writer(self) -> Any:
+        """Open the writer of the exported file
+
+        Returns
+        -------
+
+        The writer for the exported data
+
+        """
+
+        return import_pyarrow("pyarrow.ipc").new_file(
+            str(self.filepath), self.schema
+        )
+
+    def _batch(self, data: ndarray) -> Any:
+        """Convert rows of measurement data into an Arrow record batch
+
+        Parameters
+        ----------
+
+        data:
+            The rows that should be converted
+
+        Returns
+        -------
+
+        A record batch with one column per field of the data
+
+        """
+
+        return self.pyarrow.RecordBatch.from_arrays(
+            [self.pyarrow.array(data[name]) for name in self.schema.names],
+            schema=self.schema,
+        )
+
+    def _write_group(self, data: ndarray) -> None:
+        """Write a record batch
+
+        Parameters
+        ----------
+
+        data:
+            The rows that should be written
+
+        """
+
+        self.writer.write_batch(self._batch(data))
+
+    def _finish(self) -> None:
+        """Close the exported file"""
+
+        self.writer.close()
+
+
+class ParquetExporter(ArrowExporter):
+    """Write measurement data into an Apache Parquet file"""
+
+    def _open_writer(self) -> Any:
+        """Open the writer of the exported file
+
+        Returns
+        -------
+
+        The writer for the exported data
+
+        """
+
+        return import_pyarrow("pyarrow.parquet").ParquetWriter(
+            str(self.filepath), self.schema, compression="zstd"
+        )
+
+    def _write_group(self, data: ndarray) -> None:
+        """Write a row group
+
+        Parameters
+        ----------
+
+        data:
+            The rows that should be written
+
+        """
+
+        self.writer.write_batch(self._batch(data), row_group_size=len(data))
+
+
+# pylint: enable=too-many-instance-attributes
+
+Exporter.FORMATS.update({
+    ".npy": NumPyExporter,
+    ".arrow": ArrowExporter,
+    ".feather": ArrowExporter,
+    ".ipc": ArrowExporter,
+    ".parquet": ParquetExporter,
+})
+
+# pylint: disable=too-many-instance-attributes
+
+
+class ExportStorage(MessageCounter):
+    """Write the data of a running measurement directly into another format
+
+    The class supports the same methods as `Storage` to store streaming data
+    and metadata, which means you can use it instead of an HDF5 file for
+    new measurements.
+    """
+
+    def __init__(
+        self,
+        filepath: Union[Path, str],
+        channels: StreamingConfiguration,
+        *,
+        raw: bool = False,
+        row_group_size: int = 100_000,
+    ) -> None:
+        """Initialize the storage object using the given arguments
+
+        Parameters
+        ----------
+
+        filepath:
+            The filepath of the exported data; the file extension specifies
+            the format
+
+        channels:
+            All channels for which data should be collected
+
+        raw:
+            Specifies if the file should store raw 16 bit ADC values
+            (`True`) or 32 bit floating point values (`False`)
+
+        row_group_size:
+            The number of rows per row group (Parquet) or record batch
+            (Arrow IPC)
+
+        Examples
+        --------
+
+        >>> from numpy import array, load, uint32, zeros
+
+        >>> block = StreamingBlock(
+        ...     counters=array([1, 2, 4], dtype=uint8),
+        ...     timestamps=array([0.5, 0.75, 1.0]),
+        ...     values=zeros((3, 3), dtype=uint16),
+        ...     lost=zeros(3, dtype=uint32),
+        ...     configuration=StreamingConfiguration(first=True))
+
+        >>> filepath = Path("test.npy")
+        >>> with ExportStorage(filepath, StreamingConfiguration(first=True),
+        ...                    raw=True) as storage:
+        ...     storage.write_sensor_range(200)
+        ...     storage.add_streaming_block(block)
+        ...     print(storage.dataloss_stats())
+        (3, 1)
+        >>> load(filepath)["timestamp"]
+        array([     0,      0,      0, 250000, 250000, 250000, 500000, 500000,
+               500000], dtype=uint64)
+        >>> filepath.unlink()
+        >>> filepath.with_suffix(".json").unlink()
+
+        """
+
+        self.filepath = Path(filepath).expanduser().resolve()
+        self.axes = channels.axes()
+        self.raw = raw
+        self.row_group_size = row_group_size
+        self.row_type = dtype([
+            ("counter", uint8),
+            ("timestamp", uint64),
+            *((axis, uint16 if raw else float32) for axis in self.axes),
+        ])
+        self.metadata: Dict[str, str] = {}
+        self.exporter: Optional[Exporter] = None
+        self.start_time: Optional[float] = None
+
+        super().__init__()
+
+        # Check the format before the measurement starts
+        if self.filepath.suffix.lower() not in Exporter.FORMATS:
+            raise ValueError(
+                f"Unsupported export format “{self.filepath.suffix}” "
+                f"(supported formats: {', '.join(Exporter.FORMATS)})"
+            )
+
+    def __enter__(self) -> ExportStorage:
+        """Start storing measurement data
+
+        Returns
+        -------
+
+        The storage object
+
+        """
+
+        return self
+
+    def __exit__(
+        self,
+        exception_type: Optional[Type[BaseException]],
+        exception_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        """Write the remaining data and close the exported file
+
+        Parameters
+        ----------
+
+        exception_type:
+            The type of the exception in case of an exception
+
+        exception_value:
+            The value of the exception in case of an exception
+
+        traceback:
+            The traceback in case of an exception
+
+        """
+
+        self.close()
+
+    def close(self) -> None:
+        """Write the remaining data and close the exported file"""
+
+        if self.exporter is None:
+            # Create the file even if the measurement did not produce data
+            self.exporter = create_exporter(
+                self.filepath, self.row_type, self.metadata
+            )
+
+        self.exporter.metadata.update(self.metadata)
+        self.exporter.close()
+
+    def add_acceleration_meta(self, name: str, value: str) -> None:
+        """Add acceleration metadata
+
+        Metadata added after the first streaming data is only stored in the
+        JSON file of the NumPy format, since the Arrow based formats store
+        the metadata at the start of the file.
+
+        Parameters
+        ----------
+
+        name:
+            The name of the metadata value
+
+        value:
+            The metadata
+
+        """
+
+        self.metadata[name] = value
+
+    def write_sensor_range(self, sensor_range_in_g: float) -> None:
+        """Add metadata about sensor range
+
+        Parameters
+        ----------
+
+        sensor_range_in_g:
+            The sensor range in both directions (e.g. `200` for a sensor
+            that measures values between -100 g₀ and +100 g₀)
+
+        """
+
+        self.add_acceleration_meta(
+            "Sensor_Range", f"± {round(sensor_range_in_g / 2)} g₀"
+        )
+
+        if self.raw:
+            for axis in self.axes:
+                self.add_acceleration_meta(
+                    f"Conversion_Slope_{axis}",
+                    str(sensor_range_in_g / ADC_MAX_VALUE),
+                )
+                self.add_acceleration_meta(
+                    f"Conversion_Offset_{axis}", str(-sensor_range_in_g / 2)
+                )
+
+    def write_sample_rate(
+        self,
+        adc_configuration: ADCConfiguration,
+        voltage: Optional[StreamingConfiguration] = None,
+    ) -> None:
+        """Store the sample rate of the ADC
+
+        Parameters
+        ----------
+
+        adc_configuration:
+            The current ADC configuration of the sensor node
+
+        voltage:
+            The enabled voltage channels or `None`, if the sensor node only
+            streams acceleration data
+
+        """
+
+        channels = (
+            None
+            if voltage is None
+            else StreamingConfiguration(*(axis in self.axes for axis in "xyz"))
+        )
+        self.add_acceleration_meta(
+            "Reference_Voltage", str(adc_configuration.reference_voltage())
+        )
+        self.add_acceleration_meta(
+            "Sample_Rate",
+            describe_sample_rate(adc_configuration, channels, voltage),
+        )
+
+    def add_streaming_block(
+        self,
+        block: StreamingBlock,
+        conversion: Optional[Callable[[ndarray], ndarray]] = None,
+    ) -> None:
+        """Add a block of streaming data
+
+        Parameters
+        ----------
+
+        block:
+            The streaming data that should be added
+
+        conversion:
+            An optional function that converts the (raw) values of the block
+            before they are stored (e.g. into multiples of g₀)
+
+        """
+
+        if len(block) <= 0:
+            return
+
+        if self.start_time is None:
+            self.start_time = float(block.timestamps[0])
+            self.add_acceleration_meta(
+                "Start_Time", datetime.now().isoformat()
+            )
+        if self.exporter is None:
+            self.exporter = create_exporter(
+                self.filepath,
+                self.row_type,
+                self.metadata,
+                self.row_group_size,
+            )
+
+        self._count(block.counters)
+        self.exporter.write(
+            convert_streaming_block(
+                block, self.axes, self.row_type, self.start_time, conversion
+            )
+        )
+
+
+# pylint: enable=too-many-instance-attributes
+
+# -- Main ---------------------------------------------------------------------
+
+if __name__ == "__main__":
+    from doctest import testmod
+
+    testmod()
@@ -0,0 +1,287 @@
+"""Show statistics of a running measurement in the terminal
+
+The class `LiveStatistics` stores the most recent raw values of every
+measurement channel and the number of received and lost messages of the
+most recent blocks of streaming data. Adding a block only copies its
+values, which means the acquisition path stays cheap. The rolling
+statistics (mean, RMS and peak value of every channel and the current data
+loss) are only computed, when the dashboard is rendered. The coroutine
+`show` renders the dashboard at a fixed rate, independent of the message
+rate of the sensor device.
+"""
+
+# -- Imports ------------------------------------------------------------------
+
+from __future__ import annotations
+
+from asyncio import sleep
+from collections import deque
+from sys import stdout
+from typing import Callable, Deque, List, NamedTuple, Optional, TextIO, Tuple
+
+from numpy import abs as absolute, dtype, empty, float64, ndarray, sqrt
+
+from mytoolit.can.streaming import StreamingBlock, StreamingConfiguration
+from mytoolit.measurement.segments import MessageCounter
+from mytoolit.measurement.trigger import RingBuffer
+
+# -- Classes ------------------------------------------------------------------
+
+
+class ChannelStatistics(NamedTuple):
+    """Rolling statistics of a single measurement channel"""
+
+    axis: str
+    mean: float
+    rms: float
+    peak: float
+
+    def __repr__(self) -> str:
+        """Get the textual representation of the channel statistics
+
+        Returns
+        -------
+
+        A string that contains the axis and the statistics of the channel
+
+        Examples
+        --------
+
+        >>> ChannelStatistics("x", 0.0123, 1.2, -3.25)
+        x: Mean:   0.012 g₀, RMS:   1.200 g₀, Peak:  -3.250 g₀
+
+        """
+
+        return (
+            f"{self.axis}: Mean: {self.mean:7.3f} g₀, "
+            f"RMS: {self.rms:7.3f} g₀, Peak: {self.peak:7.3f} g₀"
+        )
+
+
+# pylint: disable=too-many-instance-attributes
+
+
+class LiveStatistics(MessageCounter):
+    """Compute rolling statistics of the most recent measurement data"""
+
+    def __init__(
+        self,
+        channels: StreamingConfiguration,
+        sample_rate: float,
+        *,
+        window: float = 1,
+        conversion: Optional[Callable[[ndarray], ndarray]] = None,
+    ) -> None:
+        """Initialize the statistics using the given arguments
+
+        Parameters
+        ----------
+
+        channels:
+            The streaming configuration of the measurement
+
+        sample_rate:
+            The sample rate of a single channel in Hz
+
+        window:
+            The time span of the rolling statistics in seconds
+
+        conversion:
+            A function that converts the raw streaming values into
+            multiples of g₀
+
+        Examples
+        --------
+
+        >>> from numpy import arange, array, uint8, uint16, uint32, zeros
+
+        >>> channels = StreamingConfiguration(first=True, third=True)
+        >>> statistics = LiveStatistics(channels, sample_rate=4, window=1,
+        ...                             conversion=lambda values: values - 5)
+        >>> statistics.add_streaming_block(StreamingBlock(
+        ...     counters=array([1, 2, 4], dtype=uint8),
+        ...     timestamps=arange(3) / 4,
+        ...     values=array([[9, 1], [1, 2], [3, 3]], dtype=uint16),
+        ...     lost=array([0, 0, 1], dtype=uint32),
+        ...     configuration=channels))
+        >>> statistics.add_streaming_block(StreamingBlock(
+        ...     counters=array([5, 6], dtype=uint8),
+        ...     timestamps=arange(3, 5) / 4,
+        ...     values=array([[11, 4], [13, 5]], dtype=uint16),
+        ...     lost=zeros(2, dtype=uint32),
+        ...     configuration=channels))
+        >>> for channel in statistics.channels():
+        ...     print(channel)
+        x: Mean:   2.000 g₀, RMS:   5.477 g₀, Peak:   8.000 g₀
+        z: Mean:  -1.500 g₀, RMS:   1.871 g₀, Peak:  -3.000 g₀
+        >>> round(statistics.current_dataloss(), 3)
+        0.167
+
+        """
+
+        self.axes = channels.axes()
+        self.conversion = conversion
+        self.capacity = max(round(window * sample_rate), 1)
+        self.window = window
+
+        self.buffer = RingBuffer(
+            self.capacity, dtype([(axis, float64) for axis in self.axes])
+        )
+        # Number of values, received and lost messages of every block
+        self.blocks: Deque[Tuple[int, int, int]] = deque()
+        self.recent = [0, 0, 0]
+        super().__init__()
+
+    def add_streaming_block(self, block: StreamingBlock) -> None:
+        """Add the values of a block of streaming data
+
+        Parameters
+        ----------
+
+        block:
+            The streaming data that should be added
+
+        """
+
+        if len(block) <= 0:
+            return
+
+        messages, lost = self.messages, self.lost
+        self._count(block.counters)
+
+        values = block.channel(self.axes[0])
+        rows = empty(len(values), dtype=self.buffer.rows.dtype)
+        rows[self.axes[0]] = values
+        for axis in self.axes[1:]:
+            rows[axis] = block.channel(axis)
+        self.buffer.push(rows)
+
+        entry = (len(rows), self.messages - messages, self.lost - lost)
+        self.blocks.append(entry)
+        self.recent = [total + part for total, part in zip(self.recent, entry)]
+        # Keep the newest blocks that contain at least a whole window
+        while self.recent[0] - self.blocks[0][0] >= self.capacity:
+            removed = self.blocks.popleft()
+            self.recent = [
+                total - part for total, part in zip(self.recent, removed)
+            ]
+
+    def channels(self) -> List[ChannelStatistics]:
+        """Compute the statistics of the values of the current window
+
+        Returns
+        -------
+
+        The mean, RMS and peak (largest absolute) value of every channel
+
+        """
+
+        rows = self.buffer.read()
+        statistics = []
+        for axis in self.axes:
+            values = rows[axis]
+            if self.conversion is not None:
+                values = self.conversion(values)
+            if len(values) <= 0:
+                statistics.append(ChannelStatistics(axis, 0, 0, 0))
+                continue
+            peak = values[absolute(values).argmax()]
+            statistics.append(
+                ChannelStatistics(
+                    axis,
+                    float(values.mean()),
+                    float(sqrt((values * values).mean())),
+                    float(peak),
+                )
+            )
+
+        return statistics
+
+    def current_dataloss(self) -> float:
+        """Get the data loss of the blocks of the current window
+
+        Returns
+        -------
+
+        The amount of lost messages divided by the number of all messages
+        (lost and retrieved) of the most recent blocks
+
+        """
+
+        _, messages, lost = self.recent
+        return lost / (messages + lost) if messages + lost > 0 else 0
+
+    def dashboard(self) -> str:
+        """Get a textual overview of the current statistics
+
+        Returns
+        -------
+
+        A string that contains the statistics of every channel and the
+        current and overall data loss
+
+        Examples
+        --------
+
+        >>> from numpy import array, uint8, uint16, uint32
+
+        >>> channels = StreamingConfiguration(first=True)
+        >>> statistics = LiveStatistics(channels, sample_rate=10,
+        ...                             conversion=lambda values: values - 10)
+        >>> statistics.add_streaming_block(StreamingBlock(
+        ...     counters=array([1, 3], dtype=uint8),
+        ...     timestamps=array([0.1, 0.2]),
+        ...     values=array([[11, 12, 13], [9, 8, 7]], dtype=uint16),
+        ...     lost=array([0, 1], dtype=uint32),
+        ...     configuration=channels))
+        >>> print(statistics.dashboard())
+        x: Mean:   0.000 g₀, RMS:   2.160 g₀, Peak:   3.000 g₀
+        Data Loss: 33.33 % (Last 1 s), 33.33 % (Overall)
+
+        """
+
+        lines = [repr(channel) for channel in self.channels()]
+        lines.append(
+            f"Data Loss: {self.current_dataloss() * 100:.2f} % "
+            f"(Last {self.window:g} s), {self.dataloss() * 100:.2f} % "
+            "(Overall)"
+        )
+
+        return "\n".join(lines)
+
+    async def show(self, interval: float = 0.25, file: TextIO = stdout):
+        """Render the dashboard periodically
+
+        This coroutine runs until it is cancelled. You usually want to execute
+        it in its own task. Every update overwrites the previous dashboard.
+
+        Parameters
+        ----------
+
+        interval:
+            The time between two updates of the dashboard in seconds
+
+        file:
+            The text stream that should be used to show the dashboard
+
+        """
+
+        lines = 0
+        while True:
+            await sleep(interval)
+            dashboard = self.dashboard()
+            # Move cursor to the start of the previous dashboard and clear it
+            prefix = f"\x1b[{lines}F\x1b[J" if lines > 0 else ""
+            file.write(f"{prefix}{dashboard}\n")
+            file.flush()
+            lines = dashboard.count("\n") + 1
+
+
+# pylint: enable=too-many-instance-attributes
+
+# -- Main ---------------------------------------------------------------------
+
+if __name__ == "__main__":
+    from doctest import testmod
+
+    testmod()
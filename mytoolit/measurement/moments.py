@@ -0,0 +1,208 @@
+"""Compute statistics of measurement data while it is collected
+
+The class `StreamingStatistics` stores the number of values, the mean, the
+sum of squared deviations from the mean, the minimum and the maximum. It
+computes these moments for a whole block of values at once and merges them
+with the moments of the previous values (Chan et al.). The statistics are
+available at any time, without storing the values themselves.
+"""
+
+# -- Imports ------------------------------------------------------------------
+
+from __future__ import annotations
+
+from math import inf, nan, sqrt
+
+from numpy import asarray, float64, ndarray
+
+# -- Classes ------------------------------------------------------------------
+
+
+class StreamingStatistics:
+    """Accumulate mean, variance, minimum and maximum of values"""
+
+    def __init__(self) -> None:
+        """Initialize the statistics
+
+        Examples
+        --------
+
+        >>> from numpy import array
+
+        >>> statistics = StreamingStatistics()
+        >>> statistics.add(array([1, 2, 3, 4]))
+        >>> statistics.add(array([[5, 6], [7, 8]]))
+        >>> statistics
+        Values: 8, Mean: 4.5, Standard Deviation: 2.29, Range: 1 – 8
+        >>> statistics.variance(), statistics.peak_to_peak()
+        (5.25, 7.0)
+
+        """
+
+        self.count = 0
+        self.mean = 0.0
+        self.squared_deviations = 0.0
+        self.minimum = inf
+        self.maximum = -inf
+
+    def __repr__(self) -> str:
+        """Get the textual representation of the statistics
+
+        Returns
+        -------
+
+        A string that contains the number of values, the mean, the standard
+        deviation and the range of the values
+
+        """
+
+        return (
+            f"Values: {self.count}, Mean: {self.mean:g}, "
+            f"Standard Deviation: {self.standard_deviation():.2f}, "
+            f"Range: {self.minimum:g} – {self.maximum:g}"
+        )
+
+    def add(self, values: ndarray) -> None:
+        """Add values to the statistics
+
+        Parameters
+        ----------
+
+        values:
+            The values that should be added (e.g. the raw values of a
+            streaming block)
+
+        """
+
+        values = asarray(values, dtype=float64).ravel()
+        if len(values) <= 0:
+            return
+
+        mean = float(values.mean())
+        deviations = values - mean
+        self._merge(
+            len(values),
+            mean,
+            float((deviations * deviations).sum()),
+            float(values.min()),
+            float(values.max()),
+        )
+
+    def merge(self, other: StreamingStatistics) -> None:
+        """Add the statistics of other values
+
+        Parameters
+        ----------
+
+        other:
+            The statistics that should be added
+
+        Examples
+        --------
+
+        >>> from numpy import arange
+
+        >>> first = StreamingStatistics()
+        >>> first.add(arange(10))
+        >>> second = StreamingStatistics()
+        >>> second.add(arange(10, 100))
+        >>> first.merge(second)
+        >>> first
+        Values: 100, Mean: 49.5, Standard Deviation: 28.87, Range: 0 – 99
+
+        """
+
+        self._merge(
+            other.count,
+            other.mean,
+            other.squared_deviations,
+            other.minimum,
+            other.maximum,
+        )
+
+    def _merge(  # pylint: disable=too-many-arguments
+        self,
+        count: int,
+        mean: float,
+        squared_deviations: float,
+        minimum: float,
+        maximum: float,
+    ) -> None:
+        """Merge the moments of other values
+
+        Parameters
+        ----------
+
+        count:
+            The number of values
+
+        mean:
+            The mean of the values
+
+        squared_deviations:
+            The sum of the squared deviations from the mean
+
+        minimum:
+            The smallest value
+
+        maximum:
+            The largest value
+
+        """
+
+        if count <= 0:
+            return
+
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.squared_deviations += (
+            squared_deviations + delta * delta * self.count * count / total
+        )
+        self.count = total
+        self.minimum = min(self.minimum, minimum)
+        self.maximum = max(self.maximum, maximum)
+
+    def variance(self) -> float:
+        """Get the (population) variance
+
+        Returns
+        -------
+
+        The variance of all values or NaN, if there are no values
+
+        """
+
+        return self.squared_deviations / self.count if self.count > 0 else nan
+
+    def standard_deviation(self) -> float:
+        """Get the (population) standard deviation
+
+        Returns
+        -------
+
+        The standard deviation of all values or NaN, if there are no values
+
+        """
+
+        return sqrt(self.variance())
+
+    def peak_to_peak(self) -> float:
+        """Get the difference between the largest and smallest value
+
+        Returns
+        -------
+
+        The range of all values or NaN, if there are no values
+
+        """
+
+        return self.maximum - self.minimum if self.count > 0 else nan
+
+
+# -- Main ---------------------------------------------------------------------
+
+if __name__ == "__main__":
+    from doctest import testmod
+
+    testmod()
@@ -0,0 +1,421 @@
+"""Support for downsampled overview data of measurements (in HDF5)
+
+To display the data of a long measurement, a viewer does not need every
+single value. The class `Overview` computes the minimum, maximum, mean and
+RMS value of each axis for groups of (e.g.) 10, 100, 1000 and 10000
+consecutive values, while the measurement is recorded. It stores the result
+for each decimation factor in a separate table of the group `/overview`.
+Every level is computed from the previous (smaller) level, which means the
+computation only processes each value once.
+"""
+
+# -- Imports ------------------------------------------------------------------
+
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Sequence
+
+from numpy import (
+    concatenate,
+    dtype,
+    empty,
+    float32,
+    float64,
+    ndarray,
+    sqrt,
+    uint32,
+    uint64,
+)
+from tables import (
+    File,
+    Float32Col,
+    NoSuchNodeError,
+    Table,
+    UInt32Col,
+    UInt64Col,
+)
+
+# -- Functions ----------------------------------------------------------------
+
+
+def overview_dtype(axes: Sequence[str], precision: type = float64) -> dtype:
+    """Get the data type of overview records
+
+    Parameters
+    ----------
+
+    axes:
+        The names of the axes stored in the overview
+
+    precision:
+        The data type of the statistical values
+
+    Returns
+    -------
+
+    A structured data type containing the timestamp of the first value, the
+    number of values and the minimum, maximum, mean and RMS value of each
+    axis
+
+    Examples
+    --------
+
+    >>> overview_dtype(["x"]).names
+    ('timestamp', 'count', 'x_min', 'x_max', 'x_mean', 'x_rms')
+
+    """
+
+    return dtype([
+        ("timestamp", uint64),
+        ("count", uint32),
+        *(
+            (f"{axis}_{statistic}", precision)
+            for axis in axes
+            for statistic in Overview.STATISTICS
+        ),
+    ])
+
+
+def aggregate(records: ndarray, axes: Sequence[str]) -> ndarray:
+    """Combine groups of overview records
+
+    Parameters
+    ----------
+
+    records:
+        A two dimensional array of overview records; the function combines
+        all records of a row into a single record
+
+    axes:
+        The names of the axes stored in the records
+
+    Returns
+    -------
+
+    A one dimensional array containing a combined record for every row of
+    the input
+
+    Examples
+    --------
+
+    >>> records = empty((1, 2), dtype=overview_dtype(["x"]))
+    >>> records["timestamp"] = [[10, 20]]
+    >>> records["count"] = [[1, 3]]
+    >>> records["x_min"] = records["x_max"] = records["x_mean"] = [[1, 5]]
+    >>> records["x_rms"] = [[1, 5]]
+    >>> combined = aggregate(records, ["x"])
+    >>> int(combined["timestamp"][0]), int(combined["count"][0])
+    (10, 4)
+    >>> float(combined["x_mean"][0]), round(float(combined["x_rms"][0]**2), 2)
+    (4.0, 19.0)
+
+    """
+
+    combined = empty(len(records), dtype=records.dtype)
+    counts: ndarray = records["count"].astype(float64)
+    total = counts.sum(axis=1)
+
+    combined["timestamp"] = records["timestamp"][:, 0]
+    combined["count"] = total
+    for axis in axes:
+        combined[f"{axis}_min"] = records[f"{axis}_min"].min(axis=1)
+        combined[f"{axis}_max"] = records[f"{axis}_max"].max(axis=1)
+        combined[f"{axis}_mean"] = (records[f"{axis}_mean"] * counts).sum(
+            axis=1
+        ) / total
+        combined[f"{axis}_rms"] = sqrt(
+            (records[f"{axis}_rms"] ** 2 * counts).sum(axis=1) / total
+        )
+
+    return combined
+
+
+# -- Classes ------------------------------------------------------------------
+
+
+class Overview:
+    """Compute and store downsampled overview data of a measurement"""
+
+    FACTORS = (10, 100, 1000, 10_000)
+    STATISTICS = ("min", "max", "mean", "rms")
+
+    def __init__(
+        self,
+        file_handle: File,
+        axes: Sequence[str],
+        factors: Optional[Sequence[int]] = None,
+    ) -> None:
+        """Create or open the overview tables of a measurement file
+
+        Parameters
+        ----------
+
+        file_handle:
+            The HDF file that stores the measurement data
+
+        axes:
+            The names of the axes stored in the measurement file
+
+        factors:
+            The decimation factors of the overview levels. Every factor has
+            to be a multiple of the previous factor. If the file already
+            contains overview data, then the stored factors will be used
+            instead. The value `None` means that only existing overview data
+            will be used.
+
+        Examples
+        --------
+
+        >>> from pathlib import Path
+        >>> from tables import open_file
+
+        >>> filepath = Path("test.hdf5")
+        >>> with open_file(filepath, mode="w") as hdf:
+        ...     Overview(hdf, ["x"], factors=(10, 100)).factors
+        [10, 100]
+        >>> with open_file(filepath, mode="r") as hdf:
+        ...     Overview(hdf, ["x"]).factors
+        [10, 100]
+        >>> filepath.unlink()
+
+        >>> with open_file(filepath, mode="w") as hdf:
+        ...     Overview(hdf, ["x"], factors=(10, 15))
+        Traceback (most recent call last):
+        ...
+        ValueError: Incorrect overview factors “(10, 15)”
+        >>> filepath.unlink()
+
+        """
+
+        self.hdf = file_handle
+        self.axes = list(axes)
+        self.factors: List[int] = []
+        self.tables: Dict[int, Table] = {}
+        self.pending: List[ndarray] = []
+        self.rows: List[tuple] = []
+
+        try:
+            group = self.hdf.get_node("/overview")
+            self.factors = [
+                int(factor)
+                for factor in self.hdf.get_node_attr(group, "factors")
+            ]
+            for factor in self.factors:
+                self.tables[factor] = self.hdf.get_node(
+                    group, f"decimation_{factor}"
+                )
+        except NoSuchNodeError:
+            if factors:
+                self._create(factors)
+
+        self.pending = [
+            empty(0, dtype=overview_dtype(self.axes)) for _ in self.factors
+        ]
+
+    def _create(self, factors: Sequence[int]) -> None:
+        """Create the overview tables
+
+        Parameters
+        ----------
+
+        factors:
+            The decimation factors of the overview levels
+
+        """
+
+        previous = 1
+        for factor in factors:
+            if factor <= previous or factor % previous != 0:
+                raise ValueError(f"Incorrect overview factors “{factors}”")
+            previous = factor
+
+        description = {
+            "timestamp": UInt64Col(pos=0),
+            "count": UInt32Col(pos=1),
+        }
+        columns = (
+            f"{axis}_{statistic}"
+            for axis in self.axes
+            for statistic in Overview.STATISTICS
+        )
+        for position, column in enumerate(columns, start=2):
+            description[column] = Float32Col(pos=position)
+
+        group = self.hdf.create_group(
+            self.hdf.root, "overview", title="Overview Data"
+        )
+        self.hdf.set_node_attr(group, "factors", list(factors))
+        self.factors = list(factors)
+        for factor in factors:
+            self.tables[factor] = self.hdf.create_table(
+                group,
+                name=f"decimation_{factor}",
+                description=description,
+                title=f"Overview Data (Decimation: {factor})",
+            )
+
+    def _store(self, factor: int, records: ndarray) -> None:
+        """Store overview records in the table of a certain level
+
+        Parameters
+        ----------
+
+        factor:
+            The decimation factor of the level
+
+        records:
+            The overview records that should be stored
+
+        """
+
+        self.tables[factor].append(
+            records.astype(overview_dtype(self.axes, float32))
+        )
+
+    def append(self, row: tuple) -> None:
+        """Add a single row of measurement data
+
+        The overview buffers the rows and processes them in batches.
+
+        Parameters
+        ----------
+
+        row:
+            A row of the acceleration table (counter, timestamp and the
+            value of each axis)
+
+        """
+
+        if not self.factors:
+            return
+
+        self.rows.append(row)
+        if len(self.rows) >= self.factors[0] * 100:
+            self._add_rows()
+
+    def _add_rows(self) -> None:
+        """Process the buffered rows"""
+
+        if not self.rows:
+            return
+
+        rows: ndarray = empty(
+            len(self.rows),
+            dtype=[
+                ("counter", uint32),
+                ("timestamp", uint64),
+                *((axis, float64) for axis in self.axes),
+            ],
+        )
+        rows[:] = self.rows
+        self.rows = []
+        self.add(rows)
+
+    def add(self, data: ndarray) -> None:
+        """Add measurement data
+
+        Parameters
+        ----------
+
+        data:
+            A structured array containing the timestamp and the value of each
+            axis
+
+        Examples
+        --------
+
+        >>> from pathlib import Path
+        >>> from numpy import arange, ones
+        >>> from tables import open_file
+
+        >>> data = empty(250, dtype=[("timestamp", uint64), ("x", float64)])
+        >>> data["timestamp"] = arange(250)
+        >>> data["x"] = arange(250) % 10
+
+        >>> filepath = Path("test.hdf5")
+        >>> with open_file(filepath, mode="w") as hdf:
+        ...     overview = Overview(hdf, ["x"], factors=(10, 100))
+        ...     overview.add(data)
+        ...     level = overview.tables[10].read()
+        ...     print(len(level), len(overview.tables[100]))
+        ...     print(level["timestamp"][:3], level["x_max"][:3],
+        ...           level["x_mean"][:3])
+        25 2
+        [ 0 10 20] [9. 9. 9.] [4.5 4.5 4.5]
+        >>> filepath.unlink()
+
+        """
+
+        if not self.factors or len(data) <= 0:
+            return
+
+        records = empty(len(data), dtype=overview_dtype(self.axes))
+        records["timestamp"] = data["timestamp"]
+        records["count"] = 1
+        for axis in self.axes:
+            values = data[axis]
+            records[f"{axis}_min"] = values
+            records[f"{axis}_max"] = values
+            records[f"{axis}_mean"] = values
+            records[f"{axis}_rms"] = abs(values)
+
+        previous = 1
+        for level, factor in enumerate(self.factors):
+            size = factor // previous
+            previous = factor
+
+            pending = concatenate((self.pending[level], records))
+            groups = len(pending) // size
+            self.pending[level] = pending[groups * size :]
+            if groups <= 0:
+                break
+
+            records = aggregate(
+                pending[: groups * size].reshape(groups, size), self.axes
+            )
+            self._store(factor, records)
+
+    def finish(self) -> None:
+        """Store the overview data of the remaining (incomplete) groups
+
+        Examples
+        --------
+
+        >>> from pathlib import Path
+        >>> from tables import open_file
+
+        >>> filepath = Path("test.hdf5")
+        >>> with open_file(filepath, mode="w") as hdf:
+        ...     overview = Overview(hdf, ["x"], factors=(10, 100))
+        ...     for timestamp in range(15):
+        ...         overview.append((0, timestamp, 2))
+        ...     overview.finish()
+        ...     print(overview.tables[10].col("count"),
+        ...           overview.tables[100].col("count"))
+        [10  5] [15]
+        >>> filepath.unlink()
+
+        """
+
+        self._add_rows()
+
+        records: Optional[ndarray] = None
+        for level, factor in enumerate(self.factors):
+            pending = self.pending[level]
+            if records is not None:
+                pending = concatenate((pending, records))
+            self.pending[level] = pending[:0]
+            if len(pending) <= 0:
+                records = None
+                continue
+
+            records = aggregate(pending.reshape(1, -1), self.axes)
+            self._store(factor, records)
+
+
+# -- Main ---------------------------------------------------------------------
+
+if __name__ == "__main__":
+    from doctest import testmod
+
+    testmod()
@@ -0,0 +1,705 @@
+"""Read measurement data (in HDF5), while it is still being recorded
+
+HDF5 files written by `Storage` can be read by other processes, if the
+storage releases the lock of the file (parameter `live`) and flushes its data
+periodically (parameter `flush_interval`). This is a simple flush and reopen
+scheme, not HDF5 SWMR (single writer, multiple reader): The class
+`StorageTail` reopens the file read-only for every read and only reads the
+rows that were appended since the last read, which means live dashboards can
+follow a recording without reading the whole file again. A read that
+overlaps with a flush of the writer might fail; `StorageTail.follow` then
+just tries again later.
+
+The class `StorageReader` provides random access to the data of a certain
+time window. Since the timestamps of a measurement file never decrease, the
+reader uses a binary search on the timestamp column to find the first and
+last row of a window. This way it only reads the rows of the requested
+window instead of the whole table.
+"""
+
+# -- Imports ------------------------------------------------------------------
+
+from __future__ import annotations
+
+from asyncio import sleep
+from bisect import bisect_left
+from pathlib import Path
+from time import monotonic
+from types import TracebackType
+from typing import (
+    AsyncIterator,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Type,
+    Union,
+)
+
+from numpy import ndarray
+from tables import File, open_file, Table
+from tables.exceptions import HDF5ExtError
+
+from mytoolit.measurement.storage import StorageData, StorageException
+from mytoolit.measurement.timing import TimingModel
+
+# -- Functions ----------------------------------------------------------------
+
+
+def find_row(table: Table, time: float) -> int:
+    """Find the first row of a table stored at or after a certain time
+
+    Parameters
+    ----------
+
+    table:
+        A table with a (non-decreasing) column `timestamp`, which stores
+        the time since the measurement start in microseconds
+
+    time:
+        The time in seconds since the start of the measurement
+
+    Returns
+    -------
+
+    The index of the first row with a timestamp that is equal to or larger
+    than `time`, or the number of rows, if there is no such row
+
+    """
+
+    # Reading a whole row is considerably faster than reading a single field
+    # of the row (`table.cols.timestamp[row]`)
+    return bisect_left(
+        range(table.nrows),
+        time * 1_000_000,
+        key=lambda row: table[row]["timestamp"],
+    )
+
+
+# -- Classes ------------------------------------------------------------------
+
+
+class StorageTail:
+    """Read newly appended measurement data from an HDF5 file"""
+
+    def __init__(self, filepath: Union[Path, str], position: int = 0) -> None:
+        """Initialize the reader using the given arguments
+
+        Parameters
+        ----------
+
+        filepath:
+            The filepath of the HDF5 measurement file
+
+        position:
+            The index of the first row that should be read
+
+        Examples
+        --------
+
+        >>> StorageTail("Measurement.hdf5") # doctest:+ELLIPSIS
+        /...Measurement.hdf5 (Position: 0)
+
+        """
+
+        self.filepath = Path(filepath).expanduser().resolve()
+        self.position = position
+
+    def __repr__(self) -> str:
+        """Get the textual representation of the reader
+
+        Returns
+        -------
+
+        A string that contains the filepath and the current read position
+
+        """
+
+        return f"{self.filepath} (Position: {self.position})"
+
+    def read(self) -> ndarray:
+        """Read all rows appended since the last read
+
+        Returns
+        -------
+
+        A structured array containing the counter, timestamp and acceleration
+        values (in multiples of g₀) of the new rows
+
+        Raises
+        ------
+
+        A `StorageException`, if the file could not be opened or does not
+        contain (valid) measurement data yet
+
+        Examples
+        --------
+
+        >>> from mytoolit.can.streaming import (StreamingConfiguration,
+        ...                                     StreamingData)
+        >>> from mytoolit.measurement.storage import Storage
+
+        >>> filepath = Path("test.hdf5")
+        >>> tail = StorageTail(filepath)
+        >>> tail.read() # doctest:+ELLIPSIS
+        Traceback (most recent call last):
+        ...
+        mytoolit.measurement.storage.StorageException: Unable to open file ...
+
+        >>> with Storage(filepath, StreamingConfiguration(first=True)) as data:
+        ...     data.add_streaming_data(
+        ...         StreamingData(values=[1, 2, 3], counter=1, timestamp=0))
+        >>> tail.read()["x"]
+        array([1., 2., 3.], dtype=float32)
+        >>> tail.read()["x"]
+        array([], dtype=float32)
+
+        >>> with Storage(filepath) as data:
+        ...     data.add_streaming_data(
+        ...         StreamingData(values=[4, 5, 6], counter=2, timestamp=0))
+        >>> tail.read()["x"]
+        array([4., 5., 6.], dtype=float32)
+        >>> tail
+        /.../test.hdf5 (Position: 6)
+        >>> filepath.unlink()
+
+        """
+
+        try:
+            with open_file(self.filepath, mode="r") as hdf:
+                data = StorageData(hdf).read(self.position)
+        except (HDF5ExtError, OSError) as error:
+            raise StorageException(
+                f"Unable to open file “{self.filepath}”: {error}"
+            ) from error
+
+        self.position += len(data)
+
+        return data
+
+    async def follow(
+        self, interval: float = 1, timeout: Optional[float] = None
+    ) -> AsyncIterator[ndarray]:
+        """Read new rows periodically
+
+        Parameters
+        ----------
+
+        interval:
+            The time in seconds between two reads
+
+        timeout:
+            The time in seconds after which the iteration stops, if the file
+            does not contain new data, or `None` to follow the file forever
+
+        Returns
+        -------
+
+        An asynchronous iterator over arrays containing the new rows
+
+        Examples
+        --------
+
+        >>> from asyncio import run
+        >>> from mytoolit.can.streaming import (StreamingConfiguration,
+        ...                                     StreamingData)
+        >>> from mytoolit.measurement.storage import Storage
+
+        >>> filepath = Path("test.hdf5")
+        >>> with Storage(filepath, StreamingConfiguration(first=True)) as data:
+        ...     for counter in range(3):
+        ...         data.add_streaming_data(StreamingData(
+        ...             values=[1, 2, 3], counter=counter, timestamp=0))
+
+        >>> async def follow():
+        ...     async for rows in StorageTail(filepath).follow(
+        ...             interval=0.01, timeout=0.05):
+        ...         print(rows["counter"])
+        >>> run(follow())
+        [0 0 0 1 1 1 2 2 2]
+        >>> filepath.unlink()
+
+        """
+
+        last_data = monotonic()
+        while True:
+            try:
+                data = self.read()
+            except StorageException:
+                # The writer might not have created (or flushed) the
+                # measurement data yet
+                data = None
+
+            now = monotonic()
+            if data is not None and len(data) > 0:
+                last_data = now
+                yield data
+            elif timeout is not None and now - last_data >= timeout:
+                return
+
+            await sleep(interval)
+
+
+class StorageReader:
+    """Read measurement data of certain time windows from an HDF5 file"""
+
+    def __init__(self, filepath: Union[Path, str]) -> None:
+        """Initialize the reader using the given arguments
+
+        Parameters
+        ----------
+
+        filepath:
+            The filepath of the HDF5 measurement file
+
+        Examples
+        --------
+
+        >>> from mytoolit.can.streaming import (StreamingConfiguration,
+        ...                                     StreamingData)
+        >>> from mytoolit.measurement.storage import Storage
+
+        >>> filepath = Path("test.hdf5")
+        >>> with Storage(filepath, StreamingConfiguration(first=True)) as data:
+        ...     for counter in range(10):
+        ...         data.add_streaming_data(StreamingData(
+        ...             values=[counter] * 3, counter=counter,
+        ...             timestamp=counter / 10))
+
+        >>> with StorageReader(filepath) as reader:
+        ...     print(reader.duration())
+        ...     print(reader.window(0.2, 0.4)["x"])
+        0.9
+        [2. 2. 2. 3. 3. 3.]
+        >>> filepath.unlink()
+
+        """
+
+        self.filepath = Path(filepath).expanduser().resolve()
+        self.hdf: Optional[File] = None
+        self.data: Optional[StorageData] = None
+        self.timing: Optional[TimingModel] = None
+
+    def __enter__(self) -> StorageReader:
+        """Open the HDF file for reading
+
+        Returns
+        -------
+
+        The reader object
+
+        """
+
+        self.open()
+        return self
+
+    def __exit__(
+        self,
+        exception_type: Optional[Type[BaseException]],
+        exception_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        """Close the HDF file
+
+        Parameters
+        ----------
+
+        exception_type:
+            The type of the exception in case of an exception
+
+        exception_value:
+            The value of the exception in case of an exception
+
+        traceback:
+            The traceback in case of an exception
+
+        """
+
+        self.close()
+
+    def open(self) -> None:
+        """Open the HDF file for reading
+
+        Raises
+        ------
+
+        A `StorageException`, if the file could not be opened or does not
+        contain valid measurement data
+
+        """
+
+        try:
+            self.hdf = open_file(self.filepath, mode="r")
+        except (HDF5ExtError, OSError) as error:
+            raise StorageException(
+                f"Unable to open file “{self.filepath}”: {error}"
+            ) from error
+
+        try:
+            self.data = StorageData(self.hdf)
+        except StorageException:
+            self.close()
+            raise
+
+    def close(self) -> None:
+        """Close the HDF file"""
+
+        if isinstance(self.hdf, File) and self.hdf.isopen:
+            self.hdf.close()
+        self.hdf = None
+        self.data = None
+        self.timing = None
+
+    def _storage(self) -> StorageData:
+        """Get the measurement data of the opened file
+
+        Returns
+        -------
+
+        The measurement data
+
+        """
+
+        if self.data is None:
+            raise StorageException(f"File “{self.filepath}” is not open")
+
+        return self.data
+
+    def axes(self) -> List[str]:
+        """Get the axes stored in the measurement file
+
+        Returns
+        -------
+
+        A list containing the names of the stored axes
+
+        """
+
+        return list(self._storage().axes)
+
+    def duration(self) -> float:
+        """Get the time between the first and last stored value
+
+        Returns
+        -------
+
+        The duration of the measurement in seconds
+
+        """
+
+        table = self._storage().acceleration
+        if table.nrows <= 0:
+            return 0
+
+        return (
+            float(table[-1]["timestamp"] - table[0]["timestamp"]) / 1_000_000
+        )
+
+    def index(self, time: float) -> int:
+        """Get the index of the first row stored at or after a certain time
+
+        The method uses a binary search and therefore only reads about
+        log₂(n) timestamps of a table with n rows.
+
+        Parameters
+        ----------
+
+        time:
+            The time in seconds since the start of the measurement
+
+        Returns
+        -------
+
+        The index of the first row with a timestamp that is equal to or
+        larger than `time`, or the number of rows, if there is no such row
+
+        Examples
+        --------
+
+        >>> from mytoolit.can.streaming import StreamingConfiguration
+        >>> from mytoolit.measurement.storage import Storage
+
+        >>> filepath = Path("test.hdf5")
+        >>> with Storage(filepath, StreamingConfiguration(first=True)) as data:
+        ...     data.acceleration.append(
+        ...         [(0, timestamp, 0) for timestamp in range(0, 10**6, 10)])
+        >>> with StorageReader(filepath) as reader:
+        ...     print(reader.index(0), reader.index(0.5), reader.index(2))
+        0 50000 100000
+        >>> filepath.unlink()
+
+        """
+
+        return find_row(self._storage().acceleration, time)
+
+    def window(
+        self,
+        start: Optional[float] = None,
+        stop: Optional[float] = None,
+        axes: Optional[Sequence[str]] = None,
+    ) -> ndarray:
+        """Read the measurement data of a certain time window
+
+        Parameters
+        ----------
+
+        start:
+            The start time of the window (included) in seconds since the
+            start of the measurement or `None` to start at the first row
+
+        stop:
+            The end time of the window (excluded) in seconds since the start
+            of the measurement or `None` to stop after the last row
+
+        axes:
+            The axes that should be read or `None` to read all axes
+
+        Returns
+        -------
+
+        A structured array containing the counter, timestamp and acceleration
+        values (in multiples of g₀) of the selected axes
+
+        Examples
+        --------
+
+        >>> from mytoolit.can.streaming import StreamingConfiguration
+        >>> from mytoolit.measurement.storage import Storage
+
+        >>> filepath = Path("test.hdf5")
+        >>> with Storage(filepath, StreamingConfiguration(
+        ...         first=True, third=True)) as data:
+        ...     data.acceleration.append(
+        ...         [(0, timestamp, 1, timestamp)
+        ...          for timestamp in range(0, 10**6, 100)])
+        >>> with StorageReader(filepath) as reader:
+        ...     window = reader.window(0.25, 0.2505, axes=["z"])
+        >>> window.dtype.names
+        ('counter', 'timestamp', 'z')
+        >>> window["z"]
+        array([250000., 250100., 250200., 250300., 250400.], dtype=float32)
+        >>> filepath.unlink()
+
+        """
+
+        first = None if start is None else self.index(start)
+        last = None if stop is None else self.index(stop)
+
+        return self._storage().read(first, last, axes)
+
+    def timestamps(
+        self, start: Optional[float] = None, stop: Optional[float] = None
+    ) -> ndarray:
+        """Get uniformly spaced timestamps for the data of a time window
+
+        In contrast to the (receive) timestamps stored in the file, the
+        timestamps returned by this method use the timing model of the
+        measurement (see `StorageData.fit_timing`). This means every value
+        of a message has its own timestamp, and the timestamps do not
+        contain the jitter of the receive times.
+
+        Parameters
+        ----------
+
+        start:
+            The start time of the window (included) in seconds since the
+            start of the measurement or `None` to start at the first row
+
+        stop:
+            The end time of the window (excluded) in seconds since the start
+            of the measurement or `None` to stop after the last row
+
+        Returns
+        -------
+
+        The timestamps of the rows of the time window in microseconds
+
+        Examples
+        --------
+
+        >>> from mytoolit.can.streaming import StreamingConfiguration
+        >>> from mytoolit.measurement.storage import Storage
+
+        >>> filepath = Path("test.hdf5")
+        >>> with Storage(filepath, StreamingConfiguration(first=True)) as data:
+        ...     for counter in range(10):
+        ...         delay = 30 if counter in {4, 5} else 0
+        ...         data.acceleration.append([
+        ...             (counter, counter * 300 + delay, value)
+        ...             for value in range(3)])
+        >>> with StorageReader(filepath) as reader:
+        ...     print(reader.window(0.0012, 0.0018)["timestamp"])
+        ...     print(reader.timestamps(0.0012, 0.0018))
+        [1230 1230 1230 1530 1530 1530]
+        [1006. 1106. 1206. 1306. 1406. 1506.]
+        >>> filepath.unlink()
+
+        """
+
+        if self.timing is None:
+            self.timing = self._storage().timing()
+
+        first = 0 if start is None else self.index(start)
+        last = (
+            self._storage().acceleration.nrows
+            if stop is None
+            else self.index(stop)
+        )
+
+        if self.timing is None:
+            return (
+                self._storage()
+                .acceleration.read(first, last, field="timestamp")
+                .astype(float)
+            )
+
+        return self.timing.timestamps(first, last)
+
+    def overview(
+        self,
+        factor: int,
+        start: Optional[float] = None,
+        stop: Optional[float] = None,
+        axes: Optional[Sequence[str]] = None,
+    ) -> ndarray:
+        """Read the overview data of a certain time window
+
+        Parameters
+        ----------
+
+        factor:
+            The decimation factor of the overview level
+
+        start:
+            The start time of the window (included) in seconds since the
+            start of the measurement or `None` to start at the first record
+
+        stop:
+            The end time of the window (excluded) in seconds since the start
+            of the measurement or `None` to stop after the last record
+
+        axes:
+            The axes that should be read or `None` to read all axes
+
+        Returns
+        -------
+
+        A structured array containing the timestamp of the first value, the
+        number of values and the minimum, maximum, mean and RMS value (in
+        multiples of g₀) of each selected axis
+
+        Examples
+        --------
+
+        >>> from mytoolit.can.streaming import (StreamingConfiguration,
+        ...                                     StreamingData)
+        >>> from mytoolit.measurement.storage import Storage
+
+        >>> filepath = Path("test.hdf5")
+        >>> with Storage(filepath, StreamingConfiguration(first=True)) as data:
+        ...     for counter in range(10):
+        ...         data.add_streaming_data(StreamingData(
+        ...             values=[counter] * 3, counter=counter,
+        ...             timestamp=counter / 10))
+        >>> with StorageReader(filepath) as reader:
+        ...     print(reader.overview_factors())
+        ...     overview = reader.overview(10, start=0.3)
+        [10, 100, 1000, 10000]
+        >>> overview["x_min"], overview["x_max"]
+        (array([3., 6.], dtype=float32), array([6., 9.], dtype=float32))
+        >>> filepath.unlink()
+
+        """
+
+        storage = self._storage()
+        if factor not in storage.overview.tables:
+            raise ValueError(
+                f"No overview data for decimation factor “{factor}” in file "
+                f"“{self.filepath}”"
+            )
+
+        table = storage.overview.tables[factor]
+        first = None if start is None else find_row(table, start)
+        last = None if stop is None else find_row(table, stop)
+
+        return storage.read_overview(factor, first, last, axes)
+
+    def overview_factors(self) -> List[int]:
+        """Get the decimation factors of the stored overview data
+
+        Returns
+        -------
+
+        A list containing the decimation factors of all overview levels
+
+        """
+
+        return list(self._storage().overview.factors)
+
+    def chunks(
+        self,
+        size: int = 100_000,
+        start: Optional[float] = None,
+        stop: Optional[float] = None,
+        axes: Optional[Sequence[str]] = None,
+    ) -> Iterator[ndarray]:
+        """Iterate over the measurement data in chunks of limited size
+
+        Parameters
+        ----------
+
+        size:
+            The maximum number of rows per chunk
+
+        start:
+            The start time (included) in seconds since the start of the
+            measurement or `None` to start at the first row
+
+        stop:
+            The end time (excluded) in seconds since the start of the
+            measurement or `None` to stop after the last row
+
+        axes:
+            The axes that should be read or `None` to read all axes
+
+        Returns
+        -------
+
+        An iterator over structured arrays containing the counter, timestamp
+        and acceleration values (in multiples of g₀) of the selected axes
+
+        Examples
+        --------
+
+        >>> from mytoolit.can.streaming import StreamingConfiguration
+        >>> from mytoolit.measurement.storage import Storage
+
+        >>> filepath = Path("test.hdf5")
+        >>> with Storage(filepath, StreamingConfiguration(first=True)) as data:
+        ...     data.acceleration.append(
+        ...         [(0, timestamp, 0) for timestamp in range(0, 10**6, 10)])
+        >>> with StorageReader(filepath) as reader:
+        ...     print([len(chunk) for chunk in reader.chunks(
+        ...         size=30_000, start=0.1)])
+        [30000, 30000, 30000]
+        >>> filepath.unlink()
+
+        """
+
+        if size <= 0:
+            raise ValueError(f"Incorrect chunk size “{size}”")
+
+        storage = self._storage()
+        first = 0 if start is None else self.index(start)
+        last = storage.acceleration.nrows if stop is None else self.index(stop)
+
+        for index in range(first, last, size):
+            yield storage.read(index, min(index + size, last), axes)
+
+
+# -- Main ---------------------------------------------------------------------
+
+if __name__ == "__main__":
+    from doctest import testmod
+
+    testmod()
@@ -0,0 +1,588 @@
+"""Resample measurement data to a uniform time grid
+
+Measurement files do not contain the values of lost messages, and the
+stored timestamps are the receive times of the messages, including jitter.
+The class `Resampler` uses the timing model of a measurement (see
+`StorageData.timing`) to place every stored value at its position on the
+uniform sample grid of the sensor node. It fills the positions of lost
+messages with NaN or (linearly) interpolated values and then resamples the
+grid to an exact sample rate using a band-limited (windowed sinc) or linear
+interpolation kernel.
+
+The resampler reads and returns the data chunk by chunk. Its memory usage
+therefore only depends on the chunk size, and neither on the length of the
+measurement nor on the size of gaps.
+"""
+
+# -- Imports ------------------------------------------------------------------
+
+from __future__ import annotations
+
+from math import ceil, floor
+from pathlib import Path
+from typing import Iterator, List, Optional, Sequence, Tuple, Union
+
+from numpy import (
+    arange,
+    array,
+    concatenate,
+    cos,
+    dtype,
+    empty,
+    float32,
+    float64,
+    floor as floor_array,
+    full,
+    int64,
+    interp,
+    nan,
+    ndarray,
+    pi,
+    searchsorted,
+    sinc,
+    stack,
+    where,
+)
+from tables import NoSuchNodeError
+
+from mytoolit.measurement.storage import (
+    Storage,
+    StorageData,
+    StorageException,
+)
+
+# -- Classes ------------------------------------------------------------------
+
+# pylint: disable=too-many-instance-attributes
+
+
+class Resampler:
+    """Resample measurement data to a uniform sample rate"""
+
+    FILL_METHODS = ("nan", "interpolate")
+    KERNELS = ("sinc", "linear")
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        storage: StorageData,
+        sample_rate: float,
+        *,
+        fill: str = "interpolate",
+        kernel: str = "sinc",
+        taps: int = 16,
+        axes: Optional[Sequence[str]] = None,
+    ) -> None:
+        """Initialize the resampler using the given arguments
+
+        Parameters
+        ----------
+
+        storage:
+            The measurement data that should be resampled
+
+        sample_rate:
+            The sample rate of the resampled data in Hz
+
+        fill:
+            Specifies how the resampler handles the values of lost messages:
+
+            - `nan`: use NaN for the missing values (and resampled values
+              close to them)
+            - `interpolate`: interpolate the missing values linearly
+
+        kernel:
+            The interpolation kernel:
+
+            - `sinc`: band-limited interpolation using a Blackman windowed
+              sinc function, which also removes frequencies above half of
+              the new sample rate (anti-aliasing)
+            - `linear`: linear interpolation between neighboring values
+
+        taps:
+            The number of values on each side of a resampled value used by
+            the `sinc` kernel (at the original sample rate)
+
+        axes:
+            The axes that should be resampled or `None` for all axes
+
+        Examples
+        --------
+
+        Resample data with a gap of five messages (15 values)
+
+        >>> from mytoolit.can.streaming import StreamingConfiguration
+
+        >>> filepath = Path("test.hdf5")
+        >>> with Storage(filepath, StreamingConfiguration(first=True)) as data:
+        ...     for message in range(10):
+        ...         counter = message + 5 * (message >= 5)
+        ...         data.acceleration.append([
+        ...             (counter, counter * 300, 3 * message + value)
+        ...             for value in range(3)])
+
+        >>> with Storage(filepath) as data:
+        ...     resampler = Resampler(data, 5000, fill="nan", kernel="linear")
+        ...     resampled = resampler.read()
+        >>> resampler
+        10000.00 Hz → 5000.00 Hz (x), Fill: nan, Kernel: linear
+        >>> len(resampled)
+        23
+        >>> resampled["x"][:8]
+        array([ 0.,  2.,  4.,  6.,  8., 10., 12., 14.], dtype=float32)
+        >>> resampled["x"][8:16]
+        array([nan, nan, nan, nan, nan, nan, nan, 15.], dtype=float32)
+        >>> resampled["timestamp"][:3]
+        array([-200.,    0.,  200.])
+        >>> filepath.unlink()
+
+        """
+
+        if fill not in self.FILL_METHODS:
+            raise ValueError(f"Unknown fill method “{fill}”")
+        if kernel not in self.KERNELS:
+            raise ValueError(f"Unknown kernel “{kernel}”")
+        if sample_rate <= 0:
+            raise ValueError(f"Incorrect sample rate “{sample_rate}”")
+        if taps <= 0:
+            raise ValueError(f"Incorrect number of taps “{taps}”")
+
+        timing = storage.timing()
+        if timing is None:
+            raise StorageException(
+                "Resampling requires measurement data of at least two messages"
+            )
+
+        self.storage = storage
+        self.timing = timing
+        self.axes: List[str] = (
+            list(storage.axes) if axes is None else list(axes)
+        )
+        self.sample_rate = sample_rate
+        self.fill = fill
+        self.kernel = kernel
+
+        # The first resampled value uses the time of the first stored value
+        self.first_position = int(timing.positions(0, 1)[0])
+        # Number of grid positions between two resampled values
+        self.ratio = timing.sample_rate() / sample_rate
+        self.cutoff = min(1.0, 1 / self.ratio) if kernel == "sinc" else 1.0
+        self.half_width = ceil(taps / self.cutoff) if kernel == "sinc" else 1
+
+        self.dtype = dtype(
+            [("timestamp", float64)] + [(axis, float32) for axis in self.axes]
+        )
+
+    def __repr__(self) -> str:
+        """Get the textual representation of the resampler
+
+        Returns
+        -------
+
+        A string that contains the original and new sample rate, the axes,
+        the fill method and the kernel
+
+        """
+
+        return (
+            f"{self.timing.sample_rate():.2f} Hz → {self.sample_rate:.2f} Hz "
+            f"({', '.join(self.axes)}), Fill: {self.fill}, "
+            f"Kernel: {self.kernel}"
+        )
+
+    def _weights(self, offsets: ndarray) -> ndarray:
+        """Compute the kernel weights for certain distances
+
+        Parameters
+        ----------
+
+        offsets:
+            The distances between the resampled values and the grid values
+            (in grid positions)
+
+        Returns
+        -------
+
+        The (unnormalized) weight of every grid value
+
+        """
+
+        if self.kernel == "linear":
+            return (1 - abs(offsets)).clip(min=0)
+
+        relative = offsets / self.half_width
+        window = (
+            0.42 + 0.5 * cos(pi * relative) + 0.08 * cos(2 * pi * relative)
+        )
+        window[abs(relative) >= 1] = 0
+
+        return self.cutoff * sinc(self.cutoff * offsets) * window
+
+    def _grid(
+        self,
+        positions: ndarray,
+        values: ndarray,
+        previous: Optional[Tuple[int, ndarray]],
+        size: int,
+    ) -> Iterator[ndarray]:
+        """Place values on the sample grid and fill missing values
+
+        Parameters
+        ----------
+
+        positions:
+            The grid positions of the values
+
+        values:
+            A two dimensional array that contains the values of every axis
+            (one row per axis)
+
+        previous:
+            The position and values of the last value before `positions` or
+            `None`, if `positions` starts with the first value
+
+        size:
+            The maximum number of grid positions per returned array
+
+        Returns
+        -------
+
+        An iterator over the consecutive grid values from the position
+        after `previous` up to the last position (one row per axis)
+
+        """
+
+        start = int(positions[0]) if previous is None else previous[0] + 1
+        end = int(positions[-1]) + 1
+
+        for first in range(start, end, size):
+            last = min(first + size, end)
+            begin = int(searchsorted(positions, first))
+            stop = int(searchsorted(positions, last))
+
+            if self.fill == "nan":
+                grid = full((len(self.axes), last - first), nan)
+                grid[:, positions[begin:stop] - first] = values[:, begin:stop]
+                yield grid
+            else:
+                yield self._interpolate(
+                    positions, values, previous, (begin, stop), (first, last)
+                )
+
+    def _interpolate(  # pylint: disable=too-many-arguments
+        self,
+        positions: ndarray,
+        values: ndarray,
+        previous: Optional[Tuple[int, ndarray]],
+        indices: Tuple[int, int],
+        grid_range: Tuple[int, int],
+    ) -> ndarray:
+        """Interpolate the grid values in a certain range linearly
+
+        Parameters
+        ----------
+
+        positions:
+            The grid positions of the values
+
+        values:
+            A two dimensional array that contains the values of every axis
+            (one row per axis)
+
+        previous:
+            The position and values of the last value before `positions` or
+            `None`, if `positions` starts with the first value
+
+        indices:
+            The start and stop index of the values inside the grid range
+
+        grid_range:
+            The first and the position after the last interpolated grid
+            value
+
+        Returns
+        -------
+
+        The interpolated grid values (one row per axis)
+
+        """
+
+        begin, stop = indices
+        # Use the known values around the grid range too
+        known_positions: List[ndarray] = [positions[begin:stop]]
+        known_values: List[ndarray] = [values[:, begin:stop]]
+        if begin > 0:
+            known_positions.insert(0, positions[begin - 1 : begin])
+            known_values.insert(0, values[:, begin - 1 : begin])
+        elif previous is not None:
+            known_positions.insert(0, array([previous[0]]))
+            known_values.insert(0, previous[1][:, None])
+        if stop < len(positions):
+            known_positions.append(positions[stop : stop + 1])
+            known_values.append(values[:, stop : stop + 1])
+
+        xp = concatenate(known_positions)
+        fp = concatenate(known_values, axis=1)
+        grid_positions = arange(*grid_range)
+        return stack([interp(grid_positions, xp, row) for row in fp])
+
+    def _resample(
+        self, grid: ndarray, grid_start: int, outputs: ndarray
+    ) -> ndarray:
+        """Compute resampled values using grid values
+
+        Parameters
+        ----------
+
+        grid:
+            Consecutive grid values (one row per axis)
+
+        grid_start:
+            The position of the first grid value
+
+        outputs:
+            The indices of the resampled values
+
+        Returns
+        -------
+
+        A structured array that contains the timestamp and the value of
+        every axis for every resampled value
+
+        """
+
+        points = self.first_position + outputs * self.ratio
+        indices = floor_array(points).astype(int64)[:, None] + arange(
+            1 - self.half_width, self.half_width + 1
+        )
+        weights = self._weights(points[:, None] - indices)
+
+        relative = indices - grid_start
+        weights[(relative < 0) | (relative >= grid.shape[1])] = 0
+        weights /= weights.sum(axis=1, keepdims=True)
+        # Ignore unused grid values, which might be NaN
+        valid = weights != 0
+        relative = relative.clip(0, grid.shape[1] - 1)
+
+        resampled: ndarray = empty(len(outputs), dtype=self.dtype)
+        resampled["timestamp"] = self.timing.offset + points * (
+            self.timing.period / self.timing.rows_per_message
+        )
+        for axis, values in zip(self.axes, grid):
+            resampled[axis] = (
+                where(valid, values[relative], 0) * weights
+            ).sum(axis=1)
+
+        return resampled
+
+    def _available(self, grid_end: int, final: bool) -> int:
+        """Get the number of resampled values that can be computed
+
+        Parameters
+        ----------
+
+        grid_end:
+            The position after the last known grid value
+
+        final:
+            Specifies if the grid contains the last value of the
+            measurement
+
+        Returns
+        -------
+
+        The index after the last resampled value, whose kernel only uses
+        known grid values
+
+        """
+
+        if final:
+            return floor((grid_end - 1 - self.first_position) / self.ratio) + 1
+
+        return max(
+            ceil(
+                (grid_end - self.half_width - self.first_position) / self.ratio
+            ),
+            0,
+        )
+
+    # pylint: disable=too-many-locals
+
+    def chunks(self, size: int = 50_000) -> Iterator[ndarray]:
+        """Iterate over the resampled data in chunks of limited size
+
+        Parameters
+        ----------
+
+        size:
+            The maximum number of rows read and returned at once
+
+        Returns
+        -------
+
+        An iterator over structured arrays that contain the timestamp (in
+        microseconds) and the resampled values (in multiples of g₀) of
+        every selected axis
+
+        """
+
+        if size <= 0:
+            raise ValueError(f"Incorrect chunk size “{size}”")
+
+        rows = self.storage.acceleration.nrows
+        grid: ndarray = empty((len(self.axes), 0))
+        grid_start = self.first_position
+        previous: Optional[Tuple[int, ndarray]] = None
+        output = 0
+
+        for start in range(0, rows, size):
+            stop = min(start + size, rows)
+            data = self.storage.read(start, stop, self.axes)
+            positions = self.timing.positions(start, stop)
+            values = stack([data[axis].astype(float64) for axis in self.axes])
+
+            for values_grid in self._grid(positions, values, previous, size):
+                grid = concatenate((grid, values_grid), axis=1)
+                final = (
+                    stop >= rows and grid_start + grid.shape[1] > positions[-1]
+                )
+                available = self._available(grid_start + grid.shape[1], final)
+                for first in range(output, available, size):
+                    yield self._resample(
+                        grid,
+                        grid_start,
+                        arange(first, min(first + size, available)),
+                    )
+                output = max(output, available)
+
+                # Keep the grid values required for the next resampled value
+                needed = (
+                    floor(self.first_position + output * self.ratio)
+                    - self.half_width
+                    + 1
+                )
+                if needed > grid_start:
+                    drop = min(needed - grid_start, grid.shape[1])
+                    grid = grid[:, drop:]
+                    grid_start += drop
+
+            previous = (int(positions[-1]), values[:, -1])
+
+    # pylint: enable=too-many-locals
+
+    def read(self) -> ndarray:
+        """Read all resampled data at once
+
+        Returns
+        -------
+
+        A structured array that contains the timestamp (in microseconds)
+        and the resampled values (in multiples of g₀) of every selected axis
+
+        """
+
+        chunks = list(self.chunks())
+        if not chunks:
+            return empty(0, dtype=self.dtype)
+
+        return concatenate(chunks)
+
+
+# pylint: enable=too-many-instance-attributes
+
+# -- Functions ----------------------------------------------------------------
+
+
+def resample_measurement(  # pylint: disable=too-many-arguments
+    filepath: Union[Path, str],
+    sample_rate: float,
+    *,
+    fill: str = "interpolate",
+    kernel: str = "sinc",
+    name: str = "resampled",
+    chunk_size: int = 50_000,
+) -> int:
+    """Store resampled measurement data in a table of the measurement file
+
+    Parameters
+    ----------
+
+    filepath:
+        The HDF5 measurement file
+
+    sample_rate:
+        The sample rate of the resampled data in Hz
+
+    fill:
+        The fill method for the values of lost messages (`nan` or
+        `interpolate`)
+
+    kernel:
+        The interpolation kernel (`sinc` or `linear`)
+
+    name:
+        The name of the table that stores the resampled data; the function
+        replaces an existing table with the same name
+
+    chunk_size:
+        The maximum number of rows processed at once
+
+    Returns
+    -------
+
+    The number of resampled rows
+
+    Examples
+    --------
+
+    >>> from mytoolit.can.streaming import StreamingConfiguration
+    >>> from tables import open_file
+
+    >>> filepath = Path("test.hdf5")
+    >>> with Storage(filepath, StreamingConfiguration(first=True)) as data:
+    ...     for counter in range(100):
+    ...         data.acceleration.append(
+    ...             [(counter, counter * 300, 1) for _ in range(3)])
+    >>> resample_measurement(filepath, 2000, chunk_size=64)
+    60
+    >>> with open_file(filepath) as hdf:
+    ...     print(hdf.root.resampled.attrs["Sample_Rate"])
+    ...     print(set(hdf.root.resampled.col("x").round(3)))
+    2000 Hz
+    {np.float32(1.0)}
+    >>> filepath.unlink()
+
+    """
+
+    with Storage(filepath) as storage:
+        resampler = Resampler(storage, sample_rate, fill=fill, kernel=kernel)
+        hdf = storage.hdf
+        try:
+            hdf.remove_node(f"/{name}")
+        except NoSuchNodeError:
+            pass
+
+        table = hdf.create_table(
+            hdf.root,
+            name=name,
+            description=resampler.dtype,
+            title="Resampled Acceleration Data",
+        )
+        rows = 0
+        for chunk in resampler.chunks(chunk_size):
+            table.append(chunk)
+            rows += len(chunk)
+
+        table.attrs["Sample_Rate"] = f"{sample_rate:g} Hz"
+        table.attrs["Fill"] = fill
+        table.attrs["Kernel"] = kernel
+        table.flush()
+
+    return rows
+
+
+# -- Main ---------------------------------------------------------------------
+
+if __name__ == "__main__":
+    from doctest import testmod
+
+    testmod()
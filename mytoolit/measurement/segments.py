@@ -0,0 +1,801 @@
+"""Support for storing long measurements in multiple files (segments)
+
+The class `SegmentedStorage` stores measurement data like `Storage`, but
+starts a new HDF5 file (segment), if the current file reaches a certain size
+or contains data of a certain duration. A crash can therefore only affect
+the last segment, and other tools can process a long measurement piece by
+piece.
+
+The timestamps of all segments are relative to the start of the whole
+measurement. A small JSON file (manifest) lists all segments together with
+their time range and the number of received and lost messages. The class
+`SegmentedReader` uses the manifest to read the data of all segments as if it
+were stored in a single file.
+"""
+
+# -- Imports ------------------------------------------------------------------
+
+from __future__ import annotations
+
+from json import dump, load
+from pathlib import Path
+from types import TracebackType
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Type,
+    TYPE_CHECKING,
+    Union,
+)
+
+from numpy import array, concatenate, diff, ndarray
+
+from mytoolit.can.adc import ADCConfiguration
+from mytoolit.can.streaming import (
+    StreamingBlock,
+    StreamingConfiguration,
+    StreamingData,
+)
+from mytoolit.measurement.compression import Compression
+from mytoolit.measurement.overview import Overview
+from mytoolit.measurement.reader import StorageReader
+from mytoolit.measurement.storage import Storage, StorageData
+
+if TYPE_CHECKING:
+    from mytoolit.measurement.catalog import Catalog
+
+# -- Classes ------------------------------------------------------------------
+
+
+class MessageCounter:
+    """Count received and lost messages using the message counters"""
+
+    def __init__(self) -> None:
+        """Initialize the message statistics"""
+
+        self.last_counter: Optional[int] = None
+        self.messages = 0
+        self.lost = 0
+
+    def _count(self, counters: ndarray) -> None:
+        """Update the number of received and lost messages
+
+        Parameters
+        ----------
+
+        counters:
+            The message counters of the received messages
+
+        """
+
+        if len(counters) <= 0:
+            return
+
+        counters = counters.astype(int)
+        if self.last_counter is not None:
+            counters = concatenate(([self.last_counter], counters))
+        else:
+            self.messages += 1
+        steps = diff(counters) % 256
+        # Messages with the same counter contain data of the same message
+        self.messages += int((steps != 0).sum())
+        self.lost += int((steps[steps != 0] - 1).sum())
+        self.last_counter = int(counters[-1])
+
+    def dataloss_stats(self) -> tuple[int, int]:
+        """Get the number of received and lost messages
+
+        Returns
+        -------
+
+        A tuple containing the number of received and lost messages
+
+        """
+
+        return (self.messages, self.lost)
+
+    def dataloss(self) -> float:
+        """Get the measurement data loss
+
+        Returns
+        -------
+
+        The amount of lost messages divided by the number of all messages
+        (lost and retrieved)
+
+        """
+
+        messages = self.messages + self.lost
+
+        return self.lost / messages if messages > 0 else 0
+
+
+# pylint: disable=too-many-instance-attributes
+
+
+class SegmentedStorage(MessageCounter):
+    """Store measurement data in multiple HDF5 files"""
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        filepath: Union[Path, str],
+        channels: StreamingConfiguration,
+        compression: Optional[Compression] = None,
+        *,
+        raw: bool = False,
+        flush_interval: Optional[float] = None,
+        overview: Optional[Sequence[int]] = Overview.FACTORS,
+        max_size: Optional[int] = None,
+        max_duration: Optional[float] = None,
+        catalog: Optional[Catalog] = None,
+        live: bool = False,
+    ) -> None:
+        """Initialize the storage object using the given arguments
+
+        Parameters
+        ----------
+
+        filepath:
+            The filepath of the manifest. The segments use the same name
+            followed by the number of the segment (e.g. the first segment of
+            `Measurement.json` is `Measurement-0001.hdf5`).
+
+        channels:
+            All channels for which data should be collected
+
+        compression:
+            The compression settings of the segments or `None` to use the
+            default compression
+
+        raw:
+            Specifies if the segments should store raw 16 bit ADC values
+
+        flush_interval:
+            The maximum time in seconds between two flushes of new
+            measurement data or `None` to disable periodic flushes
+
+        overview:
+            The decimation factors of the overview data of each segment or
+            `None` to not store overview data
+
+        max_size:
+            The (approximate) maximum size of a segment in bytes or `None`
+            for no size limit
+
+        max_duration:
+            The maximum time span of the data in a segment in seconds or
+            `None` for no time limit
+
+        catalog:
+            The catalog to which every finished segment should be added or
+            `None` to not add the segments to a catalog
+
+        live:
+            Specifies if other processes should be able to read the current
+            segment, while the storage writes to it (see `Storage`)
+
+        Examples
+        --------
+
+        Store measurement data in segments of two seconds; the messages
+        20 – 29 are lost
+
+        >>> from numpy import arange, uint8, uint16, uint32, zeros
+
+        >>> def create_block(start):
+        ...     return StreamingBlock(
+        ...         counters=arange(start, start + 10, dtype=uint8),
+        ...         timestamps=arange(start, start + 10) / 10,
+        ...         values=zeros((10, 3), dtype=uint16),
+        ...         lost=zeros(10, dtype=uint32),
+        ...         configuration=StreamingConfiguration(first=True))
+
+        >>> manifest = Path("test.json")
+        >>> with SegmentedStorage(manifest, StreamingConfiguration(first=True),
+        ...                       max_duration=2) as storage:
+        ...     for start in (0, 10, 30, 40):
+        ...         storage.add_streaming_block(create_block(start))
+        ...     print(storage.dataloss_stats())
+        (40, 10)
+
+        Read the data of all segments
+
+        >>> reader = SegmentedReader(manifest)
+        >>> [segment.name for segment in reader.filepaths()]
+        ['test-0001.hdf5', 'test-0002.hdf5']
+        >>> reader.dataloss()
+        0.2
+        >>> reader.window(1.8, 3.2)["timestamp"]
+        array([1800000, 1800000, 1800000, 1900000, 1900000, 1900000, 3000000,
+               3000000, 3000000, 3100000, 3100000, 3100000], dtype=uint64)
+        >>> sum(len(chunk) for chunk in reader.chunks(size=25))
+        120
+
+        >>> reader.remove()
+        >>> manifest.exists()
+        False
+
+        """
+
+        self.filepath = Path(filepath).expanduser().resolve()
+        self.channels = channels
+        self.compression = compression
+        self.raw = raw
+        self.flush_interval = flush_interval
+        self.overview = overview
+        self.max_size = max_size
+        self.max_duration = max_duration
+        self.catalog = catalog
+        self.live = live
+
+        self.storage: Optional[Storage] = None
+        self.data: Optional[StorageData] = None
+        self.segments: List[Dict[str, Any]] = []
+
+        self.segment_start: Optional[float] = None
+        super().__init__()
+
+    def __enter__(self) -> SegmentedStorage:
+        """Open the first segment
+
+        Returns
+        -------
+
+        The segmented storage object
+
+        """
+
+        self.open()
+        return self
+
+    def __exit__(
+        self,
+        exception_type: Optional[Type[BaseException]],
+        exception_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        """Close the current segment and store the manifest
+
+        Parameters
+        ----------
+
+        exception_type:
+            The type of the exception in case of an exception
+
+        exception_value:
+            The value of the exception in case of an exception
+
+        traceback:
+            The traceback in case of an exception
+
+        """
+
+        self.close()
+
+    def segment_filepath(self, number: int) -> Path:
+        """Get the filepath of a certain segment
+
+        Parameters
+        ----------
+
+        number:
+            The number of the segment (starting with 1)
+
+        Returns
+        -------
+
+        The filepath of the segment
+
+        Examples
+        --------
+
+        >>> SegmentedStorage("Measurement.json", StreamingConfiguration()
+        ...                 ).segment_filepath(12).name
+        'Measurement-0012.hdf5'
+
+        """
+
+        return self.filepath.with_name(
+            f"{self.filepath.stem}-{number:04}.hdf5"
+        )
+
+    def open(self) -> None:
+        """Open the first segment"""
+
+        if self.storage is None:
+            self._rotate()
+
+    def close(self) -> None:
+        """Close the current segment and store the manifest"""
+
+        if self.storage is None:
+            return
+
+        self._finish_segment()
+        self.storage.close()
+        self.storage = None
+        self.data = None
+        self._write_manifest(complete=True)
+
+    def _storage_data(self) -> StorageData:
+        """Get the storage data of the current segment
+
+        Returns
+        -------
+
+        The storage data object of the current segment
+
+        """
+
+        if self.data is None:
+            self.open()
+        assert self.data is not None
+
+        return self.data
+
+    def _finish_segment(self) -> None:
+        """Store the information about the current segment"""
+
+        data = self.data
+        if data is None:
+            return
+
+        table = data.acceleration
+        table.flush()
+        segment = self.segments[-1]
+        segment["rows"] = int(table.nrows)
+        if table.nrows > 0:
+            segment["start"] = int(table[0]["timestamp"])
+            segment["stop"] = int(table[-1]["timestamp"])
+        segment["messages"] = self.messages - segment["messages"]
+        segment["lost"] = self.lost - segment["lost"]
+
+    def _rotate(self) -> None:
+        """Start a new segment"""
+
+        previous_storage = self.storage
+        previous_data = self.data
+        if previous_data is not None:
+            self._finish_segment()
+
+        filepath = self.segment_filepath(len(self.segments) + 1)
+        storage = Storage(
+            filepath,
+            self.channels,
+            self.compression,
+            raw=self.raw,
+            flush_interval=self.flush_interval,
+            overview=self.overview,
+            catalog=self.catalog,
+            live=self.live,
+        )
+        data = storage.open()
+
+        if previous_storage is not None and previous_data is not None:
+            # Keep the metadata and the time base of the measurement
+            previous_data.acceleration.attrs._f_copy(  # pylint: disable=W0212
+                data.acceleration
+            )
+            data.start_time = previous_data.start_time
+            if (
+                data.timing_fit is not None
+                and previous_data.timing_fit is not None
+            ):
+                data.timing_fit.period = previous_data.timing_fit.period
+            previous_storage.close()
+
+        self.storage = storage
+        self.data = data
+        self.segment_start = None
+        # Store the totals at the start of the segment; `_finish_segment`
+        # replaces them with the values of the segment
+        self.segments.append({
+            "file": filepath.name,
+            "rows": None,
+            "start": None,
+            "stop": None,
+            "messages": self.messages,
+            "lost": self.lost,
+        })
+        self._write_manifest(complete=False)
+
+    def _write_manifest(self, complete: bool) -> None:
+        """Store the list of segments
+
+        Parameters
+        ----------
+
+        complete:
+            Specifies if the measurement is finished
+
+        """
+
+        manifest = {
+            "version": 1,
+            "complete": complete,
+            "messages": self.messages,
+            "lost": self.lost,
+            "segments": self.segments,
+        }
+        temporary = self.filepath.with_suffix(".tmp")
+        with temporary.open("w", encoding="utf-8") as file:
+            dump(manifest, file, indent=2)
+        # Replacing the file is atomic, so the manifest is always complete
+        temporary.replace(self.filepath)
+
+    def _prepare(self, timestamp: float) -> StorageData:
+        """Start a new segment, if the current segment is full
+
+        Parameters
+        ----------
+
+        timestamp:
+            The timestamp of the data that should be added next
+
+        Returns
+        -------
+
+        The storage data of the segment that should store the data
+
+        """
+
+        data = self._storage_data()
+        if self.segment_start is None:
+            self.segment_start = timestamp
+            return data
+
+        full = (
+            self.max_duration is not None
+            and timestamp - self.segment_start >= self.max_duration
+        )
+        if not full and self.max_size is not None:
+            full = data.hdf.get_filesize() >= self.max_size
+
+        if full:
+            self._rotate()
+            self.segment_start = timestamp
+
+        return self._storage_data()
+
+    def add_streaming_data(self, streaming_data: StreamingData) -> None:
+        """Add streaming data to the current segment
+
+        Parameters
+        ----------
+
+        streaming_data:
+            The streaming data that should be stored
+
+        """
+
+        data = self._prepare(streaming_data.timestamp)
+        self._count(array([streaming_data.counter]))
+        data.add_streaming_data(streaming_data)
+
+    def add_streaming_block(
+        self,
+        block: StreamingBlock,
+        conversion: Optional[Callable[[ndarray], ndarray]] = None,
+    ) -> None:
+        """Add a block of streaming data to the current segment
+
+        Parameters
+        ----------
+
+        block:
+            The streaming data that should be stored
+
+        conversion:
+            An optional function that converts the (raw) values of the block
+            before they are stored
+
+        """
+
+        if len(block) <= 0:
+            return
+
+        data = self._prepare(float(block.timestamps[0]))
+        self._count(block.counters)
+        data.add_streaming_block(block, conversion)
+
+    def add_voltage_block(
+        self,
+        block: StreamingBlock,
+        conversion: Optional[Callable[[ndarray], ndarray]] = None,
+    ) -> None:
+        """Add a block of voltage data to the current segment
+
+        Parameters
+        ----------
+
+        block:
+            The voltage data that should be stored
+
+        conversion:
+            An optional function that converts the raw values of the block
+            before they are stored
+
+        """
+
+        if len(block) <= 0:
+            return
+
+        # Only acceleration data starts new segments
+        self._storage_data().add_voltage_block(block, conversion)
+
+    def add_acceleration_meta(self, name: str, value: str) -> None:
+        """Add acceleration metadata to the current and all later segments
+
+        Parameters
+        ----------
+
+        name:
+            The name of the meta attribute
+
+        value:
+            The value of the meta attribute
+
+        """
+
+        self._storage_data().add_acceleration_meta(name, value)
+
+    def write_sensor_range(self, sensor_range_in_g: float) -> None:
+        """Add metadata about the sensor range
+
+        Parameters
+        ----------
+
+        sensor_range_in_g:
+            The sensor range in multiples of g₀
+
+        """
+
+        self._storage_data().write_sensor_range(sensor_range_in_g)
+
+    def write_sample_rate(
+        self,
+        adc_configuration: ADCConfiguration,
+        voltage: Optional[StreamingConfiguration] = None,
+    ) -> None:
+        """Store the sample rate of the ADC
+
+        Parameters
+        ----------
+
+        adc_configuration:
+            The current ADC configuration of the sensor node
+
+        voltage:
+            The enabled voltage channels or `None`, if the sensor node only
+            streams acceleration data
+
+        """
+
+        self._storage_data().write_sample_rate(adc_configuration, voltage)
+
+
+# pylint: enable=too-many-instance-attributes
+
+
+class SegmentedReader:
+    """Read the data of a segmented measurement"""
+
+    def __init__(self, filepath: Union[Path, str]) -> None:
+        """Initialize the reader using the given manifest
+
+        Parameters
+        ----------
+
+        filepath:
+            The filepath of the manifest of the segmented measurement
+
+        """
+
+        self.filepath = Path(filepath).expanduser().resolve()
+        with self.filepath.open(encoding="utf-8") as file:
+            self.manifest = load(file)
+
+        self.segments: List[Dict[str, Any]] = self.manifest["segments"]
+
+    def filepaths(self) -> List[Path]:
+        """Get the filepaths of all segments
+
+        Returns
+        -------
+
+        A list containing the filepath of each segment
+
+        """
+
+        return [
+            self.filepath.with_name(segment["file"])
+            for segment in self.segments
+        ]
+
+    def _selected(
+        self, start: Optional[float], stop: Optional[float]
+    ) -> List[Path]:
+        """Get the segments that contain data of a certain time window
+
+        Parameters
+        ----------
+
+        start:
+            The start time (included) in seconds or `None` for no limit
+
+        stop:
+            The end time (excluded) in seconds or `None` for no limit
+
+        Returns
+        -------
+
+        The filepaths of the segments that (might) contain data of the
+        given window; segments without time information in the manifest
+        (e.g. the last segment after a crash) are always included
+
+        """
+
+        selected = []
+        for filepath, segment in zip(self.filepaths(), self.segments):
+            first, last = segment["start"], segment["stop"]
+            if first is not None and last is not None:
+                if stop is not None and first >= stop * 1_000_000:
+                    continue
+                if start is not None and last < start * 1_000_000:
+                    continue
+            selected.append(filepath)
+
+        return selected
+
+    def window(
+        self,
+        start: Optional[float] = None,
+        stop: Optional[float] = None,
+        axes: Optional[Sequence[str]] = None,
+    ) -> ndarray:
+        """Read the measurement data of a certain time window
+
+        Parameters
+        ----------
+
+        start:
+            The start time of the window (included) in seconds since the
+            start of the measurement or `None` to start at the first row
+
+        stop:
+            The end time of the window (excluded) in seconds since the start
+            of the measurement or `None` to stop after the last row
+
+        axes:
+            The axes that should be read or `None` to read all axes
+
+        Returns
+        -------
+
+        A structured array containing the counter, timestamp and acceleration
+        values (in multiples of g₀) of the selected axes
+
+        """
+
+        filepaths = self._selected(start, stop) or self.filepaths()[:1]
+        parts = []
+        for filepath in filepaths:
+            with StorageReader(filepath) as reader:
+                parts.append(reader.window(start, stop, axes))
+
+        return concatenate(parts)
+
+    def chunks(
+        self,
+        size: int = 100_000,
+        start: Optional[float] = None,
+        stop: Optional[float] = None,
+        axes: Optional[Sequence[str]] = None,
+    ) -> Iterator[ndarray]:
+        """Iterate over the measurement data in chunks of limited size
+
+        Parameters
+        ----------
+
+        size:
+            The maximum number of rows per chunk
+
+        start:
+            The start time (included) in seconds since the start of the
+            measurement or `None` to start at the first row
+
+        stop:
+            The end time (excluded) in seconds since the start of the
+            measurement or `None` to stop after the last row
+
+        axes:
+            The axes that should be read or `None` to read all axes
+
+        Returns
+        -------
+
+        An iterator over structured arrays containing the counter, timestamp
+        and acceleration values (in multiples of g₀) of the selected axes
+
+        """
+
+        for filepath in self._selected(start, stop):
+            with StorageReader(filepath) as reader:
+                yield from reader.chunks(size, start, stop, axes)
+
+    def overview(
+        self,
+        factor: int,
+        start: Optional[float] = None,
+        stop: Optional[float] = None,
+        axes: Optional[Sequence[str]] = None,
+    ) -> ndarray:
+        """Read the overview data of a certain time window
+
+        Parameters
+        ----------
+
+        factor:
+            The decimation factor of the overview level
+
+        start:
+            The start time of the window (included) in seconds since the
+            start of the measurement or `None` to start at the first record
+
+        stop:
+            The end time of the window (excluded) in seconds since the start
+            of the measurement or `None` to stop after the last record
+
+        axes:
+            The axes that should be read or `None` to read all axes
+
+        Returns
+        -------
+
+        A structured array containing the overview data of all segments
+
+        """
+
+        filepaths = self._selected(start, stop) or self.filepaths()[:1]
+        parts = []
+        for filepath in filepaths:
+            with StorageReader(filepath) as reader:
+                parts.append(reader.overview(factor, start, stop, axes))
+
+        return concatenate(parts)
+
+    def dataloss(self) -> float:
+        """Get the measurement data loss of all segments
+
+        Returns
+        -------
+
+        The amount of lost messages divided by the number of all messages
+        (lost and retrieved)
+
+        """
+
+        lost = self.manifest["lost"]
+        messages = self.manifest["messages"] + lost
+
+        return lost / messages if messages > 0 else 0
+
+    def remove(self) -> None:
+        """Delete the manifest and all segments"""
+
+        for filepath in self.filepaths():
+            filepath.unlink(missing_ok=True)
+        self.filepath.unlink()
+
+
+# -- Main ---------------------------------------------------------------------
+
+if __name__ == "__main__":
+    from doctest import testmod
+
+    testmod()
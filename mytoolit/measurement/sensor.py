@@ -4,8 +4,11 @@
 
 from collections.abc import Iterator, Mapping
 from enum import auto, Enum
-from statistics import mean
-from typing import Iterable, NamedTuple
+from math import nan
+from typing import Iterable, List, NamedTuple, Tuple
+
+from numpy import asarray, errstate, exp, float64, fromiter, log, ndarray
+from numpy.fft import rfft
 
 from mytoolit.can.streaming import StreamingConfiguration
 
@@ -421,6 +424,8 @@ class Sensor(NamedTuple):
 
     type: SensorType
     mean: float
+    standard_deviation: float = nan
+    flatness: float = nan
 
     def __repr__(self) -> str:
         """Return a string representation of the sensor
@@ -443,7 +448,7 @@ class Sensor(NamedTuple):
 
         representation = f"{self.type.name.capitalize()} Sensor"
         if self.type == SensorType.BROKEN:
-            representation += f" (Mean: {self.mean})"
+            representation += f" (Mean: {self.mean:g})"
 
         return representation
 
@@ -463,6 +468,148 @@ class Sensor(NamedTuple):
 # -- Functions ----------------------------------------------------------------
 
 
+def sensor_features(values: ndarray) -> Tuple[ndarray, ndarray, ndarray]:
+    """Compute the features used to classify sensor channels
+
+    Parameters
+    ----------
+
+    values:
+        A two dimensional array that contains raw 16 bit ADC values of
+        every channel (one row per channel)
+
+    Returns
+    -------
+
+    The mean, the standard deviation and the spectral flatness of every
+    channel. The spectral flatness is the ratio of the geometric and
+    arithmetic mean of the power spectrum (without DC component): It is
+    about `0.56` for white noise, close to `0` for a tonal signal and `0`
+    for a constant signal.
+
+    Examples
+    --------
+
+    >>> from numpy import arange, array, cos, pi
+
+    >>> means, deviations, flatness = sensor_features(array([
+    ...     [1, 3, 1, 3, 1, 3, 1, 3],
+    ...     [5, 5, 5, 5, 5, 5, 5, 5],
+    ...     1000 + 10 * cos(2 * pi * arange(8) / 4),
+    ... ]))
+    >>> means
+    array([   2.,    5., 1000.])
+    >>> deviations.round(2)
+    array([1.  , 0.  , 7.07])
+    >>> flatness.round(2)
+    array([0., 0., 0.])
+
+    """
+
+    values = asarray(values, dtype=float64)
+    if values.ndim == 1:
+        values = values.reshape(1, -1)
+
+    means = values.mean(axis=1)
+    deviations = values.std(axis=1)
+
+    spectrum = rfft(values - means[:, None], axis=1)[:, 1:]
+    power = spectrum.real**2 + spectrum.imag**2
+    if power.shape[1] <= 0:
+        return means, deviations, power.sum(axis=1)
+
+    total = power.mean(axis=1)
+    with errstate(divide="ignore", invalid="ignore"):
+        flatness = exp(log(power).mean(axis=1)) / total
+    flatness[total <= 0] = 0
+
+    return means, deviations, flatness
+
+
+def sensor_type(mean_raw: float) -> SensorType:
+    """Guess the sensor type from the mean of raw 16 bit ADC values
+
+    Parameters
+    ----------
+
+    mean_raw:
+        The mean of multiple raw 16 bit ADC measurement values
+
+    Returns
+    -------
+
+    The guessed sensor type
+
+    Examples
+    --------
+
+    >>> sensor_type(10500)
+    <SensorType.TEMPERATURE: 3>
+
+    >>> sensor_type(2**16 - 1)
+    <SensorType.BROKEN: 1>
+
+    """
+
+    half = 2**15
+
+    tolerance_acceleration = 1000
+    min_acceleration = half - tolerance_acceleration
+    max_acceleration = half + tolerance_acceleration
+
+    if 10000 <= mean_raw <= 11000:
+        return SensorType.TEMPERATURE
+    if min_acceleration <= mean_raw <= max_acceleration:
+        return SensorType.ACCELERATION
+    if 37500 <= mean_raw <= 38500:
+        return SensorType.PIEZO
+
+    return SensorType.BROKEN
+
+
+def classify_sensors(values: ndarray) -> List[Sensor]:
+    """Guess the sensor types of multiple channels at once
+
+    Parameters
+    ----------
+
+    values:
+        A two dimensional array that contains raw 16 bit ADC values of
+        every channel (one row per channel)
+
+    Returns
+    -------
+
+    The guessed sensor of every channel
+
+    Examples
+    --------
+
+    >>> from numpy import array
+
+    >>> sensors = classify_sensors(array([
+    ...     [38024, 38000, 37950, 38011],
+    ...     [32500, 32571, 32499, 32520],
+    ...     [0, 0, 0, 0],
+    ... ]))
+    >>> sensors
+    [Piezo Sensor, Acceleration Sensor, Broken Sensor (Mean: 0)]
+    >>> round(sensors[1].standard_deviation, 2)
+    29.23
+
+    """
+
+    return [
+        Sensor(
+            sensor_type(float(mean_raw)),
+            float(mean_raw),
+            float(deviation),
+            float(flatness),
+        )
+        for mean_raw, deviation, flatness in zip(*sensor_features(values))
+    ]
+
+
 def guess_sensor(values: Iterable[int]) -> Sensor:
     """Guess the sensor type from raw 16 bit ADC values
 
@@ -494,21 +641,7 @@ def guess_sensor(values: Iterable[int]) -> Sensor:
 
     """
 
-    mean_raw = mean(values)
-    half = 2**15
-
-    tolerance_acceleration = 1000
-    min_acceleration = half - tolerance_acceleration
-    max_acceleration = half + tolerance_acceleration
-
-    if 10000 <= mean_raw <= 11000:
-        return Sensor(SensorType.TEMPERATURE, mean_raw)
-    if min_acceleration <= mean_raw <= max_acceleration:
-        return Sensor(SensorType.ACCELERATION, mean_raw)
-    if 37500 <= mean_raw <= 38500:
-        return Sensor(SensorType.PIEZO, mean_raw)
-
-    return Sensor(SensorType.BROKEN, mean_raw)
+    return classify_sensors(fromiter(values, dtype=float64).reshape(1, -1))[0]
 
 
 # -- Main ---------------------------------------------------------------------
@@ -0,0 +1,514 @@
+"""Compute power spectra of streaming data while the measurement is running
+
+The class `SpectralAnalyzer` splits the values of every channel into
+overlapping segments, applies a Hann window and computes the FFT of each
+segment (short-time Fourier transform). It averages the power of all
+segments of an update interval (Welch’s method) and returns the resulting
+power spectral density as `Spectrum`.
+
+The analyzer keeps the values of the last incomplete segment in a
+preallocated buffer and transforms all complete segments of a block at
+once, which keeps the processing time per streaming block small.
+"""
+
+# -- Imports ------------------------------------------------------------------
+
+from __future__ import annotations
+
+from typing import (
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+)
+
+from numpy import (
+    argmax,
+    float64,
+    hanning,
+    ndarray,
+    zeros,
+)
+from numpy.fft import rfft, rfftfreq
+from numpy.lib.stride_tricks import sliding_window_view
+
+from mytoolit.can.adc import ADCConfiguration
+from mytoolit.can.streaming import StreamingBlock, StreamingConfiguration
+
+# -- Functions ----------------------------------------------------------------
+
+
+def power_spectral_density(
+    power: ndarray, segments: int, window: ndarray, sample_rate: float
+) -> ndarray:
+    """Convert the summed power of FFT segments into a spectral density
+
+    Parameters
+    ----------
+
+    power:
+        The sum of the squared magnitudes of the (one-sided) FFT of all
+        segments; the last dimension contains the frequency bins
+
+    segments:
+        The number of segments
+
+    window:
+        The window function applied to every segment
+
+    sample_rate:
+        The sample rate of the values in Hz
+
+    Returns
+    -------
+
+    The one-sided power spectral density (e.g. in g₀²/Hz)
+
+    Examples
+    --------
+
+    >>> from numpy import ones
+    >>> power_spectral_density(ones(5) * 8, segments=2, window=ones(8),
+    ...                        sample_rate=1)
+    array([0.5, 1. , 1. , 1. , 0.5])
+
+    """
+
+    density = power / (segments * sample_rate * float((window**2).sum()))
+    density[..., 1:-1] *= 2
+
+    return density
+
+
+# -- Classes ------------------------------------------------------------------
+
+
+class Spectrum:
+    """Power spectral density of multiple channels"""
+
+    def __init__(
+        self,
+        axes: List[str],
+        frequencies: ndarray,
+        density: ndarray,
+        segments: int,
+        time: float,
+    ) -> None:
+        """Initialize the spectrum using the given arguments
+
+        Parameters
+        ----------
+
+        axes:
+            The names of the channels
+
+        frequencies:
+            The frequency of every bin in Hz
+
+        density:
+            A two dimensional array, which contains the power spectral
+            density of every channel (one row per channel)
+
+        segments:
+            The number of segments averaged to compute the spectrum
+
+        time:
+            The time of the last value included in the spectrum in seconds
+            since the start of the analysis
+
+        """
+
+        self.axes = axes
+        self.frequencies = frequencies
+        self.density = density
+        self.segments = segments
+        self.time = time
+
+    def __repr__(self) -> str:
+        """Get the textual representation of the spectrum
+
+        Returns
+        -------
+
+        A string that contains the time, the number of segments and the
+        frequency with the highest power of every channel
+
+        Examples
+        --------
+
+        >>> from numpy import array
+        >>> Spectrum(["x", "y"], frequencies=array([0.0, 10.0, 20.0]),
+        ...          density=array([[0, 2, 1], [3, 0, 0]]), segments=4,
+        ...          time=1.5)
+        Time: 1.50 s, Segments: 4, Peak: x: 10.0 Hz, y: 0.0 Hz
+
+        """
+
+        peaks = ", ".join(
+            f"{axis}: {frequency:.1f} Hz"
+            for axis, frequency in zip(self.axes, self.peak_frequencies())
+        )
+
+        return (
+            f"Time: {self.time:.2f} s, Segments: {self.segments}, "
+            f"Peak: {peaks}"
+        )
+
+    def peak_frequencies(self) -> List[float]:
+        """Get the frequency with the highest power of every channel
+
+        Returns
+        -------
+
+        A list that contains the frequency of the highest bin of every
+        channel in Hz
+
+        """
+
+        return [float(self.frequencies[index]) for index in self.peak_bins()]
+
+    def peak_bins(self) -> ndarray:
+        """Get the bin with the highest power of every channel
+
+        Returns
+        -------
+
+        The index of the highest bin of every channel
+
+        """
+
+        return argmax(self.density, axis=1)
+
+    def band_energy(self, low: float, high: float) -> ndarray:
+        """Get the energy of a frequency band for every channel
+
+        Parameters
+        ----------
+
+        low:
+            The lower frequency of the band in Hz
+
+        high:
+            The upper frequency of the band in Hz
+
+        Returns
+        -------
+
+        The mean square value of the signal components in the frequency
+        band for every channel
+
+        """
+
+        band = (self.frequencies >= low) & (self.frequencies <= high)
+        resolution = (
+            float(self.frequencies[1] - self.frequencies[0])
+            if len(self.frequencies) > 1
+            else 0
+        )
+
+        return self.density[:, band].sum(axis=1) * resolution
+
+    def band_energies(
+        self, bands: Iterable[Tuple[float, float]]
+    ) -> Dict[str, float]:
+        """Get the energy of multiple frequency bands for every channel
+
+        Parameters
+        ----------
+
+        bands:
+            The lower and upper frequency of every band in Hz
+
+        Returns
+        -------
+
+        A dictionary that maps the name of every channel and band (e.g.
+        `x_band_0_1000`) to its energy
+
+        """
+
+        energies: Dict[str, float] = {}
+        for low, high in bands:
+            for axis, energy in zip(self.axes, self.band_energy(low, high)):
+                energies[f"{axis}_band_{low:g}_{high:g}"] = float(energy)
+
+        return energies
+
+
+# pylint: disable=too-many-instance-attributes
+
+
+class SpectralAnalyzer:
+    """Compute averaged power spectra of streaming data"""
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        channels: StreamingConfiguration,
+        sample_rate: float,
+        *,
+        segment_length: int = 1024,
+        overlap: float = 0.5,
+        update_interval: float = 0.25,
+        conversion: Optional[Callable[[ndarray], ndarray]] = None,
+    ) -> None:
+        """Initialize the analyzer using the given arguments
+
+        Parameters
+        ----------
+
+        channels:
+            The channels contained in the streaming data
+
+        sample_rate:
+            The sample rate of a single channel in Hz
+
+        segment_length:
+            The number of values per FFT segment
+
+        overlap:
+            The fraction of a segment shared with the next segment
+
+        update_interval:
+            The (measurement) time between two spectra in seconds
+
+        conversion:
+            An optional function that converts the (raw) streaming values
+            before the analysis (e.g. into multiples of g₀)
+
+        Examples
+        --------
+
+        Analyze a sine wave with a frequency of 1000 Hz
+
+        >>> from numpy import arange, pi, sin, uint8, uint16, uint32
+
+        >>> sample_rate = 9600
+        >>> signal = sin(2 * pi * 1000 * arange(9600) / sample_rate)
+        >>> values = ((signal + 1) * 1000).astype(uint16).reshape(-1, 3)
+        >>> block = StreamingBlock(
+        ...     counters=arange(len(values), dtype=uint8),
+        ...     timestamps=arange(len(values)) / 3200,
+        ...     values=values,
+        ...     lost=zeros(len(values), dtype=uint32),
+        ...     configuration=StreamingConfiguration(first=True))
+
+        >>> analyzer = SpectralAnalyzer(
+        ...     StreamingConfiguration(first=True), sample_rate,
+        ...     segment_length=960, update_interval=0.5,
+        ...     conversion=lambda values: values / 1000 - 1)
+        >>> spectrum = analyzer.add_streaming_block(block)
+        >>> spectrum
+        Time: 1.00 s, Segments: 19, Peak: x: 1000.0 Hz
+        >>> round(float(spectrum.band_energy(900, 1100)[0]), 2)
+        0.5
+
+        """
+
+        if segment_length <= 1:
+            raise ValueError(f"Incorrect segment length “{segment_length}”")
+        if not 0 <= overlap < 1:
+            raise ValueError(f"Incorrect overlap “{overlap}”")
+        if sample_rate <= 0:
+            raise ValueError(f"Incorrect sample rate “{sample_rate}”")
+
+        self.axes = channels.axes()
+        self.sample_rate = sample_rate
+        self.segment_length = segment_length
+        self.hop = max(round(segment_length * (1 - overlap)), 1)
+        self.update_samples = max(round(update_interval * sample_rate), 1)
+        self.conversion = conversion
+
+        self.window = hanning(segment_length)
+        self.frequencies = rfftfreq(segment_length, 1 / sample_rate)
+
+        # Values of the current (incomplete) segment
+        self.buffer: ndarray = zeros(
+            (len(self.axes), 2 * segment_length), dtype=float64
+        )
+        self.filled = 0
+        # Summed power of the segments of the current update interval
+        self.power: ndarray = zeros((len(self.axes), len(self.frequencies)))
+        self.segments = 0
+        self.pending = 0
+        self.samples = 0
+
+    @classmethod
+    def from_adc_configuration(
+        cls,
+        channels: StreamingConfiguration,
+        adc_configuration: ADCConfiguration,
+        **arguments,
+    ) -> SpectralAnalyzer:
+        """Create an analyzer for data collected with a certain ADC setup
+
+        All enabled channels share the sample rate of the ADC.
+
+        Parameters
+        ----------
+
+        channels:
+            The channels contained in the streaming data
+
+        adc_configuration:
+            The ADC configuration used to collect the streaming data
+
+        arguments:
+            Further (keyword) arguments of the analyzer
+
+        Returns
+        -------
+
+        An analyzer that uses the sample rate of a single channel
+
+        Examples
+        --------
+
+        >>> analyzer = SpectralAnalyzer.from_adc_configuration(
+        ...     StreamingConfiguration(first=True, third=True),
+        ...     ADCConfiguration(prescaler=2, acquisition_time=8,
+        ...                      oversampling_rate=64))
+        >>> round(analyzer.sample_rate, 2)
+        4761.9
+
+        """
+
+        return cls(
+            channels,
+            adc_configuration.sample_rate() / len(channels.axes()),
+            **arguments,
+        )
+
+    def add(self, values: ndarray) -> Optional[Spectrum]:
+        """Add (converted) values of all channels
+
+        Parameters
+        ----------
+
+        values:
+            A two dimensional array that contains the values of every
+            channel (one row per channel)
+
+        Returns
+        -------
+
+        The averaged spectrum of the last update interval, if the values
+        complete an update interval, or `None` otherwise
+
+        """
+
+        count = values.shape[1]
+        if count <= 0:
+            return None
+
+        needed = self.filled + count
+        if needed > self.buffer.shape[1]:
+            buffer = zeros((len(self.axes), 2 * needed), dtype=float64)
+            buffer[:, : self.filled] = self.buffer[:, : self.filled]
+            self.buffer = buffer
+        self.buffer[:, self.filled : needed] = values
+        self.filled = needed
+
+        length = self.segment_length
+        segments = (
+            (self.filled - length) // self.hop + 1
+            if self.filled >= length
+            else 0
+        )
+        if segments > 0:
+            # View of all complete segments (channels × segments × length)
+            frames = sliding_window_view(
+                self.buffer[:, : self.filled], length, axis=1
+            )[:, : segments * self.hop : self.hop]
+            spectrum = rfft(frames * self.window, axis=2)
+            self.power += (spectrum.real**2 + spectrum.imag**2).sum(axis=1)
+            self.segments += segments
+
+            consumed = segments * self.hop
+            remaining = self.filled - consumed
+            self.buffer[:, :remaining] = self.buffer[:, consumed : self.filled]
+            self.filled = remaining
+
+        self.samples += count
+        self.pending += count
+        if self.pending < self.update_samples or self.segments <= 0:
+            return None
+
+        spectrum = Spectrum(
+            self.axes,
+            self.frequencies,
+            power_spectral_density(
+                self.power, self.segments, self.window, self.sample_rate
+            ),
+            self.segments,
+            self.samples / self.sample_rate,
+        )
+        self.power.fill(0)
+        self.segments = 0
+        self.pending = 0
+
+        return spectrum
+
+    def add_streaming_block(self, block: StreamingBlock) -> Optional[Spectrum]:
+        """Add a block of streaming data
+
+        Parameters
+        ----------
+
+        block:
+            The streaming data that should be analyzed
+
+        Returns
+        -------
+
+        The averaged spectrum of the last update interval, if the block
+        completes an update interval, or `None` otherwise
+
+        """
+
+        values = (
+            block.values
+            if self.conversion is None
+            else self.conversion(block.values)
+        )
+        if len(self.axes) == 1:
+            # A single message contains multiple values of the same axis
+            return self.add(values.reshape(1, -1))
+
+        return self.add(values.T)
+
+    async def spectra(
+        self, blocks: AsyncIterator[StreamingBlock]
+    ) -> AsyncIterator[Spectrum]:
+        """Compute spectra for streaming blocks
+
+        Parameters
+        ----------
+
+        blocks:
+            Streaming blocks (e.g. `stream.blocks()` of the data stream
+            returned by `Network.open_data_stream`)
+
+        Returns
+        -------
+
+        An iterator over the spectra of all update intervals
+
+        """
+
+        async for block in blocks:
+            spectrum = self.add_streaming_block(block)
+            if spectrum is not None:
+                yield spectrum
+
+
+# pylint: enable=too-many-instance-attributes
+
+# -- Main ---------------------------------------------------------------------
+
+if __name__ == "__main__":
+    from doctest import testmod
+
+    testmod()
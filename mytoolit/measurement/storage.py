@@ -1,30 +1,76 @@
 """Support for storing measurement data (in HDF5)"""
 
+# pylint: disable=too-many-lines
+
 # -- Imports ------------------------------------------------------------------
 
 from __future__ import annotations
 
 from datetime import datetime
+from sys import platform
 from pathlib import Path
+from re import search
+from time import monotonic
 from types import TracebackType
-from typing import Dict, Optional, Type, Union
+from typing import (
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    TYPE_CHECKING,
+    Union,
+)
 
+from numpy import (
+    diff,
+    dtype,
+    empty,
+    float32,
+    float64,
+    full,
+    maximum,
+    minimum,
+    ndarray,
+    repeat,
+    sqrt,
+    uint16,
+)
 from tables import (
     File,
-    Filters,
     Float32Col,
+    Int64Col,
     IsDescription,
     MetaAtom,
     MetaIsDescription,
     NoSuchNodeError,
     open_file,
+    Table,
     UInt8Col,
+    UInt16Col,
     UInt64Col,
 )
 from tables.exceptions import HDF5ExtError
 
 from mytoolit.can.adc import ADCConfiguration
-from mytoolit.can.streaming import StreamingConfiguration, StreamingData
+from mytoolit.can.bandwidth import channel_sample_rate
+from mytoolit.can.streaming import (
+    StreamingBlock,
+    StreamingConfiguration,
+    StreamingData,
+)
+from mytoolit.measurement.compression import Compression
+from mytoolit.measurement.constants import ADC_MAX_VALUE
+from mytoolit.measurement.overview import Overview, overview_dtype
+from mytoolit.measurement.timing import TimingFit, TimingModel
+
+if TYPE_CHECKING:
+    from mytoolit.measurement.catalog import Catalog
+
+if platform != "win32":
+    from fcntl import flock, LOCK_UN
 
 # -- Functions ----------------------------------------------------------------
 
@@ -60,6 +106,239 @@ def create_acceleration_description(
     return description_class
 
 
+def convert_streaming_block(
+    block: StreamingBlock,
+    axes: Sequence[str],
+    row_type: dtype,
+    start_time: float,
+    conversion: Optional[Callable[[ndarray], ndarray]] = None,
+) -> ndarray:
+    """Convert a block of streaming data into rows of acceleration data
+
+    Parameters
+    ----------
+
+    block:
+        The streaming data that should be converted
+
+    axes:
+        The names of the axes contained in the streaming data
+
+    row_type:
+        The data type of a single row (counter, timestamp and the value of
+        each axis)
+
+    start_time:
+        The start time of the measurement in seconds
+
+    conversion:
+        An optional function that converts the (raw) values of the block
+        (e.g. into multiples of g₀)
+
+    Returns
+    -------
+
+    A structured array that contains one row for every value (single axis)
+    or every message (multiple axes). The timestamps of the rows are
+    relative to the start time in microseconds.
+
+    Examples
+    --------
+
+    >>> from numpy import array, uint8, uint32, uint64
+
+    >>> block = StreamingBlock(
+    ...     counters=array([21, 22], dtype=uint8),
+    ...     timestamps=array([1.0, 1.5]),
+    ...     values=array([[1, 2], [4, 5]], dtype=uint16),
+    ...     lost=array([0, 0], dtype=uint32),
+    ...     configuration=StreamingConfiguration(first=True, second=True))
+    >>> row_type = dtype([("counter", uint8), ("timestamp", uint64),
+    ...                   ("x", uint16), ("y", uint16)])
+    >>> convert_streaming_block(block, ["x", "y"], row_type, start_time=1)
+    array([(21,      0, 1, 2), (22, 500000, 4, 5)],
+          dtype=[('counter', 'u1'), ('timestamp', '<u8'), ('x', '<u2'), \
+('y', '<u2')])
+
+    """
+
+    timestamps = (block.timestamps - start_time) * 1_000_000
+    counters = block.counters
+    values = block.values if conversion is None else conversion(block.values)
+
+    if len(axes) == 1:
+        # A single message contains multiple values of the same axis
+        values_per_message = values.shape[1]
+        counters = repeat(counters, values_per_message)
+        timestamps = repeat(timestamps, values_per_message)
+        columns = [values.ravel()]
+    else:
+        columns = [values[:, index] for index in range(len(axes))]
+
+    data = empty(len(counters), dtype=row_type)
+    data["counter"] = counters
+    data["timestamp"] = timestamps
+    for axis, column in zip(axes, columns):
+        data[axis] = column
+
+    return data
+
+
+def create_voltage_description(
+    attributes: Dict[str, MetaAtom],
+) -> MetaIsDescription:
+    """Create a new `IsDescription` class to store voltage data
+
+    Parameters
+    ----------
+
+    attributes:
+        A dictionary containing additional columns to store specific
+        voltage data. The key specifies the name of the attribute, while
+        the value specifies the type.
+
+    Examples
+    --------
+
+    >>> description_voltage = create_voltage_description(
+    ...     dict(voltage_1=Float32Col()))
+    >>> list(description_voltage.columns.keys())
+    ['counter', 'timestamp', 'voltage_1']
+
+    """
+
+    description_class = type(
+        "ExtendedVoltageDescription",
+        (VoltageDescription,),
+        attributes,
+    )
+    return description_class
+
+
+def release_file_lock(file_handle: File) -> None:
+    """Allow other processes to open an HDF5 file that is open for writing
+
+    HDF5 locks a file, while a process writes to it. Other processes are
+    only able to open the file, after the writer releases this lock. This
+    function releases the lock of a single file. Unlike the environment
+    variable `HDF5_USE_FILE_LOCKING` it does not change the locking of any
+    other file opened by the current process.
+
+    Parameters
+    ----------
+
+    file_handle:
+        The HDF5 file that other processes should be able to read
+
+    """
+
+    # HDF5 does not lock files on Windows
+    if platform != "win32":
+        flock(file_handle.fileno(), LOCK_UN)
+
+
+def describe_sample_rate(
+    adc_configuration: ADCConfiguration,
+    channels: Optional[StreamingConfiguration] = None,
+    voltage: Optional[StreamingConfiguration] = None,
+) -> str:
+    """Describe the sample rate of an ADC configuration
+
+    Parameters
+    ----------
+
+    adc_configuration:
+        The ADC configuration of the sensor device
+
+    channels:
+        The enabled acceleration channels or `None`, if only the first
+        channel is enabled
+
+    voltage:
+        The enabled voltage channels or `None`, if the sensor device only
+        streams acceleration data
+
+    Returns
+    -------
+
+    A text that contains the sample rate of the acceleration data and the
+    ADC values that determine the sample rate
+
+    Examples
+    --------
+
+    >>> describe_sample_rate(ADCConfiguration(
+    ...     prescaler=2, acquisition_time=8, oversampling_rate=64))
+    '9523.81 Hz (Prescaler: 2, Acquisition Time: 8, Oversampling Rate: 64)'
+
+    Voltage channels use a part of the sample rate of the ADC
+
+    >>> describe_sample_rate(ADCConfiguration(
+    ...     prescaler=2, acquisition_time=8, oversampling_rate=64),
+    ...     StreamingConfiguration(first=True),
+    ...     StreamingConfiguration(first=True))
+    '4761.90 Hz (Prescaler: 2, Acquisition Time: 8, Oversampling Rate: 64, \
+Voltage Channels: 1)'
+
+    """
+
+    adc_config_values = [
+        f"Prescaler: {adc_configuration.prescaler()}",
+        f"Acquisition Time: {adc_configuration.acquisition_time()}",
+        f"Oversampling Rate: {adc_configuration.oversampling_rate()}",
+    ]
+
+    sample_rate = adc_configuration.sample_rate()
+    if voltage is not None:
+        channels = (
+            StreamingConfiguration(first=True)
+            if channels is None
+            else channels
+        )
+        sample_rate = (
+            channel_sample_rate(adc_configuration, channels, voltage)
+            * channels.enabled_channels()
+        )
+        adc_config_values.append(
+            f"Voltage Channels: {voltage.enabled_channels()}"
+        )
+
+    adc_config_text = ", ".join(adc_config_values)
+
+    return f"{sample_rate:.2f} Hz ({adc_config_text})"
+
+
+def voltage_columns(channels: StreamingConfiguration) -> List[str]:
+    """Get the column names of voltage data
+
+    Parameters
+    ----------
+
+    channels:
+        The enabled voltage channels
+
+    Returns
+    -------
+
+    The names of the columns that store the values of the voltage channels
+
+    Examples
+    --------
+
+    >>> voltage_columns(StreamingConfiguration(first=True, third=True))
+    ['voltage_1', 'voltage_3']
+
+    """
+
+    return [
+        f"voltage_{number}"
+        for number, enabled in enumerate(
+            (channels.first, channels.second, channels.third), start=1
+        )
+        if enabled
+    ]
+
+
 # -- Classes ------------------------------------------------------------------
 
 
@@ -73,6 +352,15 @@ class AccelerationDescription(IsDescription):
     timestamp = UInt64Col()  # Microseconds since measurement start
 
 
+class VoltageDescription(IsDescription):
+    """Description of HDF voltage table"""
+
+    counter = UInt8Col()
+    # Microseconds since measurement start; voltage data received shortly
+    # before the first acceleration data has a negative timestamp
+    timestamp = Int64Col()
+
+
 # pylint: enable=too-few-public-methods
 
 
@@ -80,13 +368,23 @@ class StorageException(Exception):
     """Exception for HDF storage errors"""
 
 
+# pylint: disable=too-many-instance-attributes
+
+
 class Storage:
     """Code to store measurement data in HDF5 format"""
 
-    def __init__(
+    def __init__(  # pylint: disable=too-many-arguments
         self,
         filepath: Union[Path, str],
         channels: Optional[StreamingConfiguration] = None,
+        compression: Optional[Compression] = None,
+        *,
+        raw: bool = False,
+        flush_interval: Optional[float] = None,
+        overview: Optional[Sequence[int]] = Overview.FACTORS,
+        catalog: Optional[Catalog] = None,
+        live: bool = False,
     ) -> None:
         """Initialize the storage object using the given arguments
 
@@ -102,6 +400,37 @@ class Storage:
             axes data should be taken from an existing valid file at
             `filepath`.
 
+        compression:
+            The compression settings for new measurement data or `None` to
+            use the default compression (zlib, level 4)
+
+        raw:
+            Specifies if new measurement data should be stored as raw 16 bit
+            ADC values (`True`) or as 32 bit floating point values (`False`)
+
+        flush_interval:
+            The maximum time in seconds between two flushes of new
+            measurement data to disk or `None` to only flush data when
+            PyTables buffers are full. Flushed data can already be read by
+            other processes while the measurement is still running.
+
+        overview:
+            The decimation factors of the overview data (minimum, maximum,
+            mean and RMS value) stored together with new measurement data or
+            `None` to not store overview data
+
+        catalog:
+            The catalog to which the measurement file should be added
+            (after closing the file) or `None` to not add the file to a
+            catalog
+
+        live:
+            Specifies if other processes (e.g. `StorageTail`) should be able
+            to read the file, while the storage writes to it. The storage
+            then releases the HDF5 lock of the file. Readers do not use
+            HDF5 SWMR (single writer, multiple reader), but reopen the file
+            to read the data flushed so far (see `flush_interval`).
+
         Example
         -------
 
@@ -136,6 +465,15 @@ class Storage:
 
         self.hdf: Optional[File] = None
         self.channels = channels
+        self.compression = (
+            Compression() if compression is None else compression
+        )
+        self.raw = raw
+        self.flush_interval = flush_interval
+        self.overview = overview
+        self.catalog = catalog
+        self.live = live
+        self.data: Optional[StorageData] = None
 
     def __enter__(self) -> StorageData:
         """Open the HDF file for writing"""
@@ -167,36 +505,109 @@ class Storage:
         self.close()
 
     def open(self) -> StorageData:
-        """Open and initialize the HDF file for writing"""
+        """Open and initialize the HDF file for writing
+
+        Examples
+        --------
+
+        >>> filepath = Path("test.hdf5")
+        >>> with Storage(filepath, StreamingConfiguration(first=True),
+        ...              Compression("blosc:lz4", level=5)) as storage:
+        ...     print(storage.acceleration.filters.complib)
+        blosc:lz4
+        >>> filepath.unlink()
+
+        Read the flushed data of a live storage in another process
+
+        >>> from subprocess import run
+        >>> from sys import executable
+        >>> read = ("from tables import open_file; "
+        ...         "print(open_file('test.hdf5').root.acceleration.nrows)")
+        >>> with Storage(filepath, StreamingConfiguration(first=True),
+        ...              live=True) as storage:
+        ...     storage.add_streaming_data(StreamingData(
+        ...         values=[1, 2, 3], counter=1, timestamp=0))
+        ...     storage.hdf.flush()
+        ...     print(run([executable, "-c", read], capture_output=True,
+        ...               text=True).stdout.strip())
+        3
+        >>> filepath.unlink()
+
+        """
 
         try:
             self.hdf = open_file(
                 self.filepath,
                 mode="a",
-                filters=Filters(4, "zlib"),
+                filters=self.compression.filters(),
                 title="STH Measurement Data",
+                **self.compression.parameters(),
             )
         except (HDF5ExtError, OSError) as error:
             raise StorageException(
                 f"Unable to open file “{self.filepath}”: {error}"
             ) from error
 
-        return StorageData(self.hdf, self.channels)
+        if self.live:
+            release_file_lock(self.hdf)
+
+        self.data = StorageData(
+            self.hdf,
+            self.channels,
+            self.raw,
+            self.flush_interval,
+            self.overview,
+        )
+
+        return self.data
 
     def close(self) -> None:
-        """Close the HDF file"""
+        """Close the HDF file
+
+        Examples
+        --------
+
+        >>> filepath = Path("test.hdf5")
+        >>> storage = Storage(filepath, StreamingConfiguration(first=True))
+        >>> data = storage.open()
+        >>> def finish():
+        ...     raise OSError("Disk full")
+        >>> data.overview.finish = finish
+        >>> storage.close()
+        Traceback (most recent call last):
+            ...
+        OSError: Disk full
+        >>> bool(storage.hdf.isopen), storage.data
+        (False, None)
+        >>> filepath.unlink()
+
+        """
 
         if isinstance(self.hdf, File) and self.hdf.isopen:
-            self.hdf.close()
+            try:
+                if self.data is not None:
+                    self.data.overview.finish()
+                    if self.channels and self.data.acceleration.nrows > 0:
+                        self.data.fit_timing()
+            finally:
+                # Always release the file, even if finalizing the data fails
+                self.data = None
+                self.hdf.close()
+            if self.catalog is not None:
+                self.catalog.add(self.filepath)
+        self.data = None
 
 
 class StorageData:
     """Store HDF acceleration data"""
 
-    def __init__(
+    def __init__(  # pylint: disable=too-many-arguments
         self,
         file_handle: File,
         channels: Optional[StreamingConfiguration] = None,
+        raw: bool = False,
+        flush_interval: Optional[float] = None,
+        overview: Optional[Sequence[int]] = None,
     ) -> None:
         """Create new storage data object using the given file handle
 
@@ -211,6 +622,20 @@ class StorageData:
             axes data should be taken from an existing valid file at
             `filepath`.
 
+        raw:
+            Specifies if new data should be stored as raw 16 bit ADC values.
+            For existing files this value will be determined from the type
+            of the stored data.
+
+        flush_interval:
+            The maximum time in seconds between two flushes of added
+            streaming data or `None` to disable periodic flushes
+
+        overview:
+            The decimation factors of the overview data for new files or
+            `None` to not store overview data. For existing files the
+            object uses the factors of the stored overview data.
+
         Examples
         --------
 
@@ -230,19 +655,36 @@ class StorageData:
 
         >>> filepath.unlink()
 
+        Store raw ADC values
+
+        >>> with Storage(filepath, StreamingConfiguration(first=True),
+        ...              raw=True) as data:
+        ...     data.add_streaming_data(streaming_data)
+        ...     print(data.acceleration.coldtypes["x"])
+        uint16
+        >>> with Storage(filepath) as data:
+        ...     data.raw
+        True
+
+        >>> filepath.unlink()
+
         """
 
         self.hdf = file_handle
         self.start_time: Optional[float] = None
+        self.flush_interval = flush_interval
+        self.last_flush = monotonic()
 
         name = "acceleration"
         if channels:
             self.axes = channels.axes()
+            self.raw = raw
+            column = UInt16Col if raw else Float32Col
             self.acceleration = self.hdf.create_table(
                 self.hdf.root,
                 name=name,
                 description=create_acceleration_description(
-                    attributes={axis: Float32Col() for axis in self.axes}
+                    attributes={axis: column() for axis in self.axes}
                 ),
                 title="STH Acceleration Data",
             )
@@ -257,7 +699,13 @@ class StorageData:
                     except AttributeError:
                         pass
 
-                self.start_time = self.acceleration[-1][1] / 1000
+                coldtypes = self.acceleration.coldtypes
+                self.raw = all(
+                    coldtypes[axis] == dtype(uint16) for axis in self.axes
+                )
+
+                if self.acceleration.nrows > 0:
+                    self.start_time = self.acceleration[-1][1] / 1000
 
             except NoSuchNodeError as error:
                 raise StorageException(
@@ -265,6 +713,25 @@ class StorageData:
                     f"incorrect format: {error}"
                 ) from error
 
+        self.overview = Overview(
+            self.hdf, self.axes, overview if channels else None
+        )
+        # Fit the timing of new data while it is stored
+        self.timing_fit = (
+            TimingFit(self._rows_per_message()) if channels else None
+        )
+
+        self.voltage: Optional[Table] = None
+        # Voltage data received before the start time of the measurement
+        self.pending_voltage: List[
+            Tuple[StreamingBlock, Optional[Callable[[ndarray], ndarray]]]
+        ] = []
+        if not channels:
+            try:
+                self.voltage = self.hdf.get_node("/voltage")
+            except NoSuchNodeError:
+                pass
+
     def add_streaming_data(
         self,
         streaming_data: StreamingData,
@@ -320,11 +787,11 @@ class StorageData:
         counter = streaming_data.counter
 
         if self.start_time is None:
-            self.start_time = timestamp
-            self.acceleration.attrs["Start_Time"] = datetime.now().isoformat()
+            self._start(timestamp)
 
         assert isinstance(self.start_time, (int, float))
 
+        first_row = self.acceleration.nrows
         row = self.acceleration.row
         timestamp = (timestamp - self.start_time) * 1_000_000
 
@@ -335,12 +802,293 @@ class StorageData:
                 row["counter"] = counter
                 row[axis] = value
                 row.append()
+                self.overview.append((counter, timestamp, value))
         else:
             row["timestamp"] = timestamp
             row["counter"] = counter
             for accelertation_type, value in zip(self.axes, values):
                 row[accelertation_type] = value
             row.append()
+            self.overview.append(
+                (counter, timestamp, *values[: len(self.axes)])
+            )
+
+        rows = self.acceleration.nrows - first_row
+        self._fit_rows(first_row, full(rows, counter), full(rows, timestamp))
+        self._flush_periodically()
+
+    def add_streaming_block(
+        self,
+        block: StreamingBlock,
+        conversion: Optional[Callable[[ndarray], ndarray]] = None,
+    ) -> None:
+        """Add a block of streaming data to the storage object
+
+        Parameters
+        ----------
+
+        block:
+            The streaming data that should be added to the storage
+
+        conversion:
+            An optional function that converts the (raw) values of the block
+            before they are stored (e.g. into multiples of g₀)
+
+        Examples
+        --------
+
+        >>> from numpy import array, uint8, uint32
+
+        >>> block = StreamingBlock(
+        ...     counters=array([21, 22], dtype=uint8),
+        ...     timestamps=array([1.0, 1.5]),
+        ...     values=array([[1, 2, 3], [4, 5, 6]], dtype=uint16),
+        ...     lost=array([0, 0], dtype=uint32),
+        ...     configuration=StreamingConfiguration(first=True))
+        >>> filepath = Path("test.hdf5")
+        >>> with Storage(filepath, StreamingConfiguration(first=True),
+        ...              raw=True) as storage:
+        ...     storage.add_streaming_block(block)
+        ...     storage.acceleration.flush()
+        ...     print(storage.acceleration.col("x"))
+        ...     print(storage.acceleration.col("timestamp"))
+        [1 2 3 4 5 6]
+        [     0      0      0 500000 500000 500000]
+        >>> filepath.unlink()
+
+        >>> with Storage(filepath, StreamingConfiguration(first=True)
+        ...             ) as storage:
+        ...     storage.add_streaming_block(block,
+        ...                                 conversion=lambda raw: raw / 2)
+        ...     storage.acceleration.flush()
+        ...     print(storage.acceleration.col("x"))
+        [0.5 1.  1.5 2.  2.5 3. ]
+        >>> filepath.unlink()
+
+        """
+
+        if len(block) <= 0:
+            return
+
+        self.add_rows(self.convert_block(block, conversion))
+
+    def convert_block(
+        self,
+        block: StreamingBlock,
+        conversion: Optional[Callable[[ndarray], ndarray]] = None,
+    ) -> ndarray:
+        """Convert a block of streaming data into rows of the storage
+
+        The first converted block sets the start time of the measurement.
+
+        Parameters
+        ----------
+
+        block:
+            The streaming data that should be converted
+
+        conversion:
+            An optional function that converts the (raw) values of the block
+            (e.g. into multiples of g₀)
+
+        Returns
+        -------
+
+        A structured array containing the rows for the streaming data
+
+        """
+
+        if self.start_time is None and len(block) > 0:
+            self._start(float(block.timestamps[0]))
+
+        return convert_streaming_block(
+            block,
+            self.axes,
+            self.acceleration.dtype,
+            0 if self.start_time is None else self.start_time,
+            conversion,
+        )
+
+    def add_rows(self, data: ndarray) -> None:
+        """Add rows of acceleration data to the storage
+
+        Parameters
+        ----------
+
+        data:
+            A structured array containing rows of acceleration data (e.g.
+            the result of `convert_block`)
+
+        """
+
+        if len(data) <= 0:
+            return
+
+        first_row = self.acceleration.nrows
+        self.acceleration.append(data)
+        self.overview.add(data)
+        self._fit_rows(first_row, data["counter"], data["timestamp"])
+        self._flush_periodically()
+
+    def _fit_rows(
+        self, first_row: int, counters: ndarray, timestamps: ndarray
+    ) -> None:
+        """Add the counters and timestamps of new rows to the timing fit
+
+        Parameters
+        ----------
+
+        first_row:
+            The index of the first new row
+
+        counters:
+            The counter of every new row
+
+        timestamps:
+            The timestamp of every new row
+
+        """
+
+        if self.timing_fit is None:
+            return
+
+        # Only use the first row of every message
+        step = self.timing_fit.rows_per_message
+        start = -first_row % step
+        self.timing_fit.add(counters[start::step], timestamps[start::step])
+
+    def add_voltage_block(
+        self,
+        block: StreamingBlock,
+        conversion: Optional[Callable[[ndarray], ndarray]] = None,
+    ) -> None:
+        """Add a block of voltage data to the storage object
+
+        The voltage data is stored in the table `voltage`, which uses the
+        same start time as the acceleration data. Only acceleration data
+        determines the start time: the storage keeps voltage data until the
+        first acceleration data arrives. Voltage data received before the
+        first acceleration data has a negative timestamp.
+
+        Parameters
+        ----------
+
+        block:
+            The voltage data that should be added to the storage
+
+        conversion:
+            An optional function that converts the raw values of the block
+            before they are stored (e.g. into volts); without a conversion
+            the storage stores the raw 16 bit values
+
+        Examples
+        --------
+
+        >>> from numpy import array, uint8, uint32
+
+        >>> def create_block(timestamps, values, channels):
+        ...     return StreamingBlock(
+        ...         counters=array(range(len(timestamps)), dtype=uint8),
+        ...         timestamps=array(timestamps),
+        ...         values=array(values, dtype=uint16),
+        ...         lost=array([0] * len(timestamps), dtype=uint32),
+        ...         configuration=channels)
+        >>> channels = StreamingConfiguration(first=True)
+        >>> voltage = create_block([2.0, 2.5], [[10, 11, 12], [13, 14, 15]],
+        ...                        channels)
+        >>> acceleration = create_block([1.5], [[1, 2, 3]], channels)
+        >>> filepath = Path("test.hdf5")
+        >>> with Storage(filepath, channels) as storage:
+        ...     storage.add_streaming_block(acceleration)
+        ...     storage.add_voltage_block(voltage,
+        ...                               conversion=lambda raw: raw / 10)
+        >>> with Storage(filepath) as storage:
+        ...     print(storage.voltage.col("voltage_1"))
+        ...     print(storage.voltage.col("timestamp"))
+        [1.  1.1 1.2 1.3 1.4 1.5]
+        [ 500000  500000  500000 1000000 1000000 1000000]
+        >>> filepath.unlink()
+
+        Voltage data that arrives before the acceleration data does not
+        change the start time of the measurement
+
+        >>> voltage = create_block([1.75, 2.25], [[1, 2, 3], [4, 5, 6]],
+        ...                        channels)
+        >>> acceleration = create_block([2.0, 2.25, 2.5],
+        ...                             [[1, 2, 3], [4, 5, 6], [7, 8, 9]],
+        ...                             channels)
+        >>> with Storage(filepath, channels) as storage:
+        ...     storage.add_voltage_block(voltage)
+        ...     storage.voltage is None
+        ...     storage.add_streaming_block(acceleration)
+        True
+        >>> with Storage(filepath) as storage:
+        ...     print(storage.acceleration.col("timestamp")[::3])
+        ...     print(storage.voltage.col("timestamp")[::3])
+        [     0 250000 500000]
+        [-250000  250000]
+        >>> filepath.unlink()
+
+        """
+
+        if len(block) <= 0:
+            return
+
+        if self.start_time is None:
+            self.pending_voltage.append((block, conversion))
+            return
+
+        columns = voltage_columns(block.configuration)
+        if self.voltage is None:
+            column = UInt16Col if conversion is None else Float32Col
+            self.voltage = self.hdf.create_table(
+                self.hdf.root,
+                name="voltage",
+                description=create_voltage_description(
+                    attributes={name: column() for name in columns}
+                ),
+                title="STH Voltage Data",
+            )
+
+        self.voltage.append(
+            convert_streaming_block(
+                block,
+                columns,
+                self.voltage.dtype,
+                self.start_time,
+                conversion,
+            )
+        )
+        self._flush_periodically()
+
+    def _start(self, timestamp: float) -> None:
+        """Set the start time of the measurement
+
+        Parameters
+        ----------
+
+        timestamp:
+            The timestamp of the first acceleration data in seconds
+
+        """
+
+        self.start_time = timestamp
+        self.acceleration.attrs["Start_Time"] = datetime.now().isoformat()
+
+        pending, self.pending_voltage = self.pending_voltage, []
+        for block, conversion in pending:
+            self.add_voltage_block(block, conversion)
+
+    def _flush_periodically(self) -> None:
+        """Flush the measurement data, if the flush interval elapsed"""
+
+        if self.flush_interval is None:
+            return
+
+        now = monotonic()
+        if now - self.last_flush >= self.flush_interval:
+            self.hdf.flush()
+            self.last_flush = now
 
     def add_acceleration_meta(self, name: str, value: str) -> None:
         """Add acceleration metadata
@@ -398,7 +1146,311 @@ class StorageData:
             "Sensor_Range", f"± {sensor_range_positive} g₀"
         )
 
-    def write_sample_rate(self, adc_configuration: ADCConfiguration) -> None:
+        if self.raw:
+            # The sensor maps the maximum negative acceleration to 0 and the
+            # maximum positive acceleration to the maximum ADC value
+            for axis in self.axes:
+                self.write_conversion(
+                    axis,
+                    slope=sensor_range_in_g / ADC_MAX_VALUE,
+                    offset=-sensor_range_in_g / 2,
+                )
+
+    def write_conversion(self, axis: str, slope: float, offset: float) -> None:
+        """Store the conversion from raw values into multiples of g₀
+
+        The acceleration of an axis is calculated from a raw value using the
+        formula: `slope · raw + offset`
+
+        Parameters
+        ----------
+
+        axis:
+            The axis for which the conversion should be stored
+
+        slope:
+            The factor the raw value will be multiplied with
+
+        offset:
+            The value added to the scaled raw value
+
+        Examples
+        --------
+
+        >>> filepath = Path("test.hdf5")
+        >>> with Storage(filepath, StreamingConfiguration(first=True),
+        ...              raw=True) as storage:
+        ...     storage.write_sensor_range(200)
+        ...     slope, offset = storage.conversion("x")
+        >>> round(slope * 0xffff + offset)
+        100
+        >>> offset
+        -100.0
+        >>> filepath.unlink()
+
+        """
+
+        attributes = self.acceleration.attrs
+        attributes[f"Conversion_Slope_{axis}"] = float(slope)
+        attributes[f"Conversion_Offset_{axis}"] = float(offset)
+
+    def conversion(self, axis: str) -> Tuple[float, float]:
+        """Get the conversion from raw values into multiples of g₀
+
+        Parameters
+        ----------
+
+        axis:
+            The axis for which the conversion should be returned
+
+        Returns
+        -------
+
+        The slope and offset of the conversion
+
+        Raises
+        ------
+
+        A `StorageException`, if the conversion of the axis is unknown
+
+        """
+
+        attributes = self.acceleration.attrs
+        try:
+            return (
+                float(attributes[f"Conversion_Slope_{axis}"]),
+                float(attributes[f"Conversion_Offset_{axis}"]),
+            )
+        except KeyError as error:
+            raise StorageException(
+                f"Conversion of axis “{axis}” in file "
+                f"“{self.hdf.filename}” is unknown"
+            ) from error
+
+    def read(
+        self,
+        start: Optional[int] = None,
+        stop: Optional[int] = None,
+        axes: Optional[Sequence[str]] = None,
+    ) -> ndarray:
+        """Read acceleration data in multiples of g₀
+
+        For raw data the method converts the values using the stored
+        conversion (slope and offset) of each axis.
+
+        Parameters
+        ----------
+
+        start:
+            The index of the first row that should be read
+
+        stop:
+            The index after the last row that should be read
+
+        axes:
+            The axes that should be read or `None` to read all axes
+
+        Returns
+        -------
+
+        A structured array containing the counter, timestamp and acceleration
+        values of each (selected) axis
+
+        Examples
+        --------
+
+        >>> filepath = Path("test.hdf5")
+        >>> with Storage(filepath, StreamingConfiguration(first=True),
+        ...              raw=True) as storage:
+        ...     storage.write_sensor_range(200)
+        ...     storage.add_streaming_data(
+        ...         StreamingData(values=[0, 2**15, 2**16 - 1], counter=1,
+        ...                       timestamp=0))
+        >>> with Storage(filepath) as storage:
+        ...     data = storage.read()
+        >>> data["x"].round(2)
+        array([-100.,    0.,  100.], dtype=float32)
+        >>> data["counter"]
+        array([1, 1, 1], dtype=uint8)
+        >>> filepath.unlink()
+
+        Read a single axis
+
+        >>> with Storage(filepath, StreamingConfiguration(
+        ...         first=True, second=True, third=True)) as storage:
+        ...     storage.add_streaming_data(
+        ...         StreamingData(values=[1, 2, 3], counter=1, timestamp=0))
+        ...     print(storage.read(axes=["y"]).dtype.names)
+        ...     try:
+        ...         storage.read(axes=["a"])
+        ...     except ValueError as error:
+        ...         print(error)
+        ('counter', 'timestamp', 'y')
+        Unknown axis “a” (available axes: x, y, z)
+        >>> filepath.unlink()
+
+        """
+
+        selected = self.axes if axes is None else list(axes)
+        for axis in selected:
+            if axis not in self.axes:
+                raise ValueError(
+                    f"Unknown axis “{axis}” (available axes: "
+                    f"{', '.join(self.axes)})"
+                )
+
+        self.acceleration.flush()
+        data = self.acceleration.read(start, stop)
+
+        if not self.raw and selected == self.axes:
+            return data
+
+        converted = empty(
+            len(data),
+            dtype=[
+                ("counter", data.dtype["counter"]),
+                ("timestamp", data.dtype["timestamp"]),
+                *((axis, float32) for axis in selected),
+            ],
+        )
+        converted["counter"] = data["counter"]
+        converted["timestamp"] = data["timestamp"]
+        for axis in selected:
+            if self.raw:
+                slope, offset = self.conversion(axis)
+                converted[axis] = data[axis] * slope + offset
+            else:
+                converted[axis] = data[axis]
+
+        return converted
+
+    # pylint: disable=too-many-locals
+
+    def read_overview(
+        self,
+        factor: int,
+        start: Optional[int] = None,
+        stop: Optional[int] = None,
+        axes: Optional[Sequence[str]] = None,
+    ) -> ndarray:
+        """Read overview data in multiples of g₀
+
+        Parameters
+        ----------
+
+        factor:
+            The decimation factor of the overview level
+
+        start:
+            The index of the first overview record that should be read
+
+        stop:
+            The index after the last overview record that should be read
+
+        axes:
+            The axes that should be read or `None` to read all axes
+
+        Returns
+        -------
+
+        A structured array containing the timestamp of the first value, the
+        number of values and the minimum, maximum, mean and RMS value of
+        each (selected) axis
+
+        Examples
+        --------
+
+        >>> from numpy import arange, uint8, uint32, zeros
+
+        >>> block = StreamingBlock(
+        ...     counters=arange(100, dtype=uint8),
+        ...     timestamps=arange(100) / 1000,
+        ...     values=(arange(300, dtype=uint16) % 2 * (2**16 - 1)
+        ...             ).reshape(100, 3),
+        ...     lost=zeros(100, dtype=uint32),
+        ...     configuration=StreamingConfiguration(first=True))
+        >>> filepath = Path("test.hdf5")
+        >>> with Storage(filepath, StreamingConfiguration(first=True),
+        ...              raw=True, overview=(10, 100)) as storage:
+        ...     storage.write_sensor_range(200)
+        ...     storage.add_streaming_block(block)
+        >>> with Storage(filepath) as storage:
+        ...     overview = storage.read_overview(100)
+        ...     storage.overview.factors
+        [10, 100]
+        >>> len(overview)
+        3
+        >>> overview["count"]
+        array([100, 100, 100], dtype=uint32)
+        >>> for statistic in ("min", "max", "mean", "rms"):
+        ...     print(statistic, overview[f"x_{statistic}"].round(1))
+        min [-100. -100. -100.]
+        max [100. 100. 100.]
+        mean [0. 0. 0.]
+        rms [100. 100. 100.]
+        >>> filepath.unlink()
+
+        """
+
+        if factor not in self.overview.tables:
+            raise ValueError(
+                f"No overview data for decimation factor “{factor}” "
+                f"in file “{self.hdf.filename}”"
+            )
+
+        selected = self.axes if axes is None else list(axes)
+        for axis in selected:
+            if axis not in self.axes:
+                raise ValueError(
+                    f"Unknown axis “{axis}” (available axes: "
+                    f"{', '.join(self.axes)})"
+                )
+
+        table = self.overview.tables[factor]
+        table.flush()
+        data = table.read(start, stop)
+
+        overview = empty(len(data), dtype=overview_dtype(selected, float32))
+        overview["timestamp"] = data["timestamp"]
+        overview["count"] = data["count"]
+        for axis in selected:
+            lowest, highest, mean, rms = (
+                data[f"{axis}_{statistic}"].astype(float64)
+                for statistic in Overview.STATISTICS
+            )
+            if self.raw:
+                slope, offset = self.conversion(axis)
+                # RMS(a·x + b)² = a²·RMS(x)² + 2·a·b·mean(x) + b²
+                rms = sqrt(
+                    maximum(
+                        slope**2 * rms**2
+                        + 2 * slope * offset * mean
+                        + offset**2,
+                        0,
+                    )
+                )
+                mean = mean * slope + offset
+                lowest, highest = (
+                    lowest * slope + offset,
+                    highest * slope + offset,
+                )
+                lowest, highest = minimum(lowest, highest), maximum(
+                    lowest, highest
+                )
+            overview[f"{axis}_min"] = lowest
+            overview[f"{axis}_max"] = highest
+            overview[f"{axis}_mean"] = mean
+            overview[f"{axis}_rms"] = rms
+
+        return overview
+
+    # pylint: enable=too-many-locals
+
+    def write_sample_rate(
+        self,
+        adc_configuration: ADCConfiguration,
+        voltage: Optional[StreamingConfiguration] = None,
+    ) -> None:
         """Store the sample rate of the ADC
 
         Parameters
@@ -407,6 +1459,10 @@ class StorageData:
         adc_configuration:
             The current ADC configuration of the sensor device
 
+        voltage:
+            The enabled voltage channels or `None`, if the sensor device
+            only streams acceleration data
+
         >>> filepath = Path("test.hdf5")
         >>> adc_configuration = ADCConfiguration(
         ...     set=True,
@@ -417,22 +1473,172 @@ class StorageData:
         ...              StreamingConfiguration(first=True)) as storage:
         ...     storage.write_sample_rate(adc_configuration)
         ...     print(storage.acceleration.attrs["Sample_Rate"])
+        ...     print(round(storage.timing_fit.period))
         1724.14 Hz (Prescaler: 2, Acquisition Time: 16, Oversampling Rate: 256)
+        1740
         >>> filepath.unlink()
 
-        """
+        The voltage channels reduce the sample rate of the acceleration data
 
-        sample_rate = adc_configuration.sample_rate()
+        >>> with Storage(filepath,
+        ...              StreamingConfiguration(first=True)) as storage:
+        ...     storage.write_sample_rate(
+        ...         adc_configuration, StreamingConfiguration(first=True))
+        ...     print(storage.acceleration.attrs["Sample_Rate"])
+        ...     print(round(storage.timing_fit.period))
+        862.07 Hz (Prescaler: 2, Acquisition Time: 16, Oversampling Rate: \
+256, Voltage Channels: 1)
+        3480
+        >>> filepath.unlink()
 
-        adc_config_text = ", ".join([
-            f"Prescaler: {adc_configuration.prescaler()}",
-            f"Acquisition Time: {adc_configuration.acquisition_time()}",
-            f"Oversampling Rate: {adc_configuration.oversampling_rate()}",
-        ])
+        """
 
+        self.acceleration.attrs["Reference_Voltage"] = (
+            adc_configuration.reference_voltage()
+        )
+
+        channels = (
+            None
+            if voltage is None
+            else StreamingConfiguration(*(axis in self.axes for axis in "xyz"))
+        )
         self.add_acceleration_meta(
-            "Sample_Rate", f"{sample_rate:.2f} Hz ({adc_config_text})"
+            "Sample_Rate",
+            describe_sample_rate(adc_configuration, channels, voltage),
         )
+        if self.timing_fit is not None:
+            # Unwrap the counters of long gaps using the nominal period
+            self.timing_fit.period = self._nominal_period()
+
+    def fit_timing(self) -> Optional[TimingModel]:
+        """Reconstruct the timing of the stored measurement data
+
+        The method fits the time between two messages using the message
+        counters and receive times of all stored data. For new data the
+        method uses the fit that the storage updates while it stores the
+        data; otherwise it reads the stored data in chunks. If the file is
+        writable, then the method also stores the fitted model in the node
+        `/timing`. The class `Storage` calls this method automatically
+        before it closes a new measurement file.
+
+        Returns
+        -------
+
+        The fitted timing model or `None`, if the file does not contain at
+        least two messages
+
+        Examples
+        --------
+
+        >>> filepath = Path("test.hdf5")
+        >>> with Storage(filepath, StreamingConfiguration(first=True)) as data:
+        ...     data.write_sample_rate(ADCConfiguration(
+        ...         prescaler=2, acquisition_time=8, oversampling_rate=64))
+        ...     for counter in range(100):
+        ...         if counter != 50:
+        ...             data.add_streaming_data(StreamingData(
+        ...                 values=[1, 2, 3], counter=counter,
+        ...                 timestamp=counter * 0.000315))
+
+        >>> with Storage(filepath) as data:
+        ...     model = data.timing()
+        >>> model
+        Sample Rate: 9523.81 Hz, Jitter: 0.00 µs, Drift: 0.05 ppm, Gaps: 1
+        >>> model.timestamps(0, 6)
+        array([-210., -105.,    0.,  105.,  210.,  315.])
+
+        Fit the timing of an existing file
+
+        >>> with Storage(filepath) as data:
+        ...     data.hdf.remove_node("/timing")
+        ...     data.fit_timing()
+        Sample Rate: 9523.81 Hz, Jitter: 0.00 µs, Drift: 0.05 ppm, Gaps: 1
+        >>> filepath.unlink()
+
+        """
+
+        self.acceleration.flush()
+        rows_per_message = self._rows_per_message()
+
+        nominal_period = self._nominal_period()
+
+        nrows = self.acceleration.nrows
+        messages = (nrows + rows_per_message - 1) // rows_per_message
+        fit = self.timing_fit
+        if fit is None or fit.messages + fit.pending != messages:
+            # The fit does not contain all stored data: Read the data in
+            # chunks to limit the memory usage for long measurements
+            fit = TimingFit(rows_per_message, period=nominal_period)
+            chunk = rows_per_message * fit.chunk_size * 10
+            for start in range(0, nrows, chunk):
+                # Reading whole rows is about twice as fast as reading two
+                # columns
+                messages = self.acceleration.read(
+                    start, min(start + chunk, nrows), step=rows_per_message
+                )
+                fit.add(messages["counter"], messages["timestamp"])
+
+        model = fit.model(nominal_period)
+        if model is not None and self.hdf.mode != "r":
+            model.store(self.hdf)
+
+        return model
+
+    def _rows_per_message(self) -> int:
+        """Get the number of rows that store the data of a single message
+
+        Returns
+        -------
+
+        The number of stored values of a single message (single axis) or
+        `1` (multiple axes)
+
+        """
+
+        return 3 if len(self.axes) == 1 else 1
+
+    def _nominal_period(self) -> Optional[float]:
+        """Get the nominal time between two messages in microseconds
+
+        Returns
+        -------
+
+        The period according to the stored sample rate or `None`, if the
+        period is unknown
+
+        """
+
+        # The ADC sample rate is only equal to the rate of stored values,
+        # if the sensor node streams the data of a single axis
+        rows_per_message = self._rows_per_message()
+        if (
+            rows_per_message == 1
+            or "Sample_Rate" not in self.acceleration.attrs
+        ):
+            return None
+
+        match = search(
+            r"\d+(\.\d+)?", str(self.acceleration.attrs["Sample_Rate"])
+        )
+        if match is None:
+            return None
+
+        return rows_per_message / float(match.group()) * 1_000_000
+
+    def timing(self) -> Optional[TimingModel]:
+        """Get the timing model of the stored measurement data
+
+        Returns
+        -------
+
+        The stored timing model or a newly fitted model, if the file does
+        not contain a timing model
+
+        """
+
+        model = TimingModel.load(self.hdf)
+
+        return self.fit_timing() if model is None else model
 
     def dataloss_stats(self) -> tuple[int, int]:
         """Determine number of lost and received messages
@@ -471,23 +1677,24 @@ class StorageData:
 
         """
 
-        # Write back acceleration data so we can iterate over it
+        # Write back acceleration data so we can read it
         self.acceleration.flush()
 
         lost_messages = 0
-        last_counter = int(self.acceleration[0][0])
-
-        for record in self.acceleration:
-            counter = int(record[0])
-
-            if counter == last_counter:
-                continue  # Skip data with same message counter
-
-            lost_messages += (counter - last_counter) % 256 - 1
-
-            last_counter = counter
-
         number_rows = len(self.acceleration)
+        chunk_size = 1_000_000
+
+        if number_rows > 0:
+            last_counter = int(self.acceleration[0]["counter"])
+            for start in range(0, number_rows, chunk_size):
+                counters = self.acceleration.read(
+                    start, start + chunk_size, field="counter"
+                ).astype(int)
+                steps = diff(counters, prepend=last_counter) % 256
+                # Skip data with same message counter
+                lost_messages += int((steps[steps != 0] - 1).sum())
+                last_counter = int(counters[-1])
+
         # 3 axes → 1 message ↔ 1 row
         # 2 axes → 1 message ↔ 1 row
         # 1 axis → 1 message ↔ 3 rows
@@ -578,11 +1785,15 @@ class StorageData:
         rows_per_message = 3 if len(self.axes) == 1 else 1
         if len(self.acceleration) > 1:
             measurement_time_in_us = int(self.acceleration[-1]["timestamp"])
-            return rows_per_message * messages * 10**6 / measurement_time_in_us
+            if measurement_time_in_us > 0:
+                values = rows_per_message * messages
+                return values * 10**6 / measurement_time_in_us
 
         return 0
 
 
+# pylint: enable=too-many-instance-attributes
+
 # -- Main ---------------------------------------------------------------------
 
 if __name__ == "__main__":
@@ -0,0 +1,788 @@
+"""Reconstruct sample timestamps from message counters
+
+The timestamps of measurement data are the times at which the computer
+received the corresponding CAN messages. All values of a single message
+therefore use the same timestamp, and delays of the CAN adapter, USB and
+operating system (jitter) also affect the timestamps.
+
+The sensor node, on the other hand, samples data with a constant rate and
+numbers every message with an 8 bit counter. The function `fit_timing`
+uses the (unwrapped) message counters and the receive times to estimate the
+actual time between two messages. The resulting `TimingModel` then assigns
+a timestamp on a uniform time grid to every stored value.
+"""
+
+# -- Imports ------------------------------------------------------------------
+
+from __future__ import annotations
+
+from math import nan, sqrt
+from typing import List, Optional, Tuple
+
+from numpy import (
+    arange,
+    array,
+    bincount,
+    column_stack,
+    concatenate,
+    cumsum,
+    diff,
+    flatnonzero,
+    float64,
+    int64,
+    median,
+    ndarray,
+    rint,
+    searchsorted,
+    zeros,
+)
+from tables import Array, File, NoSuchNodeError
+
+# -- Functions ----------------------------------------------------------------
+
+
+def unwrap_counters(
+    counters: ndarray, timestamps: ndarray, period: Optional[float] = None
+) -> ndarray:
+    """Convert 8 bit message counters into continuous message numbers
+
+    Parameters
+    ----------
+
+    counters:
+        The counter of every message
+
+    timestamps:
+        The receive time of every message
+
+    period:
+        The (approximate) time between two messages or `None` to estimate
+        the time using the given data
+
+    Returns
+    -------
+
+    The number of every message relative to the first message. Gaps of 256
+    or more lost messages are detected using the receive times.
+
+    Examples
+    --------
+
+    >>> counters = array([254, 255, 0, 3, 4, 4])
+    >>> timestamps = array([0, 10, 20, 50, 60, 2630])
+    >>> unwrap_counters(counters, timestamps)
+    array([  0,   1,   2,   5,   6, 262])
+
+    """
+
+    if len(counters) < 2:
+        return zeros(len(counters), dtype=int64)
+
+    steps = diff(counters.astype(int64)) % 256
+    # Two consecutive messages never share the same counter value
+    steps[steps == 0] = 256
+    durations = diff(timestamps.astype(float64))
+
+    estimate = _estimate_period(steps, durations) if period is None else period
+    wraps = _count_wraps(steps, durations, estimate)
+    if period is None and estimate > 0:
+        # Refine the estimate without the gaps that might contain wraps
+        estimate = _refine_period(
+            steps + 256 * wraps, durations, wraps > 0, estimate
+        )
+        wraps = _count_wraps(steps, durations, estimate)
+
+    return concatenate((zeros(1, dtype=int64), cumsum(steps + 256 * wraps)))
+
+
+def _count_wraps(
+    steps: ndarray, durations: ndarray, estimate: float
+) -> ndarray:
+    """Count the hidden counter wraps between consecutive messages"""
+
+    if estimate <= 0:
+        return zeros(len(steps), dtype=int64)
+
+    wraps = rint((durations / estimate - steps) / 256).clip(min=0)
+    return wraps.astype(int64)
+
+
+def _estimate_period(steps: ndarray, durations: ndarray) -> float:
+    """Estimate the time between two messages robustly
+
+    The function uses the median period of short windows of consecutive
+    messages. Windows that contain a long gap (with hidden counter wraps)
+    therefore do not influence the estimate, as long as they are rare.
+
+    Examples
+    --------
+
+    >>> steps = array([1] * 99)
+    >>> durations = array([10] * 49 + [3000] + [10] * 49)
+    >>> _estimate_period(steps, durations)
+    10.0
+
+    """
+
+    lag = min(32, len(steps))
+    numbers = concatenate(([0], cumsum(steps)))
+    times = concatenate(([0.0], cumsum(durations)))
+    periods = (times[lag:] - times[:-lag]) / (numbers[lag:] - numbers[:-lag])
+    return float(median(periods))
+
+
+def _refine_period(
+    corrected: ndarray,
+    durations: ndarray,
+    uncertain: ndarray,
+    estimate: float,
+) -> float:
+    """Fit the time between two messages inside runs without long gaps
+
+    If no run contains more than a single message, then the function returns
+    the given estimate unchanged.
+
+    Examples
+    --------
+
+    >>> corrected = array([1, 1, 1, 2, 1, 1])
+    >>> durations = array([10, 10, 10, 99999, 10, 10])
+    >>> _refine_period(corrected, durations, corrected > 1, 12.0)
+    10.0
+
+    """
+
+    numbers = concatenate(([0], cumsum(corrected))).astype(float64)
+    times = concatenate(([0.0], cumsum(durations)))
+    runs = concatenate(([0], cumsum(uncertain)))
+    sizes = bincount(runs)
+    numbers -= (bincount(runs, numbers) / sizes)[runs]
+    times -= (bincount(runs, times) / sizes)[runs]
+    squares = float((numbers * numbers).sum())
+    if squares <= 0:
+        return estimate
+    return float((numbers * times).sum()) / squares
+
+
+def fit_timing(
+    counters: ndarray,
+    timestamps: ndarray,
+    rows_per_message: int = 1,
+    nominal_period: Optional[float] = None,
+) -> Optional[TimingModel]:
+    """Fit the time between two messages using counters and receive times
+
+    Parameters
+    ----------
+
+    counters:
+        The counter of every message
+
+    timestamps:
+        The receive time of every message in microseconds
+
+    rows_per_message:
+        The number of consecutive rows that store the data of a single
+        message (e.g. `3` for measurement data of a single axis)
+
+    nominal_period:
+        The expected time between two messages in microseconds or `None`,
+        if the expected time is unknown
+
+    Returns
+    -------
+
+    The fitted timing model or `None`, if the data does not contain at least
+    two messages
+
+    Examples
+    --------
+
+    Messages with a period of 315 µs, a jitter of up to 200 µs and a gap of
+    300 lost messages
+
+    >>> from numpy.random import default_rng
+
+    >>> messages = concatenate((arange(1000), arange(1300, 2000)))
+    >>> jitter = default_rng(1).uniform(0, 200, len(messages))
+    >>> model = fit_timing(messages % 256, messages * 315 + jitter,
+    ...                    nominal_period=315 * 0.9999)
+    >>> round(model.period, 1)
+    315.0
+    >>> round(model.drift, -1)
+    100.0
+    >>> model.breakpoints.tolist()
+    [[0, 0], [1000, 1300]]
+    >>> timestamps = model.timestamps(998, 1002)
+    >>> diff(timestamps).round()
+    array([  315., 94815.,   315.])
+
+    """
+
+    fit = TimingFit(rows_per_message, period=nominal_period)
+    fit.add(counters, timestamps)
+
+    return fit.model(nominal_period)
+
+
+# -- Classes ------------------------------------------------------------------
+
+
+# pylint: disable=too-many-instance-attributes
+
+
+class TimingFit:
+    """Fit the time between two messages incrementally
+
+    The class stores the number of messages, the mean message number and
+    receive time and the sums of squared deviations from these means. It
+    computes these moments for a chunk of messages at once and merges them
+    with the moments of the previous messages. This means fitting the
+    timing only requires memory for a single chunk of messages, independent
+    of the length of the measurement. To keep the moments precise for long
+    measurements, the class uses the deviations of the receive times from a
+    reference line (determined by the first chunk) instead of the receive
+    times themselves.
+    """
+
+    def __init__(
+        self,
+        rows_per_message: int = 1,
+        *,
+        period: Optional[float] = None,
+        chunk_size: int = 10_000,
+    ) -> None:
+        """Initialize the fit using the given arguments
+
+        Parameters
+        ----------
+
+        rows_per_message:
+            The number of consecutive rows that store the data of a single
+            message
+
+        period:
+            The expected time between two messages in microseconds, which
+            is used to detect gaps of 256 or more lost messages, or `None`
+            to estimate the time using the added data
+
+        chunk_size:
+            The number of messages that the fit collects before it updates
+            the moments
+
+        Examples
+        --------
+
+        Adding the data in multiple parts returns the same model as fitting
+        all data at once
+
+        >>> from numpy.random import default_rng
+
+        >>> messages = concatenate((arange(1000), arange(1300, 2000)))
+        >>> times = messages * 315 + default_rng(1).uniform(0, 200, 1700)
+        >>> fit = TimingFit(rows_per_message=3, chunk_size=100)
+        >>> for start in range(0, 1700, 70):
+        ...     fit.add(messages[start:start + 70] % 256,
+        ...             times[start:start + 70])
+        >>> model = fit.model()
+        >>> other = fit_timing(messages % 256, times, rows_per_message=3)
+        >>> round(model.period, 6) == round(other.period, 6)
+        True
+        >>> round(model.jitter, 6) == round(other.jitter, 6)
+        True
+        >>> model.breakpoints.tolist()
+        [[0, 0], [3000, 1300]]
+
+        A long gap at the start of the measurement does not influence the
+        estimated period, even without a given period
+
+        >>> messages = concatenate((arange(3000), arange(6175, 20000)))
+        >>> times = messages * 315 + default_rng(1).uniform(0, 200, 16825)
+        >>> fit = TimingFit(rows_per_message=3)
+        >>> for start in range(0, 16825, 3333):
+        ...     fit.add(messages[start:start + 3333] % 256,
+        ...             times[start:start + 3333])
+        >>> fit.model(nominal_period=315)
+        Sample Rate: 9523.81 Hz, Jitter: 57.84 µs, Drift: -0.34 ppm, Gaps: 1
+
+        """
+
+        self.rows_per_message = rows_per_message
+        self.period = period
+        self.chunk_size = chunk_size
+
+        self.pending_counters: List[ndarray] = []
+        self.pending_timestamps: List[ndarray] = []
+        self.pending = 0
+
+        # Number, counter and receive time of the last processed message
+        self.last: Optional[Tuple[int, int, float]] = None
+        # Receive time of message 0 and time between two messages
+        self.reference: Optional[Tuple[float, float]] = None
+        self.messages = 0
+        self.index_mean = 0.0
+        self.deviation_mean = 0.0
+        self.index_squares = 0.0
+        self.deviation_squares = 0.0
+        self.products = 0.0
+        self.breakpoints: List[List[int]] = [[0, 0]]
+
+    def add(self, counters: ndarray, timestamps: ndarray) -> None:
+        """Add the data of messages to the fit
+
+        Parameters
+        ----------
+
+        counters:
+            The counter of every message
+
+        timestamps:
+            The receive time of every message in microseconds
+
+        """
+
+        if len(counters) <= 0:
+            return
+
+        self.pending_counters.append(counters)
+        self.pending_timestamps.append(timestamps)
+        self.pending += len(counters)
+        if self.pending >= self.chunk_size:
+            self._process()
+
+    def model(
+        self, nominal_period: Optional[float] = None
+    ) -> Optional[TimingModel]:
+        """Get the model for the data added so far
+
+        Parameters
+        ----------
+
+        nominal_period:
+            The expected time between two messages in microseconds or
+            `None`, if the expected time is unknown
+
+        Returns
+        -------
+
+        The fitted timing model or `None`, if the fit does not contain at
+        least two messages
+
+        """
+
+        self._process()
+        if self.messages < 2 or self.reference is None:
+            return None
+
+        offset, period = self.reference
+        slope = self.products / self.index_squares
+        residuals = max(self.deviation_squares - slope * self.products, 0.0)
+        period += slope
+
+        return TimingModel(
+            offset=offset + self.deviation_mean - slope * self.index_mean,
+            period=period,
+            rows_per_message=self.rows_per_message,
+            breakpoints=array(self.breakpoints, dtype=int64),
+            jitter=sqrt(residuals / self.messages),
+            drift=(
+                nan
+                if nominal_period is None
+                else (period / nominal_period - 1) * 1_000_000
+            ),
+        )
+
+    def _process(self) -> None:
+        """Update the moments using the data of the pending messages"""
+
+        if self.pending <= 0:
+            return
+
+        counters = concatenate(self.pending_counters)
+        message_times: ndarray = concatenate(self.pending_timestamps).astype(
+            float64
+        )
+        self.pending_counters, self.pending_timestamps = [], []
+        self.pending = 0
+
+        first = 0
+        period = self.period
+        if period is None and self.reference is not None:
+            period = self.reference[1]
+            if self.messages >= 2 and self.index_squares > 0:
+                period += self.products / self.index_squares
+        if self.last is not None:
+            # Unwrap the counters relative to the last processed message
+            number, counter, time = self.last
+            counters = concatenate((array([counter]), counters))
+            message_times = concatenate((array([time]), message_times))
+            first = 1
+        else:
+            number = 0
+
+        indices: ndarray = (
+            unwrap_counters(counters, message_times, period) + number
+        )
+        gaps: ndarray = flatnonzero(diff(indices) != 1) + 1
+        self.breakpoints.extend(
+            [
+                (self.messages + int(gap) - first) * self.rows_per_message,
+                int(indices[gap]),
+            ]
+            for gap in gaps
+        )
+        self.last = (
+            int(indices[-1]),
+            int(counters[-1]),
+            float(message_times[-1]),
+        )
+
+        indices = indices[first:].astype(float64)
+        message_times = message_times[first:]
+        if self.reference is None:
+            duration = indices[-1] - indices[0]
+            self.reference = (
+                float(message_times[0]),
+                (
+                    float((message_times[-1] - message_times[0]) / duration)
+                    if duration > 0
+                    else period or 0.0
+                ),
+            )
+        offset, reference_period = self.reference
+        self._merge(
+            indices, message_times - (offset + reference_period * indices)
+        )
+
+    def _merge(self, indices: ndarray, deviations: ndarray) -> None:
+        """Merge the moments of messages (Chan et al.)
+
+        Parameters
+        ----------
+
+        indices:
+            The (unwrapped) number of every message
+
+        deviations:
+            The deviation of the receive time of every message from the
+            reference line
+
+        """
+
+        count = len(indices)
+        index_mean = float(indices.mean())
+        deviation_mean = float(deviations.mean())
+        index_centered = indices - index_mean
+        deviation_centered = deviations - deviation_mean
+
+        total = self.messages + count
+        index_delta = index_mean - self.index_mean
+        deviation_delta = deviation_mean - self.deviation_mean
+        weight = self.messages * count / total
+        self.index_squares += (
+            float((index_centered * index_centered).sum())
+            + index_delta * index_delta * weight
+        )
+        self.deviation_squares += (
+            float((deviation_centered * deviation_centered).sum())
+            + deviation_delta * deviation_delta * weight
+        )
+        self.products += (
+            float((index_centered * deviation_centered).sum())
+            + index_delta * deviation_delta * weight
+        )
+        self.index_mean += index_delta * count / total
+        self.deviation_mean += deviation_delta * count / total
+        self.messages = total
+
+
+# pylint: enable=too-many-instance-attributes
+
+
+class TimingModel:
+    """Map stored rows to timestamps on a uniform time grid"""
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        *,
+        offset: float,
+        period: float,
+        rows_per_message: int,
+        breakpoints: ndarray,
+        jitter: float,
+        drift: float,
+    ) -> None:
+        """Initialize the model using the given arguments
+
+        Parameters
+        ----------
+
+        offset:
+            The (fitted) receive time of the first message in microseconds
+
+        period:
+            The (fitted) time between two messages in microseconds
+
+        rows_per_message:
+            The number of rows that store the data of a single message
+
+        breakpoints:
+            A two dimensional array that contains the row and message number
+            of the first row and every row after lost messages
+
+        jitter:
+            The standard deviation of the receive times from the fitted
+            times in microseconds
+
+        drift:
+            The deviation of the fitted period from the nominal period in
+            parts per million or NaN, if the nominal period is unknown
+
+        """
+
+        self.offset = offset
+        self.period = period
+        self.rows_per_message = rows_per_message
+        self.breakpoints = breakpoints
+        self.jitter = jitter
+        self.drift = drift
+
+    def __repr__(self) -> str:
+        """Get the textual representation of the model
+
+        Returns
+        -------
+
+        A string that contains the fitted sample rate, jitter and drift
+
+        Examples
+        --------
+
+        >>> TimingModel(offset=0, period=315, rows_per_message=3,
+        ...             breakpoints=array([[0, 0]]), jitter=12.5, drift=nan)
+        Sample Rate: 9523.81 Hz, Jitter: 12.50 µs, Drift: nan ppm, Gaps: 0
+
+        """
+
+        return (
+            f"Sample Rate: {self.sample_rate():.2f} Hz, "
+            f"Jitter: {self.jitter:.2f} µs, "
+            f"Drift: {self.drift:.2f} ppm, "
+            f"Gaps: {len(self.breakpoints) - 1}"
+        )
+
+    def sample_rate(self) -> float:
+        """Get the fitted sample rate
+
+        Returns
+        -------
+
+        The number of rows per second
+
+        """
+
+        return self.rows_per_message / self.period * 1_000_000
+
+    def positions(self, start: int, stop: int) -> ndarray:
+        """Get the positions of certain rows on the uniform sample grid
+
+        The sample grid contains every value measured by the sensor node,
+        including the values of lost messages. Consecutive positions are
+        `period / rows_per_message` microseconds apart.
+
+        Parameters
+        ----------
+
+        start:
+            The index of the first row
+
+        stop:
+            The index after the last row
+
+        Returns
+        -------
+
+        The grid position of every row
+
+        Examples
+        --------
+
+        >>> model = TimingModel(offset=900, period=300, rows_per_message=3,
+        ...                     breakpoints=array([[0, 0], [6, 10]]),
+        ...                     jitter=0, drift=nan)
+        >>> model.positions(0, 9)
+        array([-2, -1,  0,  1,  2,  3, 28, 29, 30])
+
+        """
+
+        rows: ndarray = arange(start, stop, dtype=int64)
+        segments = searchsorted(self.breakpoints[:, 0], rows, side="right") - 1
+        first_rows = self.breakpoints[segments, 0]
+        first_messages = self.breakpoints[segments, 1]
+
+        # Align the last value of a message with the fitted receive time
+        return (
+            first_messages * self.rows_per_message
+            + (rows - first_rows)
+            - (self.rows_per_message - 1)
+        )
+
+    def timestamps(self, start: int, stop: int) -> ndarray:
+        """Get the timestamps of certain rows
+
+        The values of a message are distributed evenly over the time
+        between the previous and the current message.
+
+        Parameters
+        ----------
+
+        start:
+            The index of the first row
+
+        stop:
+            The index after the last row
+
+        Returns
+        -------
+
+        The timestamps of the rows in microseconds
+
+        Examples
+        --------
+
+        >>> model = TimingModel(offset=900, period=300, rows_per_message=3,
+        ...                     breakpoints=array([[0, 0], [6, 10]]),
+        ...                     jitter=0, drift=nan)
+        >>> model.timestamps(0, 9)
+        array([ 700.,  800.,  900., 1000., 1100., 1200., 3700., 3800., 3900.])
+
+        """
+
+        return self.offset + self.period * (
+            self.positions(start, stop) / self.rows_per_message
+        )
+
+    def gaps(self) -> ndarray:
+        """Get the location and size of all gaps caused by lost messages
+
+        Returns
+        -------
+
+        A two dimensional array that contains the first row after every gap
+        and the number of messages lost right before this row
+
+        Examples
+        --------
+
+        >>> model = TimingModel(offset=900, period=300, rows_per_message=3,
+        ...                     breakpoints=array([[0, 0], [6, 10], [9, 20]]),
+        ...                     jitter=0, drift=nan)
+        >>> model.gaps()
+        array([[6, 8],
+               [9, 9]])
+
+        """
+
+        breakpoints = self.breakpoints
+        expected = (
+            breakpoints[:-1, 1]
+            + (breakpoints[1:, 0] - breakpoints[:-1, 0])
+            // self.rows_per_message
+        )
+
+        return column_stack(
+            (breakpoints[1:, 0], breakpoints[1:, 1] - expected)
+        )
+
+    def store(self, file_handle: File) -> None:
+        """Store the model in an HDF5 file
+
+        Parameters
+        ----------
+
+        file_handle:
+            The HDF5 file that stores the measurement data
+
+        Examples
+        --------
+
+        >>> from pathlib import Path
+        >>> from tables import open_file
+
+        >>> model = TimingModel(offset=900, period=300, rows_per_message=3,
+        ...                     breakpoints=array([[0, 0], [6, 10]]),
+        ...                     jitter=1.5, drift=20)
+        >>> filepath = Path("test.hdf5")
+        >>> with open_file(filepath, mode="w") as hdf:
+        ...     model.store(hdf)
+        >>> with open_file(filepath, mode="r") as hdf:
+        ...     TimingModel.load(hdf)
+        Sample Rate: 10000.00 Hz, Jitter: 1.50 µs, Drift: 20.00 ppm, Gaps: 1
+        >>> filepath.unlink()
+
+        """
+
+        try:
+            file_handle.remove_node("/timing")
+        except NoSuchNodeError:
+            pass
+
+        node = file_handle.create_array(
+            file_handle.root,
+            "timing",
+            obj=self.breakpoints,
+            title="Timing Model (Row and Message Number After Gaps)",
+        )
+        for name, value in (
+            ("offset", self.offset),
+            ("period", self.period),
+            ("rows_per_message", self.rows_per_message),
+            ("jitter", self.jitter),
+            ("drift", self.drift),
+        ):
+            file_handle.set_node_attr(node, name, value)
+
+    @classmethod
+    def load(cls, file_handle: File) -> Optional[TimingModel]:
+        """Load the model stored in an HDF5 file
+
+        Parameters
+        ----------
+
+        file_handle:
+            The HDF5 file that stores the measurement data
+
+        Returns
+        -------
+
+        The stored timing model or `None`, if the file does not contain a
+        timing model
+
+        """
+
+        try:
+            node = file_handle.get_node("/timing")
+        except NoSuchNodeError:
+            return None
+
+        assert isinstance(node, Array)
+
+        def attribute(name: str) -> float:
+            return float(file_handle.get_node_attr(node, name))
+
+        return cls(
+            offset=attribute("offset"),
+            period=attribute("period"),
+            rows_per_message=int(attribute("rows_per_message")),
+            breakpoints=node.read(),
+            jitter=attribute("jitter"),
+            drift=attribute("drift"),
+        )
+
+
+# -- Main ---------------------------------------------------------------------
+
+if __name__ == "__main__":
+    from doctest import testmod
+
+    testmod()
@@ -0,0 +1,637 @@
+"""Store only the measurement data around certain events
+
+The class `TriggeredRecorder` keeps the most recent values of a running
+measurement in a circular buffer (`RingBuffer`) and checks trigger
+conditions for every block of streaming data. If one of the conditions is
+met, then the recorder stores the values before (pre-trigger) and after
+(post-trigger) the event. All other values are discarded.
+
+Supported trigger conditions are:
+
+- `ThresholdTrigger`: the absolute acceleration reaches a certain level
+- `RMSTrigger`: the RMS value of a sliding window reaches a certain level
+- `BandEnergyTrigger`: the energy of a frequency band reaches a certain
+  level
+"""
+
+# -- Imports ------------------------------------------------------------------
+
+from __future__ import annotations
+
+from typing import Callable, List, Optional, Sequence
+
+from numpy import (
+    abs as absolute,
+    concatenate,
+    cumsum,
+    dtype,
+    empty,
+    flatnonzero,
+    float64,
+    ndarray,
+    stack,
+    zeros,
+)
+
+from mytoolit.can.streaming import StreamingBlock, StreamingConfiguration
+from mytoolit.measurement.segments import MessageCounter
+from mytoolit.measurement.spectrum import SpectralAnalyzer
+from mytoolit.measurement.storage import StorageData
+
+# -- Classes ------------------------------------------------------------------
+
+
+class RingBuffer:
+    """Store the most recent rows of measurement data"""
+
+    def __init__(self, capacity: int, row_type: dtype) -> None:
+        """Initialize the buffer using the given arguments
+
+        Parameters
+        ----------
+
+        capacity:
+            The maximum number of rows stored in the buffer
+
+        row_type:
+            The data type of a single row
+
+        Examples
+        --------
+
+        >>> from numpy import arange
+
+        >>> buffer = RingBuffer(4, dtype(int))
+        >>> buffer.push(arange(3))
+        >>> buffer.read()
+        array([0, 1, 2])
+        >>> buffer.push(arange(3, 6))
+        >>> buffer.read()
+        array([2, 3, 4, 5])
+        >>> buffer.push(arange(6, 20))
+        >>> buffer.read(), len(buffer)
+        (array([16, 17, 18, 19]), 4)
+
+        """
+
+        self.rows = empty(capacity, dtype=row_type)
+        self.start = 0
+        self.count = 0
+
+    def __len__(self) -> int:
+        """Get the number of stored rows
+
+        Returns
+        -------
+
+        The number of rows currently stored in the buffer
+
+        """
+
+        return self.count
+
+    def push(self, data: ndarray) -> None:
+        """Add rows to the buffer and remove the oldest rows if necessary
+
+        Parameters
+        ----------
+
+        data:
+            The rows that should be added
+
+        """
+
+        capacity = len(self.rows)
+        if capacity <= 0 or len(data) <= 0:
+            return
+
+        if len(data) >= capacity:
+            self.rows[:] = data[-capacity:]
+            self.start = 0
+            self.count = capacity
+            return
+
+        end = (self.start + self.count) % capacity
+        first = min(len(data), capacity - end)
+        self.rows[end : end + first] = data[:first]
+        self.rows[: len(data) - first] = data[first:]
+
+        overflow = max(self.count + len(data) - capacity, 0)
+        self.start = (self.start + overflow) % capacity
+        self.count = min(self.count + len(data), capacity)
+
+    def read(self) -> ndarray:
+        """Get all rows of the buffer
+
+        Returns
+        -------
+
+        A copy of the stored rows, starting with the oldest row
+
+        """
+
+        end = self.start + self.count
+        if end <= len(self.rows):
+            return self.rows[self.start : end].copy()
+
+        return concatenate(
+            (self.rows[self.start :], self.rows[: end - len(self.rows)])
+        )
+
+    def clear(self) -> None:
+        """Remove all rows from the buffer"""
+
+        self.start = 0
+        self.count = 0
+
+
+# pylint: disable=too-few-public-methods
+
+
+class Trigger:
+    """Condition that starts the recording of measurement data"""
+
+    def check(self, values: ndarray) -> ndarray:
+        """Check the trigger condition for every sample
+
+        Parameters
+        ----------
+
+        values:
+            A two dimensional array that contains the acceleration values
+            (in multiples of g₀) of every channel (one row per channel)
+
+        Returns
+        -------
+
+        A boolean array that specifies for every sample, if the condition
+        is met
+
+        """
+
+        raise NotImplementedError()
+
+
+# pylint: enable=too-few-public-methods
+
+
+class ThresholdTrigger(Trigger):
+    """Trigger if the absolute acceleration of a channel reaches a level"""
+
+    def __init__(self, level: float) -> None:
+        """Initialize the trigger using the given arguments
+
+        Parameters
+        ----------
+
+        level:
+            The acceleration level in multiples of g₀
+
+        Examples
+        --------
+
+        >>> from numpy import array
+
+        >>> trigger = ThresholdTrigger(2)
+        >>> trigger
+        |a| ≥ 2 g₀
+        >>> trigger.check(array([[0, 1, -2, 0], [0, 0, 0, 3]]))
+        array([False, False,  True,  True])
+
+        """
+
+        self.level = level
+
+    def __repr__(self) -> str:
+        """Get the textual representation of the trigger
+
+        Returns
+        -------
+
+        A string that describes the trigger condition
+
+        """
+
+        return f"|a| ≥ {self.level:g} g₀"
+
+    def check(self, values: ndarray) -> ndarray:
+        """Check the trigger condition for every sample
+
+        Parameters
+        ----------
+
+        values:
+            A two dimensional array that contains the acceleration values
+            of every channel
+
+        Returns
+        -------
+
+        A boolean array that specifies for every sample, if the condition
+        is met
+
+        """
+
+        return (absolute(values) >= self.level).any(axis=0)
+
+
+class RMSTrigger(Trigger):
+    """Trigger if the RMS value of a sliding window reaches a level"""
+
+    def __init__(self, level: float, window: int) -> None:
+        """Initialize the trigger using the given arguments
+
+        Parameters
+        ----------
+
+        level:
+            The RMS level in multiples of g₀
+
+        window:
+            The number of samples of the sliding window
+
+        Examples
+        --------
+
+        The window continues across multiple calls of `check`
+
+        >>> from numpy import array
+
+        >>> trigger = RMSTrigger(level=1, window=4)
+        >>> trigger
+        RMS ≥ 1 g₀ (4 Samples)
+        >>> trigger.check(array([[0, 1, 1]]))
+        array([False, False, False])
+        >>> trigger.check(array([[1, 1, 0, 0]]))
+        array([False,  True, False, False])
+
+        Blocks smaller than the window
+
+        >>> trigger = RMSTrigger(level=1, window=100)
+        >>> results = [trigger.check(array([[5, 5, 5]])) for _ in range(40)]
+        >>> [number for number, result in enumerate(results) if result.any()]
+        [33, 34, 35, 36, 37, 38, 39]
+        >>> results[32], results[33]
+        (array([False, False, False]), array([ True,  True,  True]))
+
+        """
+
+        if window <= 0:
+            raise ValueError(f"Incorrect window size “{window}”")
+
+        self.level = level
+        self.window = window
+        self.history: Optional[ndarray] = None
+
+    def __repr__(self) -> str:
+        """Get the textual representation of the trigger
+
+        Returns
+        -------
+
+        A string that describes the trigger condition
+
+        """
+
+        return f"RMS ≥ {self.level:g} g₀ ({self.window} Samples)"
+
+    def check(self, values: ndarray) -> ndarray:
+        """Check the trigger condition for every sample
+
+        Parameters
+        ----------
+
+        values:
+            A two dimensional array that contains the acceleration values
+            of every channel
+
+        Returns
+        -------
+
+        A boolean array that specifies for every sample, if the RMS value of
+        the window that ends with the sample reaches the level
+
+        """
+
+        samples = values.shape[1]
+        if self.history is None:
+            self.history = zeros((values.shape[0], 0))
+
+        squares = concatenate(
+            (self.history, values.astype(float64) ** 2), axis=1
+        )
+        sums = concatenate(
+            (zeros((len(squares), 1)), cumsum(squares, axis=1)), axis=1
+        )
+        # Mean square of every complete window
+        windows = (sums[:, self.window :] - sums[:, : -self.window]) / (
+            self.window
+        )
+        reached = (windows >= self.level**2).any(axis=0)
+
+        result = zeros(samples, dtype=bool)
+        complete = min(len(reached), samples)
+        if complete > 0:
+            result[samples - complete :] = reached[len(reached) - complete :]
+
+        # Keep the squares of the last (incomplete) window
+        start = max(squares.shape[1] - (self.window - 1), 0)
+        self.history = squares[:, start:]
+
+        return result
+
+
+class BandEnergyTrigger(Trigger):
+    """Trigger if the energy of a frequency band reaches a level"""
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        channels: StreamingConfiguration,
+        sample_rate: float,
+        low: float,
+        high: float,
+        level: float,
+        *,
+        segment_length: int = 256,
+    ) -> None:
+        """Initialize the trigger using the given arguments
+
+        Parameters
+        ----------
+
+        channels:
+            The channels contained in the streaming data
+
+        sample_rate:
+            The sample rate of a single channel in Hz
+
+        low:
+            The lower frequency of the band in Hz
+
+        high:
+            The upper frequency of the band in Hz
+
+        level:
+            The energy (mean square value) of the band in g₀²
+
+        segment_length:
+            The number of values per FFT segment
+
+        Examples
+        --------
+
+        >>> from numpy import arange, pi, sin
+
+        >>> trigger = BandEnergyTrigger(StreamingConfiguration(first=True),
+        ...                             sample_rate=1000, low=90, high=110,
+        ...                             level=0.1, segment_length=100)
+        >>> trigger
+        Energy 90–110 Hz ≥ 0.1 g₀²
+        >>> quiet = zeros((1, 200))
+        >>> trigger.check(quiet).any()
+        np.False_
+        >>> signal = sin(2 * pi * 100 * arange(200) / 1000).reshape(1, -1)
+        >>> trigger.check(signal)[-1]
+        np.True_
+
+        """
+
+        self.low = low
+        self.high = high
+        self.level = level
+        self.analyzer = SpectralAnalyzer(
+            channels,
+            sample_rate,
+            segment_length=segment_length,
+            overlap=0.5,
+            update_interval=segment_length / 2 / sample_rate,
+        )
+
+    def __repr__(self) -> str:
+        """Get the textual representation of the trigger
+
+        Returns
+        -------
+
+        A string that describes the trigger condition
+
+        """
+
+        return f"Energy {self.low:g}–{self.high:g} Hz ≥ {self.level:g} g₀²"
+
+    def check(self, values: ndarray) -> ndarray:
+        """Check the trigger condition for every sample
+
+        The trigger computes the band energy of the segments completed by
+        the given values and marks the last sample, if the energy reaches
+        the level.
+
+        Parameters
+        ----------
+
+        values:
+            A two dimensional array that contains the acceleration values
+            of every channel
+
+        Returns
+        -------
+
+        A boolean array that specifies for every sample, if the condition
+        is met
+
+        """
+
+        result = zeros(values.shape[1], dtype=bool)
+        spectrum = self.analyzer.add(values)
+        if spectrum is not None and len(result) > 0:
+            energy = spectrum.band_energy(self.low, self.high)
+            result[-1] = bool((energy >= self.level).any())
+
+        return result
+
+
+# pylint: disable=too-many-instance-attributes
+
+
+class TriggeredRecorder(MessageCounter):
+    """Store the measurement data before and after trigger events"""
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        storage: StorageData,
+        triggers: Sequence[Trigger],
+        sample_rate: float,
+        *,
+        pre_trigger: float = 1,
+        post_trigger: float = 2,
+        conversion: Optional[Callable[[ndarray], ndarray]] = None,
+    ) -> None:
+        """Initialize the recorder using the given arguments
+
+        Parameters
+        ----------
+
+        storage:
+            The storage for the data around the trigger events
+
+        triggers:
+            The trigger conditions; the recorder starts storing data, if
+            one of the conditions is met
+
+        sample_rate:
+            The sample rate of a single channel in Hz
+
+        pre_trigger:
+            The time before a trigger event that should be stored in
+            seconds
+
+        post_trigger:
+            The time after a trigger event that should be stored in
+            seconds. Another trigger event during this time extends the
+            recording.
+
+        conversion:
+            A function that converts the raw streaming values into
+            multiples of g₀. The trigger conditions always use converted
+            values; the storage only stores converted values, if it does
+            not store raw values.
+
+        Examples
+        --------
+
+        >>> from pathlib import Path
+        >>> from numpy import arange, array, uint8, uint16, uint32
+        >>> from mytoolit.measurement.storage import Storage
+
+        Store two values before and three values after every value of at
+        least 5 g₀ (the value 6 extends the recording started by the value 5)
+
+        >>> filepath = Path("test.hdf5")
+        >>> channels = StreamingConfiguration(first=True)
+        >>> with Storage(filepath, channels, raw=True) as data:
+        ...     recorder = TriggeredRecorder(
+        ...         data, [ThresholdTrigger(5)], sample_rate=1000,
+        ...         pre_trigger=0.002, post_trigger=0.003)
+        ...     for start, values in ((0, [0, 1, 2, 3]),
+        ...                           (4, [4, 5, 6, 0, 0, 0, 0])):
+        ...         recorder.add_streaming_block(StreamingBlock(
+        ...             counters=(arange(len(values)) + start).astype(uint8),
+        ...             timestamps=(arange(len(values)) + start) / 1000,
+        ...             values=array(values, dtype=uint16).reshape(-1, 1),
+        ...             lost=zeros(len(values), dtype=uint32),
+        ...             configuration=channels))
+        ...     print(data.acceleration.col("x"), recorder.events,
+        ...           recorder.dataloss_stats())
+        [3 4 5 6 0 0] [0.005] (11, 0)
+        >>> filepath.unlink()
+
+        """
+
+        self.storage = storage
+        self.triggers = triggers
+        self.conversion = conversion
+        self.pre_rows = max(round(pre_trigger * sample_rate), 0)
+        self.post_rows = max(round(post_trigger * sample_rate), 1)
+
+        self.buffer = RingBuffer(self.pre_rows, storage.acceleration.dtype)
+        self.remaining = 0
+        self.events: List[float] = []
+        super().__init__()
+
+        storage.add_acceleration_meta(
+            "Trigger",
+            f"{', '.join(map(repr, triggers))} (Pre-Trigger: "
+            f"{pre_trigger:g} s, Post-Trigger: {post_trigger:g} s)",
+        )
+
+    def add_streaming_block(self, block: StreamingBlock) -> None:
+        """Check the trigger conditions for a block of streaming data
+
+        Parameters
+        ----------
+
+        block:
+            The streaming data that should be checked
+
+        """
+
+        if len(block) <= 0:
+            return
+
+        self._count(block.counters)
+
+        storage = self.storage
+        rows = storage.convert_block(
+            block, None if storage.raw else self.conversion
+        )
+        values = stack([rows[axis] for axis in storage.axes])
+        if storage.raw and self.conversion is not None:
+            values = self.conversion(values)
+
+        mask: ndarray = zeros(len(rows), dtype=bool)
+        for trigger in self.triggers:
+            mask |= trigger.check(values)
+
+        self._store(rows, mask)
+
+    def _store(self, rows: ndarray, mask: ndarray) -> None:
+        """Store the rows before and after trigger events
+
+        Parameters
+        ----------
+
+        rows:
+            The rows of a block of streaming data
+
+        mask:
+            A boolean array that specifies for every row, if a trigger
+            condition is met
+
+        """
+
+        position = 0
+        while position < len(rows):
+            if self.remaining <= 0:
+                hits = flatnonzero(mask[position:])
+                if len(hits) <= 0:
+                    self.buffer.push(rows[position:])
+                    break
+
+                event = position + int(hits[0])
+                before = concatenate(
+                    (self.buffer.read(), rows[position:event])
+                )
+                self.storage.add_rows(
+                    before[len(before) - min(len(before), self.pre_rows) :]
+                )
+                self.buffer.clear()
+                self.events.append(float(rows["timestamp"][event]) / 10**6)
+                self.remaining = self.post_rows
+                position = event
+
+            stop = min(len(rows), position + self.remaining)
+            while True:
+                # Other events extend the post-trigger window
+                hits = flatnonzero(mask[position:stop])
+                if len(hits) > 0:
+                    self.remaining = max(
+                        self.remaining, int(hits[-1]) + self.post_rows
+                    )
+                extended = min(len(rows), position + self.remaining)
+                if extended == stop:
+                    break
+                stop = extended
+
+            self.storage.add_rows(rows[position:stop])
+            self.remaining -= stop - position
+            position = stop
+
+
+# pylint: enable=too-many-instance-attributes
+
+# -- Main ---------------------------------------------------------------------
+
+if __name__ == "__main__":
+    from doctest import testmod
+
+    testmod()
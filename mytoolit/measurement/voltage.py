@@ -24,7 +24,8 @@ def convert_raw_to_supply_voltage(
     Returns
     -------
 
-    The supply voltage in volts
+    The supply voltage in volts. The function also converts arrays of raw
+    values.
 
     Example:
 
@@ -36,9 +37,15 @@ def convert_raw_to_supply_voltage(
     >>> 5.12 < voltage < 5.14
     True
 
+    >>> from numpy import array, uint16
+    >>> convert_raw_to_supply_voltage(array([0, 11000], dtype=uint16)
+    ...                              ).round(2)
+    array([0.  , 3.16])
+
     """
 
-    if voltage_raw <= 0:
+    # Raw values of arrays are unsigned (uint16)
+    if isinstance(voltage_raw, int) and voltage_raw <= 0:
         return 0
 
     # The value below is the result of the voltage divider circuit, which
@@ -8,26 +8,57 @@ for more information
 # -- Imports ------------------------------------------------------------------
 
 from argparse import Namespace
-from asyncio import run, sleep
+from asyncio import create_task, run, sleep
 from functools import partial
 from logging import basicConfig, getLogger
 from pathlib import Path
+from sqlite3 import Error as SQLiteError
 from sys import stderr
 from time import perf_counter_ns, process_time_ns, time
-from typing import List
+from typing import List, Union
 
 from can.interfaces.pcan import PcanError
+from tables import NoSuchNodeError
 from tqdm import tqdm
 
 from mytoolit.can import Network
 from mytoolit.can.adc import ADCConfiguration
+from mytoolit.can.bandwidth import channel_sample_rate, plan_bandwidth
 from mytoolit.can.error import UnsupportedFeatureException
+from mytoolit.can.metrics import NetworkMetrics
 from mytoolit.can.network import STHDeviceInfo, NetworkError
-from mytoolit.can.streaming import StreamingTimeoutError
+from mytoolit.can.streaming import (
+    StreamingConfiguration,
+    StreamingTimeoutError,
+)
 from mytoolit.cmdline.parse import create_icon_parser
 from mytoolit.config import ConfigurationUtility, settings
-from mytoolit.measurement import convert_raw_to_g, Storage
+from mytoolit.measurement import (
+    Catalog,
+    Compression,
+    convert_raw_to_g,
+    convert_raw_to_supply_voltage,
+    export_measurement,
+    ExportStorage,
+    SegmentedStorage,
+    Storage,
+)
+from mytoolit.measurement.analysis import (
+    Analysis,
+    analyze_files,
+    write_summary,
+)
+from mytoolit.measurement.compression import benchmark_compression
+from mytoolit.measurement.live import LiveStatistics
 from mytoolit.measurement.sensor import SensorConfiguration
+from mytoolit.measurement.storage import StorageData, StorageException
+from mytoolit.measurement.trigger import (
+    BandEnergyTrigger,
+    RMSTrigger,
+    ThresholdTrigger,
+    Trigger,
+    TriggeredRecorder,
+)
 
 # -- Functions ----------------------------------------------------------------
 
@@ -76,6 +107,289 @@ async def read_acceleration_sensor_range_in_g(network: Network) -> float:
     return sensor_range
 
 
+def get_compression(arguments: Namespace) -> Compression:
+    """Get the compression settings for measurement data
+
+    Parameters
+    ----------
+
+    arguments:
+        The given command line arguments
+
+    Returns
+    -------
+
+    The compression settings specified on the command line, or in the
+    configuration, if there was no command line argument for a setting
+
+    """
+
+    config = settings.measurement.compression
+    library = arguments.compression
+    level = arguments.compression_level
+    shuffle = arguments.shuffle
+
+    return Compression(
+        library=config.library if library is None else library,
+        level=config.level if level is None else level,
+        shuffle=config.shuffle if shuffle is None else shuffle,
+        threads=config.threads if config.threads > 0 else None,
+    )
+
+
+def create_storage(
+    arguments: Namespace, channels: StreamingConfiguration
+) -> Union[Storage, SegmentedStorage, ExportStorage]:
+    """Create the storage object for new measurement data
+
+    Parameters
+    ----------
+
+    arguments:
+        The given command line arguments
+
+    channels:
+        The channels that should be stored
+
+    Returns
+    -------
+
+    A storage that writes the data directly into the chosen file format, if
+    the format is not HDF5, a segmented storage, if the configuration limits
+    the size or duration of measurement files and the measurement is not
+    triggered, or a storage for a single file otherwise
+
+    """
+
+    output = settings.measurement.output
+    filepath = settings.get_output_filepath()
+
+    if arguments.format != "hdf5":
+        return ExportStorage(
+            filepath.with_suffix(f".{arguments.format}"),
+            channels,
+            raw=arguments.raw,
+        )
+
+    flush_interval = (
+        output.flush_interval if output.flush_interval > 0 else None
+    )
+    compression = get_compression(arguments)
+    catalog = (
+        Catalog(settings.catalog_filepath())
+        if settings.measurement.catalog.enabled
+        else None
+    )
+
+    segment = output.segment
+    # Triggered measurements only store small amounts of data
+    if (segment.size > 0 or segment.duration > 0) and not triggered(arguments):
+        return SegmentedStorage(
+            filepath.with_suffix(".json"),
+            channels,
+            compression,
+            raw=arguments.raw,
+            flush_interval=flush_interval,
+            max_size=int(segment.size * 1000**2) if segment.size > 0 else None,
+            max_duration=segment.duration if segment.duration > 0 else None,
+            catalog=catalog,
+            live=flush_interval is not None,
+        )
+
+    return Storage(
+        filepath,
+        channels,
+        compression,
+        raw=arguments.raw,
+        flush_interval=flush_interval,
+        catalog=catalog,
+        live=flush_interval is not None,
+    )
+
+
+def create_triggers(
+    arguments: Namespace, channels: StreamingConfiguration, sample_rate: float
+) -> List[Trigger]:
+    """Create the trigger conditions for a triggered measurement
+
+    Parameters
+    ----------
+
+    arguments:
+        The given command line arguments
+
+    channels:
+        The channels that should be stored
+
+    sample_rate:
+        The sample rate of a single channel in Hz
+
+    Returns
+    -------
+
+    The trigger conditions specified on the command line; an empty list
+    means that the measurement should store all data
+
+    """
+
+    triggers: List[Trigger] = []
+    if arguments.trigger_level is not None:
+        triggers.append(ThresholdTrigger(arguments.trigger_level))
+    if arguments.trigger_rms is not None:
+        triggers.append(
+            RMSTrigger(
+                arguments.trigger_rms,
+                window=max(round(arguments.rms_window * sample_rate), 1),
+            )
+        )
+    if arguments.trigger_band is not None:
+        low, high = arguments.trigger_band
+        triggers.append(
+            BandEnergyTrigger(
+                channels, sample_rate, low, high, arguments.trigger_energy
+            )
+        )
+
+    return triggers
+
+
+def triggered(arguments: Namespace) -> bool:
+    """Check if the measurement should only store data around events
+
+    Parameters
+    ----------
+
+    arguments:
+        The given command line arguments
+
+    Returns
+    -------
+
+    `True`, if the command line arguments contain a trigger condition or
+    `False` otherwise
+
+    """
+
+    return any(
+        value is not None
+        for value in (
+            arguments.trigger_level,
+            arguments.trigger_rms,
+            arguments.trigger_band,
+        )
+    )
+
+
+def analyze(arguments: Namespace) -> None:
+    """Compute metrics for multiple measurement files
+
+    Parameters
+    ----------
+
+    arguments:
+        The given command line arguments
+
+    """
+
+    filepaths: List[Path] = []
+    for path in map(Path, arguments.paths):
+        filepaths.extend(
+            sorted(path.rglob("*.hdf5")) if path.is_dir() else [path]
+        )
+
+    analysis = Analysis(
+        metrics=(
+            Analysis.METRICS if arguments.metric is None else arguments.metric
+        ),
+        bands=arguments.band,
+    )
+    results, errors = analyze_files(
+        filepaths, analysis, workers=arguments.workers
+    )
+    for error in errors:
+        print(error, file=stderr)
+
+    write_summary(results, arguments.output)
+    print(f"Stored results of {len(results)} files in “{arguments.output}”")
+
+
+def benchmark(arguments: Namespace) -> None:
+    """Compare the performance of different compression settings
+
+    Parameters
+    ----------
+
+    arguments:
+        The given command line arguments
+
+    """
+
+    compressions = [get_compression(arguments)]
+    user_choice = any(
+        value is not None
+        for value in (
+            arguments.compression,
+            arguments.compression_level,
+            arguments.shuffle,
+        )
+    )
+    if not user_choice:
+        threads = compressions[0].threads
+        compressions.extend(
+            Compression(library, level=5, shuffle=shuffle, threads=threads)
+            for library, shuffle in (
+                ("blosc:blosclz", "byte"),
+                ("blosc:lz4", "byte"),
+                ("blosc:lz4", "bit"),
+                ("blosc:zstd", "byte"),
+                ("blosc:zstd", "bit"),
+            )
+        )
+
+    for result in benchmark_compression(arguments.filepath, compressions):
+        print(result)
+
+
+def catalog(arguments: Namespace) -> None:
+    """Add measurement files to the catalog or search the catalog
+
+    Parameters
+    ----------
+
+    arguments:
+        The given command line arguments
+
+    """
+
+    with Catalog(settings.catalog_filepath()) as measurement_catalog:
+        if arguments.catalog_subcommand == "index":
+            directories = arguments.directories or [
+                settings.output_directory()
+            ]
+            added, errors = measurement_catalog.index(
+                directories, workers=arguments.workers
+            )
+            for error in errors:
+                print(error, file=stderr)
+            print(f"Added {added} measurement files to the catalog")
+            return
+
+        for info in measurement_catalog.search(
+            name=arguments.name,
+            since=arguments.since,
+            until=arguments.until,
+            min_sample_rate=arguments.min_rate,
+            max_sample_rate=arguments.max_rate,
+            max_dataloss=(
+                None
+                if arguments.max_loss is None
+                else arguments.max_loss / 100
+            ),
+            attributes=dict(arguments.attribute),
+        ):
+            print(info)
+
+
 def config(arguments: Namespace) -> None:  # pylint: disable=unused-argument
     """Open configuration file"""
 
@@ -91,7 +405,7 @@ async def dataloss(arguments: Namespace) -> None:
     identifier = arguments.identifier
     logger = getLogger(__name__)
 
-    async with Network() as network:
+    async with Network(metrics=arguments.metrics) as network:
         logger.info("Connecting to “%s”", identifier)
         await network.connect_sensor_device(identifier)
         logger.info("Connected to “%s”", identifier)
@@ -132,7 +446,8 @@ async def dataloss(arguments: Namespace) -> None:
                 start_time = time()
                 try:
                     async with network.open_data_stream(
-                        sensor_config.streaming_configuration()
+                        sensor_config.streaming_configuration(),
+                        overflow=settings.measurement.buffer.overflow,
                     ) as stream:
                         async for data, _ in stream:
                             data.apply(conversion_to_g)
@@ -153,9 +468,26 @@ async def dataloss(arguments: Namespace) -> None:
 # pylint: enable=too-many-locals
 
 
-async def list_sensor_devices(
-    arguments: Namespace,  # pylint: disable=unused-argument
-) -> None:
+def export(arguments: Namespace) -> None:
+    """Convert a measurement file into another format
+
+    Parameters
+    ----------
+
+    arguments:
+        The given command line arguments
+
+    """
+
+    rows = export_measurement(
+        arguments.source,
+        arguments.destination,
+        row_group_size=arguments.row_group_size,
+    )
+    print(f"Exported {rows} rows to “{arguments.destination}”")
+
+
+async def list_sensor_devices(arguments: Namespace) -> None:
     """Print a list of available sensor devices
 
     Parameters
@@ -166,7 +498,7 @@ async def list_sensor_devices(
 
     """
 
-    async with Network() as network:
+    async with Network(metrics=arguments.metrics) as network:
         timeout = time() + 5
         sensor_devices: List[STHDeviceInfo] = []
         sensor_devices_before: List[STHDeviceInfo] = []
@@ -204,7 +536,7 @@ async def measure(arguments: Namespace) -> None:
     identifier = arguments.identifier
     measurement_time_s = arguments.time
 
-    async with Network() as network:
+    async with Network(metrics=arguments.metrics) as network:
         await network.connect_sensor_device(identifier)
 
         adc_config = ADCConfiguration(
@@ -234,42 +566,136 @@ async def measure(arguments: Namespace) -> None:
         sensor_range = await read_acceleration_sensor_range_in_g(network)
         conversion_to_g = partial(convert_raw_to_g, max_value=sensor_range)
 
-        with Storage(
-            settings.get_output_filepath(),
-            user_sensor_config.streaming_configuration(),
-        ) as storage:
+        # Raw data will be converted into multiples of g when it is read back
+        raw = arguments.raw
+        conversion = None if raw else conversion_to_g
+
+        streaming_config = user_sensor_config.streaming_configuration()
+        logger.info("Streaming Configuration: %s", streaming_config)
+        # The first voltage channel contains the supply voltage
+        voltage_config = (
+            StreamingConfiguration(first=True) if arguments.voltage else None
+        )
+
+        bandwidth = plan_bandwidth(
+            adc_config,
+            streaming_config,
+            voltage_config,
+            can_bitrate=settings.can_configuration().get("bitrate"),
+        )
+        logger.info("Bandwidth: %s", bandwidth)
+        if not bandwidth.sustainable():
+            print(
+                "Warning: The sensor device is not able to transmit the "
+                "data of the current configuration without data loss "
+                f"({bandwidth}). Please use a lower sample rate or fewer "
+                "channels.",
+                file=stderr,
+            )
+
+        with create_storage(arguments, streaming_config) as storage:
             storage.write_sensor_range(sensor_range)
-            storage.write_sample_rate(adc_config)
+            storage.write_sample_rate(adc_config, voltage_config)
 
-            streaming_config = user_sensor_config.streaming_configuration()
-            logger.info("Streaming Configuration: %s", streaming_config)
             values_per_message = streaming_config.data_length()
+            # All enabled (acceleration and voltage) channels share the
+            # sample rate of the ADC
+            sample_rate = channel_sample_rate(
+                adc_config, streaming_config, voltage_config
+            )
+
+            recorder = None
+            if triggered(arguments):
+                assert isinstance(storage, StorageData)
+                recorder = TriggeredRecorder(
+                    storage,
+                    create_triggers(arguments, streaming_config, sample_rate),
+                    sample_rate,
+                    pre_trigger=arguments.pre_trigger,
+                    post_trigger=arguments.post_trigger,
+                    # The conversion also works for arrays of values
+                    conversion=conversion_to_g,  # type: ignore[arg-type]
+                )
+            dataloss_source = storage if recorder is None else recorder
+
+            voltage_conversion = partial(
+                convert_raw_to_supply_voltage,
+                reference_voltage=adc_config.reference_voltage(),
+            )
+
+            live = None
+            live_task = None
+            if arguments.live:
+                live = LiveStatistics(
+                    streaming_config,
+                    sample_rate,
+                    # The conversion also works for arrays of values
+                    conversion=conversion_to_g,  # type: ignore[arg-type]
+                )
+                # The dashboard uses a fixed refresh rate, independent of
+                # the rate of the received streaming data
+                live_task = create_task(live.show())
 
             progress = tqdm(
-                total=round(adc_config.sample_rate() * measurement_time_s, 0),
+                total=round(
+                    sample_rate
+                    * len(streaming_config.axes())
+                    * measurement_time_s,
+                    0,
+                ),
                 desc="Read sensor data",
                 unit=" values",
                 leave=False,
-                disable=None,
+                disable=True if arguments.live else None,
             )
 
             try:
-                async with network.open_data_stream(
-                    streaming_config
-                ) as stream:
+                async with network.open_streaming_session(
+                    streaming_config,
+                    voltage=voltage_config,
+                    overflow=settings.measurement.buffer.overflow,
+                ) as session:
                     start_time = time()
-                    async for data, _ in stream:
-                        data.apply(conversion_to_g)
-                        storage.add_streaming_data(data)
-                        progress.update(values_per_message)
+                    async for kind, block in session.blocks():
+                        if kind == "voltage":
+                            assert not isinstance(storage, ExportStorage)
+                            # The conversion also works for arrays of values
+                            storage.add_voltage_block(
+                                block,
+                                voltage_conversion,  # type: ignore[arg-type]
+                            )
+                            continue
+
+                        if recorder is not None:
+                            recorder.add_streaming_block(block)
+                        else:
+                            # The conversion also works for arrays of values
+                            storage.add_streaming_block(
+                                block, conversion  # type: ignore[arg-type]
+                            )
+                        if live is not None:
+                            live.add_streaming_block(block)
+                        progress.update(len(block) * values_per_message)
 
                         if time() - start_time >= measurement_time_s:
                             break
+
+                    buffer_stats = session.acceleration.buffer_stats
+                    if buffer_stats.overflows > 0:
+                        print(
+                            "Warning: Stream buffer overflow "
+                            f"({buffer_stats})",
+                            file=stderr,
+                        )
             except KeyboardInterrupt:
                 pass
             finally:
                 progress.close()
-                print(f"Data Loss: {storage.dataloss() * 100} %")
+                if live_task is not None:
+                    live_task.cancel()
+                if recorder is not None:
+                    print(f"Trigger Events: {len(recorder.events)}")
+                print(f"Data Loss: {dataloss_source.dataloss() * 100} %")
 
 
 async def rename(arguments: Namespace) -> None:
@@ -286,7 +712,7 @@ async def rename(arguments: Namespace) -> None:
     identifier = arguments.identifier
     name = arguments.name
 
-    async with Network() as network:
+    async with Network(metrics=arguments.metrics) as network:
         node = "STH 1"
 
         await network.connect_sensor_device(identifier)
@@ -314,7 +740,7 @@ async def stu(arguments: Namespace) -> None:
 
     subcommand = arguments.stu_subcommand
 
-    async with Network() as network:
+    async with Network(metrics=arguments.metrics) as network:
         if subcommand == "ota":
             # The coroutine below activates the advertisement required for the
             # Over The Air (OTA) firmware update.
@@ -334,6 +760,49 @@ async def stu(arguments: Namespace) -> None:
             raise ValueError(f"Unknown STU subcommand “{subcommand}”")
 
 
+async def run_command(arguments: Namespace) -> None:
+    """Execute the coroutine for the given subcommand
+
+    Parameters
+    ----------
+
+    arguments:
+        The given command line arguments
+
+    """
+
+    command_to_coroutine = {
+        "dataloss": dataloss,
+        "list": list_sensor_devices,
+        "measure": measure,
+        "rename": rename,
+        "stu": stu,
+    }
+
+    metrics: NetworkMetrics = arguments.metrics
+    stats_file = arguments.stats_file
+    dump_task = (
+        create_task(
+            metrics.dump(
+                stats_file,
+                interval=arguments.stats_interval,
+                file_format=arguments.stats_format,
+            )
+        )
+        if stats_file
+        else None
+    )
+
+    try:
+        await command_to_coroutine[arguments.subcommand](arguments)
+    finally:
+        if dump_task is not None:
+            dump_task.cancel()
+            metrics.write(stats_file, file_format=arguments.stats_format)
+        if arguments.stats:
+            print(metrics.summary(), file=stderr)
+
+
 def main():
     """ICOtronic command line tool"""
 
@@ -346,6 +815,21 @@ def main():
                 second=arguments.second_channel,
                 third=arguments.third_channel,
             ).check()
+            if (arguments.trigger_band is None) != (
+                arguments.trigger_energy is None
+            ):
+                raise ValueError(
+                    "Options “--trigger-band” and “--trigger-energy” have to "
+                    "be used together"
+                )
+            if triggered(arguments) and arguments.format != "hdf5":
+                raise ValueError(
+                    "Triggered measurements only support the format “hdf5”"
+                )
+            if arguments.voltage and arguments.format != "hdf5":
+                raise ValueError(
+                    "Option “--voltage” only supports the format “hdf5”"
+                )
     except ValueError as error:
         parser.prog = f"{parser.prog} {arguments.subcommand}"
         parser.error(str(error))
@@ -361,18 +845,34 @@ def main():
 
     if arguments.subcommand == "config":
         config(arguments.subcommand)
+    elif arguments.subcommand == "analyze":
+        try:
+            analyze(arguments)
+        except OSError as error:
+            print(error, file=stderr)
+    elif arguments.subcommand == "catalog":
+        try:
+            catalog(arguments)
+        except (OSError, SQLiteError, StorageException) as error:
+            print(error, file=stderr)
+    elif arguments.subcommand == "export":
+        try:
+            export(arguments)
+        except (OSError, ValueError, StorageException) as error:
+            print(error, file=stderr)
+    elif arguments.subcommand == "benchmark":
+        try:
+            benchmark(arguments)
+        except (OSError, NoSuchNodeError) as error:
+            print(error, file=stderr)
     else:
-        command_to_coroutine = {
-            "dataloss": dataloss,
-            "list": list_sensor_devices,
-            "measure": measure,
-            "rename": rename,
-            "stu": stu,
-        }
+        # All subcommands share the same metrics collector, which stores
+        # performance data of the CAN network
+        arguments.metrics = NetworkMetrics()
 
         try:
             perf_start, cpu_start = perf_counter_ns(), process_time_ns()
-            run(command_to_coroutine[arguments.subcommand](arguments))
+            run(run_command(arguments))
             perf_end, cpu_end = perf_counter_ns(), process_time_ns()
             run_time_command = perf_end - perf_start
             cpu_time_command = cpu_end - cpu_start
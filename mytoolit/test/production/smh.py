@@ -7,9 +7,7 @@ from unittest import main as unittest_main
 from mytoolit.can.node import Node
 from mytoolit.cmdline.commander import Commander
 from mytoolit.config import settings
-from mytoolit.measurement.sensor import guess_sensor, SensorConfiguration
 from mytoolit.report import Report
-from mytoolit.can.streaming import StreamingConfiguration
 from mytoolit.test.production import TestSensorNode
 from mytoolit.test.unit import ExtendedTestRunner
 
@@ -111,43 +109,14 @@ class TestSMH(TestSensorNode):
     def test_sensors(self):
         """Test available sensor channels"""
 
-        async def read_streaming_data_amount(length: int):
-            async with self.can.open_data_stream(
-                StreamingConfiguration(first=True, second=False, third=False)
-            ) as stream:
-                stream_data = []
-                async for data, _ in stream:
-                    stream_data.extend(data.values)
-                    if len(stream_data) >= length:
-                        break
-
-            # Due to the chosen streaming format the code above might have
-            # collected one or two additional values. We remove these values
-            # here.
-            assert len(stream_data) >= length
-            additional_values = len(stream_data) - length
-            return stream_data[:-additional_values]
-
         async def test_sensors():
             cls = type(self)
 
-            for test_channel in range(1, settings.smh.channels + 1):
-                await self.can.write_sensor_configuration(
-                    SensorConfiguration(first=test_channel)
-                )
-                config = await self.can.read_sensor_configuration()
-                self.assertEqual(
-                    config.first,
-                    test_channel,
-                    f"Read sensor channel number “{config.first}” does "
-                    f"not match expected channel number “{test_channel}”",
+            cls.sensors.extend(
+                await self.can.scan_sensors(
+                    range(1, settings.smh.channels + 1), samples=1000
                 )
-                stream_data = await read_streaming_data_amount(1000)
-                values = [
-                    timestamped.value for timestamped in stream_data.first
-                ]
-                sensor = guess_sensor(values)
-                cls.sensors.append(sensor)
+            )
 
             non_working_sensors = [
                 str(sensor_number)
@@ -16,7 +16,11 @@ from semantic_version import Version
 from mytoolit.can import Node
 from mytoolit.can.streaming import StreamingConfiguration
 from mytoolit.config import settings
-from mytoolit.measurement import convert_raw_to_g, ratio_noise_max
+from mytoolit.measurement import (
+    convert_raw_to_g,
+    ratio_noise_max,
+    StreamingStatistics,
+)
 from mytoolit.report import Report
 from mytoolit.test.production import TestSensorNode
 from mytoolit.test.unit import ExtendedTestRunner
@@ -265,18 +269,18 @@ class TestSTH(TestSensorNode):
 
         async def read_streaming_data():
             """Read streaming data of first channel"""
-            stream_data = []
+            statistics = StreamingStatistics()
             seconds = 4
             async with self.can.open_data_stream(
                 StreamingConfiguration(first=True)
             ) as stream:
                 end_time = time() + seconds
-                async for data, _ in stream:
-                    stream_data.extend(data.values)
+                async for block in stream.blocks():
+                    statistics.add(block.values)
                     if time() > end_time:
                         break
 
-            return stream_data
+            return statistics
 
         acceleration = self.loop.run_until_complete(read_streaming_data())
 